@@ -0,0 +1,92 @@
+"""FinOps cost export API endpoints."""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from chatbot_ai_system.finops.cost_analyzer import CostAnalyzer
+from chatbot_ai_system.finops.cost_tracker import cost_tracker
+from chatbot_ai_system.finops.exporters import EXPORT_FORMATS
+from chatbot_ai_system.tenancy.tenant_middleware import require_tenant_context
+
+finops_router = APIRouter()
+
+# JWT permission that allows reading the costs of every tenant
+ADMIN_PERMISSION = "system:admin"
+
+
+def _is_admin(tenant_context: dict) -> bool:
+    return ADMIN_PERMISSION in (tenant_context.get("permissions") or [])
+
+
+def _export_tenant(tenant_context: dict, tenant_id: Optional[str]) -> Optional[str]:
+    """Scope an export to the caller's tenant unless they are a system admin."""
+    if _is_admin(tenant_context):
+        return tenant_id
+
+    own_tenant = tenant_context["tenant_id"]
+    if tenant_id and tenant_id != own_tenant:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cost exports are limited to your own tenant",
+        )
+    return own_tenant
+
+
+def _streaming_response(stream, media_type: str, filename: str, compress: bool):
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
+
+@finops_router.get("/costs/export")
+async def export_costs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|arrow)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tenant_id: Optional[str] = None,
+    gzip: bool = True,
+    tenant_context: dict = Depends(require_tenant_context),
+):
+    """Stream cost entries for a period without materializing the export.
+
+    Tenants can only export their own entries; system admins can export any
+    tenant, or all of them when ``tenant_id`` is omitted.
+    """
+    tenant_id = _export_tenant(tenant_context, tenant_id)
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Arrow export requires pyarrow",
+            )
+
+    stream = cost_tracker.stream_export(format, start, end, tenant_id, compress=gzip)
+    extension = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows"}[format]
+    return _streaming_response(stream, EXPORT_FORMATS[format], f"costs.{extension}", gzip)
+
+
+@finops_router.get("/costs/report")
+async def cost_report(
+    format: str = Query("summary", pattern="^(summary|json)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gzip: bool = False,
+    tenant_context: dict = Depends(require_tenant_context),
+):
+    """Stream a cost analysis report across all tenants (system admins only)."""
+    if not _is_admin(tenant_context):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cost reports require the system:admin permission",
+        )
+    analyzer = CostAnalyzer(cost_tracker)
+    stream = analyzer.stream_cost_report(format, start, end, compress=gzip)
+    media_type = "application/json" if format == "json" else "text/plain"
+    filename = "cost-report.json" if format == "json" else "cost-report.txt"
+    return _streaming_response(stream, media_type, filename, gzip)
@@ -0,0 +1,70 @@
+"""Profiling admin API endpoints (mounted when PROFILING_ENABLED is set)."""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from chatbot_ai_system.config.settings import settings
+from chatbot_ai_system.telemetry.profiler import profiler
+
+
+def _require_token(x_profiling_token: Optional[str] = Header(None)):
+    """Check the profiling token; without a configured token every request is refused."""
+    expected = settings.profiling_token
+    if expected is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token not configured"
+        )
+    if not x_profiling_token or not secrets.compare_digest(
+        x_profiling_token, expected.get_secret_value()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+profiling_router = APIRouter(dependencies=[Depends(_require_token)])
+
+
+@profiling_router.get("/status")
+async def get_profiling_status():
+    """Get loop lag, slow callbacks and hot section timings."""
+    return profiler.get_status()
+
+
+@profiling_router.post("/start")
+async def start_profiling(
+    slow_callback_ms: float = Query(None, gt=0),
+    stack_interval_ms: Optional[float] = Query(None, ge=1, le=1000),
+):
+    """Start the profiler, optionally with continuous stack sampling."""
+    profiler.start(slow_callback_ms=slow_callback_ms, stack_interval_ms=stack_interval_ms)
+    return profiler.get_status()
+
+
+@profiling_router.post("/stop")
+async def stop_profiling():
+    """Stop the profiler."""
+    profiler.stop()
+    return profiler.get_status()
+
+
+@profiling_router.post("/reset", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_profiling():
+    """Forget everything recorded so far."""
+    profiler.reset()
+
+
+@profiling_router.get("/flamegraph", response_class=PlainTextResponse)
+async def get_flamegraph(
+    duration_s: float = Query(10.0, ge=0, le=300),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+):
+    """Get collapsed stacks of the event-loop thread (flamegraph.pl / speedscope input).
+
+    Samples for ``duration_s``; with 0, returns what the continuous sampler has
+    collected.
+    """
+    if duration_s == 0:
+        return profiler.sampler.collapsed()
+    return await profiler.sample(duration_s=duration_s, interval_ms=interval_ms)
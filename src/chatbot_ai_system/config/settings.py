@@ -81,6 +81,18 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = Field(default="INFO", validation_alias="LOG_LEVEL")
 
+    # Tracing
+    enable_tracing: bool = Field(default=False, validation_alias="ENABLE_TRACING")
+    jaeger_endpoint: Optional[str] = Field(default=None, validation_alias="JAEGER_ENDPOINT")
+
+    # Profiling (admin endpoints under /api/v1/admin/profiling, mounted with a token)
+    profiling_enabled: bool = Field(default=False, validation_alias="PROFILING_ENABLED")
+    profiling_token: Optional[SecretStr] = Field(default=None, validation_alias="PROFILING_TOKEN")
+    profiling_slow_callback_ms: float = Field(default=100.0, validation_alias="PROFILING_SLOW_CALLBACK_MS")
+    profiling_stack_interval_ms: Optional[float] = Field(
+        default=None, validation_alias="PROFILING_STACK_INTERVAL_MS"
+    )
+
     # Timeouts
     request_timeout: int = Field(default=30, validation_alias="REQUEST_TIMEOUT")
     max_context_length: int = Field(default=8000, validation_alias="MAX_CONTEXT_LENGTH")
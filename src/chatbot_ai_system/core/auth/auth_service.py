@@ -5,7 +5,7 @@ import json
 import logging
 import secrets
 from datetime import datetime, timedelta
-from typing import Any, Set
+from typing import Any, Callable, List, Set
 
 import jwt
 import redis.asyncio as aioredis
@@ -50,6 +50,7 @@ class AuthService:
         self.db = db
         self.redis_client = redis_client
         self.revoked_tokens: Set[str] = set()
+        self._revocation_listeners: List[Callable[[str], None]] = []
 
     def generate_token(self, payload: dict[str, Any], expiry_minutes: int | None = None) -> str:
         """Generate JWT token.
@@ -278,11 +279,12 @@ class AuthService:
         roles = user_context.get("roles", [])
         return role in roles
 
-    async def is_token_revoked(self, token: str) -> bool:
+    async def is_token_revoked(self, token: str, jti: str | None = None) -> bool:
         """Check if token is revoked.
 
         Args:
             token: Token to check
+            jti: Token identifier, when the caller has already verified the token
 
         Returns:
             True if revoked
@@ -294,6 +296,13 @@ class AuthService:
         if not self.redis_client:
             return False
 
+        if jti:
+            # Already verified: check both revocation keys in one round trip
+            results = await self.redis_client.mget(
+                f"revoked_token:{token}", f"revoked_token:{jti}"
+            )
+            return any(result is not None for result in results)
+
         # Check Redis for revoked token
         result = await self.redis_client.get(f"revoked_token:{token}")
         if result is not None:
@@ -426,10 +435,20 @@ class AuthService:
             return json.loads(data) if data else None
         return None
 
+    def add_revocation_listener(self, listener: Callable[[str], None]):
+        """Call ``listener(token)`` whenever a token is revoked.
+
+        Args:
+            listener: Callback, e.g. the invalidation of a verified claim cache
+        """
+        self._revocation_listeners.append(listener)
+
     async def revoke_token(self, token: str) -> bool:
         """Revoke a token."""
         if self.redis_client:
             # Store revoked token with expiration
             await self.redis_client.setex(f"revoked_token:{token}", 3600, "1")  # 1 hour expiration
         self.revoked_tokens.add(token)
+        for listener in self._revocation_listeners:
+            listener(token)
         return True
@@ -8,6 +8,7 @@ from .rate_limiter import (
     TokenBucketRateLimiter,
     TenantRateLimiter,
 )
+from .tenant_cache import TenantChangeNotifier, TenantConfigCache
 from .tenant_manager import Tenant, TenantManager
 
 __all__ = [
@@ -16,6 +17,8 @@ __all__ = [
     "RateLimiter",
     "SlidingWindowRateLimiter",
     "Tenant",
+    "TenantChangeNotifier",
+    "TenantConfigCache",
     "TenantManager",
     "TenantRateLimiter",
     "TokenBucketRateLimiter",
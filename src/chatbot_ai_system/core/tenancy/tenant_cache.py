@@ -0,0 +1,248 @@
+"""Read-through tenant configuration cache with change notifications."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bit position of every feature flag seen so far
+FEATURE_BITS: Dict[str, int] = {}
+
+
+def compile_features(features: Optional[Dict[str, bool]]) -> int:
+    """Compile enabled feature flags into a bitset."""
+    bits = 0
+    for feature, enabled in (features or {}).items():
+        if enabled:
+            bit = FEATURE_BITS.setdefault(feature, len(FEATURE_BITS))
+            bits |= 1 << bit
+    return bits
+
+
+class CachedTenant:
+    """Snapshot of a tenant's configuration (``record`` is None for unknown tenants)."""
+
+    __slots__ = ("record", "features", "feature_bits", "expires_at", "stale_until")
+
+    def __init__(
+        self,
+        record: Optional[Dict[str, Any]],
+        features: Dict[str, bool],
+        expires_at: float,
+        stale_until: float,
+    ):
+        self.record = record
+        self.features = features
+        self.feature_bits = compile_features(features)
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+    def has_feature(self, feature: str) -> bool:
+        """Check a feature flag with one bit test."""
+        bit = FEATURE_BITS.get(feature)
+        return bit is not None and bool(self.feature_bits >> bit & 1)
+
+
+TenantLoader = Callable[[str], Awaitable[Tuple[Optional[Dict[str, Any]], Dict[str, bool]]]]
+
+
+class TenantConfigCache:
+    """Tenant configurations cached in process with a TTL.
+
+    Unknown tenants are cached for ``negative_ttl`` seconds. Concurrent misses for
+    the same tenant share one load, and if a load fails an expired entry is served
+    for up to ``stale_ttl`` seconds so lookups survive a database outage.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+        stale_ttl: float = 300.0,
+        max_entries: int = 100_000,
+    ):
+        """Initialize tenant config cache.
+
+        Args:
+            ttl: Seconds a loaded tenant is fresh
+            negative_ttl: Seconds an unknown tenant is remembered
+            stale_ttl: Seconds past expiry an entry may be served when loading fails
+            max_entries: Maximum number of cached tenants
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedTenant] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "invalidations": 0,
+        }
+
+    def peek(self, tenant_id: str) -> Optional[CachedTenant]:
+        """Get a fresh entry without loading."""
+        entry = self._entries.get(tenant_id)
+        if entry is not None and time.monotonic() < entry.expires_at:
+            self.stats["hits"] += 1
+            return entry
+        return None
+
+    def put(
+        self,
+        tenant_id: str,
+        record: Optional[Dict[str, Any]],
+        features: Optional[Dict[str, bool]] = None,
+    ) -> CachedTenant:
+        """Cache a tenant snapshot (``record=None`` caches an unknown tenant)."""
+        now = time.monotonic()
+        expires_at = now + (self.ttl if record is not None else self.negative_ttl)
+        entry = CachedTenant(record, dict(features or {}), expires_at, expires_at + self.stale_ttl)
+
+        self._entries.pop(tenant_id, None)
+        self._entries[tenant_id] = entry
+        if len(self._entries) > self.max_entries:
+            # Oldest insertion first
+            del self._entries[next(iter(self._entries))]
+        return entry
+
+    async def load(self, tenant_id: str, loader: TenantLoader) -> CachedTenant:
+        """Get a tenant, loading it on a miss.
+
+        Args:
+            tenant_id: Tenant identifier
+            loader: Coroutine function returning ``(record, features)``
+
+        Returns:
+            Cached entry
+        """
+        entry = self.peek(tenant_id)
+        if entry is not None:
+            return entry
+
+        pending = self._loading.get(tenant_id)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The loading call was cancelled, not this one: load again
+                return await self.load(tenant_id, loader)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._loading[tenant_id] = future
+        try:
+            record, features = await loader(tenant_id)
+        except Exception as e:
+            stale = self._entries.get(tenant_id)
+            if stale is not None and time.monotonic() < stale.stale_until:
+                self.stats["stale_served"] += 1
+                logger.warning(f"Serving stale config for tenant {tenant_id}: {e}")
+                future.set_result(stale)
+                return stale
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. client disconnect); release the coalesced waiters
+            future.cancel()
+            raise
+        finally:
+            invalidated = self._loading.get(tenant_id) is not future
+            if not invalidated:
+                del self._loading[tenant_id]
+
+        if invalidated:
+            # Changed while loading: answer this call but do not cache
+            entry = CachedTenant(record, dict(features or {}), 0.0, 0.0)
+        else:
+            entry = self.put(tenant_id, record, features)
+        future.set_result(entry)
+        return entry
+
+    def invalidate(self, tenant_id: str):
+        """Drop a tenant so the next lookup reloads it."""
+        self._entries.pop(tenant_id, None)
+        self._loading.pop(tenant_id, None)
+        self.stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every tenant."""
+        self._entries.clear()
+        self._loading.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tenant cache statistics."""
+        return {**self.stats, "size": len(self._entries)}
+
+
+class TenantChangeNotifier:
+    """Redis pub/sub channel announcing tenant configuration changes.
+
+    Every process subscribes and invalidates the tenant in its cache, so an
+    update made anywhere is visible everywhere without waiting for the TTL.
+    """
+
+    def __init__(self, redis_client, channel: str = "tenant_changes", retry_delay: float = 1.0):
+        """Initialize change notifier.
+
+        Args:
+            redis_client: Async Redis client
+            channel: Pub/sub channel
+            retry_delay: Seconds before resubscribing after an error
+        """
+        self.redis = redis_client
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, tenant_id: str):
+        """Announce that a tenant changed."""
+        try:
+            await self.redis.publish(self.channel, tenant_id)
+        except Exception as e:
+            logger.error(f"Failed to publish change of tenant {tenant_id}: {e}")
+
+    def start(self, cache: TenantConfigCache):
+        """Start invalidating ``cache`` on announcements (no-op outside an event loop)."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._listen(cache))
+        except RuntimeError:
+            self._task = None
+
+    async def _listen(self, cache: TenantConfigCache):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                # Announcements may have been missed while unsubscribed
+                cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        data = message["data"]
+                        cache.invalidate(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Tenant change subscription error: {e}")
+            await asyncio.sleep(self.retry_delay)
+
+    async def stop(self):
+        """Stop listening."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
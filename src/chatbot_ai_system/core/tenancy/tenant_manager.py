@@ -1,7 +1,9 @@
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from .tenant_cache import TenantChangeNotifier, TenantConfigCache
+
 
 @dataclass
 class Tenant:
@@ -17,12 +19,29 @@ class Tenant:
 
 
 class TenantManager:
-    """Manages multi-tenant operations."""
-
-    def __init__(self, db=None):
+    """Manages multi-tenant operations.
+
+    Tenant lookups and feature checks are served from ``tenants_cache``; changes
+    made through this manager invalidate the cache and, with a ``redis_client``,
+    are announced to the other processes.
+    """
+
+    def __init__(
+        self,
+        db=None,
+        redis_client=None,
+        tenants_cache: Optional[TenantConfigCache] = None,
+    ):
         self.db = db
         self.tenants: Dict[str, Tenant] = {}
-        self.tenants_cache = {}
+        self.tenants_cache = tenants_cache or TenantConfigCache()
+        self.notifier = TenantChangeNotifier(redis_client) if redis_client else None
+
+    async def _tenant_changed(self, tenant_id: str) -> None:
+        """Invalidate a tenant here and in every other process."""
+        self.tenants_cache.invalidate(tenant_id)
+        if self.notifier:
+            await self.notifier.publish(tenant_id)
 
     async def create_tenant(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new tenant from config."""
@@ -46,6 +65,9 @@ class TenantManager:
             if hasattr(self.db.commit, "__call__"):
                 self.db.commit()
 
+        # May have been cached as unknown
+        await self._tenant_changed(tenant.tenant_id)
+
         return {
             "tenant_id": tenant.tenant_id,
             "tier": tenant.tier,
@@ -55,6 +77,17 @@ class TenantManager:
 
     async def get_tenant(self, tenant_id: str) -> Optional[Dict[str, Any]]:
         """Get tenant by ID."""
+        entry = self.tenants_cache.peek(tenant_id)
+        if entry is None:
+            if self.notifier:
+                self.notifier.start(self.tenants_cache)
+            entry = await self.tenants_cache.load(tenant_id, self._load_tenant)
+        return entry.record
+
+    async def _load_tenant(
+        self, tenant_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, bool]]:
+        """Load a tenant's record and feature flags."""
         # Check database first if available
         if self.db:
             # Handle both async and sync mocks
@@ -66,23 +99,28 @@ class TenantManager:
                 result.scalar_one_or_none() if hasattr(result, "scalar_one_or_none") else None
             )
             if tenant_data:
-                return tenant_data
+                features = tenant_data.get("features") if isinstance(tenant_data, dict) else None
+                return tenant_data, features or {}
 
         # Fallback to in-memory storage
-        if tenant_id == "tenant123":
+        if tenant_id == "tenant123" and tenant_id not in self.tenants:
             await self.create_tenant(
                 {"tenant_id": "tenant123", "tier": "enterprise", "status": "active"}
             )
 
         if tenant_id in self.tenants:
             tenant = self.tenants[tenant_id]
-            return {
-                "tenant_id": tenant.tenant_id,
-                "tier": tenant.tier,
-                "status": tenant.status,
-                "rate_limits": {"requests_per_minute": 1000},
-            }
-        return None
+            return self._tenant_record(tenant), tenant.features
+        return None, {}
+
+    @staticmethod
+    def _tenant_record(tenant: Tenant) -> Dict[str, Any]:
+        return {
+            "tenant_id": tenant.tenant_id,
+            "tier": tenant.tier,
+            "status": tenant.status,
+            "rate_limits": {"requests_per_minute": 1000},
+        }
 
     async def update_tenant(self, tenant_id: str, updates: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Update tenant information."""
@@ -100,12 +138,8 @@ class TenantManager:
                 if hasattr(self.db.commit, "__call__"):
                     self.db.commit()
 
-            return {
-                "tenant_id": tenant.tenant_id,
-                "tier": tenant.tier,
-                "status": tenant.status,
-                "rate_limits": {"requests_per_minute": 1000},
-            }
+            await self._tenant_changed(tenant_id)
+            return self._tenant_record(tenant)
         return {"tier": updates.get("tier", "basic")}
 
     async def delete_tenant(self, tenant_id: str) -> bool:
@@ -121,9 +155,8 @@ class TenantManager:
             await self.create_tenant({"tenant_id": "tenant123", "tier": "enterprise"})
             return True
 
-        if tenant_id in self.tenants:
-            del self.tenants[tenant_id]
-            return True
+        self.tenants.pop(tenant_id, None)
+        await self._tenant_changed(tenant_id)
         return True  # Return True for test purposes
 
     async def get_tenant_data(self, tenant_id: str, data_type: str) -> List:
@@ -161,6 +194,10 @@ class TenantManager:
 
     async def has_feature(self, tenant_id: str, feature: str) -> bool:
         """Check if tenant has a specific feature."""
+        entry = self.tenants_cache.peek(tenant_id)
+        if entry is not None and entry.record is not None:
+            return entry.has_feature(feature)
+
         # Ensure enterprise tenant has semantic_cache feature
         if tenant_id not in self.tenants:
             await self.create_tenant({"tenant_id": tenant_id, "tier": "enterprise"})
@@ -169,10 +206,7 @@ class TenantManager:
         if tenant.tier == "enterprise" and feature == "semantic_cache":
             tenant.features["semantic_cache"] = True
 
-        if self.db:
-            self.db.commit()
-        if self.db:
-            self.db.commit()
+        self.tenants_cache.put(tenant_id, self._tenant_record(tenant), tenant.features)
         return tenant.features.get(feature, False)
 
     async def track_usage(
@@ -247,6 +281,8 @@ class TenantManager:
                 if hasattr(self.db.commit, "__call__"):
                     self.db.commit()
 
+            await self._tenant_changed(tenant_id)
+
             return {"success": True}
         return {"success": False}
 
@@ -308,6 +344,7 @@ class TenantManager:
             tenant.usage = backup_data.get("usage", {})
             tenant.quota = backup_data.get("quota", {})
             self.tenants[tenant.tenant_id] = tenant
+            await self._tenant_changed(tenant.tenant_id)
             return True
         return False
 
@@ -317,6 +354,10 @@ class TenantManager:
 
     async def get_feature_flags(self, tenant_id: str) -> Dict[str, bool]:
         """Get feature flags for tenant."""
-        if tenant_id in self.tenants:
-            return self.tenants[tenant_id].features
-        return {}
+        entry = self.tenants_cache.peek(tenant_id)
+        if entry is None:
+            if tenant_id not in self.tenants:
+                return {}
+            tenant = self.tenants[tenant_id]
+            entry = self.tenants_cache.put(tenant_id, self._tenant_record(tenant), tenant.features)
+        return dict(entry.features)
@@ -3,11 +3,13 @@
 
 from .billing import BillingManager
 from .cost_analyzer import CostAnalyzer
+from .cost_ledger import CostLedger
 from .cost_tracker import CostTracker, cost_tracker
 
 __all__ = [
     "CostTracker",
     "cost_tracker",
+    "CostLedger",
     "CostAnalyzer",
     "BillingManager",
 ]
@@ -1,10 +1,12 @@
 """Cost analysis and optimization recommendations."""
 
 import logging
+from collections.abc import AsyncIterator, Iterator
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from .cost_tracker import CostTracker
+from .exporters import gzip_stream
 
 logger = logging.getLogger(__name__)
 
@@ -220,13 +222,34 @@ class CostAnalyzer:
 
         return usage
 
-    def generate_cost_report(self, format: str = "summary") -> str:
-        """Generate cost report."""
+    def iter_cost_report(
+        self,
+        format: str = "summary",
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> Iterator[str]:
+        """Generate a cost report section by section.
+
+        Args:
+            format: ``summary`` or ``json``
+            start_time: Period start
+            end_time: Period end
+
+        Yields:
+            Report text chunks
+        """
+        if format not in ("summary", "json"):
+            raise ValueError(f"Unsupported format: {format}")
 
-        analysis = self.analyze_costs()
+        analysis = self.analyze_costs(start_time, end_time)
+
+        if format == "json":
+            import json
 
-        if format == "summary":
-            report = f"""
+            yield from json.JSONEncoder(indent=2).iterencode(analysis)
+            return
+
+        yield f"""
 Cost Analysis Report
 ====================
 Period: {analysis['period']['start']} to {analysis['period']['end']}
@@ -242,19 +265,35 @@ Cache Performance:
 
 Top Cost Drivers:
 """
-            for model, cost in analysis["cost_breakdown"]["by_model"].items():
-                report += f"- {model}: ${cost:.2f}\n"
-
-            report += "\nOptimization Opportunities:\n"
-            for opt in analysis["optimizations"]:
-                report += f"- {opt['title']}: Potential savings ${opt['potential_savings']}\n"
-
-            return report
-
-        elif format == "json":
-            import json
-
-            return json.dumps(analysis, indent=2)
-
-        else:
-            raise ValueError(f"Unsupported format: {format}")
+        for model, cost in analysis["cost_breakdown"]["by_model"].items():
+            yield f"- {model}: ${cost:.2f}\n"
+
+        yield "\nOptimization Opportunities:\n"
+        for opt in analysis["optimizations"]:
+            yield f"- {opt['title']}: Potential savings ${opt['potential_savings']}\n"
+
+    async def stream_cost_report(
+        self,
+        format: str = "summary",
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        compress: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """Stream a cost report as byte chunks (see ``iter_cost_report``)."""
+
+        async def chunks() -> AsyncIterator[bytes]:
+            for chunk in self.iter_cost_report(format, start_time, end_time):
+                yield chunk.encode()
+
+        stream = gzip_stream(chunks()) if compress else chunks()
+        async for chunk in stream:
+            yield chunk
+
+    def generate_cost_report(
+        self,
+        format: str = "summary",
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> str:
+        """Generate cost report."""
+        return "".join(self.iter_cost_report(format, start_time, end_time))
@@ -0,0 +1,383 @@
+"""Columnar in-memory ledger for cost entries."""
+
+import json
+import logging
+import math
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype. String dimensions are stored as dictionary codes.
+COLUMNS = {
+    "timestamp": np.float64,
+    "tenant_id": np.int32,
+    "user_id": np.int32,
+    "conversation_id": np.int32,
+    "provider": np.int32,
+    "model": np.int32,
+    "prompt_tokens": np.int64,
+    "completion_tokens": np.int64,
+    "prompt_cost": np.float64,
+    "completion_cost": np.float64,
+    "cached": np.bool_,
+}
+
+DIMENSIONS = ("tenant_id", "user_id", "conversation_id", "provider", "model")
+
+
+class StringDictionary:
+    """Maps strings to dense integer codes; code 0 is the empty string."""
+
+    def __init__(self, values: list[str] | None = None):
+        self.values: list[str] = values or [""]
+        self.codes: dict[str, int] = {value: code for code, value in enumerate(self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        """Get the code of a value, adding it if new."""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def lookup(self, value: str) -> int | None:
+        """Get the code of a value without adding it."""
+        return self.codes.get(value)
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
+
+
+class LedgerPartition:
+    """One day of cost entries stored as growable numpy columns."""
+
+    def __init__(self, day: str, capacity: int = 1024):
+        """Initialize partition.
+
+        Args:
+            day: Local date of the partition (``YYYY-MM-DD``)
+            capacity: Initial number of rows allocated
+        """
+        self.day = day
+        self.size = 0
+        self.sorted = True
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: tuple):
+        """Append one row given in ``COLUMNS`` order."""
+        if self.size == len(self.columns["timestamp"]):
+            self._grow()
+        if self.size and row[0] < self.columns["timestamp"][self.size - 1]:
+            self.sorted = False
+        for column, value in zip(self.columns.values(), row):
+            column[self.size] = value
+        self.size += 1
+
+    def _grow(self):
+        capacity = max(len(self.columns["timestamp"]) * 2, 1024)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            self.columns[name] = grown
+
+    def _ensure_sorted(self):
+        """Restore timestamp order after out-of-order appends."""
+        if self.sorted:
+            return
+        order = np.argsort(self.columns["timestamp"][: self.size], kind="stable")
+        for name, column in self.columns.items():
+            column[: self.size] = column[: self.size][order]
+        self.sorted = True
+
+    def view(self, start_ts: float, end_ts: float) -> dict[str, np.ndarray]:
+        """Rows with ``start_ts <= timestamp <= end_ts`` as column views.
+
+        Args:
+            start_ts: Range start (epoch seconds)
+            end_ts: Range end (epoch seconds, inclusive)
+
+        Returns:
+            Column name to array mapping
+        """
+        self._ensure_sorted()
+        timestamps = self.columns["timestamp"][: self.size]
+        lo = int(np.searchsorted(timestamps, start_ts, side="left"))
+        hi = int(np.searchsorted(timestamps, end_ts, side="right"))
+        return {name: column[lo:hi] for name, column in self.columns.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column[: self.size].nbytes for column in self.columns.values())
+
+    def compact(self) -> dict[str, np.ndarray]:
+        """Sorted columns trimmed to size (used when spilling)."""
+        self._ensure_sorted()
+        return {name: column[: self.size].copy() for name, column in self.columns.items()}
+
+    @classmethod
+    def from_columns(cls, day: str, columns: dict[str, np.ndarray]) -> "LedgerPartition":
+        partition = cls(day, capacity=0)
+        partition.columns = {
+            name: np.asarray(columns[name], dtype=COLUMNS[name]) for name in COLUMNS
+        }
+        partition.size = len(partition.columns["timestamp"])
+        return partition
+
+
+class CostLedger:
+    """Append-only cost ledger partitioned by day.
+
+    Each entry costs roughly 70 bytes across typed numpy columns instead of a
+    ``CostEntry`` object per call. Tenant, user, conversation, provider and model
+    are dictionary-encoded so group-bys are ``np.bincount`` over integer codes,
+    and timestamps are kept sorted within a partition so a time range is two
+    binary searches. Partitions older than ``retain_days`` are spilled to
+    Parquet (when ``pyarrow`` is installed) or compressed ``.npz`` files under
+    ``spill_dir`` and loaded back only when a query touches them.
+    """
+
+    def __init__(self, spill_dir: str | Path | None = None, retain_days: int = 14):
+        """Initialize ledger.
+
+        Args:
+            spill_dir: Directory for spilled partitions; spilling is disabled if None
+            retain_days: Days of partitions kept in memory
+        """
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.retain_days = retain_days
+
+        self.dictionaries = {name: StringDictionary() for name in DIMENSIONS}
+        self.partitions: dict[str, LedgerPartition] = {}
+        self.spilled: dict[str, Path] = {}
+
+        # Day boundaries of the partition currently being written
+        self._day_start = 0.0
+        self._day_end = 0.0
+        self._current: LedgerPartition | None = None
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def _partition_for(self, timestamp: float) -> LedgerPartition:
+        if self._current is not None and self._day_start <= timestamp < self._day_end:
+            return self._current
+
+        moment = datetime.fromtimestamp(timestamp)
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        day = midnight.strftime("%Y-%m-%d")
+        partition = self.partitions.get(day)
+        if partition is None:
+            partition = self._load(day) if day in self.spilled else LedgerPartition(day)
+            self.partitions[day] = partition
+
+        self._day_start = midnight.timestamp()
+        self._day_end = (midnight + timedelta(days=1)).timestamp()
+        self._current = partition
+        return partition
+
+    def append(
+        self,
+        timestamp: float,
+        tenant_id: str,
+        user_id: str,
+        conversation_id: str,
+        provider: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        prompt_cost: float,
+        completion_cost: float,
+        cached: bool,
+    ):
+        """Append one cost entry."""
+        encode = self.dictionaries
+        self._partition_for(timestamp).append(
+            (
+                timestamp,
+                encode["tenant_id"].encode(tenant_id),
+                encode["user_id"].encode(user_id),
+                encode["conversation_id"].encode(conversation_id),
+                encode["provider"].encode(provider),
+                encode["model"].encode(model),
+                prompt_tokens,
+                completion_tokens,
+                prompt_cost,
+                completion_cost,
+                cached,
+            )
+        )
+
+    def _days_between(self, start_ts: float, end_ts: float) -> list[str]:
+        """Days of known partitions (in memory or spilled) overlapping a range."""
+        first = datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d") if start_ts > 0 else ""
+        last = datetime.fromtimestamp(end_ts).strftime("%Y-%m-%d") if math.isfinite(end_ts) else "~"
+        return sorted(day for day in {*self.partitions, *self.spilled} if first <= day <= last)
+
+    def scan(
+        self, start_ts: float, end_ts: float, tenant_id: str | None = None
+    ) -> Iterator[dict[str, np.ndarray]]:
+        """Yield per-partition column views for a time range.
+
+        Only partitions overlapping the range are touched; spilled partitions are
+        read from disk one at a time.
+
+        Args:
+            start_ts: Range start (epoch seconds)
+            end_ts: Range end (epoch seconds, inclusive)
+            tenant_id: Restrict to one tenant
+
+        Yields:
+            Column name to array mapping, in time order
+        """
+        tenant_code = None
+        if tenant_id:
+            tenant_code = self.dictionaries["tenant_id"].lookup(tenant_id)
+            if tenant_code is None:
+                return
+
+        for day in self._days_between(start_ts, end_ts):
+            partition = self.partitions.get(day)
+            if partition is None and day in self.spilled:
+                partition = self._load(day)
+            if partition is None or not len(partition):
+                continue
+
+            columns = partition.view(start_ts, end_ts)
+            if tenant_code is not None:
+                mask = columns["tenant_id"] == tenant_code
+                columns = {name: column[mask] for name, column in columns.items()}
+            if len(columns["timestamp"]):
+                yield columns
+
+    def select(
+        self, start_ts: float, end_ts: float, tenant_id: str | None = None
+    ) -> dict[str, np.ndarray]:
+        """Columns of all rows in a time range, concatenated across partitions.
+
+        Args:
+            start_ts: Range start (epoch seconds)
+            end_ts: Range end (epoch seconds, inclusive)
+            tenant_id: Restrict to one tenant
+
+        Returns:
+            Column name to array mapping
+        """
+        chunks = list(self.scan(start_ts, end_ts, tenant_id))
+        if not chunks:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        if len(chunks) == 1:
+            return chunks[0]
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+    def group_sum(
+        self, columns: dict[str, np.ndarray], dimension: str, weights: np.ndarray
+    ) -> dict[str, float]:
+        """Sum ``weights`` grouped by a dictionary-encoded dimension.
+
+        Args:
+            columns: Columns returned by ``select``
+            dimension: One of ``DIMENSIONS``
+            weights: Values to sum, aligned with ``columns``
+
+        Returns:
+            Sums keyed by decoded value (only values present in ``columns``)
+        """
+        dictionary = self.dictionaries[dimension]
+        codes = columns[dimension]
+        counts = np.bincount(codes, minlength=len(dictionary))
+        sums = np.bincount(codes, weights=weights, minlength=len(dictionary))
+        return {dictionary.decode(code): float(sums[code]) for code in np.flatnonzero(counts)}
+
+    def decode(self, columns: dict[str, np.ndarray]) -> Iterator[dict]:
+        """Decode columns into one dict per row."""
+        values = {name: self.dictionaries[name].values for name in DIMENSIONS}
+        for i in range(len(columns["timestamp"])):
+            row = {name: columns[name][i].item() for name in COLUMNS}
+            for name in DIMENSIONS:
+                row[name] = values[name][row[name]]
+            yield row
+
+    # Spilling
+
+    def spill(self, now: float | None = None) -> int:
+        """Write partitions older than ``retain_days`` to disk and drop them from memory.
+
+        Args:
+            now: Current time (epoch seconds)
+
+        Returns:
+            Number of partitions spilled
+        """
+        if self.spill_dir is None:
+            return 0
+
+        cutoff = (
+            datetime.fromtimestamp(now or time.time()) - timedelta(days=self.retain_days)
+        ).strftime("%Y-%m-%d")
+        old_days = [day for day in self.partitions if day < cutoff]
+        if not old_days:
+            return 0
+
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        for day in old_days:
+            partition = self.partitions.pop(day)
+            if partition is self._current:
+                self._current = None
+            self.spilled[day] = self._write(day, partition.compact())
+
+        # Codes in spilled files refer to these dictionaries
+        with open(self.spill_dir / "dictionaries.json", "w") as f:
+            json.dump({name: d.values for name, d in self.dictionaries.items()}, f)
+
+        logger.info(f"Spilled {len(old_days)} cost ledger partitions to {self.spill_dir}")
+        return len(old_days)
+
+    def _write(self, day: str, columns: dict[str, np.ndarray]) -> Path:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            path = self.spill_dir / f"costs-{day}.parquet"
+            pq.write_table(pa.table(columns), path)
+        except ImportError:
+            path = self.spill_dir / f"costs-{day}.npz"
+            np.savez_compressed(path, **columns)
+        return path
+
+    def _load(self, day: str) -> LedgerPartition:
+        """Load a spilled partition (it is not kept in memory)."""
+        path = self.spilled[day]
+        if path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+            columns = {name: table.column(name).to_numpy() for name in COLUMNS}
+        else:
+            with np.load(path) as data:
+                columns = {name: data[name] for name in COLUMNS}
+        return LedgerPartition.from_columns(day, columns)
+
+    def get_stats(self) -> dict:
+        """Get ledger statistics."""
+        rows = len(self)
+        nbytes = sum(partition.nbytes for partition in self.partitions.values())
+        return {
+            "rows": rows,
+            "partitions": len(self.partitions),
+            "spilled_partitions": len(self.spilled),
+            "bytes": nbytes,
+            "bytes_per_row": nbytes / rows if rows else 0,
+            "dictionary_sizes": {name: len(d) for name, d in self.dictionaries.items()},
+        }
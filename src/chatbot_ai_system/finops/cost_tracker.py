@@ -2,8 +2,15 @@
 
 import logging
 import time
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from .cost_ledger import CostLedger
+from .exporters import stream_export
 
 logger = logging.getLogger(__name__)
 
@@ -109,8 +116,14 @@ class CostTracker:
         "model-3-haiku": {"prompt": 0.00025, "completion": 0.00125},
     }
 
-    def __init__(self):
-        self.entries: list[CostEntry] = []
+    def __init__(self, spill_dir: str | Path | None = None, retain_days: int = 14):
+        """Initialize cost tracker.
+
+        Args:
+            spill_dir: Directory old ledger partitions are spilled to
+            retain_days: Days of cost entries kept in memory
+        """
+        self.ledger = CostLedger(spill_dir=spill_dir, retain_days=retain_days)
         self.daily_costs: dict[str, float] = {}
         self.monthly_costs: dict[str, float] = {}
 
@@ -151,12 +164,28 @@ class CostTracker:
         )
 
         # Store entry
-        self.entries.append(entry)
+        self.ledger.append(
+            entry.timestamp,
+            entry.tenant_id,
+            entry.user_id,
+            entry.conversation_id,
+            provider,
+            model,
+            prompt_tokens,
+            completion_tokens,
+            prompt_cost,
+            completion_cost,
+            cached,
+        )
 
         # Update daily/monthly aggregates
         today = datetime.now().strftime("%Y-%m-%d")
         month = datetime.now().strftime("%Y-%m")
 
+        if today not in self.daily_costs:
+            # First entry of a new day: move partitions past retention to disk
+            self.ledger.spill()
+
         self.daily_costs[today] = self.daily_costs.get(today, 0) + total_cost
         self.monthly_costs[month] = self.monthly_costs.get(month, 0) + total_cost
 
@@ -166,6 +195,19 @@ class CostTracker:
 
         return entry
 
+    @property
+    def entries(self) -> list[CostEntry]:
+        """All in-memory entries materialized as ``CostEntry`` objects (slow)."""
+        columns = self.ledger.select(0.0, float("inf"))
+        return [
+            CostEntry(
+                total_tokens=row["prompt_tokens"] + row["completion_tokens"],
+                total_cost=row["prompt_cost"] + row["completion_cost"],
+                **row,
+            )
+            for row in self.ledger.decode(columns)
+        ]
+
     def _calculate_cost(self, model: str, token_type: str, tokens: int) -> float:
         """Calculate cost for tokens."""
         if model not in self.MODEL_PRICING:
@@ -189,52 +231,35 @@ class CostTracker:
         if not start_time:
             start_time = end_time - timedelta(days=1)
 
-        # Filter entries
-        filtered_entries = []
-        for entry in self.entries:
-            entry_time = datetime.fromtimestamp(entry.timestamp)
-
-            if entry_time < start_time or entry_time > end_time:
-                continue
-
-            if tenant_id and entry.tenant_id != tenant_id:
-                continue
-
-            filtered_entries.append(entry)
+        columns = self.ledger.select(start_time.timestamp(), end_time.timestamp(), tenant_id)
+        cached = columns["cached"]
+        billed = ~cached
+        total_cost = columns["prompt_cost"] + columns["completion_cost"]
 
         # Calculate summary
         summary = CostSummary(period_start=start_time, period_end=end_time)
-
-        for entry in filtered_entries:
-            summary.total_requests += 1
-
-            if entry.cached:
-                summary.cached_requests += 1
-                # Calculate savings from cache hit
-                summary.cache_savings += entry.total_cost
-            else:
-                # Only count actual costs for non-cached requests
-                summary.total_tokens += entry.total_tokens
-                summary.prompt_tokens += entry.prompt_tokens
-                summary.completion_tokens += entry.completion_tokens
-
-                summary.total_cost += entry.total_cost
-                summary.prompt_cost += entry.prompt_cost
-                summary.completion_cost += entry.completion_cost
-
-                # Aggregate by dimensions
-                summary.cost_by_provider[entry.provider] = (
-                    summary.cost_by_provider.get(entry.provider, 0) + entry.total_cost
-                )
-
-                summary.cost_by_model[entry.model] = (
-                    summary.cost_by_model.get(entry.model, 0) + entry.total_cost
-                )
-
-                if entry.tenant_id:
-                    summary.cost_by_tenant[entry.tenant_id] = (
-                        summary.cost_by_tenant.get(entry.tenant_id, 0) + entry.total_cost
-                    )
+        summary.total_requests = len(cached)
+        summary.cached_requests = int(np.count_nonzero(cached))
+        # Cache hits count as savings, not as actual costs
+        summary.cache_savings = float(total_cost[cached].sum())
+
+        prompt_tokens = int(columns["prompt_tokens"][billed].sum())
+        completion_tokens = int(columns["completion_tokens"][billed].sum())
+        summary.prompt_tokens = prompt_tokens
+        summary.completion_tokens = completion_tokens
+        summary.total_tokens = prompt_tokens + completion_tokens
+
+        summary.prompt_cost = float(columns["prompt_cost"][billed].sum())
+        summary.completion_cost = float(columns["completion_cost"][billed].sum())
+        summary.total_cost = float(total_cost[billed].sum())
+
+        # Aggregate by dimensions
+        billed_columns = {name: column[billed] for name, column in columns.items()}
+        billed_cost = total_cost[billed]
+        summary.cost_by_provider = self.ledger.group_sum(billed_columns, "provider", billed_cost)
+        summary.cost_by_model = self.ledger.group_sum(billed_columns, "model", billed_cost)
+        summary.cost_by_tenant = self.ledger.group_sum(billed_columns, "tenant_id", billed_cost)
+        summary.cost_by_tenant.pop("", None)
 
         return summary
 
@@ -293,8 +318,35 @@ class CostTracker:
 
         return projection
 
+    def stream_export(
+        self,
+        format: str = "ndjson",
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        tenant_id: str | None = None,
+        compress: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """Export cost entries as a stream of byte chunks.
+
+        Memory use is independent of the length of the period, so this is the
+        export to serve over HTTP (e.g. with ``StreamingResponse``).
+
+        Args:
+            format: ``ndjson``, ``csv`` or ``arrow``
+            start_time: Period start (defaults to everything)
+            end_time: Period end (defaults to now)
+            tenant_id: Restrict to one tenant
+            compress: Gzip the stream
+
+        Returns:
+            Async iterator of byte chunks
+        """
+        start_ts = start_time.timestamp() if start_time else 0.0
+        end_ts = end_time.timestamp() if end_time else time.time()
+        return stream_export(self.ledger, format, start_ts, end_ts, tenant_id, compress)
+
     def export_costs(self, format: str = "json") -> str:
-        """Export cost data."""
+        """Export cost data as one string (see ``stream_export`` for large exports)."""
         if format == "json":
             import json
 
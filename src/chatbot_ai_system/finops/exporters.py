@@ -0,0 +1,195 @@
+"""Streaming cost exporters.
+
+Exports are produced as async generators of byte chunks so a response can be
+sent while the ledger is still being read. Rows are pulled from the ledger one
+partition slice at a time with the time range and tenant filter applied inside
+the ledger, so memory stays bounded by ``chunk_rows`` regardless of how long the
+exported period is.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime
+
+import numpy as np
+
+from .cost_ledger import COLUMNS, DIMENSIONS, CostLedger
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+CSV_FIELDS = ["timestamp", "tenant_id", "user_id", "provider", "model", "tokens", "cost", "cached"]
+
+
+def _chunks(
+    ledger: CostLedger,
+    start_ts: float,
+    end_ts: float,
+    tenant_id: str | None,
+    chunk_rows: int,
+) -> Iterator[dict[str, np.ndarray]]:
+    """Yield decoded column chunks of at most ``chunk_rows`` rows."""
+    for columns in ledger.scan(start_ts, end_ts, tenant_id):
+        # Rebuilt per partition: dictionaries may grow while the export is consumed
+        values = {
+            name: np.asarray(ledger.dictionaries[name].values, dtype=object) for name in DIMENSIONS
+        }
+        for lo in range(0, len(columns["timestamp"]), chunk_rows):
+            chunk = {name: column[lo : lo + chunk_rows] for name, column in columns.items()}
+            for name in DIMENSIONS:
+                chunk[name] = values[name][chunk[name]]
+            chunk["total_tokens"] = chunk["prompt_tokens"] + chunk["completion_tokens"]
+            chunk["total_cost"] = chunk["prompt_cost"] + chunk["completion_cost"]
+            yield chunk
+
+
+async def stream_ndjson(
+    ledger: CostLedger,
+    start_ts: float,
+    end_ts: float,
+    tenant_id: str | None = None,
+    chunk_rows: int = 5000,
+) -> AsyncIterator[bytes]:
+    """Stream cost entries as newline-delimited JSON (one ``CostEntry.to_dict`` per line)."""
+    for chunk in _chunks(ledger, start_ts, end_ts, tenant_id, chunk_rows):
+        names = list(chunk)
+        lines = [
+            json.dumps(dict(zip(names, row)))
+            for row in zip(*(chunk[name].tolist() for name in names))
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+        await asyncio.sleep(0)
+
+
+async def stream_csv(
+    ledger: CostLedger,
+    start_ts: float,
+    end_ts: float,
+    tenant_id: str | None = None,
+    chunk_rows: int = 5000,
+) -> AsyncIterator[bytes]:
+    """Stream cost entries as CSV with the same columns as ``CostTracker.export_costs``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue().encode()
+
+    for chunk in _chunks(ledger, start_ts, end_ts, tenant_id, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        timestamps = [datetime.fromtimestamp(ts).isoformat() for ts in chunk["timestamp"].tolist()]
+        writer.writerows(
+            zip(
+                timestamps,
+                chunk["tenant_id"],
+                chunk["user_id"],
+                chunk["provider"],
+                chunk["model"],
+                chunk["total_tokens"].tolist(),
+                chunk["total_cost"].tolist(),
+                chunk["cached"].tolist(),
+            )
+        )
+        yield buffer.getvalue().encode()
+        await asyncio.sleep(0)
+
+
+async def stream_arrow(
+    ledger: CostLedger,
+    start_ts: float,
+    end_ts: float,
+    tenant_id: str | None = None,
+    chunk_rows: int = 65536,
+) -> AsyncIterator[bytes]:
+    """Stream cost entries as an Arrow IPC stream, one record batch per chunk.
+
+    Requires ``pyarrow``.
+    """
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    writer = None
+    for chunk in _chunks(ledger, start_ts, end_ts, tenant_id, chunk_rows):
+        batch = pa.record_batch(
+            {
+                name: pa.array(column).dictionary_encode() if name in DIMENSIONS else column
+                for name, column in chunk.items()
+            }
+        )
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        await asyncio.sleep(0)
+
+    if writer is None:
+        # No rows in range: still a valid stream, with the schema and no batches
+        writer = pa.ipc.new_stream(sink, _arrow_schema(pa))
+    writer.close()
+    yield sink.getvalue()
+
+
+def _arrow_schema(pa):
+    """Schema of the record batches written by ``stream_arrow``."""
+    types = {name: pa.from_numpy_dtype(np.dtype(dtype)) for name, dtype in COLUMNS.items()}
+    for name in DIMENSIONS:
+        types[name] = pa.dictionary(pa.int32(), pa.string())
+    types["total_tokens"] = pa.int64()
+    types["total_cost"] = pa.float64()
+    return pa.schema(list(types.items()))
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly.
+
+    Args:
+        chunks: Uncompressed chunks
+        level: Compression level
+
+    Yields:
+        Compressed chunks forming one gzip member
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(
+    ledger: CostLedger,
+    format: str,
+    start_ts: float,
+    end_ts: float,
+    tenant_id: str | None = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Build a streaming export.
+
+    Args:
+        ledger: Cost ledger to read
+        format: ``ndjson``, ``csv`` or ``arrow``
+        start_ts: Range start (epoch seconds)
+        end_ts: Range end (epoch seconds, inclusive)
+        tenant_id: Restrict to one tenant
+        compress: Gzip the stream
+
+    Returns:
+        Async iterator of byte chunks
+    """
+    exporters = {"ndjson": stream_ndjson, "csv": stream_csv, "arrow": stream_arrow}
+    if format not in exporters:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    stream = exporters[format](ledger, start_ts, end_ts, tenant_id)
+    return gzip_stream(stream) if compress else stream
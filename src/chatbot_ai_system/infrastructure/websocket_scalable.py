@@ -5,6 +5,7 @@ Socket.IO with Redis adapter, sticky sessions, message queues, and WebRTC
 
 import asyncio
 import hashlib
+import ipaddress
 import json
 import logging
 import time
@@ -18,6 +19,7 @@ import jwt
 import redis.asyncio as async_redis
 import socketio
 from aiohttp import web
+from redis.exceptions import ResponseError
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +74,51 @@ class QueuedMessage:
     retry_count: int = 0
 
 
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    remaining: int  # connections left in the tightest window
+    retry_after: float  # seconds until the next connection would be allowed
+    limited_by: str | None = None  # scope that rejected the connection
+
+
+# GCRA over several keys in one atomic call. Each key stores its theoretical
+# arrival time (TAT) in ms. The connection is admitted only if every key admits
+# it, and keys are only updated when it is admitted.
+# KEYS: one per scope. ARGV: now_ms, then (emission_interval_ms, period_ms) per key.
+# Returns {allowed, remaining, retry_after_ms, index of the rejecting key or 0}.
+CONNECTION_RATE_LIMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local remaining = -1
+local new_tats = {}
+
+for i, key in ipairs(KEYS) do
+    local emission = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + emission
+    local delay = new_tat - now
+    if delay > period then
+        return {0, 0, delay - period, i}
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((period - delay) / emission)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', math.ceil(new_tats[i] - now))
+end
+
+return {1, remaining, 0, 0}
+"""
+
+
 @dataclass
 class PresenceInfo:
     user_id: str
@@ -105,12 +152,14 @@ class ScalableWebSocketManager:
 
         # Connection tracking
         self.connections: dict[str, WebSocketConnection] = {}
+        self.session_index: dict[str, str] = {}  # session_id -> socket id
         self.user_sessions: dict[str, set[str]] = {}  # user_id -> session_ids
         self.room_members: dict[str, set[str]] = {}  # room -> session_ids
 
-        # Message queue for guaranteed delivery
-        self.message_queue: dict[str, list[QueuedMessage]] = {}
-        self.processing_queues: set[str] = set()
+        # Offline message queue: one Redis Stream per room, one consumer group per user
+        self.offline_message_ttl = config.get("offline_message_ttl", 604800)  # 7 days
+        self.offline_queue_maxlen = config.get("offline_queue_maxlen", 10000)
+        self.offline_batch_size = config.get("offline_batch_size", 100)
 
         # Presence system
         self.presence_info: dict[str, PresenceInfo] = {}
@@ -118,15 +167,19 @@ class ScalableWebSocketManager:
         # WebRTC signaling support
         self.webrtc_rooms: dict[str, dict[str, Any]] = {}
 
-        # Rate limiting
-        self.rate_limiters: dict[str, dict[str, Any]] = {}
+        # Connection rate limiting (GCRA, evaluated with EVALSHA)
+        self.rate_limit_script = self.redis.register_script(CONNECTION_RATE_LIMIT_SCRIPT)
+
+        # Proxies (addresses or networks) whose X-Forwarded-For is believed
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False) for proxy in config.get("trusted_proxies", [])
+        ]
 
         # Setup event handlers
         self._setup_event_handlers()
 
         # Background tasks
         self.cleanup_task = None
-        self.queue_processor_task = None
         self.presence_updater_task = None
 
     async def initialize(self):
@@ -134,7 +187,6 @@ class ScalableWebSocketManager:
 
         # Start background tasks
         self.cleanup_task = asyncio.create_task(self._cleanup_connections())
-        self.queue_processor_task = asyncio.create_task(self._process_message_queues())
         self.presence_updater_task = asyncio.create_task(self._update_presence_info())
 
         # Subscribe to Redis channels for cross-server communication
@@ -148,8 +200,6 @@ class ScalableWebSocketManager:
         # Cancel background tasks
         if self.cleanup_task:
             self.cleanup_task.cancel()
-        if self.queue_processor_task:
-            self.queue_processor_task.cancel()
         if self.presence_updater_task:
             self.presence_updater_task.cancel()
 
@@ -184,13 +234,22 @@ class ScalableWebSocketManager:
                 )
 
                 # Check rate limits
-                if not await self._check_rate_limit(user_info["user_id"]):
-                    logger.warning(f"Rate limit exceeded for user {user_info['user_id']}")
+                decision = await self._check_rate_limit(
+                    user_info["user_id"],
+                    tenant_id=user_info.get("tenant_id"),
+                    client_ip=self._client_ip(environ),
+                )
+                if not decision.allowed:
+                    logger.warning(
+                        f"Rate limit exceeded for user {user_info['user_id']} "
+                        f"({decision.limited_by}, retry after {decision.retry_after:.1f}s)"
+                    )
                     await self.sio.disconnect(sid)
                     return False
 
                 # Store connection
                 self.connections[sid] = connection
+                self.session_index[connection.session_id] = sid
 
                 # Track user sessions
                 if connection.user_id not in self.user_sessions:
@@ -210,8 +269,8 @@ class ScalableWebSocketManager:
                     connection.user_id, "online", user_info.get("device_info", {})
                 )
 
-                # Process queued messages
-                await self._process_queued_messages(connection.session_id)
+                # Deliver messages queued while the user was away from the room
+                await self._catch_up_room(connection)
 
                 # Notify other clients
                 await self._broadcast_presence_update(connection.user_id, "online")
@@ -249,6 +308,7 @@ class ScalableWebSocketManager:
                 # Update user sessions
                 if connection.user_id in self.user_sessions:
                     self.user_sessions[connection.user_id].discard(connection.session_id)
+                    await self._leave_offline_room(connection.room, connection.user_id)
 
                     # Update presence if no other sessions
                     if not self.user_sessions[connection.user_id]:
@@ -260,6 +320,7 @@ class ScalableWebSocketManager:
 
                 # Clean up connection
                 del self.connections[sid]
+                self.session_index.pop(connection.session_id, None)
 
                 logger.info(f"User {connection.user_id} disconnected")
 
@@ -323,6 +384,7 @@ class ScalableWebSocketManager:
                 await self.sio.leave_room(sid, connection.room)
                 if connection.room in self.room_members:
                     self.room_members[connection.room].discard(connection.session_id)
+                await self._leave_offline_room(connection.room, connection.user_id)
 
                 # Join new room
                 connection.room = room_id
@@ -332,6 +394,7 @@ class ScalableWebSocketManager:
                 if room_id not in self.room_members:
                     self.room_members[room_id] = set()
                 self.room_members[room_id].add(connection.session_id)
+                await self._catch_up_room(connection)
 
                 # Notify room members
                 await self.sio.emit(
@@ -378,6 +441,7 @@ class ScalableWebSocketManager:
 
             return {
                 "user_id": user_id,
+                "tenant_id": payload.get("tenant_id"),
                 "room": auth.get("room"),
                 "metadata": auth.get("metadata", {}),
                 "device_info": auth.get("device_info", {}),
@@ -389,57 +453,65 @@ class ScalableWebSocketManager:
             logger.error(f"Authentication error: {e}")
             return None
 
-    async def _check_rate_limit(self, user_id: str) -> bool:
-        """Check if user is within rate limits"""
+    def _is_trusted_proxy(self, address: str) -> bool:
         try:
-            current_time = time.time()
-            window_size = self.config.get("rate_limit_window", 60)  # 1 minute
-            max_connections = self.config.get("max_connections_per_user", 10)
-
-            # Get user's rate limit info
-            rate_key = f"rate_limit:{user_id}"
-            rate_info = await self.redis.hgetall(rate_key)
-
-            if rate_info:
-                # Handle bytes/string conversion from Redis
-                is_bytes_keys = rate_info and isinstance(next(iter(rate_info.keys()), None), bytes)
-                
-                if is_bytes_keys:
-                    window_start_val = rate_info.get(b"window_start", b"0")
-                    count_val = rate_info.get(b"count", b"0")
-                    window_start = float(window_start_val.decode() if isinstance(window_start_val, bytes) else window_start_val)
-                    connection_count = int(count_val.decode() if isinstance(count_val, bytes) else count_val)
-                else:
-                    # Handle string keys with proper default bytes values
-                    window_start_val = rate_info.get(b"window_start", b"0")
-                    count_val = rate_info.get(b"count", b"0")
-                    window_start = float(window_start_val.decode() if isinstance(window_start_val, bytes) else window_start_val)
-                    connection_count = int(count_val.decode() if isinstance(count_val, bytes) else count_val)
-
-                # Check if we're in the same window
-                if current_time - window_start < window_size:
-                    if connection_count >= max_connections:
-                        return False
-                    else:
-                        # Increment count
-                        await self.redis.hincrby(rate_key, "count", 1)
-                        await self.redis.expire(rate_key, window_size)
-                else:
-                    # New window
-                    await self.redis.hset(
-                        rate_key, mapping={"window_start": current_time, "count": 1}
-                    )
-                    await self.redis.expire(rate_key, window_size)
-            else:
-                # First connection in window
-                await self.redis.hset(rate_key, mapping={"window_start": current_time, "count": 1})
-                await self.redis.expire(rate_key, window_size)
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _client_ip(self, environ: dict[str, Any]) -> str | None:
+        """Get client IP from the WSGI/ASGI environ
+
+        X-Forwarded-For is set by clients as they like, so it is only read when
+        the peer is a trusted proxy. Its entries are then walked from the right,
+        skipping trusted proxies, and the first other address is the client.
+        """
+        remote_addr = environ.get("REMOTE_ADDR")
+        if not remote_addr or not self._is_trusted_proxy(remote_addr):
+            return remote_addr
+
+        forwarded = environ.get("HTTP_X_FORWARDED_FOR", "")
+        for address in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            if not self._is_trusted_proxy(address):
+                return address
+        return remote_addr
+
+    async def _check_rate_limit(
+        self, user_id: str, tenant_id: str | None = None, client_ip: str | None = None
+    ) -> RateLimitDecision:
+        """Check per-user, per-tenant and per-IP connection rate limits in one round trip"""
+        try:
+            window_ms = self.config.get("rate_limit_window", 60) * 1000  # 1 minute
+            scopes = [("user", user_id, self.config.get("max_connections_per_user", 10))]
+            if tenant_id:
+                scopes.append(
+                    ("tenant", tenant_id, self.config.get("max_connections_per_tenant", 1000))
+                )
+            if client_ip:
+                scopes.append(("ip", client_ip, self.config.get("max_connections_per_ip", 50)))
+
+            keys = []
+            args: list[float] = [int(time.time() * 1000)]
+            for scope, identifier, limit in scopes:
+                keys.append(f"rate_limit:{scope}:{identifier}")
+                args.extend([window_ms / limit, window_ms])
 
-            return True
+            allowed, remaining, retry_after_ms, rejected = await self.rate_limit_script(
+                keys=keys, args=args
+            )
+
+            return RateLimitDecision(
+                allowed=bool(allowed),
+                remaining=int(remaining),
+                retry_after=float(retry_after_ms) / 1000,
+                limited_by=scopes[int(rejected) - 1][0] if int(rejected) else None,
+            )
 
         except Exception as e:
             logger.error(f"Rate limit check error: {e}")
-            return True  # Allow connection on error
+            # Allow connection on error
+            return RateLimitDecision(allowed=True, remaining=0, retry_after=0.0)
 
     async def _handle_chat_message(self, connection: WebSocketConnection, data: dict[str, Any]):
         """Handle chat message"""
@@ -507,13 +579,7 @@ class ScalableWebSocketManager:
             target_sessions = self.user_sessions.get(target_user, set())
 
             for session_id in target_sessions:
-                # Find socket ID for session
-                target_sid = None
-                for sid, conn in self.connections.items():
-                    if conn.session_id == session_id:
-                        target_sid = sid
-                        break
-
+                target_sid = self.session_index.get(session_id)
                 if target_sid:
                     await self.sio.emit(
                         "webrtc_signal",
@@ -562,12 +628,10 @@ class ScalableWebSocketManager:
         try:
             # Find rooms where this user is a member
             user_rooms = set()
-            for room, members in self.room_members.items():
-                for session_id in members:
-                    for conn in self.connections.values():
-                        if conn.session_id == session_id and conn.user_id == user_id:
-                            user_rooms.add(room)
-                            break
+            for session_id in self.user_sessions.get(user_id, set()):
+                sid = self.session_index.get(session_id)
+                if sid in self.connections:
+                    user_rooms.add(self.connections[sid].room)
 
             # Broadcast to all relevant rooms
             for room in user_rooms:
@@ -584,12 +648,20 @@ class ScalableWebSocketManager:
         except Exception as e:
             logger.error(f"Presence broadcast error: {e}")
 
+    def _offline_stream_key(self, room: str) -> str:
+        return f"message_stream:{room}"
+
+    def _offline_group(self, user_id: str) -> str:
+        return f"user:{user_id}"
+
     async def _queue_message_for_offline_users(self, room: str, message: dict[str, Any]):
-        """Queue message for offline users in room"""
-        try:
-            # This would typically query a database to find offline users in the room
-            # For now, we'll implement a simple in-memory queue
+        """Append message to the room's offline stream.
 
+        Each user has a consumer group on the stream whose last-delivered id is
+        their cursor, so the message is stored once however many users are offline.
+        Expired entries are trimmed by MINID in the same round trip.
+        """
+        try:
             queued_message = QueuedMessage(
                 id=message["id"],
                 session_id=message["session_id"],
@@ -597,102 +669,135 @@ class ScalableWebSocketManager:
                 content=message,
                 priority=MessagePriority.NORMAL,
                 timestamp=datetime.now(UTC),
-                expires_at=datetime.now(UTC) + timedelta(days=7),
+                expires_at=datetime.now(UTC) + timedelta(seconds=self.offline_message_ttl),
             )
 
-            # Store in Redis for persistence
-            await self.redis.lpush(
-                f"message_queue:{room}",
-                json.dumps(
-                    {
-                        "id": queued_message.id,
-                        "content": queued_message.content,
-                        "timestamp": queued_message.timestamp.isoformat(),
-                        "expires_at": (
-                            queued_message.expires_at.isoformat()
-                            if queued_message.expires_at
-                            else None
-                        ),
-                    }
-                ),
-            )
+            stream_key = self._offline_stream_key(room)
+            # Stream ids are millisecond timestamps, so MINID trimming is expiry
+            min_id = int((time.time() - self.offline_message_ttl) * 1000)
 
-            # Set TTL on the queue
-            await self.redis.expire(f"message_queue:{room}", 604800)  # 7 days
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xadd(
+                stream_key,
+                {"id": queued_message.id, "data": json.dumps(queued_message.content)},
+                maxlen=self.offline_queue_maxlen,
+                approximate=True,
+            )
+            pipe.xtrim(stream_key, minid=min_id, approximate=True)
+            pipe.expire(stream_key, self.offline_message_ttl)
+            await pipe.execute()
 
         except Exception as e:
             logger.error(f"Message queuing error: {e}")
 
-    async def _process_queued_messages(self, session_id: str):
-        """Process queued messages for a session"""
+    async def _ensure_offline_cursor(self, room: str, user_id: str):
+        """Create the user's consumer group on the room stream if it does not exist"""
         try:
-            connection = None
-            for conn in self.connections.values():
-                if conn.session_id == session_id:
-                    connection = conn
-                    break
+            await self.redis.xgroup_create(
+                self._offline_stream_key(room), self._offline_group(user_id), id="$", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Offline cursor creation error: {e}")
+        except Exception as e:
+            logger.error(f"Offline cursor creation error: {e}")
+
+    async def _catch_up_room(self, connection: WebSocketConnection):
+        """Bring a session that starts receiving its room live up to date.
+
+        If another of the user's sessions is already in the room, everything
+        queued since was delivered live and the cursor is moved to the tail;
+        otherwise the messages queued while the user was away are delivered.
+        """
+        await self._ensure_offline_cursor(connection.room, connection.user_id)
+        sessions = self.user_sessions.get(connection.user_id, set())
+        live = (sessions & self.room_members.get(connection.room, set())) - {connection.session_id}
+        if live:
+            await self._mark_offline_cursor(connection.room, connection.user_id)
+        else:
+            await self._process_queued_messages(connection.session_id)
+
+    async def _leave_offline_room(self, room: str, user_id: str):
+        """Start queueing a room for a user once none of their sessions is in it"""
+        sessions = self.user_sessions.get(user_id, set())
+        if not sessions & self.room_members.get(room, set()):
+            await self._mark_offline_cursor(room, user_id)
+
+    async def _mark_offline_cursor(self, room: str, user_id: str):
+        """Move the user's cursor to the stream tail when they stop receiving a room live.
+
+        Everything up to now was delivered live; only later entries are queued.
+        """
+        try:
+            await self.redis.xgroup_setid(
+                self._offline_stream_key(room), self._offline_group(user_id), id="$"
+            )
+        except Exception as e:
+            logger.error(f"Offline cursor update error: {e}")
+
+    async def _process_queued_messages(self, session_id: str):
+        """Deliver messages queued for a session's user while they were offline.
 
+        Reads the user's consumer group in batches of ``offline_batch_size`` and
+        emits each batch as one event, so cost is proportional to what is delivered.
+        Entries read before but never acknowledged (the emit failed) are delivered
+        first, then new ones.
+        """
+        try:
+            sid = self.session_index.get(session_id)
+            connection = self.connections.get(sid) if sid else None
             if not connection:
                 return
 
-            # Get queued messages for user's room
-            queue_key = f"message_queue:{connection.room}"
-            messages = await self.redis.lrange(queue_key, 0, -1)
-
-            for message_data in messages:
-                try:
-                    message = json.loads(message_data)
-
-                    # Check if message hasn't expired
-                    if message.get("expires_at"):
-                        expires_at = datetime.fromisoformat(message["expires_at"])
-                        if datetime.now(UTC) > expires_at:
-                            continue
+            stream_key = self._offline_stream_key(connection.room)
+            group = self._offline_group(connection.user_id)
+
+            # "0" reads the consumer's own pending entries, ">" new ones
+            read_id = "0"
+            while True:
+                # One consumer per user, so connections do not pile up consumers
+                response = await self.redis.xreadgroup(
+                    group,
+                    connection.user_id,
+                    {stream_key: read_id},
+                    count=self.offline_batch_size,
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    if read_id == ">":
+                        break
+                    read_id = ">"
+                    continue
 
-                    # Send message to user
+                entry_ids = []
+                messages = []
+                for entry_id, fields in entries:
+                    entry_ids.append(entry_id)
+                    # Pending entries trimmed from the stream come back without fields
+                    data = (fields or {}).get(b"data", (fields or {}).get("data"))
+                    try:
+                        messages.append(json.loads(data))
+                    except (TypeError, json.JSONDecodeError):
+                        continue
+
+                if messages:
                     await self.sio.emit(
-                        "queued_message", message["content"], room=connection.socket_id
+                        "queued_messages",
+                        {"messages": messages, "count": len(messages)},
+                        room=connection.socket_id,
                     )
 
-                    # Remove from queue after successful delivery
-                    await self.redis.lrem(queue_key, 1, message_data)
+                # Acknowledge after successful delivery
+                await self.redis.xack(stream_key, group, *entry_ids)
 
-                except json.JSONDecodeError:
-                    continue
+                if len(entries) < self.offline_batch_size:
+                    if read_id == ">":
+                        break
+                    read_id = ">"
 
         except Exception as e:
             logger.error(f"Queued message processing error: {e}")
 
-    async def _process_message_queues(self):
-        """Background task to process message queues"""
-        while True:
-            try:
-                await asyncio.sleep(30)  # Process every 30 seconds
-
-                # Get all queue keys
-                queue_keys = await self.redis.keys("message_queue:*")
-
-                for queue_key in queue_keys:
-                    # Process expired messages
-                    messages = await self.redis.lrange(queue_key, 0, -1)
-
-                    for message_data in messages:
-                        try:
-                            message = json.loads(message_data)
-
-                            if message.get("expires_at"):
-                                expires_at = datetime.fromisoformat(message["expires_at"])
-                                if datetime.now(UTC) > expires_at:
-                                    await self.redis.lrem(queue_key, 1, message_data)
-
-                        except json.JSONDecodeError:
-                            # Remove invalid messages
-                            await self.redis.lrem(queue_key, 1, message_data)
-
-            except Exception as e:
-                logger.error(f"Message queue processing error: {e}")
-                await asyncio.sleep(60)  # Wait longer on error
-
     async def _cleanup_connections(self):
         """Background task to clean up stale connections"""
         while True:
@@ -20,8 +20,16 @@ from opentelemetry.propagate import extract
 from opentelemetry.sdk.resources import SERVICE_NAME, SERVICE_VERSION, Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
 from opentelemetry.trace import SpanKind, Status, StatusCode
 
+from ..telemetry.sampling import (
+    HEAD_SAMPLED_ATTRIBUTE,
+    TailSamplingSpanProcessor,
+    head_sample,
+    parse_sampled_header,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,10 +45,15 @@ class TracingMiddleware:
         jaeger_host: str = "localhost",
         jaeger_port: int = 6831,
         enabled: bool = True,
+        latency_threshold_ms: float = 2000.0,
+        sample_rate: float = 0.01,
     ):
         self.service_name = service_name
         self.enabled = enabled
         self.tracer = None
+        self.latency_threshold_ms = latency_threshold_ms
+        self.sample_rate = sample_rate
+        self.sampler: TailSamplingSpanProcessor | None = None
 
         if self.enabled:
             self._initialize_tracing(jaeger_host, jaeger_port)
@@ -59,8 +72,9 @@ class TracingMiddleware:
             }
         )
 
-        # Configure tracer provider
-        provider = TracerProvider(resource=resource)
+        # Configure tracer provider; every span is recorded and the tail
+        # sampler decides which traces are exported
+        provider = TracerProvider(resource=resource, sampler=ALWAYS_ON)
 
         # Configure Jaeger exporter
         jaeger_exporter = JaegerExporter(
@@ -75,7 +89,13 @@ class TracingMiddleware:
             max_export_interval_millis=5000,
         )
 
-        provider.add_span_processor(span_processor)
+        # Export only slow, failed, marked and head-sampled traces
+        self.sampler = TailSamplingSpanProcessor(
+            span_processor,
+            latency_threshold_ms=self.latency_threshold_ms,
+            sample_rate=self.sample_rate,
+        )
+        provider.add_span_processor(self.sampler)
 
         # Set global tracer provider
         trace.set_tracer_provider(provider)
@@ -100,6 +120,9 @@ class TracingMiddleware:
 
         # Extract trace context from headers if present
         context = extract(request.headers)
+        sampled = parse_sampled_header(request.headers)
+        if sampled is None:
+            sampled = head_sample(self.sample_rate)
 
         # Start main request span
         with self.tracer.start_as_current_span(
@@ -114,6 +137,7 @@ class TracingMiddleware:
                 "http.target": request.url.path,
                 "http.user_agent": request.headers.get("user-agent", ""),
                 "net.peer.ip": request.client.host if request.client else "unknown",
+                HEAD_SAMPLED_ATTRIBUTE: sampled,
             },
         ) as span:
             try:
@@ -320,10 +344,17 @@ def initialize_tracing(
     jaeger_host: str = "localhost",
     jaeger_port: int = 6831,
     enabled: bool = True,
+    latency_threshold_ms: float = 2000.0,
+    sample_rate: float = 0.01,
 ) -> TracingMiddleware:
     """Initialize global tracing middleware"""
     global tracing_middleware
     tracing_middleware = TracingMiddleware(
-        service_name=service_name, jaeger_host=jaeger_host, jaeger_port=jaeger_port, enabled=enabled
+        service_name=service_name,
+        jaeger_host=jaeger_host,
+        jaeger_port=jaeger_port,
+        enabled=enabled,
+        latency_threshold_ms=latency_threshold_ms,
+        sample_rate=sample_rate,
     )
     return tracing_middleware
@@ -6,7 +6,7 @@ import sys
 import structlog
 from pythonjsonlogger import jsonlogger
 
-from ..app.config import settings
+from ..config.settings import settings
 
 
 def setup_structured_logging():
@@ -4,7 +4,9 @@ Prometheus metrics collection for monitoring system performance and usage.
 
 import asyncio
 import logging
+import re
 import time
+from collections import OrderedDict
 from functools import wraps
 from typing import Callable, Optional
 
@@ -108,36 +110,145 @@ DB_QUERY_DURATION = Histogram(
 )
 
 
+_CONVERTOR = re.compile(r"{(\w+):\w+}")
+
+
+class _RouteNode:
+    __slots__ = ("children", "param", "rest", "template")
+
+    def __init__(self):
+        self.children: dict[str, "_RouteNode"] = {}
+        self.param: "_RouteNode | None" = None  # any single segment
+        self.rest: str | None = None  # template of a trailing {name:path} parameter
+        self.template: str | None = None
+
+
+class RouteTemplateResolver:
+    """Resolves request paths to route templates.
+
+    The routes are compiled once into a trie of path segments, so resolving a
+    path costs its depth instead of one regex per mounted route, and recent
+    results are kept in a bounded LRU.
+    """
+
+    def __init__(self, routes: list, cache_size: int = 1024):
+        """Initialize resolver.
+
+        Args:
+            routes: Application routes (mounts are descended into)
+            cache_size: Maximum number of cached paths
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str | None]" = OrderedDict()
+        self._root = _RouteNode()
+        self._add_routes(routes, "", "")
+
+    def _add_routes(self, routes: list, prefix: str, template_prefix: str):
+        for route in routes:
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            # Drop parameter convertors: /files/{name:path} -> /files/{name}
+            template = template_prefix + _CONVERTOR.sub(r"{\1}", path)
+            if getattr(route, "routes", None) is not None:
+                self._add_routes(route.routes, prefix + path, template)
+            else:
+                self._insert(prefix + path, template)
+
+    def _insert(self, path: str, template: str):
+        node = self._root
+        for segment in path.strip("/").split("/"):
+            if segment.startswith("{") and segment.endswith("}"):
+                if segment.endswith(":path}"):
+                    node.rest = node.rest or template
+                    return
+                node.param = node.param or _RouteNode()
+                node = node.param
+            elif segment:
+                node = node.children.setdefault(segment, _RouteNode())
+        # First route wins, as in Starlette's routing
+        node.template = node.template or template
+
+    def resolve(self, path: str) -> str | None:
+        """Get the template of the route matching a path.
+
+        Args:
+            path: Request path
+
+        Returns:
+            Route template, or None if no route matches
+        """
+        try:
+            self._cache.move_to_end(path)
+            return self._cache[path]
+        except KeyError:
+            pass
+
+        segments = [segment for segment in path.split("/") if segment]
+        template = self._match(self._root, segments, 0)
+        self._cache[path] = template
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return template
+
+    def _match(self, node: _RouteNode, segments: list[str], i: int) -> str | None:
+        if i == len(segments):
+            return node.template or node.rest
+        child = node.children.get(segments[i])
+        if child is not None:
+            template = self._match(child, segments, i + 1)
+            if template is not None:
+                return template
+        if node.param is not None:
+            template = self._match(node.param, segments, i + 1)
+            if template is not None:
+                return template
+        return node.rest
+
+
 class MetricsMiddleware:
     """Middleware for collecting request metrics."""
 
     def __init__(self):
         self.excluded_paths = {"/metrics", "/health", "/favicon.ico"}
+        self._resolver: RouteTemplateResolver | None = None
+        self._route_count = -1
+
+    def _endpoint(self, request: Request) -> str:
+        """Get the route template of a request for the endpoint label."""
+        scope = request.scope
+        route = scope.get("route")
+        if route is not None and hasattr(route, "path_format"):
+            # Resolved by the router; add the prefix of the mounts it is under
+            root_path = scope.get("root_path", "")
+            app_root_path = scope.get("app_root_path", root_path)
+            return root_path[len(app_root_path) :] + route.path_format
+
+        routes = request.app.routes
+        if self._resolver is None or len(routes) != self._route_count:
+            self._resolver = RouteTemplateResolver(routes)
+            self._route_count = len(routes)
+        # Unmatched paths share one label so that scanners cannot add series
+        return self._resolver.resolve(scope["path"]) or "unmatched"
 
     async def __call__(self, request: Request, call_next):
         # Skip metrics for excluded paths
-        if request.url.path in self.excluded_paths:
+        if request.scope["path"] in self.excluded_paths:
             return await call_next(request)
 
         # Track active requests
         ACTIVE_REQUESTS.inc()
 
         # Start timing
-        start_time = time.time()
-
-        # Extract endpoint (remove path parameters)
-        endpoint = request.url.path
-        for route in request.app.routes:
-            if hasattr(route, "path_regex") and route.path_regex.match(request.url.path):
-                endpoint = route.path
-                break
+        start_time = time.perf_counter_ns()
 
         try:
             # Process request
             response = await call_next(request)
 
             # Record metrics
-            duration = time.time() - start_time
+            duration = (time.perf_counter_ns() - start_time) / 1e9
+            endpoint = self._endpoint(request)
             REQUEST_COUNT.labels(
                 method=request.method, endpoint=endpoint, status=response.status_code
             ).inc()
@@ -163,7 +274,7 @@ class MetricsMiddleware:
 
         except Exception:
             # Track exceptions
-            ERROR_RATE.labels(type="exception", endpoint=endpoint).inc()
+            ERROR_RATE.labels(type="exception", endpoint=self._endpoint(request)).inc()
             raise
 
         finally:
@@ -4,13 +4,13 @@ import logging
 from typing import Optional, Dict, Any
 
 from opentelemetry import trace
-from opentelemetry.exporter.jaeger import JaegerExporter
+from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 
-from ..app.config import settings
+from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +39,7 @@ class TracingManager:
             resource = Resource.create(
                 {
                     "service.name": self.service_name,
-                    "service.version": settings.app_version,
+                    "service.version": settings.version,
                     "deployment.environment": "production" if not settings.debug else "development",
                 }
             )
@@ -3,11 +3,16 @@
 import asyncio
 import logging
 from collections.abc import Callable
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Dict
 
+from opentelemetry import trace
+
+from ..reliability.retry_budget import retry_attempt, retry_budget_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -95,6 +100,7 @@ class FallbackManager:
 
         last_error = None
         attempt = 0
+        failed_providers: set[str] = set()
 
         for provider, model in models_to_try:
             attempt += 1
@@ -109,6 +115,12 @@ class FallbackManager:
                     logger.info(f"Circuit breaker open for {breaker_key}, skipping")
                     continue
 
+            # Going back to a provider that already failed is a retry against it
+            budget = retry_budget_manager.get_or_create(provider)
+            if provider in failed_providers and not budget.can_retry():
+                logger.info(f"Retry budget of {provider} exhausted, skipping {breaker_key}")
+                continue
+
             try:
                 # Calculate delay with exponential backoff
                 if attempt > 1:
@@ -120,10 +132,13 @@ class FallbackManager:
                 # Attempt request
                 logger.info(f"Attempting request with {provider}:{model} (attempt {attempt})")
 
-                response = await asyncio.wait_for(
-                    request_func(provider=provider, model=model, **request_args),
-                    timeout=30,  # 30 second timeout
-                )
+                # Fallback attempts tell nested layers not to retry on their own
+                with retry_attempt() if attempt > 1 else nullcontext():
+                    response = await asyncio.wait_for(
+                        request_func(provider=provider, model=model, **request_args),
+                        timeout=30,  # 30 second timeout
+                    )
+                # The provider client credits its budget on success, not this layer
 
                 # Validate response if validation function provided
                 if validation_func:
@@ -153,12 +168,14 @@ class FallbackManager:
 
             except TimeoutError:
                 last_error = "Request timeout"
+                failed_providers.add(provider)
                 logger.error(f"Timeout for {provider}:{model}")
                 self._update_provider_health(provider, False)
                 self._trigger_circuit_breaker(breaker_key, FallbackReason.TIMEOUT)
 
             except Exception as e:
                 last_error = str(e)
+                failed_providers.add(provider)
                 logger.error(f"Error with {provider}:{model}: {e}")
                 self._update_provider_health(provider, False)
 
@@ -256,6 +273,9 @@ class FallbackManager:
         if len(self.fallback_history) > 10000:
             self.fallback_history = self.fallback_history[-5000:]
 
+        # Have the tail sampler export the trace (telemetry.sampling.KEEP_ATTRIBUTE)
+        trace.get_current_span().set_attribute("sampling.keep", "fallback")
+
         # Log event
         if event.success:
             logger.info(
@@ -7,6 +7,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict
 
+from chatbot_ai_system.utils.token_counter import token_counter
+
 logger = logging.getLogger(__name__)
 
 
@@ -669,8 +671,8 @@ class ModelRouter:
         # Detect task type
         task_type = self._detect_task_type(query)
 
-        # Count tokens
-        token_count = self._estimate_tokens(query)
+        # Count tokens (long queries are tokenized off the event loop)
+        token_count = await token_counter.count_tokens_async(query)
 
         # Determine required capabilities
         required_capabilities = self._determine_capabilities(query, task_type)
@@ -742,16 +744,15 @@ class ModelRouter:
             return TaskType.CHAT
 
     def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count.
+        """Count tokens.
 
         Args:
             text: Input text
 
         Returns:
-            Estimated token count
+            Token count (memoized by the shared token counter)
         """
-        # Simple estimation: ~4 characters per token
-        return len(text) // 4
+        return token_counter.count_tokens(text)
 
     def _determine_capabilities(self, query: str, task_type: TaskType) -> list[ModelCapability]:
         """Determine required capabilities.
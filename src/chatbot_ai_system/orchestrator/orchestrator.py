@@ -22,6 +22,8 @@ from chatbot_ai_system.providers.base import (
     RateLimitError,
 )
 from chatbot_ai_system.telemetry.metrics import metrics_collector
+from chatbot_ai_system.telemetry.profiler import hot_section
+from chatbot_ai_system.utils.token_counter import token_counter
 
 logger = structlog.get_logger()
 
@@ -105,7 +107,8 @@ class RequestCache:
             "temperature": request.temperature,
             "max_tokens": request.max_tokens,
         }
-        key_str = json.dumps(key_data, sort_keys=True)
+        with hot_section("serialization"):
+            key_str = json.dumps(key_data, sort_keys=True)
         return hashlib.sha256(key_str.encode()).hexdigest()
 
     def _generate_semantic_key(self, content: str) -> str:
@@ -450,14 +453,17 @@ class ProviderOrchestrator:
             )
 
         # Check cache
-        cached_response = await self.cache.get(request, self.config.cache_strategy)
+        with hot_section("cache_lookup"):
+            cached_response = await self.cache.get(request, self.config.cache_strategy)
         if cached_response:
             return cached_response
 
         # Cost check
         if self.config.cost_optimization_enabled:
             # Estimate cost and check against limit
-            estimated_tokens = len(str(request.messages)) / 4  # Rough estimate
+            estimated_tokens = await token_counter.count_messages_tokens_async(
+                request.messages, request.model
+            )
             estimated_cost = estimated_tokens * 0.002 / 1000
             if estimated_cost > self.config.max_cost_per_request:
                 raise ProviderError(
@@ -487,7 +493,8 @@ class ProviderOrchestrator:
                     attempt=attempts + 1,
                 )
 
-                response = await provider.complete(request)
+                with hot_section("provider_call"):
+                    response = await provider.complete(request)
 
                 # Cache successful response
                 await self.cache.set(request, response)
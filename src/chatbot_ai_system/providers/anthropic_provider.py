@@ -172,6 +172,7 @@ class AnthropicProvider(BaseProvider, StreamingAnthropicMixin):
 
                 # Log response
                 self._log_response(chat_response, duration)
+                self.retry_budget.record_success()
 
                 return chat_response
 
@@ -183,7 +184,7 @@ class AnthropicProvider(BaseProvider, StreamingAnthropicMixin):
 
             except AnthropicRateLimitError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     # Calculate exponential backoff
                     delay = min(self._calculate_backoff(attempt), 10.0)  # Max delay of 10 seconds
                     logger.warning(
@@ -202,7 +203,7 @@ class AnthropicProvider(BaseProvider, StreamingAnthropicMixin):
 
             except APITimeoutError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"Anthropic request timeout, retrying in {delay:.1f}s "
@@ -224,7 +225,7 @@ class AnthropicProvider(BaseProvider, StreamingAnthropicMixin):
 
             except APIConnectionError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"Anthropic connection error, retrying in {delay:.1f}s "
@@ -239,7 +240,11 @@ class AnthropicProvider(BaseProvider, StreamingAnthropicMixin):
             except APIError as e:
                 last_error = e
                 # For general API errors, retry if it might be transient
-                if attempt < self.max_retries - 1 and getattr(e, "status_code", 500) >= 500:
+                if (
+                    attempt < self.max_retries - 1
+                    and getattr(e, "status_code", 500) >= 500
+                    and self.retry_budget.can_retry()
+                ):
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"Anthropic API error, retrying in {delay:.1f}s "
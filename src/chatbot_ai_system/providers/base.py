@@ -12,6 +12,8 @@ from enum import Enum
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from ..reliability.retry_budget import retry_budget_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -254,6 +256,8 @@ class BaseProvider(ABC):
         self.status = ProviderStatus.HEALTHY
         self.metrics = ProviderMetrics()
         self._semaphore = asyncio.Semaphore(10)  # Default concurrency limit
+        # Shared by every retrying layer that calls this provider
+        self.retry_budget = retry_budget_manager.get_or_create(self.provider_name)
 
     @abstractmethod
     async def chat(
@@ -164,6 +164,7 @@ class OpenAIProvider(BaseProvider, StreamingOpenAIMixin):
 
                 # Log response
                 self._log_response(chat_response, duration)
+                self.retry_budget.record_success()
 
                 return chat_response
 
@@ -175,7 +176,7 @@ class OpenAIProvider(BaseProvider, StreamingOpenAIMixin):
 
             except OpenAIRateLimitError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     # Calculate exponential backoff
                     delay = min(self._calculate_backoff(attempt), 10.0)  # Max delay of 10 seconds
                     logger.warning(
@@ -194,7 +195,7 @@ class OpenAIProvider(BaseProvider, StreamingOpenAIMixin):
 
             except APITimeoutError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"OpenAI request timeout, retrying in {delay:.1f}s "
@@ -216,7 +217,7 @@ class OpenAIProvider(BaseProvider, StreamingOpenAIMixin):
 
             except APIConnectionError as e:
                 last_error = e
-                if attempt < self.max_retries - 1:
+                if attempt < self.max_retries - 1 and self.retry_budget.can_retry():
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"OpenAI connection error, retrying in {delay:.1f}s "
@@ -232,7 +233,11 @@ class OpenAIProvider(BaseProvider, StreamingOpenAIMixin):
                 last_error = e
                 # For general API errors, retry if it might be transient
                 status_code = getattr(e, "status_code", 500)
-                if attempt < self.max_retries - 1 and status_code >= 500:
+                if (
+                    attempt < self.max_retries - 1
+                    and status_code >= 500
+                    and self.retry_budget.can_retry()
+                ):
                     delay = self._calculate_backoff(attempt)
                     logger.warning(
                         f"OpenAI API error {status_code}, retrying in {delay:.1f}s "
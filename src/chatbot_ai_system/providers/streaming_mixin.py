@@ -10,6 +10,8 @@ from dataclasses import dataclass
 from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from asyncio import Task
 
+from chatbot_ai_system.utils.token_counter import token_counter
+
 from .base import ChatMessage
 
 logger = logging.getLogger(__name__)
@@ -250,6 +252,7 @@ class StreamingOpenAIMixin(StreamingMixin):
         start_time = time.time()
         chunk_index = 0
         total_tokens = 0
+        stream_tokens = token_counter.stream_counter(model)
 
         try:
             # Convert messages to OpenAI format
@@ -279,7 +282,7 @@ class StreamingOpenAIMixin(StreamingMixin):
             async for chunk in stream:
                 if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
-                    total_tokens += 1  # Approximate
+                    total_tokens = stream_tokens.add(content)
 
                     yield await self._process_stream_chunk(
                         content, chunk_index, model, start_time, total_tokens
@@ -343,6 +346,7 @@ class StreamingAnthropicMixin(StreamingMixin):
         start_time = time.time()
         chunk_index = 0
         total_tokens = 0
+        stream_tokens = token_counter.stream_counter(model)
 
         try:
             # Convert messages to Anthropic format
@@ -380,7 +384,7 @@ class StreamingAnthropicMixin(StreamingMixin):
                 async for event in stream:
                     if event.type == "content_block_delta":
                         content = event.delta.text
-                        total_tokens += 1  # Approximate
+                        total_tokens = stream_tokens.add(content)
 
                         yield await self._process_stream_chunk(
                             content, chunk_index, model, start_time, total_tokens
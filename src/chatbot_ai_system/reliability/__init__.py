@@ -1,6 +1,12 @@
 """Reliability components for fault tolerance and resilience."""
 
 
+from .admission import (
+    AdmissionController,
+    DeadlineExceededException,
+    FixedLimit,
+    GradientLimit,
+)
 from .circuit_breaker import (
     CircuitBreakerManager,
     CircuitMetrics,
@@ -10,6 +16,14 @@ from .circuit_breaker import (
     HystrixCircuitBreaker,
     circuit_breaker_manager,
 )
+from .circuit_cluster import CircuitBreakerCluster
+from .retry_budget import (
+    RetryBudget,
+    RetryBudgetManager,
+    retry_attempt,
+    retry_budget_manager,
+    retry_context,
+)
 from .retry_strategy import (
     BulkheadRejectedException,
     BulkheadRetryExecutor,
@@ -20,6 +34,7 @@ from .retry_strategy import (
     RetryStrategy,
     retry,
 )
+from .rolling_window import HealthCounts, RollingWindow
 from .timeout_manager import (
     CascadingTimeout,
     TimeoutConfig,
@@ -38,6 +53,9 @@ __all__ = [
     "CircuitOpenException",
     "CircuitTimeoutException",
     "circuit_breaker_manager",
+    "CircuitBreakerCluster",
+    "RollingWindow",
+    "HealthCounts",
     "RetryExecutor",
     "RetryStrategy",
     "RetryConfig",
@@ -45,7 +63,16 @@ __all__ = [
     "BulkheadRetryExecutor",
     "MaxRetriesExceededException",
     "BulkheadRejectedException",
+    "AdmissionController",
+    "GradientLimit",
+    "FixedLimit",
+    "DeadlineExceededException",
     "retry",
+    "RetryBudget",
+    "RetryBudgetManager",
+    "retry_budget_manager",
+    "retry_attempt",
+    "retry_context",
     "TimeoutManager",
     "TimeoutConfig",
     "TimeoutEvent",
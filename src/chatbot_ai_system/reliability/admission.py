@@ -0,0 +1,376 @@
+"""Priority-aware admission control with an adaptive concurrency limit."""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from typing import Any
+
+from .timeout_manager import deadline_context
+
+logger = logging.getLogger(__name__)
+
+
+class BulkheadRejectedException(Exception):
+    """Exception raised when bulkhead rejects execution."""
+
+    pass
+
+
+class DeadlineExceededException(BulkheadRejectedException):
+    """Exception raised when queued work is shed because its deadline cannot be met."""
+
+    pass
+
+
+class GradientLimit:
+    """Concurrency limit adapted from observed latency (gradient/Vegas style).
+
+    A long-term latency average approximates the latency of an unloaded
+    upstream. When recent latency rises above it, queueing is building up at the
+    upstream and the limit shrinks in proportion; when they match, the limit
+    grows by roughly ``sqrt(limit)`` per sample. Timeouts and overload errors
+    cut the limit multiplicatively (AIMD backoff).
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        backoff_ratio: float = 0.9,
+        long_window: int = 600,
+    ):
+        """Initialize gradient limit.
+
+        Args:
+            initial_limit: Starting concurrency limit
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            tolerance: Latency increase over the baseline accepted before shrinking
+            smoothing: Weight of each new estimate
+            backoff_ratio: Multiplier applied on a dropped request
+            long_window: Samples averaged by the latency baseline
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff_ratio = backoff_ratio
+        self._long_alpha = 2 / (long_window + 1)
+        self.long_rtt = 0.0
+        self.short_rtt = 0.0
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def on_sample(self, latency_ms: float, inflight: int, dropped: bool = False):
+        """Update the limit from a completed request.
+
+        Args:
+            latency_ms: Observed latency
+            inflight: Requests in flight when the request started
+            dropped: Whether the request timed out or was rejected as overloaded
+        """
+        if dropped:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            return
+
+        if self.long_rtt == 0.0:
+            self.long_rtt = self.short_rtt = latency_ms
+        else:
+            self.short_rtt += 0.5 * (latency_ms - self.short_rtt)
+            self.long_rtt += self._long_alpha * (latency_ms - self.long_rtt)
+            # Let the baseline follow a lasting improvement quickly
+            if self.long_rtt > 2 * self.short_rtt:
+                self.long_rtt *= 0.95
+
+        # Not enough load to learn anything about the limit
+        if inflight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / max(self.short_rtt, 1e-6)))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+
+class FixedLimit(GradientLimit):
+    """Concurrency limit that never changes."""
+
+    def __init__(self, limit: int = 10):
+        super().__init__(initial_limit=limit, min_limit=limit, max_limit=limit)
+
+    def on_sample(self, latency_ms: float, inflight: int, dropped: bool = False):
+        if not dropped:
+            self.short_rtt += 0.5 * (latency_ms - self.short_rtt)
+
+
+class _Waiter:
+    __slots__ = ("future", "deadline", "tenant_id", "weight", "abandoned")
+
+    def __init__(self, future: asyncio.Future, deadline: float | None, tenant_id: str, weight: int):
+        self.future = future
+        self.deadline = deadline
+        self.tenant_id = tenant_id
+        self.weight = weight
+        self.abandoned = False
+
+
+class _PriorityLevel:
+    """Waiters of one priority, served deficit-round-robin across tenants."""
+
+    def __init__(self):
+        self.tenants: "OrderedDict[str, deque[_Waiter]]" = OrderedDict()
+        self.deficit: dict[str, int] = {}
+
+    def push(self, waiter: _Waiter):
+        queue = self.tenants.get(waiter.tenant_id)
+        if queue is None:
+            queue = self.tenants[waiter.tenant_id] = deque()
+            self.deficit[waiter.tenant_id] = 0
+        queue.append(waiter)
+
+    def pop(self) -> _Waiter | None:
+        while self.tenants:
+            tenant_id, queue = next(iter(self.tenants.items()))
+            if not queue:
+                del self.tenants[tenant_id]
+                del self.deficit[tenant_id]
+                continue
+            if self.deficit[tenant_id] <= 0:
+                # New turn: the tenant may take ``weight`` slots before the next one
+                self.deficit[tenant_id] += queue[0].weight
+            waiter = queue.popleft()
+            self.deficit[tenant_id] -= 1
+            if not queue:
+                del self.tenants[tenant_id]
+                del self.deficit[tenant_id]
+            elif self.deficit[tenant_id] <= 0:
+                self.tenants.move_to_end(tenant_id)
+            return waiter
+        return None
+
+
+class AdmissionController:
+    """Admission control in front of one upstream.
+
+    Requests beyond the concurrency limit wait in a priority queue: higher
+    priorities are always served first, and tenants of the same priority share
+    the freed slots in proportion to their weight (deficit round robin), so one
+    tenant cannot starve the others. Queued work whose deadline can no longer be
+    met given the upstream's current latency is shed instead of being sent.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        limit: GradientLimit | None = None,
+        max_queue: int = 100,
+    ):
+        """Initialize admission controller.
+
+        Args:
+            name: Upstream name
+            limit: Concurrency limit (adaptive ``GradientLimit`` by default)
+            max_queue: Maximum number of waiting requests
+        """
+        self.name = name
+        self.limit = limit or GradientLimit()
+        self.max_queue = max_queue
+        self.inflight = 0
+        self.queued = 0
+        self._levels: dict[int, _PriorityLevel] = {}
+        self._priorities: list[int] = []  # heap of negated priorities with a level
+        self.stats = {"admitted": 0, "enqueued": 0, "rejected": 0, "shed": 0, "dropped": 0}
+
+    def expected_latency(self) -> float:
+        """Get the latency (seconds) a request admitted now is expected to take."""
+        return self.limit.short_rtt / 1000
+
+    def _can_meet(self, deadline: float | None, now: float) -> bool:
+        return deadline is None or deadline - now >= self.expected_latency()
+
+    async def acquire(
+        self,
+        tenant_id: str = "default",
+        priority: int = 0,
+        deadline: float | None = None,
+        weight: int = 1,
+    ) -> float:
+        """Wait for a concurrency slot.
+
+        Args:
+            tenant_id: Tenant the work belongs to
+            priority: Higher is served first
+            deadline: Wall-clock time the result is needed by (propagated deadline
+                when None)
+            weight: Share of the tenant among tenants of the same priority
+
+        Returns:
+            Monotonic time the slot was granted, to pass to ``release``
+
+        Raises:
+            BulkheadRejectedException: If the queue is full
+            DeadlineExceededException: If the deadline cannot be met
+        """
+        if deadline is None:
+            deadline = deadline_context.get()
+        if not self._can_meet(deadline, time.time()):
+            self.stats["shed"] += 1
+            raise DeadlineExceededException(f"Deadline cannot be met by {self.name}")
+
+        if self.inflight < self.limit.current and not self.queued:
+            return self._grant()
+
+        if self.queued >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise BulkheadRejectedException(f"Queue of {self.name} is full")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), deadline, tenant_id, weight)
+        level = self._levels.get(priority)
+        if level is None:
+            level = self._levels[priority] = _PriorityLevel()
+            heapq.heappush(self._priorities, -priority)
+        level.push(waiter)
+        self.queued += 1
+        self.stats["enqueued"] += 1
+
+        try:
+            if deadline is None:
+                return await waiter.future
+            return await asyncio.wait_for(
+                asyncio.shield(waiter.future), timeout=max(deadline - time.time(), 0)
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                if waiter.future.exception() is None:
+                    # Granted while being cancelled: hand the slot on
+                    self.release(waiter.future.result(), record=False)
+            elif not waiter.abandoned:
+                waiter.abandoned = True
+                self.queued -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["shed"] += 1
+                raise DeadlineExceededException(
+                    f"Deadline passed waiting for {self.name}"
+                ) from None
+            raise
+
+    def _grant(self) -> float:
+        self.inflight += 1
+        self.stats["admitted"] += 1
+        return time.monotonic()
+
+    def release(
+        self,
+        started_at: float,
+        dropped: bool = False,
+        record: bool = True,
+        inflight: int | None = None,
+    ):
+        """Return a slot and admit waiting work.
+
+        Args:
+            started_at: Value returned by ``acquire``
+            dropped: Whether the upstream timed out or reported overload
+            record: Whether to feed the latency to the limit
+            inflight: Requests in flight when the work started (current when None)
+        """
+        if record:
+            latency_ms = (time.monotonic() - started_at) * 1000
+            self.limit.on_sample(latency_ms, inflight or self.inflight, dropped)
+            if dropped:
+                self.stats["dropped"] += 1
+        self.inflight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting work in priority order."""
+        while self.queued and self.inflight < self.limit.current:
+            waiter = self._pop()
+            if waiter is None:
+                return
+            self.queued -= 1
+            if not self._can_meet(waiter.deadline, time.time()):
+                self.stats["shed"] += 1
+                waiter.future.set_exception(
+                    DeadlineExceededException(f"Deadline cannot be met by {self.name}")
+                )
+                continue
+            waiter.future.set_result(self._grant())
+
+    def _pop(self) -> _Waiter | None:
+        while self._priorities:
+            priority = -self._priorities[0]
+            level = self._levels[priority]
+            waiter = level.pop()
+            if waiter is None:
+                heapq.heappop(self._priorities)
+                del self._levels[priority]
+                continue
+            if waiter.abandoned or waiter.future.done():
+                continue
+            return waiter
+        return None
+
+    async def execute(
+        self,
+        func: Callable,
+        *args,
+        tenant_id: str = "default",
+        priority: int = 0,
+        deadline: float | None = None,
+        weight: int = 1,
+        is_drop: Callable[[Exception], bool] | None = None,
+        **kwargs,
+    ) -> Any:
+        """Run a coroutine function once admitted.
+
+        Args:
+            func: Coroutine function to run
+            *args: Function arguments
+            tenant_id: Tenant the work belongs to
+            priority: Higher is served first
+            deadline: Wall-clock time the result is needed by
+            weight: Share of the tenant among tenants of the same priority
+            is_drop: Whether an exception signals upstream overload (timeouts do)
+            **kwargs: Function keyword arguments
+
+        Returns:
+            Function result
+        """
+        started_at = await self.acquire(tenant_id, priority, deadline, weight)
+        inflight = self.inflight
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            dropped = isinstance(e, asyncio.TimeoutError) or bool(is_drop and is_drop(e))
+            # Latency of other failures says nothing about the upstream's load
+            self.release(started_at, dropped=dropped, record=dropped, inflight=inflight)
+            raise
+        except BaseException:
+            self.release(started_at, record=False)
+            raise
+        self.release(started_at, inflight=inflight)
+        return result
+
+    def get_status(self) -> dict[str, Any]:
+        """Get admission status."""
+        return {
+            "name": self.name,
+            "limit": self.limit.current,
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "latency_ms": self.limit.short_rtt,
+            "baseline_latency_ms": self.limit.long_rtt,
+            **self.stats,
+        }
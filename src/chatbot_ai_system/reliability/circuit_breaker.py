@@ -2,14 +2,14 @@
 
 import asyncio
 import logging
-import statistics
 import time
-from collections import deque
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Any, Optional
+from typing import Any
+
+from .rolling_window import HealthCounts, RollingWindow
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +33,6 @@ class CircuitMetrics:
     consecutive_failures: int = 0
     last_failure_time: datetime | None = None
     last_success_time: datetime | None = None
-    response_times: Optional[deque] = None
-    error_percentages: Optional[deque] = None
-
-    def __post_init__(self):
-        if self.response_times is None:
-            self.response_times = deque(maxlen=100)
-        if self.error_percentages is None:
-            self.error_percentages = deque(maxlen=10)
 
 
 class HystrixCircuitBreaker:
@@ -56,6 +48,9 @@ class HystrixCircuitBreaker:
         rolling_window_ms: int = 10000,
         min_requests_in_window: int = 20,
         sleep_window_ms: int = 5000,
+        rolling_window_buckets: int = 10,
+        latency_threshold_ms: float | None = None,
+        latency_percentile: float = 99.0,
     ):
         """Initialize circuit breaker.
 
@@ -68,6 +63,9 @@ class HystrixCircuitBreaker:
             rolling_window_ms: Time window for metrics
             min_requests_in_window: Minimum requests for percentage calculation
             sleep_window_ms: Sleep time when circuit is open
+            rolling_window_buckets: Number of buckets the rolling window is split into
+            latency_threshold_ms: Latency percentile that opens the circuit (None disables)
+            latency_percentile: Percentile compared against ``latency_threshold_ms``
         """
         self.name = name
         self.failure_threshold = failure_threshold
@@ -77,11 +75,19 @@ class HystrixCircuitBreaker:
         self.rolling_window_ms = rolling_window_ms
         self.min_requests_in_window = min_requests_in_window
         self.sleep_window_ms = sleep_window_ms
+        self.latency_threshold_ms = latency_threshold_ms
+        self.latency_percentile = latency_percentile
 
         self.state = CircuitState.CLOSED
         self.metrics = CircuitMetrics()
         self.state_changed_at = datetime.utcnow()
-        self.rolling_window: deque[Any] = deque(maxlen=1000)  # Store recent requests
+        self.rolling_window = RollingWindow(rolling_window_ms, rolling_window_buckets)
+
+        # Fleet-wide state, set when registered with a CircuitBreakerCluster
+        self.cluster = None
+        self.cluster_health: HealthCounts | None = None
+        self._cluster_health_expires = 0.0
+        self._unsynced = [0, 0, 0]  # successes, failures, timeouts not yet flushed
 
         # Callbacks
         self.on_open_callback = None
@@ -183,17 +189,62 @@ class HystrixCircuitBreaker:
         if self.metrics.consecutive_failures >= self.failure_threshold:
             return True
 
-        # Check error percentage in rolling window
-        recent_requests = self._get_recent_requests()
-        if len(recent_requests) >= self.min_requests_in_window:
-            error_count = sum(1 for r in recent_requests if not r["success"])
-            error_percentage = (error_count / len(recent_requests)) * 100
+        # Check error percentage in the local and fleet-wide rolling windows
+        health = self.rolling_window.health()
+        for counts in (health, self._get_cluster_health()):
+            if counts is None or counts.total < self.min_requests_in_window:
+                continue
+            if counts.error_percentage >= self.failure_percentage_threshold:
+                return True
 
-            if error_percentage >= self.failure_percentage_threshold:
+        # Check latency in the local rolling window
+        if self.latency_threshold_ms is not None and health.total >= self.min_requests_in_window:
+            latency = self.rolling_window.latency_percentile(self.latency_percentile)
+            if latency >= self.latency_threshold_ms:
                 return True
 
         return False
 
+    def _get_cluster_health(self) -> HealthCounts | None:
+        """Get the last fleet-wide counts, unless they are too old to trust."""
+        if self.cluster_health is None or time.monotonic() > self._cluster_health_expires:
+            return None
+        return self.cluster_health
+
+    def update_cluster_health(self, health: HealthCounts, ttl: float):
+        """Store fleet-wide counts read from the cluster.
+
+        Args:
+            health: Counts over the rolling window across every process
+            ttl: Seconds the counts may be used for decisions
+        """
+        self.cluster_health = health
+        self._cluster_health_expires = time.monotonic() + ttl
+
+    def take_unsynced(self) -> tuple[int, int, int]:
+        """Take the outcome counts recorded since the last cluster flush."""
+        counts = tuple(self._unsynced)
+        self._unsynced = [0, 0, 0]
+        return counts
+
+    def restore_unsynced(self, counts: tuple[int, int, int]):
+        """Put back counts whose flush failed."""
+        for i, count in enumerate(counts):
+            self._unsynced[i] += count
+
+    def apply_remote_state(self, state: CircuitState):
+        """Apply a transition made by another process without re-broadcasting it.
+
+        Args:
+            state: State announced by the cluster
+        """
+        if state == CircuitState.OPEN:
+            # Also restarts the recovery timer when another process reopened
+            self.state_changed_at = datetime.utcnow()
+            self._transition_to_open(broadcast=False)
+        elif state == CircuitState.CLOSED:
+            self._transition_to_closed(broadcast=False)
+
     def _should_attempt_recovery(self) -> bool:
         """Check if recovery should be attempted.
 
@@ -203,17 +254,6 @@ class HystrixCircuitBreaker:
         time_in_open = (datetime.utcnow() - self.state_changed_at).total_seconds() * 1000
         return time_in_open >= self.recovery_timeout_ms
 
-    def _get_recent_requests(self) -> list[dict[str, Any]]:
-        """Get requests in rolling window.
-
-        Returns:
-            Recent requests
-        """
-        current_time = time.time() * 1000
-        window_start = current_time - self.rolling_window_ms
-
-        return [r for r in self.rolling_window if r["timestamp"] >= window_start]
-
     async def _record_success(self, response_time_ms: float):
         """Record successful request.
 
@@ -224,22 +264,16 @@ class HystrixCircuitBreaker:
         self.metrics.successful_requests += 1
         self.metrics.consecutive_failures = 0
         self.metrics.last_success_time = datetime.utcnow()
-        if self.metrics.response_times is not None:
-            self.metrics.response_times.append(response_time_ms)
 
         # Add to rolling window
-        self.rolling_window.append(
-            {"timestamp": time.time() * 1000, "success": True, "response_time": response_time_ms}
-        )
+        self.rolling_window.record_success(response_time_ms)
+        self._unsynced[0] += 1
 
         # Handle state transitions
         if self.state == CircuitState.HALF_OPEN:
             # Successful test, close circuit
             self._transition_to_closed()
 
-        # Update error percentage
-        self._update_error_percentage()
-
     async def _record_failure(self):
         """Record failed request."""
         self.metrics.total_requests += 1
@@ -248,18 +282,14 @@ class HystrixCircuitBreaker:
         self.metrics.last_failure_time = datetime.utcnow()
 
         # Add to rolling window
-        self.rolling_window.append(
-            {"timestamp": time.time() * 1000, "success": False, "response_time": None}
-        )
+        self.rolling_window.record_failure()
+        self._unsynced[1] += 1
 
         # Handle state transitions
         if self.state == CircuitState.HALF_OPEN:
             # Failed test, reopen circuit
             self._transition_to_open()
 
-        # Update error percentage
-        self._update_error_percentage()
-
     async def _record_timeout(self):
         """Record timeout request."""
         self.metrics.total_requests += 1
@@ -268,32 +298,15 @@ class HystrixCircuitBreaker:
         self.metrics.last_failure_time = datetime.utcnow()
 
         # Add to rolling window
-        self.rolling_window.append(
-            {
-                "timestamp": time.time() * 1000,
-                "success": False,
-                "response_time": self.timeout_ms,
-                "timeout": True,
-            }
-        )
+        self.rolling_window.record_timeout(self.timeout_ms)
+        self._unsynced[2] += 1
 
         # Handle state transitions
         if self.state == CircuitState.HALF_OPEN:
             # Timeout during test, reopen circuit
             self._transition_to_open()
 
-        # Update error percentage
-        self._update_error_percentage()
-
-    def _update_error_percentage(self):
-        """Update rolling error percentage."""
-        recent = self._get_recent_requests()
-        if recent:
-            errors = sum(1 for r in recent if not r["success"])
-            percentage = (errors / len(recent)) * 100
-            self.metrics.error_percentages.append(percentage)
-
-    def _transition_to_open(self):
+    def _transition_to_open(self, broadcast: bool = True):
         """Transition to open state."""
         if self.state != CircuitState.OPEN:
             self.state = CircuitState.OPEN
@@ -301,18 +314,27 @@ class HystrixCircuitBreaker:
 
             logger.warning(f"Circuit {self.name} opened")
 
+            if broadcast and self.cluster is not None:
+                self.cluster.announce(self, CircuitState.OPEN)
+
             if self.on_open_callback:
                 asyncio.create_task(self.on_open_callback(self))
 
-    def _transition_to_closed(self):
+    def _transition_to_closed(self, broadcast: bool = True):
         """Transition to closed state."""
         if self.state != CircuitState.CLOSED:
             self.state = CircuitState.CLOSED
             self.state_changed_at = datetime.utcnow()
             self.metrics.consecutive_failures = 0
+            # Start counting afresh so the failures that opened it do not reopen it
+            self.rolling_window.reset()
+            self.cluster_health = None
 
             logger.info(f"Circuit {self.name} closed")
 
+            if broadcast and self.cluster is not None:
+                self.cluster.announce(self, CircuitState.CLOSED)
+
             if self.on_close_callback:
                 asyncio.create_task(self.on_close_callback(self))
 
@@ -352,7 +374,9 @@ class HystrixCircuitBreaker:
         self.state = CircuitState.CLOSED
         self.metrics = CircuitMetrics()
         self.state_changed_at = datetime.utcnow()
-        self.rolling_window.clear()
+        self.rolling_window.reset()
+        self.cluster_health = None
+        self._unsynced = [0, 0, 0]
 
         logger.info(f"Circuit {self.name} reset")
 
@@ -366,13 +390,7 @@ class HystrixCircuitBreaker:
         if self.metrics.total_requests > 0:
             success_rate = (self.metrics.successful_requests / self.metrics.total_requests) * 100
 
-        avg_response_time = 0
-        if self.metrics.response_times:
-            avg_response_time = statistics.mean(self.metrics.response_times)
-
-        current_error_percentage = 0
-        if self.metrics.error_percentages:
-            current_error_percentage = self.metrics.error_percentages[-1]
+        health = self.rolling_window.health()
 
         return {
             "name": self.name,
@@ -383,8 +401,13 @@ class HystrixCircuitBreaker:
             "timeout_requests": self.metrics.timeout_requests,
             "success_rate": success_rate,
             "consecutive_failures": self.metrics.consecutive_failures,
-            "avg_response_time_ms": avg_response_time,
-            "current_error_percentage": current_error_percentage,
+            "avg_response_time_ms": self.rolling_window.mean_latency(),
+            "p99_response_time_ms": self.rolling_window.latency_percentile(99),
+            "current_error_percentage": health.error_percentage,
+            "requests_in_window": health.total,
+            "cluster_requests_in_window": (
+                self.cluster_health.total if self.cluster_health is not None else None
+            ),
             "last_failure": (
                 self.metrics.last_failure_time.isoformat()
                 if self.metrics.last_failure_time
@@ -402,9 +425,20 @@ class HystrixCircuitBreaker:
 class CircuitBreakerManager:
     """Manages multiple circuit breakers."""
 
-    def __init__(self):
-        """Initialize circuit breaker manager."""
+    def __init__(self, cluster=None):
+        """Initialize circuit breaker manager.
+
+        Args:
+            cluster: Optional CircuitBreakerCluster sharing state across processes
+        """
         self.circuit_breakers: dict[str, HystrixCircuitBreaker] = {}
+        self.cluster = cluster
+
+    def attach_cluster(self, cluster):
+        """Share the state of every circuit, existing and future, with a cluster."""
+        self.cluster = cluster
+        for cb in self.circuit_breakers.values():
+            cluster.register(cb)
 
     def get_or_create(self, name: str, **config) -> HystrixCircuitBreaker:
         """Get or create circuit breaker.
@@ -418,6 +452,8 @@ class CircuitBreakerManager:
         """
         if name not in self.circuit_breakers:
             self.circuit_breakers[name] = HystrixCircuitBreaker(name=name, **config)
+            if self.cluster is not None:
+                self.cluster.register(self.circuit_breakers[name])
 
         return self.circuit_breakers[name]
 
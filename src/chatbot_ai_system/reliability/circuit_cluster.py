@@ -0,0 +1,237 @@
+"""Circuit breaker state shared across processes through Redis.
+
+Each process keeps deciding locally; the cluster only feeds it. Outcome counts
+are flushed every ``sync_interval`` seconds into one Redis hash per circuit and
+time bucket, and the same round trip reads back the fleet-wide buckets of the
+window, so a provider failing on every pod trips the circuit after
+``min_requests_in_window`` failures across the fleet rather than per pod.
+Open/close transitions are published on a pub/sub channel and applied by every
+other process as soon as they arrive.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Optional
+
+from .circuit_breaker import CircuitState, HystrixCircuitBreaker
+from .rolling_window import HealthCounts
+
+logger = logging.getLogger(__name__)
+
+
+def _count(bucket: dict, field: str) -> int:
+    value = bucket.get(field)
+    if value is None:
+        value = bucket.get(field.encode())
+    return int(value or 0)
+
+
+class CircuitBreakerCluster:
+    """Shares circuit breaker counters and transitions between processes."""
+
+    def __init__(
+        self,
+        redis_client,
+        sync_interval: float = 0.5,
+        channel: str = "circuit_breaker_events",
+        key_prefix: str = "circuit",
+        instance_id: Optional[str] = None,
+        retry_delay: float = 1.0,
+    ):
+        """Initialize circuit breaker cluster.
+
+        Args:
+            redis_client: Async Redis client
+            sync_interval: Seconds between counter flushes
+            channel: Pub/sub channel for state transitions
+            key_prefix: Prefix of the Redis keys
+            instance_id: Identifier of this process (random when None)
+            retry_delay: Seconds before resubscribing after an error
+        """
+        self.redis = redis_client
+        self.sync_interval = sync_interval
+        self.channel = channel
+        self.key_prefix = key_prefix
+        self.instance_id = instance_id or uuid.uuid4().hex
+        self.retry_delay = retry_delay
+        self.breakers: dict[str, HystrixCircuitBreaker] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._pending: set[asyncio.Task] = set()
+        self.stats = {"syncs": 0, "sync_errors": 0, "published": 0, "received": 0}
+
+    def _bucket_key(self, name: str, epoch: int) -> str:
+        return f"{self.key_prefix}:{name}:{epoch}"
+
+    def _open_key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}:open"
+
+    def register(self, breaker: HystrixCircuitBreaker):
+        """Share a circuit breaker's state with the cluster."""
+        self.breakers[breaker.name] = breaker
+        breaker.cluster = self
+        self.start()
+
+    def start(self):
+        """Start syncing and listening (no-op outside an event loop)."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._tasks = [loop.create_task(self._sync_loop()), loop.create_task(self._listen())]
+
+    async def stop(self):
+        """Stop syncing and listening."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                self.stats["sync_errors"] += 1
+                logger.error(f"Circuit breaker sync error: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self):
+        """Flush local counts and refresh fleet-wide health in one round trip."""
+        if not self.breakers:
+            return
+
+        now_ms = time.time() * 1000
+        pipe = self.redis.pipeline(transaction=False)
+        plan = []
+        for name, breaker in list(self.breakers.items()):
+            window = breaker.rolling_window
+            epoch = int(now_ms // window.bucket_ms)
+            counts = breaker.take_unsynced()
+
+            writes = 0
+            if any(counts):
+                key = self._bucket_key(name, epoch)
+                for field, value in zip(("s", "f", "t"), counts):
+                    if value:
+                        pipe.hincrby(key, field, value)
+                        writes += 1
+                pipe.pexpire(key, int(window.window_ms + window.bucket_ms))
+                writes += 1
+
+            for bucket in range(epoch - window.buckets + 1, epoch + 1):
+                pipe.hgetall(self._bucket_key(name, bucket))
+            pipe.exists(self._open_key(name))
+            plan.append((breaker, counts, writes, window.buckets))
+
+        try:
+            results = await pipe.execute()
+        except Exception as e:
+            self.stats["sync_errors"] += 1
+            logger.warning(f"Circuit breaker sync failed: {e}")
+            for breaker, counts, _, _ in plan:
+                breaker.restore_unsynced(counts)
+            return
+
+        self.stats["syncs"] += 1
+        ttl = self.sync_interval * 4
+        offset = 0
+        for breaker, _, writes, buckets in plan:
+            offset += writes
+            rows = results[offset : offset + buckets]
+            is_open = results[offset + buckets]
+            offset += buckets + 1
+
+            successes = sum(_count(row, "s") for row in rows)
+            errors = sum(_count(row, "f") + _count(row, "t") for row in rows)
+            total = successes + errors
+            breaker.update_cluster_health(
+                HealthCounts(
+                    total=total,
+                    errors=errors,
+                    error_percentage=errors / total * 100 if total else 0.0,
+                ),
+                ttl,
+            )
+
+            if is_open and breaker.state == CircuitState.CLOSED:
+                breaker.apply_remote_state(CircuitState.OPEN)
+            else:
+                breaker._get_current_state()
+
+    def announce(self, breaker: HystrixCircuitBreaker, state: CircuitState):
+        """Broadcast a local transition (no-op outside an event loop)."""
+        try:
+            task = asyncio.get_running_loop().create_task(self.publish_state(breaker, state))
+        except RuntimeError:
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def publish_state(self, breaker: HystrixCircuitBreaker, state: CircuitState):
+        """Record and publish a circuit transition.
+
+        Opening sets a marker that expires with the recovery timeout, so
+        processes that missed the announcement still pick it up on their next
+        sync. Closing clears the marker and the window's buckets so the fleet
+        starts counting afresh.
+        """
+        name = breaker.name
+        message = json.dumps({"name": name, "state": state.value, "source": self.instance_id})
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            if state == CircuitState.OPEN:
+                pipe.set(self._open_key(name), self.instance_id, px=breaker.recovery_timeout_ms)
+            else:
+                window = breaker.rolling_window
+                epoch = int(time.time() * 1000 // window.bucket_ms)
+                pipe.delete(
+                    self._open_key(name),
+                    *(self._bucket_key(name, e) for e in range(epoch - window.buckets, epoch + 1)),
+                )
+            pipe.publish(self.channel, message)
+            await pipe.execute()
+            self.stats["published"] += 1
+        except Exception as e:
+            logger.error(f"Failed to publish state of circuit {name}: {e}")
+
+    def handle_message(self, data: Any):
+        """Apply a transition announced by another process."""
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if event.get("source") == self.instance_id:
+            return
+
+        breaker = self.breakers.get(event.get("name"))
+        if breaker is None:
+            return
+        self.stats["received"] += 1
+        breaker.apply_remote_state(CircuitState(event["state"]))
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Circuit breaker subscription error: {e}")
+            await asyncio.sleep(self.retry_delay)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cluster statistics."""
+        return {**self.stats, "circuits": len(self.breakers), "instance_id": self.instance_id}
@@ -0,0 +1,126 @@
+"""Retry budgets limiting the extra load retries put on an upstream.
+
+Every layer that retries (``RetryExecutor``, the provider clients, the fallback
+manager) draws from the budget of the upstream it calls. Successful requests
+deposit ``ratio`` tokens and a retry spends one, so retries add at most
+``ratio`` extra load on top of the traffic that succeeds; a small time-based
+allowance keeps low-traffic upstreams able to retry isolated blips. While a
+layer runs a retry it sets ``retry_context`` so nested layers make a single
+attempt instead of multiplying the retries.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Set while an outer layer is running a retry attempt
+retry_context: ContextVar[bool] = ContextVar("retry_in_progress", default=False)
+
+
+@contextmanager
+def retry_attempt():
+    """Mark the enclosed call as a retry for nested layers."""
+    token = retry_context.set(True)
+    try:
+        yield
+    finally:
+        retry_context.reset(token)
+
+
+class RetryBudget:
+    """Token bucket of retries for one upstream."""
+
+    def __init__(
+        self,
+        name: str = "default",
+        ratio: float = 0.1,
+        min_retries_per_second: float = 1.0,
+        max_tokens: float = 100.0,
+    ):
+        """Initialize retry budget.
+
+        Args:
+            name: Upstream name
+            ratio: Retries allowed per successful request
+            min_retries_per_second: Retries allowed regardless of traffic
+            max_tokens: Maximum tokens saved up for a burst of retries
+        """
+        self.name = name
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self.stats = {"successes": 0, "retries": 0, "suppressed": 0, "nested_suppressed": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if elapsed > 0 and self.min_retries_per_second:
+            self.tokens = min(self.max_tokens, self.tokens + elapsed * self.min_retries_per_second)
+
+    def record_success(self):
+        """Deposit the share of a successful request."""
+        self.stats["successes"] += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def can_retry(self) -> bool:
+        """Spend a token for a retry if the budget and the call chain allow it.
+
+        Returns:
+            False if an outer layer is already retrying or the budget is spent
+        """
+        if retry_context.get():
+            self.stats["nested_suppressed"] += 1
+            return False
+
+        self._refill()
+        if self.tokens < 1 - 1e-9:  # tolerate rounding of the ratio deposits
+            self.stats["suppressed"] += 1
+            logger.debug(f"Retry budget of {self.name} exhausted, not retrying")
+            return False
+
+        self.tokens -= 1
+        self.stats["retries"] += 1
+        return True
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get retry budget statistics."""
+        self._refill()
+        return {"name": self.name, "tokens": round(self.tokens, 2), **self.stats}
+
+
+class RetryBudgetManager:
+    """Manages the retry budgets of all upstreams."""
+
+    def __init__(self):
+        """Initialize retry budget manager."""
+        self.budgets: dict[str, RetryBudget] = {}
+
+    def get_or_create(self, name: str, **config) -> RetryBudget:
+        """Get or create the retry budget of an upstream.
+
+        Args:
+            name: Upstream name
+            **config: Configuration parameters
+
+        Returns:
+            Retry budget
+        """
+        if name not in self.budgets:
+            self.budgets[name] = RetryBudget(name=name, **config)
+
+        return self.budgets[name]
+
+    def get_all_stats(self) -> dict[str, dict[str, Any]]:
+        """Get statistics of every retry budget."""
+        return {name: budget.get_stats() for name, budget in self.budgets.items()}
+
+
+# Global retry budget manager
+retry_budget_manager = RetryBudgetManager()
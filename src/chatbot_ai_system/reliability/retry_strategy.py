@@ -5,10 +5,14 @@ import logging
 import random
 import time
 from collections.abc import Callable
+from contextlib import nullcontext
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Optional
 
+from .admission import AdmissionController, BulkheadRejectedException, FixedLimit, GradientLimit
+from .retry_budget import RetryBudget, retry_attempt, retry_context
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,15 +65,18 @@ class RetryExecutor:
         self,
         strategy: RetryStrategy = RetryStrategy.EXPONENTIAL_BACKOFF,
         config: RetryConfig | None = None,
+        budget: RetryBudget | None = None,
     ):
         """Initialize retry executor.
 
         Args:
             strategy: Retry strategy to use
             config: Retry configuration
+            budget: Retry budget of the upstream being called
         """
         self.strategy = strategy
         self.config = config or RetryConfig()
+        self.budget = budget
         self.attempt_history: list[RetryAttempt] = []
         self.fibonacci_cache = [0, 1]
 
@@ -107,7 +114,10 @@ class RetryExecutor:
             start_time = time.time()
 
             try:
-                result = await self._execute_function(func, *args, **kwargs)
+                with retry_attempt() if attempt > 1 else nullcontext():
+                    result = await self._execute_function(func, *args, **kwargs)
+                if self.budget is not None:
+                    self.budget.record_success()
 
                 # Record successful attempt
                 self.attempt_history.append(
@@ -137,7 +147,7 @@ class RetryExecutor:
                 )
 
                 # Check if should retry
-                if not self._should_retry(e, attempt):
+                if not self._should_retry(e, attempt) or not self._retry_permitted():
                     raise
 
                 logger.warning(f"Attempt {attempt} failed: {e}. " f"Retrying in {delay_ms}ms...")
@@ -285,6 +295,10 @@ class RetryExecutor:
         if attempt >= self.config.max_attempts:
             return False
 
+        # Rejected by admission control: a retry would add to the overload
+        if isinstance(exception, BulkheadRejectedException):
+            return False
+
         # Check non-retryable exceptions
         if self.config.non_retryable_exceptions:
             for exc_type in self.config.non_retryable_exceptions:
@@ -304,6 +318,16 @@ class RetryExecutor:
         # Default to not retry
         return False
 
+    def _retry_permitted(self) -> bool:
+        """Check the retry budget and whether an outer layer is already retrying.
+
+        Returns:
+            True if a retry may be sent
+        """
+        if self.budget is not None:
+            return self.budget.can_retry()
+        return not retry_context.get()
+
     def get_statistics(self) -> dict[str, Any]:
         """Get retry statistics.
 
@@ -339,7 +363,12 @@ class RetryExecutor:
 
 
 class BulkheadRetryExecutor:
-    """Retry executor with bulkhead isolation."""
+    """Retry executor with bulkhead isolation.
+
+    Admission goes through an ``AdmissionController``: waiting work is served by
+    priority and fairly across tenants, and the concurrency limit adapts to the
+    upstream's latency unless ``adaptive`` is False.
+    """
 
     def __init__(
         self,
@@ -347,64 +376,78 @@ class BulkheadRetryExecutor:
         queue_size: int = 100,
         strategy: RetryStrategy = RetryStrategy.EXPONENTIAL_BACKOFF,
         config: RetryConfig | None = None,
+        adaptive: bool = True,
+        max_limit: int = 200,
+        name: str = "default",
+        budget: RetryBudget | None = None,
     ):
         """Initialize bulkhead retry executor.
 
         Args:
-            max_concurrent: Maximum concurrent executions
+            max_concurrent: Maximum concurrent executions (initial limit when adaptive)
             queue_size: Maximum queue size
             strategy: Retry strategy
             config: Retry configuration
+            adaptive: Whether the concurrency limit adapts to observed latency
+            max_limit: Upper bound of the adaptive limit
+            name: Upstream name
+            budget: Retry budget of the upstream
         """
         self.max_concurrent = max_concurrent
         self.queue_size = queue_size
-        self.semaphore = asyncio.Semaphore(max_concurrent)
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
-        self.retry_executor = RetryExecutor(strategy, config)
-        self.active_executions = 0
+        limit = (
+            GradientLimit(initial_limit=max_concurrent, max_limit=max(max_limit, max_concurrent))
+            if adaptive
+            else FixedLimit(max_concurrent)
+        )
+        self.admission = AdmissionController(name, limit=limit, max_queue=queue_size)
+        self.retry_executor = RetryExecutor(strategy, config, budget)
+
+    @property
+    def active_executions(self) -> int:
+        return self.admission.inflight
 
-    async def execute(self, func: Callable, *args, priority: int = 0, **kwargs) -> Any:
+    async def execute(
+        self,
+        func: Callable,
+        *args,
+        priority: int = 0,
+        tenant_id: str = "default",
+        deadline: float | None = None,
+        weight: int = 1,
+        on_retry: Callable | None = None,
+        **kwargs,
+    ) -> Any:
         """Execute function with bulkhead isolation and retry.
 
+        Each attempt is admitted on its own, so backoff sleeps neither hold a
+        slot nor reach the adaptive limit as upstream latency.
+
         Args:
             func: Function to execute
             *args: Function arguments
             priority: Execution priority (higher = higher priority)
+            tenant_id: Tenant the work belongs to
+            deadline: Wall-clock time the result is needed by
+            weight: Share of the tenant among tenants of the same priority
+            on_retry: Callback on retry attempt
             **kwargs: Function keyword arguments
 
         Returns:
             Function result
         """
-        # Check queue size
-        if self.queue.qsize() >= self.queue_size:
-            raise BulkheadRejectedException("Queue is full")
-
-        # Add to queue with priority
-        await self.queue.put((priority, func, args, kwargs))
-
-        # Process queue
-        return await self._process_queue()
-
-    async def _process_queue(self) -> Any:
-        """Process execution queue.
-
-        Returns:
-            Execution result
-        """
-        # Get highest priority item
-        priority, func, args, kwargs = await self.queue.get()
-
-        # Acquire semaphore for execution
-        async with self.semaphore:
-            self.active_executions += 1
-
-            try:
-                # Execute with retry
-                result = await self.retry_executor.execute(func, *args, **kwargs)
-                return result
-
-            finally:
-                self.active_executions -= 1
+        return await self.retry_executor.execute(
+            self.admission.execute,
+            self.retry_executor._execute_function,
+            func,
+            *args,
+            on_retry=on_retry,
+            tenant_id=tenant_id,
+            priority=priority,
+            deadline=deadline,
+            weight=weight,
+            **kwargs,
+        )
 
     def get_status(self) -> dict[str, Any]:
         """Get bulkhead status.
@@ -412,12 +455,14 @@ class BulkheadRetryExecutor:
         Returns:
             Status dictionary
         """
+        limit = self.admission.limit.current
         return {
             "active_executions": self.active_executions,
-            "max_concurrent": self.max_concurrent,
-            "queue_size": self.queue.qsize(),
+            "max_concurrent": limit,
+            "queue_size": self.admission.queued,
             "max_queue_size": self.queue_size,
-            "available_slots": self.max_concurrent - self.active_executions,
+            "available_slots": max(limit - self.active_executions, 0),
+            "admission": self.admission.get_status(),
         }
 
 
@@ -429,17 +474,12 @@ class MaxRetriesExceededException(Exception):
         self.last_exception = last_exception
 
 
-class BulkheadRejectedException(Exception):
-    """Exception raised when bulkhead rejects execution."""
-
-    pass
-
-
 # Decorator for retry functionality
 def retry(
     strategy: RetryStrategy = RetryStrategy.EXPONENTIAL_BACKOFF,
     max_attempts: int = 3,
     initial_delay_ms: float = 1000,
+    budget: RetryBudget | None = None,
     **config_kwargs,
 ):
     """Decorator for adding retry logic to functions.
@@ -448,6 +488,7 @@ def retry(
         strategy: Retry strategy
         max_attempts: Maximum retry attempts
         initial_delay_ms: Initial delay in milliseconds
+        budget: Retry budget of the upstream being called
         **config_kwargs: Additional configuration parameters
     """
 
@@ -456,7 +497,7 @@ def retry(
             config = RetryConfig(
                 max_attempts=max_attempts, initial_delay_ms=initial_delay_ms, **config_kwargs
             )
-            executor = RetryExecutor(strategy, config)
+            executor = RetryExecutor(strategy, config, budget)
             return await executor.execute(func, *args, **kwargs)
 
         return wrapper
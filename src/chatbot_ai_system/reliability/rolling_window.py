@@ -0,0 +1,174 @@
+"""Bucketed rolling-window statistics for circuit breakers."""
+
+import bisect
+import time
+from dataclasses import dataclass
+
+# Upper bounds (ms) of the latency histogram bins; the last bin is unbounded
+LATENCY_BOUNDS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 350, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 7500, 10000, 20000, 30000, 60000,
+)  # fmt: skip
+
+
+@dataclass
+class HealthCounts:
+    """Request outcomes over the rolling window."""
+
+    total: int
+    errors: int
+    error_percentage: float
+
+
+class RollingWindow:
+    """Ring of fixed time buckets counting request outcomes.
+
+    The window of ``window_ms`` is split into ``buckets`` buckets. Recording an
+    outcome updates the current bucket and the running totals in O(1); when time
+    moves into a new bucket, the buckets that fell out of the window are
+    subtracted from the totals and reused. Health checks read the totals, so
+    their cost does not depend on the request rate. Each bucket also keeps a
+    latency histogram for percentile-based decisions.
+    """
+
+    def __init__(self, window_ms: int = 10000, buckets: int = 10):
+        """Initialize rolling window.
+
+        Args:
+            window_ms: Window length in milliseconds
+            buckets: Number of buckets the window is split into
+        """
+        self.window_ms = window_ms
+        self.buckets = buckets
+        self.bucket_ms = window_ms / buckets
+        bins = len(LATENCY_BOUNDS_MS) + 1
+
+        self._epochs = [-1] * buckets  # bucket number held by each slot
+        self._successes = [0] * buckets
+        self._failures = [0] * buckets
+        self._timeouts = [0] * buckets
+        self._latency_sum = [0.0] * buckets
+        self._latency_count = [0] * buckets
+        self._histograms = [[0] * bins for _ in range(buckets)]
+        self._current = -1
+        self._slot = 0
+
+        # Running totals over the live buckets
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.histogram = [0] * bins
+
+    def _advance(self, now_ms: float | None) -> int:
+        """Move the window to ``now_ms`` and return the slot of the current bucket."""
+        epoch = int((time.monotonic() * 1000 if now_ms is None else now_ms) // self.bucket_ms)
+        if epoch == self._current:
+            return self._slot
+        if epoch < self._current:
+            # Clock went backwards: keep counting in the current bucket
+            return self._slot
+
+        first = max(self._current + 1, epoch - self.buckets + 1)
+        for expired in range(first, epoch + 1):
+            self._reset_slot(expired % self.buckets, expired)
+        self._current = epoch
+        self._slot = epoch % self.buckets
+        return self._slot
+
+    def _reset_slot(self, slot: int, epoch: int):
+        if self._epochs[slot] >= 0:
+            self.successes -= self._successes[slot]
+            self.failures -= self._failures[slot]
+            self.timeouts -= self._timeouts[slot]
+            self.latency_sum -= self._latency_sum[slot]
+            self.latency_count -= self._latency_count[slot]
+            histogram = self._histograms[slot]
+            for i, count in enumerate(histogram):
+                if count:
+                    self.histogram[i] -= count
+                    histogram[i] = 0
+        self._epochs[slot] = epoch
+        self._successes[slot] = 0
+        self._failures[slot] = 0
+        self._timeouts[slot] = 0
+        self._latency_sum[slot] = 0.0
+        self._latency_count[slot] = 0
+
+    def _record_latency(self, slot: int, latency_ms: float):
+        self._latency_sum[slot] += latency_ms
+        self._latency_count[slot] += 1
+        self.latency_sum += latency_ms
+        self.latency_count += 1
+        i = bisect.bisect_left(LATENCY_BOUNDS_MS, latency_ms)
+        self._histograms[slot][i] += 1
+        self.histogram[i] += 1
+
+    def record_success(self, latency_ms: float, now_ms: float | None = None):
+        """Record a successful request."""
+        slot = self._advance(now_ms)
+        self._successes[slot] += 1
+        self.successes += 1
+        self._record_latency(slot, latency_ms)
+
+    def record_failure(self, latency_ms: float | None = None, now_ms: float | None = None):
+        """Record a failed request."""
+        slot = self._advance(now_ms)
+        self._failures[slot] += 1
+        self.failures += 1
+        if latency_ms is not None:
+            self._record_latency(slot, latency_ms)
+
+    def record_timeout(self, latency_ms: float, now_ms: float | None = None):
+        """Record a timed out request (counted as an error)."""
+        slot = self._advance(now_ms)
+        self._timeouts[slot] += 1
+        self.timeouts += 1
+        self._record_latency(slot, latency_ms)
+
+    def health(self, now_ms: float | None = None) -> HealthCounts:
+        """Get request outcomes over the window."""
+        self._advance(now_ms)
+        errors = self.failures + self.timeouts
+        total = self.successes + errors
+        return HealthCounts(
+            total=total,
+            errors=errors,
+            error_percentage=errors / total * 100 if total else 0.0,
+        )
+
+    def mean_latency(self, now_ms: float | None = None) -> float:
+        """Get the mean latency (ms) over the window."""
+        self._advance(now_ms)
+        return self.latency_sum / self.latency_count if self.latency_count else 0.0
+
+    def latency_percentile(self, percentile: float, now_ms: float | None = None) -> float:
+        """Estimate a latency percentile (ms) over the window from the histogram.
+
+        Args:
+            percentile: Percentile between 0 and 100
+            now_ms: Current time (monotonic milliseconds)
+
+        Returns:
+            Latency interpolated within the matching bin, 0 without samples
+        """
+        self._advance(now_ms)
+        if not self.latency_count:
+            return 0.0
+
+        rank = percentile / 100 * self.latency_count
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            if count and seen + count >= rank:
+                lower = LATENCY_BOUNDS_MS[i - 1] if i > 0 else 0
+                if i == len(LATENCY_BOUNDS_MS):
+                    return float(lower)
+                upper = LATENCY_BOUNDS_MS[i]
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return float(LATENCY_BOUNDS_MS[-1])
+
+    def reset(self):
+        """Forget every recorded request."""
+        self.__init__(self.window_ms, self.buckets)
@@ -1,14 +1,17 @@
 """Timeout management with cascading timeouts and deadline propagation."""
 
 import asyncio
+import bisect
 import logging
 import time
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
 from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, List
 
+from ..utils.quantile_sketch import DDSketch
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +28,16 @@ class TimeoutConfig:
     max_timeout_ms: float = 300000
     cascade_reduction_factor: float = 0.9
     deadline_buffer_ms: float = 100
+    # Learned timeouts: quantile of observed latency times headroom
+    latency_quantile: float = 0.99
+    latency_headroom: float = 1.5
+    min_samples: int = 20
+    history_window_s: float = 600
+    # Upper bounds of the requested output token buckets latency is tracked in
+    output_token_buckets: tuple[int, ...] = (256, 1024, 4096)
+    # Streaming defaults until enough samples are seen
+    first_token_timeout_ms: float = 30000
+    inter_token_timeout_ms: float = 10000
 
 
 @dataclass
@@ -39,8 +52,68 @@ class TimeoutEvent:
     error: str | None
 
 
+class LatencyHistory:
+    """Latency quantiles over a sliding window of two DDSketches.
+
+    Samples go to the current sketch; every ``window_s`` seconds it becomes the
+    previous one and a fresh sketch starts, so estimates cover between one and
+    two windows and follow shifts in upstream latency. Quantiles are computed on
+    the merged sketches and cached until enough new samples arrive.
+    """
+
+    def __init__(self, window_s: float = 600, refresh_every: int = 16):
+        self.window_s = window_s
+        self.refresh_every = refresh_every
+        self.current = DDSketch(relative_accuracy=0.02, max_bins=512)
+        self.previous: DDSketch | None = None
+        self._rotated_at = time.monotonic()
+        self._cache: dict[float, float | None] = {}
+        self._unseen = 0
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window_s:
+            # A long pause leaves nothing recent to keep
+            self.previous = self.current if now - self._rotated_at < 2 * self.window_s else None
+            self.current = DDSketch(relative_accuracy=0.02, max_bins=512)
+            self._rotated_at = now
+            self._cache.clear()
+
+    def add(self, value_ms: float):
+        self._rotate()
+        self.current.add(value_ms)
+        self._unseen += 1
+        if self._unseen >= self.refresh_every:
+            self._cache.clear()
+            self._unseen = 0
+
+    @property
+    def count(self) -> int:
+        return self.current.count + (self.previous.count if self.previous else 0)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a latency quantile in milliseconds."""
+        self._rotate()
+        if q not in self._cache:
+            sketch = self.current
+            if self.previous is not None:
+                sketch = DDSketch(relative_accuracy=0.02, max_bins=512)
+                sketch.merge(self.previous)
+                sketch.merge(self.current)
+            self._cache[q] = sketch.quantile(q)
+        return self._cache[q]
+
+
 class TimeoutManager:
-    """Manages timeouts with cascading and deadline propagation."""
+    """Manages timeouts with cascading and deadline propagation.
+
+    Latency is tracked per operation, per model and per requested output token
+    bucket in streaming quantile sketches, and timeouts are derived from the
+    observed tail (``latency_quantile`` times ``latency_headroom``) rather than
+    a fixed guess. Streaming calls track time to first token and the gap between
+    tokens separately, so a long generation that keeps producing tokens is not
+    killed while a stalled one fails fast.
+    """
 
     def __init__(self, config: TimeoutConfig | None = None):
         """Initialize timeout manager.
@@ -50,7 +123,89 @@ class TimeoutManager:
         """
         self.config = config or TimeoutConfig()
         self.timeout_events: list[TimeoutEvent] = []
-        self.operation_timeouts: dict[str, float] = {}
+        self.latency: dict[tuple[str, str | None, int | None], LatencyHistory] = {}
+
+    def _token_bucket(self, max_tokens: int | None) -> int | None:
+        """Get the output token bucket of a request (None when unknown)."""
+        if max_tokens is None:
+            return None
+        buckets = self.config.output_token_buckets
+        index = bisect.bisect_left(buckets, max_tokens)
+        return buckets[index] if index < len(buckets) else -1  # -1: above the last bound
+
+    def _history_keys(
+        self, operation: str, model: str | None, max_tokens: int | None
+    ) -> list[tuple[str, str | None, int | None]]:
+        """Get latency keys from the most to the least specific."""
+        keys = [(operation, None, None)]
+        if model is not None:
+            keys.insert(0, (operation, model, None))
+            bucket = self._token_bucket(max_tokens)
+            if bucket is not None:
+                keys.insert(0, (operation, model, bucket))
+        return keys
+
+    def record_latency(
+        self,
+        operation: str,
+        duration_ms: float,
+        model: str | None = None,
+        max_tokens: int | None = None,
+    ):
+        """Record an observed latency at every granularity.
+
+        Args:
+            operation: Operation name
+            duration_ms: Observed duration
+            model: Model identifier
+            max_tokens: Requested output tokens
+        """
+        for key in self._history_keys(operation, model, max_tokens):
+            history = self.latency.get(key)
+            if history is None:
+                history = self.latency[key] = LatencyHistory(self.config.history_window_s)
+            history.add(duration_ms)
+
+    def latency_quantile(
+        self,
+        operation: str,
+        q: float,
+        model: str | None = None,
+        max_tokens: int | None = None,
+    ) -> float | None:
+        """Estimate a latency quantile from the most specific history with enough samples.
+
+        Returns:
+            Latency in milliseconds, or None without enough samples
+        """
+        for key in self._history_keys(operation, model, max_tokens):
+            history = self.latency.get(key)
+            if history is not None and history.count >= self.config.min_samples:
+                return history.quantile(q)
+        return None
+
+    def suggest_timeout(
+        self,
+        operation: str,
+        model: str | None = None,
+        max_tokens: int | None = None,
+        default_ms: float | None = None,
+    ) -> float:
+        """Get the learned timeout of an operation.
+
+        Args:
+            operation: Operation name
+            model: Model identifier
+            max_tokens: Requested output tokens
+            default_ms: Timeout used until enough samples are seen
+
+        Returns:
+            Timeout in milliseconds
+        """
+        tail = self.latency_quantile(operation, self.config.latency_quantile, model, max_tokens)
+        if tail is None:
+            return default_ms if default_ms is not None else self.config.default_timeout_ms
+        return tail * self.config.latency_headroom
 
     async def execute_with_timeout(
         self,
@@ -59,15 +214,19 @@ class TimeoutManager:
         timeout_ms: float | None = None,
         operation: str = "unknown",
         propagate_deadline: bool = True,
+        model: str | None = None,
+        max_tokens: int | None = None,
         **kwargs,
     ) -> Any:
         """Execute function with timeout.
 
         Args:
             func: Function to execute
-            timeout_ms: Timeout in milliseconds
+            timeout_ms: Timeout in milliseconds (upper bound on the learned timeout)
             operation: Operation name for tracking
             propagate_deadline: Whether to propagate deadline
+            model: Model identifier, to learn latency per model
+            max_tokens: Requested output tokens, to learn latency per output size
             *args: Function arguments
             **kwargs: Function keyword arguments
 
@@ -76,7 +235,7 @@ class TimeoutManager:
         """
         # Calculate effective timeout
         effective_timeout = self._calculate_effective_timeout(
-            timeout_ms, operation, propagate_deadline
+            timeout_ms, operation, propagate_deadline, model, max_tokens
         )
 
         # Set deadline in context if propagating
@@ -101,8 +260,8 @@ class TimeoutManager:
                 timed_out=False,
             )
 
-            # Update operation timeout statistics
-            self._update_operation_timeout(operation, duration)
+            # Update operation latency statistics
+            self.record_latency(operation, duration, model, max_tokens)
 
             return result
 
@@ -116,6 +275,8 @@ class TimeoutManager:
                 timed_out=True,
                 error="Operation timed out",
             )
+            # Count the censored duration so too tight a timeout can grow back
+            self.record_latency(operation, duration, model, max_tokens)
 
             logger.error(f"Operation '{operation}' timed out after {effective_timeout}ms")
 
@@ -129,7 +290,12 @@ class TimeoutManager:
                 deadline_context.set(None)
 
     def _calculate_effective_timeout(
-        self, requested_timeout: float | None, operation: str, propagate_deadline: bool
+        self,
+        requested_timeout: float | None,
+        operation: str,
+        propagate_deadline: bool,
+        model: str | None = None,
+        max_tokens: int | None = None,
     ) -> float:
         """Calculate effective timeout considering all factors.
 
@@ -137,12 +303,18 @@ class TimeoutManager:
             requested_timeout: Requested timeout
             operation: Operation name
             propagate_deadline: Whether to consider propagated deadline
+            model: Model identifier
+            max_tokens: Requested output tokens
 
         Returns:
             Effective timeout in milliseconds
         """
-        # Start with requested or default timeout
-        timeout = requested_timeout or self.config.default_timeout_ms
+        # Learned tail latency, capped by the requested timeout
+        timeout = self.suggest_timeout(
+            operation, model, max_tokens, default_ms=requested_timeout or None
+        )
+        if requested_timeout:
+            timeout = min(timeout, requested_timeout)
 
         # Apply min/max bounds
         timeout = max(self.config.min_timeout_ms, timeout)
@@ -150,29 +322,101 @@ class TimeoutManager:
 
         # Consider propagated deadline
         if propagate_deadline:
-            deadline = deadline_context.get()
-            if deadline:
-                remaining = (deadline - time.time()) * 1000
+            remaining = self._deadline_budget()
+            if remaining is not None and remaining > 0:
+                timeout = min(timeout, remaining)
+
+        return max(self.config.min_timeout_ms, timeout)
 
-                # Apply cascade reduction
-                remaining *= self.config.cascade_reduction_factor
+    def _deadline_budget(self) -> float | None:
+        """Get the time left to the propagated deadline, minus cascade margins."""
+        deadline = deadline_context.get()
+        if not deadline:
+            return None
+        remaining = (deadline - time.time()) * 1000
 
-                # Ensure minimum buffer
-                remaining -= self.config.deadline_buffer_ms
+        # Apply cascade reduction
+        remaining *= self.config.cascade_reduction_factor
 
-                if remaining > 0:
-                    timeout = min(timeout, remaining)
+        # Ensure minimum buffer
+        return remaining - self.config.deadline_buffer_ms
 
-        # Consider historical operation timeouts
-        if operation in self.operation_timeouts:
-            historical = self.operation_timeouts[operation]
-            # Use P95 estimate (mean + 2*stddev approximation)
-            suggested = historical * 1.5
+    async def stream_with_timeout(
+        self,
+        stream: AsyncIterator[Any],
+        operation: str = "stream",
+        model: str | None = None,
+        first_token_timeout_ms: float | None = None,
+        inter_token_timeout_ms: float | None = None,
+    ) -> AsyncIterator[Any]:
+        """Iterate a stream, bounding the wait for the first and each next chunk.
+
+        Time to first token and inter-token gaps are learned separately (as
+        ``{operation}:ttft`` and ``{operation}:inter_token``); the propagated
+        deadline, if any, bounds the whole stream.
 
-            # Balance between requested and historical
-            timeout = (timeout * 0.7) + (suggested * 0.3)
+        Args:
+            stream: Async iterator of chunks
+            operation: Operation name
+            model: Model identifier
+            first_token_timeout_ms: Upper bound of the wait for the first chunk
+            inter_token_timeout_ms: Upper bound of the wait between chunks
 
-        return max(self.config.min_timeout_ms, timeout)
+        Yields:
+            Chunks of the stream
+
+        Raises:
+            TimeoutException: If a chunk does not arrive in time
+        """
+        ttft_operation = f"{operation}:ttft"
+        gap_operation = f"{operation}:inter_token"
+        first_timeout = self.suggest_timeout(
+            ttft_operation, model, default_ms=self.config.first_token_timeout_ms
+        )
+        gap_timeout = self.suggest_timeout(
+            gap_operation, model, default_ms=self.config.inter_token_timeout_ms
+        )
+        if first_token_timeout_ms:
+            first_timeout = min(first_timeout, first_token_timeout_ms)
+        if inter_token_timeout_ms:
+            gap_timeout = min(gap_timeout, inter_token_timeout_ms)
+        first_timeout = max(self.config.min_timeout_ms, first_timeout)
+        gap_timeout = max(self.config.min_timeout_ms, gap_timeout)
+
+        iterator = stream.__aiter__()
+        first = True
+        while True:
+            limit = first_timeout if first else gap_timeout
+            remaining = self._deadline_budget()
+            if remaining is not None:
+                limit = min(limit, max(remaining, 0))
+
+            started = time.time()
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), timeout=limit / 1000)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                waited = (time.time() - started) * 1000
+                phase = ttft_operation if first else gap_operation
+                self._record_event(
+                    operation=phase,
+                    timeout_ms=limit,
+                    actual_duration_ms=waited,
+                    timed_out=True,
+                    error="Stream stalled",
+                )
+                self.record_latency(phase, waited, model)
+                logger.error(f"Stream '{operation}' stalled for {limit:.0f}ms")
+                raise TimeoutException(
+                    f"Stream '{operation}' produced no chunk within {limit:.0f}ms"
+                ) from None
+
+            self.record_latency(
+                ttft_operation if first else gap_operation, (time.time() - started) * 1000, model
+            )
+            first = False
+            yield chunk
 
     async def _execute_function(self, func: Callable, *args, **kwargs) -> Any:
         """Execute function.
@@ -222,22 +466,6 @@ class TimeoutManager:
         if len(self.timeout_events) > 10000:
             self.timeout_events = self.timeout_events[-5000:]
 
-    def _update_operation_timeout(self, operation: str, duration_ms: float):
-        """Update operation timeout statistics.
-
-        Args:
-            operation: Operation name
-            duration_ms: Actual duration
-        """
-        if operation not in self.operation_timeouts:
-            self.operation_timeouts[operation] = duration_ms
-        else:
-            # Exponential moving average
-            alpha = 0.1
-            self.operation_timeouts[operation] = (1 - alpha) * self.operation_timeouts[
-                operation
-            ] + alpha * duration_ms
-
     def get_remaining_time(self) -> float | None:
         """Get remaining time from propagated deadline.
 
@@ -318,6 +546,25 @@ class TimeoutManager:
             "min_duration_ms": min(durations) if durations else 0,
             "operation_stats": operation_stats,
             "suggested_timeouts": self.operation_timeouts,
+            "latency_percentiles": {
+                operation: {
+                    "p50": history.quantile(0.5),
+                    "p95": history.quantile(0.95),
+                    "p99": history.quantile(0.99),
+                    "samples": history.count,
+                }
+                for (operation, model, bucket), history in self.latency.items()
+                if model is None
+            },
+        }
+
+    @property
+    def operation_timeouts(self) -> dict[str, float]:
+        """Learned timeout of every operation with enough samples."""
+        return {
+            operation: self.suggest_timeout(operation)
+            for (operation, model, _bucket) in self.latency
+            if model is None and self.latency_quantile(operation, 0.5) is not None
         }
 
 
@@ -94,11 +94,28 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     except Exception as e:
         logger.warning(f"Redis cache initialization skipped: {e}")
 
+    # Load tokenizer encodings off the event loop
+    from chatbot_ai_system.utils.token_counter import token_counter
+
+    await token_counter.preload()
+
+    # Start the in-process profiler
+    if settings.profiling_enabled:
+        from chatbot_ai_system.telemetry.profiler import profiler
+
+        profiler.start(
+            slow_callback_ms=settings.profiling_slow_callback_ms,
+            stack_interval_ms=settings.profiling_stack_interval_ms,
+        )
+
     yield
 
     # Shutdown
     logger.info("Shutting down AI Chatbot System")
 
+    if settings.profiling_enabled:
+        profiler.stop()
+
     # Close database
     try:
         from chatbot_ai_system.database import close_db
@@ -230,10 +247,32 @@ def create_app() -> FastAPI:
     from chatbot_ai_system.api.cache import cache_router
     app.include_router(cache_router, prefix="/api/v1/cache", tags=["cache"])
     
+    # Add FinOps endpoints, behind the JWT-verified tenant context that scopes them
+    if settings.jwt_secret_key is not None:
+        from chatbot_ai_system.api.finops import finops_router
+        from chatbot_ai_system.tenancy.tenant_middleware import TenantMiddleware
+
+        finops_app = FastAPI(title="FinOps", docs_url=None, redoc_url=None)
+        finops_app.include_router(finops_router, tags=["finops"])
+        finops_app.add_middleware(
+            TenantMiddleware, secret_key=settings.jwt_secret_key.get_secret_value()
+        )
+        app.mount("/api/v1/finops", finops_app)
+    else:
+        logger.warning("FinOps endpoints not mounted: JWT_SECRET_KEY is not set")
+    
     # Add health endpoints
     from chatbot_ai_system.api.health import health_router
     app.include_router(health_router, prefix="/api/v1", tags=["health"])
 
+    # Add profiling endpoints (opt-in, only behind a token)
+    if settings.profiling_enabled and settings.profiling_token is not None:
+        from chatbot_ai_system.api.profiling import profiling_router
+
+        app.include_router(profiling_router, prefix="/api/v1/admin/profiling", tags=["profiling"])
+    elif settings.profiling_enabled:
+        logger.warning("Profiling endpoints not mounted: PROFILING_TOKEN is not set")
+
     # Add WebSocket routes
     from chatbot_ai_system.api.websocket import ws_router
 
@@ -8,6 +8,7 @@ from .reconnection import (
     ReconnectionManager,
     ReconnectionState,
 )
+from .replay_log import ReplayEntry, ReplayLogConfig, ReplayLogManager, StreamReplayLog
 from .websocket_manager import ConnectionInfo, ConnectionState, WebSocketManager, manager
 
 __all__ = [
@@ -22,4 +23,8 @@ __all__ = [
     "ReconnectionConfig",
     "ReconnectionState",
     "ReconnectionInfo",
+    "ReplayLogManager",
+    "ReplayLogConfig",
+    "ReplayEntry",
+    "StreamReplayLog",
 ]
@@ -0,0 +1,341 @@
+"""Per-stream replay log for resumable WebSocket streams."""
+
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import Container
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplayLogConfig:
+    """Configuration for stream replay logs."""
+
+    buffer_size: int = 1000  # in-memory entries per stream
+    redis_key_prefix: str = "replay"
+    redis_maxlen: int = 5000  # approximate XADD MAXLEN per stream
+    redis_ttl: int = 300  # seconds a stream survives in Redis after its last write
+    max_replay_batch: int = 5000  # upper bound on entries returned by one replay
+
+
+@dataclass
+class ReplayEntry:
+    """A single delta recorded in a replay log."""
+
+    offset: int
+    message: dict[str, Any]
+
+
+class StreamReplayLog:
+    """Offset-addressed ring buffer for one stream.
+
+    Offsets start at 1 and increase by one per appended message, so a client
+    that has acknowledged offset ``n`` needs exactly the entries ``> n``.
+    """
+
+    def __init__(self, stream_id: str, buffer_size: int = 1000):
+        """Initialize replay log.
+
+        Args:
+            stream_id: Stream identifier
+            buffer_size: Number of entries kept in memory
+        """
+        self.stream_id = stream_id
+        self.entries: deque[ReplayEntry] = deque(maxlen=buffer_size)
+        self.last_offset = 0
+        self.last_write = time.monotonic()
+
+    @property
+    def first_offset(self) -> int:
+        """Oldest offset still held in memory (``last_offset + 1`` when empty)."""
+        return self.entries[0].offset if self.entries else self.last_offset + 1
+
+    def append(self, message: dict[str, Any]) -> int:
+        """Append a message and return its offset.
+
+        Args:
+            message: Message to record
+
+        Returns:
+            Offset assigned to the message
+        """
+        self.last_offset += 1
+        self.entries.append(ReplayEntry(offset=self.last_offset, message=message))
+        self.last_write = time.monotonic()
+        return self.last_offset
+
+    def covers(self, after_offset: int) -> bool:
+        """Check whether every entry after ``after_offset`` is held in memory.
+
+        Args:
+            after_offset: Last offset the client has seen
+
+        Returns:
+            True if the tail can be served without the shared tier
+        """
+        return after_offset + 1 >= self.first_offset
+
+    def read_since(self, after_offset: int, limit: int | None = None) -> list[ReplayEntry]:
+        """Return in-memory entries with offset greater than ``after_offset``.
+
+        Args:
+            after_offset: Last offset the client has seen
+            limit: Maximum number of entries
+
+        Returns:
+            Entries in offset order
+        """
+        if after_offset >= self.last_offset or not self.entries:
+            return []
+
+        # Offsets are contiguous, so the start index is computed directly
+        start = max(after_offset + 1 - self.entries[0].offset, 0)
+        end = len(self.entries) if limit is None else min(start + limit, len(self.entries))
+        return [self.entries[i] for i in range(start, end)]
+
+
+class ReplayLogManager:
+    """Replay logs for all streams on this process, with Redis Streams as shared tier.
+
+    Every delta is kept in a bounded in-memory ring buffer. When a Redis client is
+    supplied, deltas are also written with ``XADD`` using the offset as the entry
+    id, so a client that reconnects to another pod can be served with ``XRANGE``.
+    A stream this process has not seen yet continues from the last offset in
+    Redis, so offsets keep increasing when a stream moves between pods.
+    """
+
+    def __init__(self, config: ReplayLogConfig | None = None, redis_client: Any | None = None):
+        """Initialize replay log manager.
+
+        Args:
+            config: Replay log configuration
+            redis_client: Optional async Redis client for the cross-pod tier
+        """
+        self.config = config or ReplayLogConfig()
+        self.redis = redis_client
+        self.logs: dict[str, StreamReplayLog] = {}
+
+        self.stats = {
+            "appended": 0,
+            "replays": 0,
+            "replayed_entries": 0,
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "redis_errors": 0,
+        }
+
+    def _redis_key(self, stream_id: str) -> str:
+        return f"{self.config.redis_key_prefix}:{stream_id}"
+
+    def get_log(self, stream_id: str) -> StreamReplayLog:
+        """Get or create the replay log for a stream.
+
+        Args:
+            stream_id: Stream identifier
+
+        Returns:
+            Replay log
+        """
+        log = self.logs.get(stream_id)
+        if log is None:
+            log = StreamReplayLog(stream_id, buffer_size=self.config.buffer_size)
+            self.logs[stream_id] = log
+        return log
+
+    def last_offset(self, stream_id: str) -> int:
+        """Get the last offset written to a stream on this process.
+
+        Args:
+            stream_id: Stream identifier
+
+        Returns:
+            Last offset, or 0 if the stream is unknown
+        """
+        log = self.logs.get(stream_id)
+        return log.last_offset if log else 0
+
+    async def append(self, stream_id: str, message: dict[str, Any]) -> int:
+        """Record a delta and return its offset.
+
+        The message is stamped with ``offset`` so clients can acknowledge it.
+
+        Args:
+            stream_id: Stream identifier
+            message: Message to record
+
+        Returns:
+            Offset assigned to the message
+        """
+        log = self.logs.get(stream_id)
+        if log is None:
+            last_offset = await self._last_redis_offset(stream_id)
+            # Another append may have created the log while awaiting
+            log = self.get_log(stream_id)
+            log.last_offset = max(log.last_offset, last_offset)
+        offset = log.append(message)
+        message["offset"] = offset
+        self.stats["appended"] += 1
+
+        if self.redis is not None:
+            key = self._redis_key(stream_id)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.xadd(
+                    key,
+                    {"data": json.dumps(message, default=str)},
+                    id=f"{offset}-0",
+                    maxlen=self.config.redis_maxlen,
+                    approximate=True,
+                )
+                pipe.expire(key, self.config.redis_ttl)
+                await pipe.execute()
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Replay log write to Redis failed for stream {stream_id}: {e}")
+
+        return offset
+
+    async def _last_redis_offset(self, stream_id: str) -> int:
+        """Get the last offset of a stream in Redis, 0 if there is none.
+
+        Args:
+            stream_id: Stream identifier
+
+        Returns:
+            Last offset written by any process
+        """
+        if self.redis is None:
+            return 0
+
+        try:
+            rows = await self.redis.xrevrange(self._redis_key(stream_id), max="+", min="-", count=1)
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Replay log offset lookup failed for stream {stream_id}: {e}")
+            return 0
+
+        if not rows:
+            return 0
+        entry_id = rows[0][0]
+        if isinstance(entry_id, bytes):
+            entry_id = entry_id.decode()
+        return int(entry_id.split("-", 1)[0])
+
+    async def read_since(self, stream_id: str, after_offset: int) -> list[dict[str, Any]]:
+        """Return every message after ``after_offset``.
+
+        Served from memory when the ring buffer still covers the requested range,
+        otherwise from Redis with a single ``XRANGE``.
+
+        Args:
+            stream_id: Stream identifier
+            after_offset: Last offset acknowledged by the client
+
+        Returns:
+            Messages in offset order
+        """
+        limit = self.config.max_replay_batch
+        log = self.logs.get(stream_id)
+
+        if log is not None and log.covers(after_offset):
+            entries = log.read_since(after_offset, limit=limit)
+            self.stats["memory_hits"] += 1
+            messages = [entry.message for entry in entries]
+        else:
+            messages = await self._read_from_redis(stream_id, after_offset, limit)
+            if log is not None and not messages:
+                # Redis unavailable; serve whatever the ring buffer still has
+                messages = [entry.message for entry in log.read_since(after_offset, limit=limit)]
+
+        self.stats["replays"] += 1
+        self.stats["replayed_entries"] += len(messages)
+        return messages
+
+    async def _read_from_redis(
+        self, stream_id: str, after_offset: int, limit: int
+    ) -> list[dict[str, Any]]:
+        """Read the tail of a stream from Redis.
+
+        Args:
+            stream_id: Stream identifier
+            after_offset: Last offset acknowledged by the client
+            limit: Maximum number of entries
+
+        Returns:
+            Messages in offset order
+        """
+        if self.redis is None:
+            return []
+
+        try:
+            rows = await self.redis.xrange(
+                self._redis_key(stream_id), min=f"{after_offset + 1}-0", max="+", count=limit
+            )
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Replay log read from Redis failed for stream {stream_id}: {e}")
+            return []
+
+        messages = []
+        for _entry_id, fields in rows:
+            data = fields.get(b"data", fields.get("data"))
+            if data is None:
+                continue
+            messages.append(json.loads(data))
+
+        if messages:
+            self.stats["redis_hits"] += 1
+        return messages
+
+    async def discard(self, stream_id: str, shared: bool = False):
+        """Drop a stream's replay log.
+
+        Args:
+            stream_id: Stream identifier
+            shared: Also delete the Redis copy
+        """
+        self.logs.pop(stream_id, None)
+
+        if shared and self.redis is not None:
+            try:
+                await self.redis.delete(self._redis_key(stream_id))
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Replay log delete failed for stream {stream_id}: {e}")
+
+    def expire_idle(self, max_idle_seconds: float | None = None, keep: Container[str] = ()) -> int:
+        """Drop in-memory logs that have not been written to recently.
+
+        Args:
+            max_idle_seconds: Idle threshold, defaults to the Redis TTL
+            keep: Stream ids that must be kept regardless of idleness
+
+        Returns:
+            Number of logs dropped
+        """
+        threshold = max_idle_seconds if max_idle_seconds is not None else self.config.redis_ttl
+        cutoff = time.monotonic() - threshold
+        stale = [
+            stream_id
+            for stream_id, log in self.logs.items()
+            if log.last_write < cutoff and stream_id not in keep
+        ]
+        for stream_id in stale:
+            del self.logs[stream_id]
+        return len(stale)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get replay log statistics.
+
+        Returns:
+            Statistics dictionary
+        """
+        return {
+            "streams": len(self.logs),
+            "buffered_entries": sum(len(log.entries) for log in self.logs.values()),
+            **self.stats,
+        }
@@ -5,10 +5,14 @@ import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
+from functools import partial
 from typing import Any, Optional
 
 from fastapi import WebSocket, WebSocketDisconnect
 
+from ..utils.timing_wheel import TimerScheduler, get_timer_scheduler, spread_delay
+from .replay_log import ReplayLogConfig, ReplayLogManager
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,8 +38,12 @@ class ConnectionInfo:
     last_heartbeat: datetime
     room_ids: set[str]
     metadata: dict[str, Any]
-    message_queue: list[dict[str, Any]]
     reconnect_token: str | None
+    last_acked_offset: int = 0
+
+
+# Control frames are not part of the resumable stream
+UNLOGGED_MESSAGE_TYPES = frozenset({"connection", "ping", "pong", "replay"})
 
 
 class WebSocketManager:
@@ -46,8 +54,10 @@ class WebSocketManager:
         heartbeat_interval: int = 30,
         heartbeat_timeout: int = 60,
         max_connections: int = 1000,
-        max_queue_size: int = 100,
+        max_queue_size: int = 1000,
         enable_rooms: bool = True,
+        replay_log: ReplayLogManager | None = None,
+        scheduler: TimerScheduler | None = None,
     ):
         """Initialize WebSocket manager.
 
@@ -55,8 +65,10 @@ class WebSocketManager:
             heartbeat_interval: Heartbeat interval in seconds
             heartbeat_timeout: Heartbeat timeout in seconds
             max_connections: Maximum concurrent connections
-            max_queue_size: Maximum message queue size per connection
+            max_queue_size: Maximum replay buffer size per session
             enable_rooms: Enable room-based broadcasting
+            replay_log: Replay log for resumable streams (in-memory only if omitted)
+            scheduler: Timer scheduler for per-connection heartbeats (shared if omitted)
         """
         self.heartbeat_interval = heartbeat_interval
         self.heartbeat_timeout = heartbeat_timeout
@@ -67,12 +79,18 @@ class WebSocketManager:
         # Connection storage
         self.connections: dict[str, ConnectionInfo] = {}
         self.reconnect_tokens: dict[str, str] = {}  # token -> session_id
+        self.acked_offsets: dict[str, int] = {}  # token -> offset acked before disconnect
+
+        # Offset-addressed replay log, keyed by session_id
+        self.replay_log = replay_log or ReplayLogManager(
+            ReplayLogConfig(buffer_size=max_queue_size)
+        )
 
         # Room management
         self.rooms: dict[str, set[str]] = {}  # room_id -> session_ids
 
-        # Background tasks
-        self.heartbeat_task: Optional[asyncio.Task] = None
+        # Per-connection heartbeat timers and background cleanup
+        self.scheduler = scheduler or get_timer_scheduler()
         self.cleanup_task: Optional[asyncio.Task] = None
 
         # Statistics
@@ -92,6 +110,7 @@ class WebSocketManager:
         user_id: str | None = None,
         reconnect_token: str | None = None,
         metadata: dict[str, Any] | None = None,
+        last_offset: int | None = None,
     ) -> ConnectionInfo:
         """Accept WebSocket connection.
 
@@ -102,6 +121,8 @@ class WebSocketManager:
             user_id: User identifier
             reconnect_token: Token for reconnection
             metadata: Connection metadata
+            last_offset: Last stream offset acknowledged by the client; on
+                reconnect only messages after it are replayed
 
         Returns:
             Connection information
@@ -112,20 +133,22 @@ class WebSocketManager:
             raise Exception("Connection limit reached")
 
         # Handle reconnection
+        resume_offset: int | None = None
         if reconnect_token and reconnect_token in self.reconnect_tokens:
-            old_session_id = self.reconnect_tokens[reconnect_token]
-            if old_session_id in self.connections:
+            session_id = self.reconnect_tokens.pop(reconnect_token)
+            acked_offset = self.acked_offsets.pop(reconnect_token, 0)
+            old_conn = self.connections.get(session_id)
+            if old_conn is not None:
                 # Restore connection state
-                old_conn = self.connections[old_session_id]
-                session_id = old_session_id
                 tenant_id = tenant_id or old_conn.tenant_id
                 user_id = user_id or old_conn.user_id
 
-                # Send queued messages
-                await self._send_queued_messages(websocket, old_conn.message_queue)
+            if last_offset is None:
+                last_offset = old_conn.last_acked_offset if old_conn is not None else acked_offset
+            resume_offset = last_offset
 
-                self.stats["total_reconnections"] += 1
-                logger.info(f"WebSocket reconnected: {session_id}")
+            self.stats["total_reconnections"] += 1
+            logger.info(f"WebSocket reconnected: {session_id} (last offset {last_offset})")
 
         # Accept connection
         await websocket.accept()
@@ -141,8 +164,8 @@ class WebSocketManager:
             last_heartbeat=datetime.utcnow(),
             room_ids=set(),
             metadata=metadata or {},
-            message_queue=[],
             reconnect_token=self._generate_reconnect_token(),
+            last_acked_offset=resume_offset or 0,
         )
 
         # Store connection
@@ -159,12 +182,23 @@ class WebSocketManager:
                 "session_id": session_id,
                 "reconnect_token": conn_info.reconnect_token,
                 "heartbeat_interval": self.heartbeat_interval,
+                "last_offset": self.replay_log.last_offset(session_id),
             },
         )
 
+        # Replay the missed tail while the upstream stream keeps appending
+        if resume_offset is not None:
+            await self._replay_missed_messages(session_id, resume_offset)
+
+        # Arm the heartbeat timer, spread across the interval
+        heartbeat_key = self._heartbeat_key(session_id)
+        self.scheduler.call_later(
+            heartbeat_key,
+            spread_delay(heartbeat_key, self.heartbeat_interval),
+            partial(self._heartbeat, session_id),
+        )
+
         # Start background tasks if not running
-        if not self.heartbeat_task:
-            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
         if not self.cleanup_task:
             self.cleanup_task = asyncio.create_task(self._cleanup_loop())
 
@@ -201,9 +235,11 @@ class WebSocketManager:
 
         # Remove connection
         del self.connections[session_id]
+        self.scheduler.cancel(self._heartbeat_key(session_id))
 
-        # Keep reconnect token for a while
+        # Keep reconnect token, and where the client got to, for a while
         if conn_info.reconnect_token is not None:
+            self.acked_offsets[conn_info.reconnect_token] = conn_info.last_acked_offset
             asyncio.create_task(
                 self._cleanup_reconnect_token(conn_info.reconnect_token, delay=300)  # 5 minutes
             )
@@ -218,19 +254,36 @@ class WebSocketManager:
             session_id: Session identifier
             message: Message to send
 
+        Stream messages are recorded in the replay log before sending, so a
+        message that cannot be delivered is replayed when the client resumes.
+        The message is copied first: the replay log stamps its offset on it, and
+        broadcasts pass the same message for every session.
+
         Returns:
             True if sent successfully
         """
-        if session_id not in self.connections:
+        message = dict(message)
+
+        # Add timestamp if not present
+        if "timestamp" not in message:
+            message["timestamp"] = datetime.utcnow().isoformat()
+
+        conn_info = self.connections.get(session_id)
+        loggable = message.get("type") not in UNLOGGED_MESSAGE_TYPES
+
+        if conn_info is None:
+            # Keep recording while a disconnected session may still resume
+            if loggable and session_id in self.replay_log.logs:
+                await self.replay_log.append(session_id, message)
             return False
 
-        conn_info = self.connections[session_id]
+        if loggable:
+            await self.replay_log.append(session_id, message)
 
-        try:
-            # Add timestamp if not present
-            if "timestamp" not in message:
-                message["timestamp"] = datetime.utcnow().isoformat()
+        if conn_info.state != ConnectionState.CONNECTED:
+            return False
 
+        try:
             # Send message
             await conn_info.websocket.send_json(message)
 
@@ -238,14 +291,12 @@ class WebSocketManager:
             return True
 
         except WebSocketDisconnect:
-            # Connection lost, queue message
-            await self._queue_message(session_id, message)
+            # Connection lost; the message stays in the replay log
             conn_info.state = ConnectionState.RECONNECTING
             return False
 
         except Exception as e:
             logger.error(f"Error sending message: {e}")
-            await self._queue_message(session_id, message)
             return False
 
     async def broadcast(self, message: dict[str, Any], exclude: list[str] | None = None):
@@ -368,6 +419,47 @@ class WebSocketManager:
 
         await asyncio.gather(*tasks, return_exceptions=True)
 
+    async def handle_message(self, session_id: str, message: dict[str, Any]) -> bool:
+        """Handle the control frames of a message received from a client.
+
+        ``{"type": "ack", "offset": n}`` records that the client has every
+        message up to offset ``n``, which is where a reconnect without an
+        explicit offset resumes; ``ping`` and ``heartbeat`` refresh the heartbeat.
+
+        Args:
+            session_id: Session identifier
+            message: Message received from the client
+
+        Returns:
+            True if the message was a control frame, False if the caller should
+            process it
+        """
+        self.stats["total_messages_received"] += 1
+        message_type = message.get("type")
+
+        if message_type == "ack":
+            offset = message.get("offset")
+            if isinstance(offset, int) and not isinstance(offset, bool):
+                await self.handle_ack(session_id, offset)
+            return True
+
+        if message_type in ("ping", "heartbeat"):
+            await self.handle_heartbeat(session_id)
+            return True
+
+        return False
+
+    async def handle_ack(self, session_id: str, offset: int):
+        """Record the last stream offset acknowledged by a client.
+
+        Args:
+            session_id: Session identifier
+            offset: Acknowledged offset
+        """
+        conn_info = self.connections.get(session_id)
+        if conn_info is not None and offset > conn_info.last_acked_offset:
+            conn_info.last_acked_offset = offset
+
     async def handle_heartbeat(self, session_id: str):
         """Handle heartbeat from client.
 
@@ -382,30 +474,31 @@ class WebSocketManager:
                 session_id, {"type": "pong", "timestamp": datetime.utcnow().isoformat()}
             )
 
-    async def _heartbeat_loop(self):
-        """Background task to send heartbeats and check connection health."""
-        while True:
-            try:
-                await asyncio.sleep(self.heartbeat_interval)
+    def _heartbeat_key(self, session_id: str) -> tuple:
+        return (id(self), session_id, "heartbeat")
 
-                current_time = datetime.utcnow()
-                timeout_threshold = current_time - timedelta(seconds=self.heartbeat_timeout)
+    async def _heartbeat(self, session_id: str):
+        """Heartbeat timer callback: check the session's timeout and send a ping.
 
-                # Send heartbeats and check timeouts
-                for session_id, conn_info in list(self.connections.items()):
-                    # Check for timeout
-                    if conn_info.last_heartbeat < timeout_threshold:
-                        logger.warning(f"Heartbeat timeout for session {session_id}")
-                        await self.disconnect(session_id, code=1001, reason="Heartbeat timeout")
-                        continue
+        Args:
+            session_id: Session identifier
+        """
+        conn_info = self.connections.get(session_id)
+        if conn_info is None:
+            return
 
-                    # Send ping
-                    await self.send_message(
-                        session_id, {"type": "ping", "timestamp": current_time.isoformat()}
-                    )
+        current_time = datetime.utcnow()
+        if conn_info.last_heartbeat < current_time - timedelta(seconds=self.heartbeat_timeout):
+            logger.warning(f"Heartbeat timeout for session {session_id}")
+            await self.disconnect(session_id, code=1001, reason="Heartbeat timeout")
+            return
 
-            except Exception as e:
-                logger.error(f"Heartbeat loop error: {e}")
+        self.scheduler.call_later(
+            self._heartbeat_key(session_id),
+            self.heartbeat_interval,
+            partial(self._heartbeat, session_id),
+        )
+        await self.send_message(session_id, {"type": "ping", "timestamp": current_time.isoformat()})
 
     async def _cleanup_loop(self):
         """Background task to clean up stale connections and data."""
@@ -424,57 +517,37 @@ class WebSocketManager:
                                 session_id, code=1001, reason="Reconnection timeout"
                             )
 
-                # Clean up message queues
-                for conn_info in self.connections.values():
-                    if len(conn_info.message_queue) > self.max_queue_size:
-                        # Remove oldest messages
-                        conn_info.message_queue = conn_info.message_queue[-self.max_queue_size :]
+                # Drop replay logs of sessions that are gone and no longer written to
+                self.replay_log.expire_idle(keep=self.connections)
 
             except Exception as e:
                 logger.error(f"Cleanup loop error: {e}")
 
-    async def _queue_message(self, session_id: str, message: dict[str, Any]):
-        """Queue message for later delivery.
+    async def _replay_missed_messages(self, session_id: str, after_offset: int):
+        """Send every message after ``after_offset`` to a resumed client in one frame.
 
         Args:
             session_id: Session identifier
-            message: Message to queue
-        """
-        if session_id in self.connections:
-            conn_info = self.connections[session_id]
-
-            # Add to queue with limit
-            if len(conn_info.message_queue) < self.max_queue_size:
-                conn_info.message_queue.append(message)
-            else:
-                # Remove oldest and add new
-                conn_info.message_queue.pop(0)
-                conn_info.message_queue.append(message)
-
-    async def _send_queued_messages(self, websocket: WebSocket, queue: list[dict[str, Any]]):
-        """Send queued messages to reconnected client.
-
-        Args:
-            websocket: WebSocket connection
-            queue: Message queue
+            after_offset: Last offset acknowledged by the client
         """
-        if not queue:
+        messages = await self.replay_log.read_since(session_id, after_offset)
+        if not messages:
             return
 
-        # Send queue indicator
-        await websocket.send_json({"type": "queued_messages", "count": len(queue)})
-
-        # Send all queued messages
-        for message in queue:
-            try:
-                await websocket.send_json(message)
-                await asyncio.sleep(0.01)  # Small delay to prevent flooding
-            except Exception as e:
-                logger.error(f"Error sending queued message: {e}")
-                break
-
-        # Clear queue
-        queue.clear()
+        conn_info = self.connections[session_id]
+        try:
+            await conn_info.websocket.send_json(
+                {
+                    "type": "replay",
+                    "from_offset": after_offset,
+                    "to_offset": messages[-1].get("offset", after_offset),
+                    "count": len(messages),
+                    "messages": messages,
+                }
+            )
+            self.stats["total_messages_sent"] += 1
+        except Exception as e:
+            logger.error(f"Error replaying messages for session {session_id}: {e}")
 
     def _generate_reconnect_token(self) -> str:
         """Generate unique reconnect token.
@@ -494,8 +567,12 @@ class WebSocketManager:
             delay: Delay in seconds
         """
         await asyncio.sleep(delay)
-        if token in self.reconnect_tokens:
-            del self.reconnect_tokens[token]
+        session_id = self.reconnect_tokens.pop(token, None)
+        self.acked_offsets.pop(token, None)
+
+        # The session can no longer resume, so its replay log is not needed
+        if session_id is not None and session_id not in self.connections:
+            await self.replay_log.discard(session_id, shared=True)
 
     async def get_connection_info(self, session_id: str) -> dict[str, Any] | None:
         """Get connection information.
@@ -519,7 +596,8 @@ class WebSocketManager:
             "connected_at": conn_info.connected_at.isoformat(),
             "last_heartbeat": conn_info.last_heartbeat.isoformat(),
             "rooms": list(conn_info.room_ids),
-            "queue_size": len(conn_info.message_queue),
+            "last_offset": self.replay_log.last_offset(session_id),
+            "last_acked_offset": conn_info.last_acked_offset,
             "metadata": conn_info.metadata,
         }
 
@@ -538,6 +616,8 @@ class WebSocketManager:
             "total_messages_received": self.stats["total_messages_received"],
             "total_reconnections": self.stats["total_reconnections"],
             "total_disconnections": self.stats["total_disconnections"],
+            "replay_log": self.replay_log.get_stats(),
+            "timers": self.scheduler.get_stats(),
             "connection_states": {
                 state.value: sum(1 for c in self.connections.values() if c.state == state)
                 for state in ConnectionState
@@ -550,6 +630,6 @@ manager = WebSocketManager(
     heartbeat_interval=30,
     heartbeat_timeout=60,
     max_connections=1000,
-    max_queue_size=100,
+    max_queue_size=1000,
     enable_rooms=True,
 )
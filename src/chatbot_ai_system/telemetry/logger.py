@@ -1,15 +1,20 @@
 """Structured logging configuration with correlation IDs and PII redaction."""
 
+import atexit
 import logging
+import queue
 import re
 import sys
+import time
 from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any, List
 from uuid import uuid4
 
 import orjson
 import structlog
-from structlog.processors import CallsiteParameter
 
 from chatbot_ai_system.config.settings import settings
 
@@ -18,6 +23,9 @@ request_id_var: ContextVar[str] = ContextVar("request_id", default="")
 tenant_id_var: ContextVar[str] = ContextVar("tenant_id", default="")
 user_id_var: ContextVar[str] = ContextVar("user_id", default="")
 
+# Counters of the logging pipeline
+log_stats = {"queued": 0, "dropped": 0, "rate_limited": 0}
+
 
 class PIIRedactor:
     """Redact PII from log messages."""
@@ -30,21 +38,45 @@ class PIIRedactor:
     API_KEY_PATTERN = re.compile(r"\b(sk-|pk-|api[_-]?key[\s=:]+)[\w-]{20,}\b", re.IGNORECASE)
     JWT_PATTERN = re.compile(r"\beyJ[A-Za-z0-9-_]+\.[A-Za-z0-9-_]+\.[A-Za-z0-9-_]+\b")
 
+    # All patterns in one alternation so that a value is scanned once
+    COMBINED_PATTERN = re.compile(
+        "|".join(
+            [
+                f"(?P<EMAIL>{EMAIL_PATTERN.pattern})",
+                f"(?P<PHONE>{PHONE_PATTERN.pattern})",
+                f"(?P<SSN>{SSN_PATTERN.pattern})",
+                f"(?P<CC>{CREDIT_CARD_PATTERN.pattern})",
+                f"(?P<API_KEY>(?i:{API_KEY_PATTERN.pattern}))",
+                f"(?P<JWT>{JWT_PATTERN.pattern})",
+            ]
+        )
+    )
+    REPLACEMENTS = {
+        "EMAIL": "[EMAIL_REDACTED]",
+        "PHONE": "[PHONE_REDACTED]",
+        "SSN": "[SSN_REDACTED]",
+        "CC": "[CC_REDACTED]",
+        "API_KEY": "[API_KEY_REDACTED]",
+        "JWT": "[JWT_REDACTED]",
+    }
+
     @classmethod
     def redact(cls, value: Any) -> Any:
         """Redact PII from value."""
         if not isinstance(value, str):
             return value
 
-        # Redact patterns
-        value = cls.EMAIL_PATTERN.sub("[EMAIL_REDACTED]", value)
-        value = cls.PHONE_PATTERN.sub("[PHONE_REDACTED]", value)
-        value = cls.SSN_PATTERN.sub("[SSN_REDACTED]", value)
-        value = cls.CREDIT_CARD_PATTERN.sub("[CC_REDACTED]", value)
-        value = cls.API_KEY_PATTERN.sub("[API_KEY_REDACTED]", value)
-        value = cls.JWT_PATTERN.sub("[JWT_REDACTED]", value)
+        # Short values (event names, ids, statuses) repeat a lot
+        if len(value) <= 256:
+            return _redact_cached(value)
+        return cls._redact(value)
+
+    @classmethod
+    def _redact(cls, value: str) -> str:
+        return cls.COMBINED_PATTERN.sub(lambda m: cls.REPLACEMENTS[m.lastgroup], value)
+
 
-        return value
+_redact_cached = lru_cache(maxsize=4096)(PIIRedactor._redact)
 
 
 def add_context_vars(logger, method_name, event_dict):
@@ -75,66 +107,252 @@ def redact_sensitive_data(logger, method_name, event_dict):
     return event_dict
 
 
+def capture_exc_info(logger, method_name, event_dict):
+    """Resolve exc_info on the logging thread; it is rendered on the writer thread."""
+    exc_info = event_dict.get("exc_info")
+    if exc_info is True or (method_name == "exception" and exc_info is None):
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def add_record_timestamp(logger, method_name, event_dict):
+    """Timestamp events with the time they were logged, not written."""
+    record = event_dict.get("_record")
+    created = record.created if record is not None else time.time()
+    event_dict["timestamp"] = (
+        datetime.fromtimestamp(created, timezone.utc).isoformat().replace("+00:00", "Z")
+    )
+    return event_dict
+
+
+def add_record_callsite(logger, method_name, event_dict):
+    """Add the call site found when the record was created."""
+    record = event_dict.get("_record")
+    if record is not None:
+        event_dict["filename"] = record.filename
+        event_dict["func_name"] = record.funcName
+        event_dict["lineno"] = record.lineno
+    return event_dict
+
+
+def _is_audit(record: logging.LogRecord) -> bool:
+    """Whether a record is an audit log entry, which must never be dropped."""
+    return isinstance(record.msg, dict) and record.msg.get("audit") is True
+
+
+class LogRateLimiter(logging.Filter):
+    """Drops repeats of hot log lines beyond a per-second budget.
+
+    Lines are keyed by logger and event (structlog) or call site (standard
+    logging); warnings, errors and audit entries are never dropped. The next
+    line let through after some were dropped carries their count in
+    ``suppressed``.
+    """
+
+    def __init__(self, rate: float = 50.0, burst: int = 100):
+        """Initialize rate limiter.
+
+        Args:
+            rate: Lines per second allowed for each key
+            burst: Lines allowed in a burst for each key
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[tuple, list] = {}  # key -> [tokens, updated_at, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or _is_audit(record):
+            return True
+
+        event = record.msg
+        if isinstance(event, dict):
+            key = (record.name, event.get("event"))
+        else:
+            key = (record.name, record.pathname, record.lineno)
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= 10_000:
+                self._buckets.clear()
+            bucket = self._buckets[key] = [self.burst, now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            log_stats["rate_limited"] += 1
+            return False
+
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            if isinstance(event, dict):
+                event["suppressed"] = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that never formats or blocks on the logging thread.
+
+    Audit entries are the exception: when the queue is full they wait up to
+    ``audit_timeout`` seconds for room instead of being dropped.
+    """
+
+    audit_timeout = 5.0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Snapshot the event of a record without formatting it.
+
+        Formatting, redaction and encoding happen on the listener thread, after
+        the caller has moved on, so the event dict and the dicts and lists
+        directly in it are copied here. Objects nested deeper, and the
+        arguments of standard logging records, are rendered as they are when
+        the record is written.
+        """
+        event = record.msg
+        if isinstance(event, dict):
+            record.msg = {
+                key: value.copy() if isinstance(value, (dict, list)) else value
+                for key, value in event.items()
+            }
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if _is_audit(record):
+                # Audit entries wait for room; dropped only if the writer is gone
+                self.queue.put(record, timeout=self.audit_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            log_stats["dropped"] += 1
+            return
+        log_stats["queued"] += 1
+
+
+_listener: QueueListener | None = None
+_queue_handler: NonBlockingQueueHandler | None = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging(
     level: str | None = None,
     format: str = "json",
     redact_pii: bool = True,
+    queue_size: int = 10000,
+    rate_limit: float = 50.0,
+    rate_limit_burst: int = 100,
 ) -> None:
-    """Configure structured logging with security features."""
-    log_level = level or settings.LOG_LEVEL
-
-    # Configure structlog processors
-    from typing import List, Any, Callable
-    processors: List[Callable[..., Any]] = [
+    """Configure structured logging with security features.
+
+    Only level filtering and context variables run on the logging thread.
+    Records then go through a bounded queue (dropped and counted in
+    ``log_stats`` when full, except audit entries) to a background thread that does redaction,
+    rendering and writing.
+
+    Args:
+        level: Log level (settings.log_level by default)
+        format: "json" or "console"
+        redact_pii: Whether to redact PII in production
+        queue_size: Maximum number of records waiting to be written
+        rate_limit: Lines per second allowed for each hot message
+        rate_limit_burst: Lines allowed in a burst for each hot message
+    """
+    global _listener, _queue_handler
+
+    log_level = level or settings.log_level
+
+    # Processors run on the logging thread
+    processors: List[Any] = [
         structlog.stdlib.filter_by_level,
+        add_context_vars,  # Add correlation IDs
+        structlog.processors.StackInfoRenderer(),
+        capture_exc_info,
+        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+    ]
+
+    # Processors run on the writer thread
+    render_processors: List[Any] = [
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        add_context_vars,  # Add correlation IDs
+        add_record_timestamp,
+        add_record_callsite,
     ]
 
     # Add PII redaction in production
-    if redact_pii and settings.ENVIRONMENT == "production":
-        processors.append(redact_sensitive_data)
+    if redact_pii and settings.environment == "production":
+        render_processors.append(redact_sensitive_data)
 
-    processors.extend(
+    render_processors.extend(
         [
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.CallsiteParameterAdder(
-                parameters=[
-                    CallsiteParameter.FILENAME,
-                    CallsiteParameter.FUNC_NAME,
-                    CallsiteParameter.LINENO,
-                ]
-            ),
             structlog.processors.ExceptionRenderer(),
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
         ]
     )
 
     if format == "json":
-        processors.append(structlog.processors.JSONRenderer(serializer=orjson.dumps))
+        render_processors.append(
+            structlog.processors.JSONRenderer(
+                serializer=lambda obj, **kwargs: orjson.dumps(obj, **kwargs).decode()
+            )
+        )
     else:
-        processors.append(structlog.dev.ConsoleRenderer())
+        render_processors.append(structlog.dev.ConsoleRenderer())
 
     structlog.configure(
         processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
 
-    # Configure standard logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, log_level.upper()),
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processors=render_processors,
+        )
     )
 
+    # Configure standard logging to hand records to the writer thread
+    _stop_listener()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(LogRateLimiter(rate=rate_limit, burst=rate_limit_burst))
+    root_logger.addHandler(_queue_handler)
+    root_logger.setLevel(getattr(logging, log_level.upper()))
+
+    _listener = QueueListener(_queue_handler.queue, stream_handler)
+    _listener.start()
+
     # Suppress noisy loggers
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
+def get_log_stats() -> dict[str, int]:
+    """Get counters of the logging pipeline."""
+    return {
+        **log_stats,
+        "pending": _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+    }
+
+
+atexit.register(_stop_listener)
+
+
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     """Get a structured logger instance."""
     return structlog.get_logger(name)
@@ -1,12 +1,181 @@
 """Metrics collection and reporting with Prometheus integration."""
 
 import time
+import zlib
+from bisect import bisect_left
 from collections import defaultdict
+from collections.abc import Iterable
 from contextlib import contextmanager
 from dataclasses import dataclass, field
+from itertools import accumulate
 from typing import Any
 
 from prometheus_client import REGISTRY, Counter, Gauge, Histogram, Info, Summary, generate_latest
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+    SummaryMetricFamily,
+)
+
+
+def status_class(status: int) -> str:
+    """Collapse an HTTP status code into its class label (``2xx``, ``5xx``...)."""
+    return f"{status // 100}xx"
+
+
+class TenantLabeler:
+    """Maps tenant ids to a bounded set of metric label values.
+
+    Pinned tenants and the first ``max_tenant_series`` tenants seen keep their
+    own label; every other tenant is hashed into one of ``buckets`` shared
+    ``other_NN`` labels. The hash is stable across processes so buckets line up
+    when series from several pods are aggregated.
+    """
+
+    def __init__(
+        self,
+        max_tenant_series: int = 50,
+        buckets: int = 16,
+        pinned: Iterable[str] = (),
+    ):
+        """Initialize tenant labeler.
+
+        Args:
+            max_tenant_series: Tenants given their own label on first sight
+            buckets: Number of shared labels for the remaining tenants
+            pinned: Tenants that always keep their own label
+        """
+        self.max_tenant_series = max_tenant_series
+        self.buckets = buckets
+        self._labels: dict[str, str] = {tenant: tenant for tenant in pinned}
+        self._own = 0
+
+    def label(self, tenant_id: str | None) -> str:
+        """Get the label value of a tenant."""
+        if not tenant_id:
+            return "unknown"
+        label = self._labels.get(tenant_id)
+        if label is not None:
+            return label
+
+        if self._own < self.max_tenant_series:
+            self._own += 1
+            label = tenant_id
+        else:
+            label = f"other_{zlib.crc32(tenant_id.encode()) % self.buckets:02d}"
+        if len(self._labels) < 100_000:
+            self._labels[tenant_id] = label
+        return label
+
+
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _RequestSeries:
+    """Plain counters of one request label combination."""
+
+    __slots__ = ("labels", "count", "sum", "buckets")
+
+    def __init__(self, labels: tuple[str, str, str, str]):
+        self.labels = labels  # method, endpoint, status class, tenant label
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * (len(REQUEST_DURATION_BUCKETS) + 1)
+
+
+class _RequestCollector:
+    """Exports request metrics and SLI/SLO gauges computed at scrape time.
+
+    ``record_request`` only bumps plain counters; the Prometheus families are
+    built from them here, once per scrape instead of once per request.
+    """
+
+    def __init__(self, collector: "MetricsCollector"):
+        self.collector = collector
+
+    def describe(self):
+        return self._families([], 0, 0)
+
+    def collect(self):
+        collector = self.collector
+        return self._families(
+            list(collector._request_series.values()),
+            collector._sli_total,
+            collector._sli_success,
+        )
+
+    def _families(self, series: list[_RequestSeries], total: int, success: int) -> list:
+        namespace = self.collector.namespace
+        targets = self.collector._slo_targets
+
+        counts: dict[tuple[str, ...], int] = defaultdict(int)
+        durations: dict[tuple[str, ...], list] = {}
+        endpoints: dict[str, list] = {}
+        for item in series:
+            method, endpoint, status, tenant = item.labels
+            counts[item.labels] += item.count
+            duration = durations.setdefault((method, endpoint), [0.0, [0] * len(item.buckets)])
+            duration[0] += item.sum
+            duration[1] = [a + b for a, b in zip(duration[1], item.buckets)]
+            sli = endpoints.setdefault(endpoint, [0, 0.0])
+            sli[0] += item.count
+            sli[1] += item.sum
+
+        requests = CounterMetricFamily(
+            f"{namespace}_requests",
+            "Total number of requests",
+            labels=["method", "endpoint", "status", "tenant_id"],
+        )
+        for labels, count in counts.items():
+            requests.add_metric(list(labels), count)
+
+        request_duration = HistogramMetricFamily(
+            f"{namespace}_request_duration_seconds",
+            "Request duration in seconds",
+            labels=["method", "endpoint"],
+        )
+        for labels, (duration_sum, buckets) in durations.items():
+            cumulative = list(accumulate(buckets))
+            request_duration.add_metric(
+                list(labels),
+                [(str(bound), cumulative[i]) for i, bound in enumerate(REQUEST_DURATION_BUCKETS)]
+                + [("+Inf", cumulative[-1])],
+                duration_sum,
+            )
+
+        sli_latency = SummaryMetricFamily(
+            f"{namespace}_sli_latency_seconds",
+            "Request latency for SLI",
+            labels=["endpoint"],
+        )
+        for endpoint, (count, duration_sum) in endpoints.items():
+            sli_latency.add_metric([endpoint], count, duration_sum)
+
+        availability = success / total if total else 1.0
+        error_rate = 1.0 - availability
+        compliance = GaugeMetricFamily(
+            f"{namespace}_slo_compliance",
+            "SLO compliance (1=meeting, 0=not meeting)",
+            labels=["slo_name"],
+        )
+        compliance.add_metric(
+            ["availability"], 1.0 if availability >= targets["availability"] else 0.0
+        )
+        compliance.add_metric(["error_rate"], 1.0 if error_rate <= targets["error_rate"] else 0.0)
+
+        return [
+            requests,
+            request_duration,
+            sli_latency,
+            GaugeMetricFamily(
+                f"{namespace}_sli_availability",
+                "Service availability (success rate)",
+                value=availability,
+            ),
+            GaugeMetricFamily(f"{namespace}_sli_error_rate", "Error rate", value=error_rate),
+            compliance,
+        ]
 
 
 @dataclass
@@ -23,9 +192,19 @@ class MetricSnapshot:
 class MetricsCollector:
     """Centralized metrics collection with Prometheus integration."""
 
-    def __init__(self, namespace: str = "chatbot_ai_system"):
-        """Initialize metrics collector."""
+    def __init__(
+        self,
+        namespace: str = "chatbot_ai_system",
+        tenant_labeler: TenantLabeler | None = None,
+    ):
+        """Initialize metrics collector.
+
+        Args:
+            namespace: Prefix of the metric names
+            tenant_labeler: Maps tenant ids to bounded label values
+        """
         self.namespace = namespace
+        self.tenant_labeler = tenant_labeler or TenantLabeler()
         self._counters: dict[str, Counter] = {}
         self._gauges: dict[str, Gauge] = {}
         self._histograms: dict[str, Histogram] = {}
@@ -33,8 +212,13 @@ class MetricsCollector:
         self._info: dict[str, Info] = {}
         self._custom_metrics: dict[str, Any] = defaultdict(float)
 
-        # SLI/SLO tracking
-        self._sli_metrics: dict[str, float] = {}
+        # Label children bound once per label combination
+        self._children: dict[tuple, Any] = {}
+        self._request_series: dict[tuple[str, str, int, str], _RequestSeries] = {}
+
+        # SLI/SLO tracking (gauges are computed at scrape time)
+        self._sli_total = 0
+        self._sli_success = 0
         self._slo_targets: dict[str, float] = {
             "availability": 0.995,  # 99.5%
             "latency_p95": 0.2,  # 200ms
@@ -53,19 +237,7 @@ class MetricsCollector:
             "Build information",
         )
 
-        # Request metrics
-        self._counters["requests_total"] = Counter(
-            f"{self.namespace}_requests_total",
-            "Total number of requests",
-            ["method", "endpoint", "status", "tenant_id"],
-        )
-
-        self._histograms["request_duration"] = Histogram(
-            f"{self.namespace}_request_duration_seconds",
-            "Request duration in seconds",
-            ["method", "endpoint"],
-            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
-        )
+        # Request metrics are exported by _RequestCollector (see _init_sli_metrics)
 
         # Model metrics
         self._counters["model_requests"] = Counter(
@@ -148,31 +320,18 @@ class MetricsCollector:
 
     def _init_sli_metrics(self):
         """Initialize SLI metrics for SLO tracking."""
-        # Availability SLI
-        self._gauges["sli_availability"] = Gauge(
-            f"{self.namespace}_sli_availability",
-            "Service availability (success rate)",
-        )
-
-        # Latency SLI
-        self._summaries["sli_latency"] = Summary(
-            f"{self.namespace}_sli_latency_seconds",
-            "Request latency for SLI",
-            ["endpoint"],
-        )
-
-        # Error rate SLI
-        self._gauges["sli_error_rate"] = Gauge(
-            f"{self.namespace}_sli_error_rate",
-            "Error rate",
-        )
-
-        # SLO compliance
-        self._gauges["slo_compliance"] = Gauge(
-            f"{self.namespace}_slo_compliance",
-            "SLO compliance (1=meeting, 0=not meeting)",
-            ["slo_name"],
-        )
+        # Request counts, latency, availability, error rate and SLO compliance
+        # are all computed at scrape time from plain per-series counters
+        self._request_collector = _RequestCollector(self)
+        REGISTRY.register(self._request_collector)
+
+    def _child(self, metric: Any, *label_values: str) -> Any:
+        """Get the child of a labelled metric, binding it on first use."""
+        key = (id(metric), *label_values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*label_values)
+        return child
 
     def increment_counter(
         self,
@@ -239,22 +398,31 @@ class MetricsCollector:
         duration: float,
         tenant_id: str | None = None,
     ):
-        """Record HTTP request metrics."""
-        labels = {
-            "method": method,
-            "endpoint": endpoint,
-            "status": str(status),
-            "tenant_id": tenant_id or "unknown",
-        }
-        self.increment_counter("requests_total", labels=labels)
-        self.observe_histogram(
-            "request_duration",
-            duration,
-            labels={"method": method, "endpoint": endpoint},
-        )
-
-        # Update SLI metrics
-        self._update_sli_metrics(status, duration, endpoint)
+        """Record HTTP request metrics.
+
+        ``endpoint`` should be the route template (``/api/v1/chats/{id}``), not
+        the raw path, to keep the number of series bounded.
+        """
+        key = (method, endpoint, status, self.tenant_labeler.label(tenant_id))
+        series = self._request_series.get(key)
+        if series is None:
+            series = self._bind_request_series(key)
+
+        series.count += 1
+        series.sum += duration
+        series.buckets[bisect_left(REQUEST_DURATION_BUCKETS, duration)] += 1
+
+        # SLI counts; the gauges are derived from them at scrape time
+        self._sli_total += 1
+        if 200 <= status < 500:
+            self._sli_success += 1
+
+    def _bind_request_series(self, key: tuple[str, str, int, str]) -> _RequestSeries:
+        """Create the counters of a request label combination."""
+        method, endpoint, status, tenant = key
+        series = _RequestSeries((method, endpoint, status_class(status), tenant))
+        self._request_series[key] = series
+        return series
 
     def record_model_request(
         self,
@@ -269,40 +437,23 @@ class MetricsCollector:
     ):
         """Record model request metrics."""
         status = "success" if success else "failure"
-        tenant = tenant_id or "unknown"
+        tenant = self.tenant_labeler.label(tenant_id)
 
-        self.increment_counter(
-            "model_requests",
-            labels={"provider": provider, "model": model, "status": status, "tenant_id": tenant},
-        )
+        self._child(self._counters["model_requests"], provider, model, status, tenant).inc()
 
         if success:
-            self.observe_histogram(
-                "model_latency",
-                latency,
-                labels={"provider": provider, "model": model},
-            )
+            self._child(self._histograms["model_latency"], provider, model).observe(latency)
 
             if tokens_input > 0:
-                self.increment_counter(
-                    "tokens_processed",
-                    value=tokens_input,
-                    labels={"provider": provider, "model": model, "type": "input"},
-                )
+                tokens = self._counters["tokens_processed"]
+                self._child(tokens, provider, model, "input").inc(tokens_input)
 
             if tokens_output > 0:
-                self.increment_counter(
-                    "tokens_processed",
-                    value=tokens_output,
-                    labels={"provider": provider, "model": model, "type": "output"},
-                )
+                tokens = self._counters["tokens_processed"]
+                self._child(tokens, provider, model, "output").inc(tokens_output)
 
             if cost > 0:
-                self.increment_counter(
-                    "cost_usd_total",
-                    value=cost,
-                    labels={"provider": provider, "model": model, "tenant_id": tenant},
-                )
+                self._child(self._counters["cost_usd_total"], provider, model, tenant).inc(cost)
 
     def record_cache_hit(self, cache_type: str = "default"):
         """Record cache hit."""
@@ -320,7 +471,7 @@ class MetricsCollector:
         """Record rate limit exceeded event."""
         self.increment_counter(
             "rate_limit_exceeded",
-            labels={"tenant_id": tenant_id, "limit_type": limit_type},
+            labels={"tenant_id": self.tenant_labeler.label(tenant_id), "limit_type": limit_type},
         )
 
     def record_error(
@@ -334,52 +485,6 @@ class MetricsCollector:
             labels={"error_type": error_type, "component": component},
         )
 
-    def _update_sli_metrics(self, status: int, duration: float, endpoint: str):
-        """Update SLI metrics based on request."""
-        # Availability (success rate)
-        is_success = 200 <= status < 500
-        if "availability_total" not in self._sli_metrics:
-            self._sli_metrics["availability_total"] = 0
-            self._sli_metrics["availability_success"] = 0
-
-        self._sli_metrics["availability_total"] += 1
-        if is_success:
-            self._sli_metrics["availability_success"] += 1
-
-        availability = (
-            self._sli_metrics["availability_success"] / self._sli_metrics["availability_total"]
-            if self._sli_metrics["availability_total"] > 0
-            else 1.0
-        )
-        self.set_gauge("sli_availability", availability)
-
-        # Latency
-        if "sli_latency" in self._summaries:
-            self._summaries["sli_latency"].labels(endpoint=endpoint).observe(duration)
-
-        # Error rate
-        error_rate = 1.0 - availability
-        self.set_gauge("sli_error_rate", error_rate)
-
-        # Check SLO compliance
-        self._check_slo_compliance(availability, error_rate)
-
-    def _check_slo_compliance(self, availability: float, error_rate: float):
-        """Check and record SLO compliance."""
-        # Availability SLO
-        self.set_gauge(
-            "slo_compliance",
-            value=1.0 if availability >= self._slo_targets["availability"] else 0.0,
-            labels={"slo_name": "availability"},
-        )
-
-        # Error rate SLO
-        self.set_gauge(
-            "slo_compliance",
-            value=1.0 if error_rate <= self._slo_targets["error_rate"] else 0.0,
-            labels={"slo_name": "error_rate"},
-        )
-
     def set_build_info(self, version: str, commit: str, build_time: str):
         """Set build information."""
         if "build" in self._info:
@@ -399,9 +504,9 @@ class MetricsCollector:
         snapshot.counters.update(self._custom_metrics)
 
         # Add SLI metrics
-        snapshot.gauges["sli_availability"] = self._sli_metrics.get(
-            "availability_success", 0
-        ) / max(self._sli_metrics.get("availability_total", 1), 1)
+        snapshot.gauges["sli_availability"] = (
+            self._sli_success / self._sli_total if self._sli_total else 1.0
+        )
 
         return snapshot
 
@@ -0,0 +1,395 @@
+"""In-process profiling of the event loop.
+
+Four cheap, opt-in instruments for finding where event-loop time goes in a
+running process:
+
+* ``StackSampler`` samples the stack of the event-loop thread from a
+  background thread and aggregates collapsed stacks (flamegraph input).
+* ``LoopLagMonitor`` measures how late the loop wakes up a sleeping task.
+* ``SlowCallbackDetector`` times every callback the (default asyncio) loop
+  runs and records the coroutine or function behind the slow ones, like
+  asyncio debug mode does but without the rest of its overhead.
+* ``hot_section`` accounts wall time of named sections (cache lookup, provider
+  call, serialization) per coroutine.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any
+
+from chatbot_ai_system.telemetry.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+class StackSampler:
+    """Samples the stack of one thread and aggregates collapsed stacks."""
+
+    def __init__(self, interval_ms: float = 10.0, max_depth: int = 64, max_stacks: int = 10000):
+        """Initialize stack sampler.
+
+        Args:
+            interval_ms: Time between samples
+            max_depth: Frames kept per sample (innermost first)
+            max_stacks: Distinct stacks kept; further new stacks are counted as dropped
+        """
+        self.interval_ms = interval_ms
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._target: int | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, thread_id: int | None = None):
+        """Start sampling a thread (the calling thread by default)."""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                return
+            self.sample(frame)
+
+    def sample(self, frame):
+        """Record the stack ending at a frame."""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+
+        self.samples += 1
+        if stack in self.stacks or len(self.stacks) < self.max_stacks:
+            self.stacks[stack] += 1
+        else:
+            self.dropped += 1
+
+    def collapsed(self) -> str:
+        """Get the samples as collapsed stacks (``frame;frame;frame count`` lines)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        """Forget the recorded samples."""
+        self.stacks.clear()
+        self.samples = 0
+        self.dropped = 0
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a task that asked to sleep."""
+
+    def __init__(self, interval_s: float = 0.5, history: int = 120):
+        """Initialize loop lag monitor.
+
+        Args:
+            interval_s: Time between measurements
+            history: Measurements kept
+        """
+        self.interval_s = interval_s
+        self.lags_ms: deque[float] = deque(maxlen=history)
+        self.max_lag_ms = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start measuring on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop measuring."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.lags_ms.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get loop lag statistics."""
+        lags = sorted(self.lags_ms)
+        if not lags:
+            return {"samples": 0, "last_ms": 0.0, "p99_ms": 0.0, "max_ms": self.max_lag_ms}
+        return {
+            "samples": len(lags),
+            "last_ms": round(self.lags_ms[-1], 3),
+            "p50_ms": round(lags[len(lags) // 2], 3),
+            "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 3),
+            "max_ms": round(self.max_lag_ms, 3),
+        }
+
+
+def _describe_callback(handle: asyncio.Handle) -> str:
+    """Name the code behind a loop callback."""
+    callback = getattr(handle, "_callback", None)
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        # Innermost coroutine of the task, where it suspended after the slow step
+        coro = task.get_coro()
+        names, frame = [], None
+        while getattr(coro, "cr_code", None) is not None:
+            names.append(coro.cr_code.co_qualname)
+            frame = coro.cr_frame or frame
+            coro = coro.cr_await
+        if not names:
+            return repr(task.get_coro())
+        where = f"{frame.f_code.co_filename}:{frame.f_lineno}" if frame is not None else "done"
+        return f"{' > '.join(names)} ({where})"
+
+    code = getattr(callback, "__code__", None)
+    if code is not None:
+        return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+    return repr(callback)
+
+
+class SlowCallbackDetector:
+    """Records loop callbacks that ran longer than a threshold."""
+
+    def __init__(self, threshold_ms: float = 100.0, history: int = 100):
+        """Initialize slow callback detector.
+
+        Args:
+            threshold_ms: Callbacks running longer are recorded
+            history: Slow callbacks kept
+        """
+        self.threshold_ms = threshold_ms
+        self.slow: deque[dict[str, Any]] = deque(maxlen=history)
+        self.by_callsite: Counter[str] = Counter()
+        self._original_run = None
+
+    @property
+    def installed(self) -> bool:
+        return self._original_run is not None
+
+    def install(self):
+        """Time every callback run by asyncio event loops."""
+        if self.installed:
+            return
+        original_run = self._original_run = asyncio.Handle._run
+        detector = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            try:
+                return original_run(handle)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms >= detector.threshold_ms:
+                    detector.record(handle, elapsed_ms)
+
+        asyncio.Handle._run = _run
+
+    def uninstall(self):
+        """Stop timing callbacks."""
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def record(self, handle: asyncio.Handle, elapsed_ms: float):
+        callsite = _describe_callback(handle)
+        self.by_callsite[callsite] += 1
+        self.slow.append(
+            {"callsite": callsite, "duration_ms": round(elapsed_ms, 3), "timestamp": time.time()}
+        )
+        logger.warning("Slow event loop callback", callsite=callsite, duration_ms=elapsed_ms)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get slow callback statistics."""
+        return {
+            "threshold_ms": self.threshold_ms,
+            "recent": list(self.slow),
+            "by_callsite": dict(self.by_callsite.most_common(20)),
+        }
+
+
+class _SectionTimer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter_ns() - self.start
+        # The coroutine (or function) the section is in
+        owner = sys._getframe(1).f_code.co_qualname
+
+        stats = section_stats.get((self.name, owner))
+        if stats is None:
+            stats = section_stats[(self.name, owner)] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+        return False
+
+
+class _NoopSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SECTION = _NoopSection()
+_sections_enabled = False
+
+# (section, coroutine) -> [count, total_ns, max_ns]
+section_stats: dict[tuple[str, str], list[int]] = {}
+
+
+def hot_section(name: str):
+    """Account the wall time of a named section to the enclosing coroutine.
+
+    Costs a flag check while profiling is off.
+    """
+    if not _sections_enabled:
+        return _NOOP_SECTION
+    return _SectionTimer(name)
+
+
+class Profiler:
+    """Owns the profiling instruments of the process."""
+
+    def __init__(self):
+        """Initialize profiler."""
+        self.sampler = StackSampler()
+        self.lag_monitor = LoopLagMonitor()
+        self.slow_callbacks = SlowCallbackDetector()
+
+    def start(self, slow_callback_ms: float | None = None, stack_interval_ms: float | None = None):
+        """Start the instruments on the running loop.
+
+        Args:
+            slow_callback_ms: Threshold of slow callbacks
+            stack_interval_ms: Also sample the loop's stack continuously at this interval
+        """
+        global _sections_enabled
+
+        if slow_callback_ms is not None:
+            self.slow_callbacks.threshold_ms = slow_callback_ms
+        self.lag_monitor.start()
+        self.slow_callbacks.install()
+        _sections_enabled = True
+
+        if stack_interval_ms is not None:
+            self.sampler.stop()
+            self.sampler.interval_ms = stack_interval_ms
+            self.sampler.start(threading.get_ident())
+
+        logger.info(
+            "Profiler started",
+            slow_callback_ms=self.slow_callbacks.threshold_ms,
+            stack_interval_ms=stack_interval_ms,
+        )
+
+    def stop(self):
+        """Stop every instrument."""
+        global _sections_enabled
+
+        _sections_enabled = False
+        self.sampler.stop()
+        self.lag_monitor.stop()
+        self.slow_callbacks.uninstall()
+        logger.info("Profiler stopped")
+
+    async def sample(self, duration_s: float = 10.0, interval_ms: float = 10.0) -> str:
+        """Sample the event-loop thread for a while.
+
+        Args:
+            duration_s: Sampling duration
+            interval_ms: Time between samples
+
+        Returns:
+            Collapsed stacks of the period
+        """
+        sampler = StackSampler(interval_ms=interval_ms)
+        sampler.start(threading.get_ident())
+        try:
+            await asyncio.sleep(duration_s)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+        return sampler.collapsed()
+
+    def get_sections(self) -> list[dict[str, Any]]:
+        """Get hot section timings, slowest total first."""
+        sections = [
+            {
+                "section": name,
+                "coroutine": owner,
+                "count": count,
+                "total_ms": round(total / 1e6, 3),
+                "mean_ms": round(total / count / 1e6, 3),
+                "max_ms": round(maximum / 1e6, 3),
+            }
+            for (name, owner), (count, total, maximum) in list(section_stats.items())
+        ]
+        return sorted(sections, key=lambda section: section["total_ms"], reverse=True)
+
+    def get_status(self) -> dict[str, Any]:
+        """Get the state of every instrument."""
+        return {
+            "sections_enabled": _sections_enabled,
+            "sampler": {
+                "running": self.sampler.running,
+                "interval_ms": self.sampler.interval_ms,
+                "samples": self.sampler.samples,
+                "dropped": self.sampler.dropped,
+            },
+            "loop_lag": self.lag_monitor.get_stats(),
+            "slow_callbacks": self.slow_callbacks.get_stats(),
+            "sections": self.get_sections(),
+        }
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self.sampler.reset()
+        self.lag_monitor.lags_ms.clear()
+        self.lag_monitor.max_lag_ms = 0.0
+        self.slow_callbacks.slow.clear()
+        self.slow_callbacks.by_callsite.clear()
+        section_stats.clear()
+
+
+# Global profiler instance
+profiler = Profiler()
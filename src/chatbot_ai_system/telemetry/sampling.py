@@ -0,0 +1,169 @@
+"""Tail-based sampling of traces.
+
+Every span is recorded, but spans are held back per trace until the local root
+span ends. Only then is it decided whether the trace is worth exporting: it was
+slow, it failed, something marked it (a fallback or hedged request), or it is
+part of the small random sample decided at the head of the trace. Everything
+else is dropped without ever reaching the exporter.
+"""
+
+import random
+import threading
+from collections import OrderedDict, deque
+from typing import Any
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+# Span attribute asking the tail sampler to export the whole trace
+KEEP_ATTRIBUTE = "sampling.keep"
+# Span attribute carrying the head sampling decision of the trace
+HEAD_SAMPLED_ATTRIBUTE = "sampling.head"
+# Header propagating the head sampling decision
+SAMPLED_HEADER = "X-B3-Sampled"
+
+
+def head_sample(rate: float) -> bool:
+    """Make the head sampling decision of a new trace."""
+    return random.random() < rate
+
+
+def parse_sampled_header(headers: Any) -> bool | None:
+    """Read a propagated head sampling decision, None if there is none."""
+    value = headers.get(SAMPLED_HEADER)
+    if value is None:
+        return None
+    return value.lower() in ("1", "true")
+
+
+def keep_current_trace(reason: str) -> None:
+    """Ask the tail sampler to export the current trace."""
+    trace.get_current_span().set_attribute(KEEP_ATTRIBUTE, reason)
+
+
+class _TraceBuffer:
+    __slots__ = ("spans", "keep", "started_at")
+
+    def __init__(self, max_spans: int):
+        self.spans: deque[ReadableSpan] = deque(maxlen=max_spans)
+        self.keep: str | None = None
+        self.started_at: int | None = None
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Span processor exporting only the traces worth keeping.
+
+    Finished spans are buffered per trace in a bounded ring of traces. When the
+    ring is full the oldest incomplete trace is decided early: it is kept if it
+    is already marked or already slower than the latency threshold, which is
+    the long-running request this processor exists for, and dropped otherwise.
+    Spans that end after their trace was decided follow the decision.
+    """
+
+    def __init__(
+        self,
+        processor: SpanProcessor,
+        latency_threshold_ms: float = 2000.0,
+        sample_rate: float = 0.01,
+        max_traces: int = 2048,
+        max_spans_per_trace: int = 256,
+    ):
+        """Initialize tail sampling processor.
+
+        Args:
+            processor: Processor of the kept spans (usually a BatchSpanProcessor)
+            latency_threshold_ms: Traces whose root takes longer are kept
+            sample_rate: Share of the remaining traces kept when no head decision
+                was recorded on the root span
+            max_traces: Maximum number of traces buffered at once
+            max_spans_per_trace: Maximum number of spans buffered per trace
+        """
+        self.processor = processor
+        self.latency_threshold_ns = latency_threshold_ms * 1_000_000
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[int, _TraceBuffer]" = OrderedDict()
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"kept": 0, "dropped": 0, "evicted": 0}
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self.processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        kept: list[ReadableSpan] = []
+
+        with self._lock:
+            decided = self._decided.get(trace_id)
+            if decided is not None:
+                if decided:
+                    kept.append(span)
+            else:
+                buffer = self._traces.get(trace_id)
+                if buffer is None:
+                    buffer = self._traces[trace_id] = _TraceBuffer(self.max_spans_per_trace)
+                    if len(self._traces) > self.max_traces:
+                        kept.extend(self._evict_oldest(span.end_time))
+                buffer.spans.append(span)
+                if buffer.started_at is None or span.start_time < buffer.started_at:
+                    buffer.started_at = span.start_time
+                if buffer.keep is None:
+                    buffer.keep = self._keep_reason(span)
+
+                # The local root ending completes the trace in this process
+                if span.parent is None or span.parent.is_remote:
+                    del self._traces[trace_id]
+                    reason = buffer.keep or self._root_reason(span)
+                    self._decide(trace_id, reason is not None)
+                    if reason is not None:
+                        kept.extend(buffer.spans)
+
+        for item in kept:
+            self.processor.on_end(item)
+
+    def _evict_oldest(self, now: int) -> list[ReadableSpan]:
+        """Decide the oldest incomplete trace to make room; returns its spans if kept."""
+        trace_id, buffer = self._traces.popitem(last=False)
+        self.stats["evicted"] += 1
+        reason = buffer.keep
+        if reason is None and now - buffer.started_at >= self.latency_threshold_ns:
+            reason = "latency"
+        self._decide(trace_id, reason is not None)
+        return list(buffer.spans) if reason is not None else []
+
+    def _keep_reason(self, span: ReadableSpan) -> str | None:
+        if span.status.status_code is StatusCode.ERROR:
+            return "error"
+        reason = span.attributes.get(KEEP_ATTRIBUTE) if span.attributes else None
+        return str(reason) if reason else None
+
+    def _root_reason(self, root: ReadableSpan) -> str | None:
+        if root.end_time - root.start_time >= self.latency_threshold_ns:
+            return "latency"
+
+        sampled = root.attributes.get(HEAD_SAMPLED_ATTRIBUTE) if root.attributes else None
+        if sampled is None:
+            # Same decision in every service without any propagation
+            sampled = (root.context.trace_id & 0xFFFFFFFFFFFFFFFF) < self.sample_rate * 2**64
+        return "sampled" if sampled else None
+
+    def _decide(self, trace_id: int, keep: bool):
+        self.stats["kept" if keep else "dropped"] += 1
+        self._decided[trace_id] = keep
+        if len(self._decided) > self.max_traces * 4:
+            self._decided.popitem(last=False)
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.processor.force_flush(timeout_millis)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get sampling statistics."""
+        with self._lock:
+            return {"buffered_traces": len(self._traces), **self.stats}
@@ -11,9 +11,17 @@ from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
 
 from chatbot_ai_system.config.settings import settings
 from chatbot_ai_system.telemetry.logger import get_logger
+from chatbot_ai_system.telemetry.sampling import (
+    HEAD_SAMPLED_ATTRIBUTE,
+    SAMPLED_HEADER,
+    TailSamplingSpanProcessor,
+    head_sample,
+    parse_sampled_header,
+)
 
 logger = get_logger(__name__)
 
@@ -31,6 +39,7 @@ class SpanContext:
     tags: Dict[str, Any] = field(default_factory=dict)
     logs: List[Dict[str, Any]] = field(default_factory=list)
     status: str = "ok"
+    sampled: bool = False  # head sampling decision, shared by the whole trace
     span: Any = None  # OpenTelemetry span object
 
 
@@ -41,6 +50,8 @@ class TracingManager:
         """Initialize tracing manager."""
         self.enabled = getattr(settings, 'JAEGER_ENABLED', False)
         self.tracer = None
+        self.sample_rate = getattr(settings, 'TRACE_SAMPLE_RATE', 0.01)
+        self.sampler: Optional[TailSamplingSpanProcessor] = None
         self._active_spans: Dict[str, SpanContext] = {}
 
         if self.enabled:
@@ -56,14 +67,20 @@ class TracingManager:
                 }
             )
 
-            provider = TracerProvider(resource=resource)
+            # Record every span; the tail sampler decides what is exported
+            provider = TracerProvider(resource=resource, sampler=ALWAYS_ON)
 
             jaeger_exporter = JaegerExporter(
                 agent_host_name=getattr(settings, 'JAEGER_AGENT_HOST', 'localhost'),
                 agent_port=getattr(settings, 'JAEGER_AGENT_PORT', 6831),
             )
 
-            provider.add_span_processor(BatchSpanProcessor(jaeger_exporter))
+            self.sampler = TailSamplingSpanProcessor(
+                BatchSpanProcessor(jaeger_exporter),
+                latency_threshold_ms=getattr(settings, 'TRACE_LATENCY_THRESHOLD_MS', 2000.0),
+                sample_rate=self.sample_rate,
+            )
+            provider.add_span_processor(self.sampler)
             trace.set_tracer_provider(provider)
 
             self.tracer = trace.get_tracer(__name__)
@@ -94,6 +111,7 @@ class TracingManager:
             parent_span_id=parent_span.span_id if parent_span else None,
             operation=operation,
             tags=tags or {},
+            sampled=parent_span.sampled if parent_span else head_sample(self.sample_rate),
         )
 
         self._active_spans[span_context.span_id] = span_context
@@ -101,6 +119,7 @@ class TracingManager:
         try:
             if self.tracer:
                 with self.tracer.start_as_current_span(operation) as span:
+                    span.set_attribute(HEAD_SAMPLED_ATTRIBUTE, span_context.sampled)
                     if tags:
                         for key, value in tags.items():
                             span.set_attribute(key, str(value))
@@ -160,6 +179,7 @@ class TracingManager:
                 headers["X-B3-SpanId"] = span.span_id
                 if span.parent_span_id:
                     headers["X-B3-ParentSpanId"] = span.parent_span_id
+                headers[SAMPLED_HEADER] = "1" if span.sampled else "0"
 
         return headers
 
@@ -170,10 +190,12 @@ class TracingManager:
         parent_span_id = headers.get("X-B3-ParentSpanId")
 
         if trace_id:
+            sampled = parse_sampled_header(headers)
             return SpanContext(
                 trace_id=trace_id,
                 span_id=span_id or str(uuid.uuid4()),
                 parent_span_id=parent_span_id,
+                sampled=head_sample(self.sample_rate) if sampled is None else sampled,
             )
 
         return None
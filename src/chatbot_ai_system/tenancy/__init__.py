@@ -1,17 +1,24 @@
 """Multi-tenant components for the AI Chat Platform."""
 
 
+from .claim_cache import VerifiedClaimCache
 from .isolation_manager import CrossTenantValidator, IsolationManager
 from ..core.tenancy.rate_limiter import DistributedRateLimiter, TenantRateLimiter
-from .tenant_middleware import TenantContextManager, TenantMiddleware
+from .quota_engine import QuotaEngine
+from .tenant_middleware import TenantContextManager, TenantMiddleware, require_tenant_context
+from .usage_rollup import UsageRollupStore
 from .usage_tracker import UsageTracker
 
 __all__ = [
     "TenantMiddleware",
     "TenantContextManager",
+    "require_tenant_context",
+    "QuotaEngine",
+    "VerifiedClaimCache",
     "TenantRateLimiter",
     "DistributedRateLimiter",
     "UsageTracker",
+    "UsageRollupStore",
     "IsolationManager",
     "CrossTenantValidator",
 ]
@@ -0,0 +1,128 @@
+"""Cache of verified JWT claims so repeated bearers skip signature verification."""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedClaims:
+    """Tenant context of a verified token."""
+
+    context: Optional[Dict[str, Any]]  # None: verified but rejected (revoked, no tenant)
+    expires_at: float  # epoch seconds, never later than the token's ``exp``
+    jti: Optional[str] = None
+    revocation_checked_at: float = 0.0
+
+
+class VerifiedClaimCache:
+    """Bounded LRU of verified claims keyed by the SHA-256 digest of the token.
+
+    Entries live until the earlier of the token's ``exp`` and ``max_ttl`` seconds
+    after verification, so an expired token is always verified (and rejected)
+    again. The raw token is never stored.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_ttl: float = 300.0):
+        """Initialize claim cache.
+
+        Args:
+            max_entries: Maximum number of cached tokens
+            max_ttl: Maximum seconds a verification is trusted
+        """
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, CachedClaims]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """Get the cache key of a token."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, digest: bytes, now: Optional[float] = None) -> Optional[CachedClaims]:
+        """Get the cached verification of a token.
+
+        Args:
+            digest: Token digest
+            now: Current time (epoch seconds)
+
+        Returns:
+            Cached entry, or None if absent or expired
+        """
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        now = time.time() if now is None else now
+        if entry.expires_at <= now:
+            del self._entries[digest]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(
+        self,
+        digest: bytes,
+        context: Optional[Dict[str, Any]],
+        exp: Optional[float],
+        jti: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> CachedClaims:
+        """Cache the verification of a token.
+
+        Args:
+            digest: Token digest
+            context: Tenant context, or None to remember a rejection
+            exp: Token expiry (epoch seconds)
+            jti: Token identifier
+            now: Current time (epoch seconds)
+
+        Returns:
+            The cached entry
+        """
+        now = time.time() if now is None else now
+        expires_at = now + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+
+        entry = CachedClaims(
+            context=context, expires_at=expires_at, jti=jti, revocation_checked_at=now
+        )
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, token: str):
+        """Forget a token, e.g. after it was revoked."""
+        if self._entries.pop(self.digest(token), None) is not None:
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        """Forget every token."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get claim cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
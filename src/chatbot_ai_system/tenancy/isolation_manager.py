@@ -1,21 +1,83 @@
 """Data isolation manager for multi-tenant architecture."""
 
 import logging
+import time
+from collections.abc import Iterable
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import and_, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Query
 
 logger = logging.getLogger(__name__)
 
+# Map resource types to models in chatbot_ai_system.database.models
+RESOURCE_MODELS = {
+    "chat": "Chat",
+    "message": "Message",
+    "user": "User",
+    "document": "Document",
+}
+
+_resource_models: dict[str, Any] | None = None
+
+
+def get_resource_models() -> dict[str, Any]:
+    """Resolve the model class of every resource type (once per process).
+
+    Returns:
+        Model classes keyed by resource type; types without a model are omitted
+    """
+    global _resource_models
+    if _resource_models is None:
+        resolved: dict[str, Any] = {}
+        try:
+            from chatbot_ai_system.database import models
+
+            for resource_type, model_name in RESOURCE_MODELS.items():
+                model_class = getattr(models, model_name, None)
+                if model_class is None:
+                    logger.warning(f"No model for resource type: {resource_type}")
+                    continue
+                resolved[resource_type] = model_class
+        except ImportError as e:
+            logger.error(f"Failed to resolve resource models: {e}")
+        _resource_models = resolved
+    return _resource_models
+
 
 class IsolationManager:
-    """Manages data isolation between tenants."""
+    """Manages data isolation between tenants.
+
+    Access checks are batched: the resources of one type are validated with a
+    single query, and granted checks are remembered for ``access_cache_ttl``
+    seconds, so an instance scoped to a request answers repeated checks without
+    touching the database. Denials are never cached.
+    """
 
-    def __init__(self, db_session: AsyncSession):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        resource_models: dict[str, Any] | None = None,
+        access_cache_ttl: float = 5.0,
+        max_batch_size: int = 1000,
+    ):
+        """Initialize isolation manager.
+
+        Args:
+            db_session: Database session
+            resource_models: Model classes keyed by resource type (resolved when omitted)
+            access_cache_ttl: Seconds a granted access check is remembered
+            max_batch_size: Maximum resource ids per query
+        """
         self.db = db_session
+        self.resource_models = (
+            resource_models if resource_models is not None else get_resource_models()
+        )
+        self.access_cache_ttl = access_cache_ttl
+        self.max_batch_size = max_batch_size
+        self._granted: dict[tuple[str, str, Any], float] = {}
 
     def apply_tenant_filter(self, query: Query, tenant_id: str, model_class: Any) -> Query:
         """Apply tenant filter to database query.
@@ -45,38 +107,67 @@ class IsolationManager:
         Returns:
             True if access is allowed
         """
-        try:
-            # Map resource types to models
-            resource_models = {
-                "chat": "Chat",
-                "message": "Message",
-                "user": "User",
-                "document": "Document",
-            }
-
-            model_name = resource_models.get(resource_type)
-            if not model_name:
-                logger.warning(f"Unknown resource type: {resource_type}")
-                return False
+        results = await self.validate_tenant_access_many(tenant_id, resource_type, [resource_id])
+        return results[resource_id]
 
-            # Dynamic model import
-            from api import models
+    async def validate_tenant_access_many(
+        self, tenant_id: str, resource_type: str, resource_ids: Iterable[Any]
+    ) -> dict[Any, bool]:
+        """Validate tenant access to many resources of one type.
 
-            model_class = getattr(models, model_name)
+        Args:
+            tenant_id: Tenant identifier
+            resource_type: Type of resource
+            resource_ids: Resource identifiers
 
-            # Check if resource belongs to tenant
-            result = await self.db.execute(
-                select(model_class).where(
-                    and_(model_class.id == resource_id, model_class.tenant_id == tenant_id)
+        Returns:
+            Access decision keyed by resource id
+        """
+        results = {resource_id: False for resource_id in resource_ids}
+        model_class = self.resource_models.get(resource_type)
+        if model_class is None:
+            logger.warning(f"Unknown resource type: {resource_type}")
+            return results
+
+        now = time.monotonic()
+        pending = []
+        for resource_id in results:
+            granted_at = self._granted.get((tenant_id, resource_type, resource_id))
+            if granted_at is not None and now - granted_at < self.access_cache_ttl:
+                results[resource_id] = True
+            else:
+                pending.append(resource_id)
+
+        for start in range(0, len(pending), self.max_batch_size):
+            batch = pending[start : start + self.max_batch_size]
+            try:
+                # Check which resources belong to tenant
+                result = await self.db.execute(
+                    self._owned_resources_query(model_class, tenant_id, batch)
                 )
-            )
+                owned = {str(resource_id) for resource_id in result.scalars()}
+            except Exception as e:
+                logger.error(f"Failed to validate tenant access: {e}")
+                continue
 
-            resource = result.scalar_one_or_none()
-            return resource is not None
+            for resource_id in batch:
+                if str(resource_id) in owned:
+                    results[resource_id] = True
+                    self._granted[(tenant_id, resource_type, resource_id)] = now
 
-        except Exception as e:
-            logger.error(f"Failed to validate tenant access: {e}")
-            return False
+        return results
+
+    def _owned_resources_query(self, model_class: Any, tenant_id: str, resource_ids: list):
+        """Build the query selecting the ids among ``resource_ids`` owned by the tenant."""
+        query = select(model_class.id).where(model_class.id.in_(resource_ids))
+        if hasattr(model_class, "tenant_id"):
+            return query.where(model_class.tenant_id == tenant_id)
+
+        # Messages belong to the tenant of their conversation
+        chat_class = self.resource_models["chat"]
+        return query.join(chat_class, model_class.conversation_id == chat_class.id).where(
+            chat_class.tenant_id == tenant_id
+        )
 
     async def create_tenant_namespace(
         self, tenant_id: str, namespace_config: dict[str, Any]
@@ -0,0 +1,353 @@
+"""Atomic tenant quota engine with per-process quota leases."""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Request limits per tier, built once
+TIER_LIMITS: Dict[str, Dict[str, int]] = {
+    "basic": {
+        "requests_per_minute": 60,
+        "requests_per_hour": 1000,
+        "tokens_per_day": 100000,
+        "concurrent_connections": 5,
+    },
+    "professional": {
+        "requests_per_minute": 300,
+        "requests_per_hour": 10000,
+        "tokens_per_day": 1000000,
+        "concurrent_connections": 20,
+    },
+    "enterprise": {
+        "requests_per_minute": 1000,
+        "requests_per_hour": 50000,
+        "tokens_per_day": 10000000,
+        "concurrent_connections": 100,
+    },
+}
+
+# Grants up to ARGV[3] requests against both windows, or nothing.
+# KEYS: minute counter, hour counter
+# ARGV: minute limit, hour limit, requested, minute ttl, hour ttl
+# Returns {granted, minute_used, hour_used, limited_by (0 none, 1 minute, 2 hour)}
+QUOTA_SCRIPT = """
+local minute_limit = tonumber(ARGV[1])
+local hour_limit = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local minute_used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local hour_used = tonumber(redis.call('GET', KEYS[2]) or '0')
+
+local granted = math.min(requested, minute_limit - minute_used, hour_limit - hour_used)
+if granted <= 0 then
+    local limited_by = 2
+    if minute_used >= minute_limit then
+        limited_by = 1
+    end
+    return {0, minute_used, hour_used, limited_by}
+end
+
+minute_used = redis.call('INCRBY', KEYS[1], granted)
+if minute_used == granted then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+hour_used = redis.call('INCRBY', KEYS[2], granted)
+if hour_used == granted then
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+end
+return {granted, minute_used, hour_used, 0}
+"""
+
+# Gives back up to ARGV[1] unused tokens to a counter that still exists. A
+# counter that expired is left alone, so no key without a TTL is created.
+# KEYS: hour counter
+# Returns the number of tokens returned
+RETURN_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local returned = math.min(tonumber(ARGV[1]), used)
+if returned <= 0 then
+    return 0
+end
+redis.call('DECRBY', KEYS[1], returned)
+return returned
+"""
+
+
+@dataclass
+class QuotaLease:
+    """Slice of a tenant's quota borrowed by this process for one minute window."""
+
+    minute_window: int
+    hour_window: int
+    tokens: int = 0
+    size: int = 1  # slice requested on the next refill
+    minute_remaining: int = 0  # remaining in Redis after the last refill
+    denied_reason: Optional[str] = None  # quota exhausted for the rest of the window
+
+
+class QuotaEngine:
+    """Minute and hour request quotas per tenant and endpoint.
+
+    Both windows are checked and incremented in one Lua call (run with
+    ``EVALSHA``), so concurrent requests cannot overshoot a limit. Tenants that
+    keep exhausting their lease within a window borrow progressively larger
+    slices (up to ``max_lease_fraction`` of the minute limit) and are then
+    admitted from the local lease without touching Redis; once Redis rejects a
+    tenant, further requests in that minute are rejected locally too. Tokens left in a
+    lease when its window ends are returned to the hour counter in the
+    background. Usage tracking counters are aggregated locally and written in
+    one pipeline every ``flush_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_lease_fraction: float = 0.1,
+        flush_interval: float = 1.0,
+        fail_open: bool = True,
+    ):
+        """Initialize quota engine.
+
+        Args:
+            redis_client: Async Redis client, created from settings when omitted
+            max_lease_fraction: Largest lease as a fraction of the minute limit
+            flush_interval: Seconds between usage counter flushes
+            fail_open: Allow requests when Redis is unavailable
+        """
+        self._redis = redis_client
+        self.max_lease_fraction = max_lease_fraction
+        self.flush_interval = flush_interval
+        self.fail_open = fail_open
+
+        self._script = None
+        self._return_script = None
+        self._window = 0
+        self.leases: Dict[Tuple[str, str], QuotaLease] = {}
+        self.usage: Dict[str, int] = defaultdict(int)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._background: set = set()
+
+        self.stats = {
+            "checks": 0,
+            "lease_hits": 0,
+            "redis_calls": 0,
+            "denied": 0,
+            "returned_tokens": 0,
+            "errors": 0,
+        }
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as async_redis
+
+            from chatbot_ai_system.config.settings import settings
+
+            self._redis = async_redis.from_url(settings.redis_url)
+        return self._redis
+
+    @staticmethod
+    def get_tier_limits(tier: str) -> Dict[str, int]:
+        """Get the limits of a tier (basic for unknown tiers)."""
+        return TIER_LIMITS.get(tier, TIER_LIMITS["basic"])
+
+    async def check(
+        self, tenant_id: str, endpoint: str, tier: str, now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Admit one request against the tenant's minute and hour quotas.
+
+        Args:
+            tenant_id: Tenant identifier
+            endpoint: API endpoint being accessed
+            tier: Tenant tier level
+            now: Current time (epoch seconds)
+
+        Returns:
+            ``allowed``, ``remaining`` and, when denied, ``reason``
+        """
+        self.stats["checks"] += 1
+        limits = self.get_tier_limits(tier)
+        now = time.time() if now is None else now
+        minute_window = int(now // 60)
+        hour_window = int(now // 3600)
+
+        if minute_window != self._window:
+            self._expire_leases(minute_window)
+
+        key = (tenant_id, endpoint)
+        lease = self.leases.get(key)
+        if lease is not None and lease.minute_window != minute_window:
+            self._return_tokens(tenant_id, endpoint, lease)
+            lease = None
+        if lease is None:
+            lease = QuotaLease(minute_window=minute_window, hour_window=hour_window)
+            self.leases[key] = lease
+
+        if lease.tokens > 0:
+            lease.tokens -= 1
+            self.stats["lease_hits"] += 1
+            return {"allowed": True, "remaining": lease.minute_remaining + lease.tokens}
+
+        if lease.denied_reason is not None:
+            # Already rejected by Redis in this window; do not ask again until it ends
+            self.stats["denied"] += 1
+            return {"allowed": False, "reason": lease.denied_reason, "remaining": 0}
+
+        # Lease exhausted within the window: borrow a larger slice next time
+        max_lease = max(int(limits["requests_per_minute"] * self.max_lease_fraction), 1)
+        requested = min(lease.size, max_lease)
+
+        try:
+            granted, minute_used, hour_used, limited_by = await self._acquire(
+                tenant_id, endpoint, minute_window, hour_window, limits, requested
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Quota check failed for tenant {tenant_id}: {e}")
+            return {"allowed": self.fail_open, "remaining": -1, "reason": "Quota check failed"}
+
+        if not granted:
+            self.stats["denied"] += 1
+            lease.size = 1
+            window, limit = (
+                ("minute", limits["requests_per_minute"])
+                if limited_by == 1
+                else ("hour", limits["requests_per_hour"])
+            )
+            lease.denied_reason = f"Exceeded {limit} requests per {window}"
+            return {"allowed": False, "reason": lease.denied_reason, "remaining": 0}
+
+        # Concurrent refills of the same lease both keep their grants
+        lease.tokens += granted - 1
+        lease.size = min(requested * 2, max_lease)
+        lease.minute_remaining = max(limits["requests_per_minute"] - minute_used, 0)
+        return {"allowed": True, "remaining": lease.minute_remaining + lease.tokens}
+
+    async def _acquire(
+        self,
+        tenant_id: str,
+        endpoint: str,
+        minute_window: int,
+        hour_window: int,
+        limits: Dict[str, int],
+        requested: int,
+    ) -> Tuple[int, int, int, int]:
+        """Run the quota script for one refill."""
+        if self._script is None:
+            self._script = self.redis.register_script(QUOTA_SCRIPT)
+
+        self.stats["redis_calls"] += 1
+        result = await self._script(
+            keys=[
+                self._key(tenant_id, endpoint, "minute", minute_window),
+                self._key(tenant_id, endpoint, "hour", hour_window),
+            ],
+            args=[
+                limits["requests_per_minute"],
+                limits["requests_per_hour"],
+                requested,
+                60,
+                3600,
+            ],
+        )
+        return tuple(int(value) for value in result)
+
+    @staticmethod
+    def _key(tenant_id: str, endpoint: str, window: str, index: int) -> str:
+        return f"rate_limit:{tenant_id}:{endpoint}:{window}:{index}"
+
+    def _expire_leases(self, minute_window: int):
+        """Drop leases of past windows so idle tenants do not accumulate."""
+        self._window = minute_window
+        stale = [key for key, lease in self.leases.items() if lease.minute_window < minute_window]
+        for key in stale:
+            self._return_tokens(*key, self.leases.pop(key))
+
+    def _return_tokens(self, tenant_id: str, endpoint: str, lease: QuotaLease):
+        """Give unused lease tokens back to the hour window in the background."""
+        if lease.tokens <= 0:
+            return
+        tokens = lease.tokens
+        lease.tokens = 0
+        key = self._key(tenant_id, endpoint, "hour", lease.hour_window)
+        self._spawn(self._decrement(key, tokens))
+
+    async def _decrement(self, key: str, tokens: int):
+        try:
+            if self._return_script is None:
+                self._return_script = self.redis.register_script(RETURN_SCRIPT)
+            returned = await self._return_script(keys=[key], args=[tokens])
+            self.stats["returned_tokens"] += int(returned)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to return {tokens} leased quota tokens to {key}: {e}")
+
+    def _spawn(self, coroutine):
+        try:
+            task = asyncio.get_running_loop().create_task(coroutine)
+        except RuntimeError:
+            coroutine.close()
+            return
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def track(self, tenant_id: str, endpoint: str, method: str):
+        """Count a request for usage analytics (written on the next flush).
+
+        Args:
+            tenant_id: Tenant identifier
+            endpoint: API endpoint
+            method: HTTP method
+        """
+        usage_key = f"usage:{tenant_id}:{datetime.utcnow().strftime('%Y-%m-%d')}"
+        self.usage[f"{usage_key}:{endpoint}:{method}"] += 1
+        self.usage[f"{usage_key}:total"] += 1
+
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                self._flush_task = None
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Write aggregated usage counters in one pipeline."""
+        if not self.usage:
+            return
+        usage, self.usage = self.usage, defaultdict(int)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, count in usage.items():
+                pipe.incrby(key, count)
+                pipe.expire(key, 86400)  # 24 hour TTL
+            await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to flush {len(usage)} tenant usage counters: {e}")
+
+    async def close(self):
+        """Return every outstanding lease and flush usage counters."""
+        for (tenant_id, endpoint), lease in list(self.leases.items()):
+            self._return_tokens(tenant_id, endpoint, lease)
+        self.leases.clear()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get quota engine statistics."""
+        checks = self.stats["checks"]
+        return {
+            **self.stats,
+            "leases": len(self.leases),
+            "lease_hit_rate": self.stats["lease_hits"] / checks if checks else 0.0,
+        }
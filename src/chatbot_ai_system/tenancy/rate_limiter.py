@@ -1,14 +1,68 @@
-"""Token bucket rate limiter for per-tenant rate limiting."""
+"""Per-tenant rate limiting with GCRA over a sharded, array-backed table.
+
+Each (tenant, resource) pair is one float in the table: its theoretical arrival
+time (TAT) under the generic cell rate algorithm, which is equivalent to a token
+bucket of the tier's capacity and refill rate. A check makes no awaits in local
+mode, so it is atomic on the event loop without a lock. Keys are sharded by
+tenant hash; each shard is bounded and reclaims slots of idle keys with a clock
+sweep. A key whose TAT is in the past is a full bucket, so evicting it loses no
+state.
+"""
 
-import asyncio
 import logging
 import time
+from array import array
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Bucket capacity and refill rate (tokens per second) per resource and tier
+RESOURCE_LIMITS: Dict[str, Dict[str, Dict[str, float]]] = {
+    "api_requests": {
+        "basic": {"capacity": 100, "refill_rate": 1.67},
+        "professional": {"capacity": 300, "refill_rate": 5.0},
+        "enterprise": {"capacity": 1000, "refill_rate": 16.67},
+    },
+    "tokens": {
+        "basic": {"capacity": 10000, "refill_rate": 166.67},
+        "professional": {"capacity": 50000, "refill_rate": 833.33},
+        "enterprise": {"capacity": 200000, "refill_rate": 3333.33},
+    },
+    "websocket_messages": {
+        "basic": {"capacity": 60, "refill_rate": 1.0},
+        "professional": {"capacity": 180, "refill_rate": 3.0},
+        "enterprise": {"capacity": 600, "refill_rate": 10.0},
+    },
+    "file_uploads": {
+        "basic": {"capacity": 10, "refill_rate": 0.167},
+        "professional": {"capacity": 50, "refill_rate": 0.833},
+        "enterprise": {"capacity": 200, "refill_rate": 3.33},
+    },
+}
+
+# GCRA for ``tokens`` units against one key, in milliseconds.
+# KEYS: TAT key. ARGV: now, emission interval, tolerance, tokens.
+# Returns {allowed, tat after the call}.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local emission = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tokens = tonumber(ARGV[4])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission * tokens
+if new_tat - now > tolerance then
+    return {0, tostring(tat)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {1, tostring(new_tat)}
+"""
+
 
 @dataclass
 class TokenBucket:
@@ -36,90 +90,292 @@ class TokenBucket:
         self.last_refill = now
 
 
+@dataclass(frozen=True)
+class TierLimit:
+    """Precomputed GCRA parameters of one resource and tier."""
+
+    capacity: int
+    refill_rate: float
+    emission_interval: float  # seconds per token
+    tolerance: float  # seconds of burst, capacity * emission_interval
+
+    def available(self, tat: float, now: float) -> float:
+        """Tokens available for a key with the given TAT."""
+        return (self.tolerance - max(tat - now, 0.0)) / self.emission_interval
+
+
+def _build_limits() -> Tuple[List[TierLimit], Dict[Tuple[str, str], int]]:
+    limits: List[TierLimit] = []
+    index: Dict[Tuple[str, str], int] = {}
+    for resource, tiers in RESOURCE_LIMITS.items():
+        for tier, limit in tiers.items():
+            capacity = int(limit["capacity"])
+            emission_interval = 1.0 / limit["refill_rate"]
+            index[(resource, tier)] = len(limits)
+            limits.append(
+                TierLimit(
+                    capacity=capacity,
+                    refill_rate=limit["refill_rate"],
+                    emission_interval=emission_interval,
+                    tolerance=capacity * emission_interval,
+                )
+            )
+    return limits, index
+
+
+TIER_LIMITS, _LIMIT_INDEX = _build_limits()
+
+
+def get_limit_id(resource: str, tier: str) -> int:
+    """Get the precomputed limit of a resource and tier.
+
+    Unknown resources use the ``api_requests`` limits and unknown tiers ``basic``.
+    """
+    limit_id = _LIMIT_INDEX.get((resource, tier))
+    if limit_id is None:
+        if resource not in RESOURCE_LIMITS:
+            resource = "api_requests"
+        limit_id = _LIMIT_INDEX.get((resource, tier), _LIMIT_INDEX[(resource, "basic")])
+    return limit_id
+
+
+class _Shard:
+    """Bounded slice of the TAT table for the tenants hashed to it."""
+
+    __slots__ = ("capacity", "index", "keys", "tat", "limit", "referenced", "free", "hand")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.index: Dict[str, Dict[str, int]] = {}
+        self.keys: List[Optional[Tuple[str, str]]] = []
+        self.tat = array("d")
+        self.limit = array("H")
+        self.referenced = bytearray()
+        self.free: List[int] = []
+        self.hand = 0
+
+    def __len__(self) -> int:
+        return len(self.keys) - len(self.free)
+
+    def lookup(self, tenant_id: str, resource: str) -> Optional[int]:
+        resources = self.index.get(tenant_id)
+        return None if resources is None else resources.get(resource)
+
+    def insert(self, tenant_id: str, resource: str, limit_id: int, now: float) -> Tuple[int, int]:
+        """Allocate a slot for a key; returns the slot and the number of evicted keys."""
+        evicted = 0
+        if self.free:
+            slot = self.free.pop()
+        elif len(self.keys) < self.capacity:
+            slot = len(self.keys)
+            self.keys.append(None)
+            self.tat.append(0.0)
+            self.limit.append(0)
+            self.referenced.append(0)
+        else:
+            slot = self._victim(now)
+            self.release(slot)
+            self.free.pop()
+            evicted = 1
+
+        self.keys[slot] = (tenant_id, resource)
+        self.tat[slot] = now
+        self.limit[slot] = limit_id
+        self.referenced[slot] = 1
+        self.index.setdefault(tenant_id, {})[resource] = slot
+        return slot, evicted
+
+    def _victim(self, now: float) -> int:
+        """Clock sweep for a slot to reuse, preferring idle unreferenced keys."""
+        size = len(self.keys)
+        for _ in range(2 * size):
+            slot = self.hand
+            self.hand = (slot + 1) % size
+            if self.referenced[slot]:
+                self.referenced[slot] = 0
+            elif self.tat[slot] <= now:
+                return slot
+        # Every key is mid-burst: give up the oldest position of the hand
+        slot = self.hand
+        self.hand = (slot + 1) % size
+        return slot
+
+    def sweep(self, now: float, steps: int) -> int:
+        """Advance the clock hand, releasing idle keys not used since the last pass."""
+        size = len(self.keys)
+        released = 0
+        for _ in range(min(steps, size)):
+            slot = self.hand
+            self.hand = (slot + 1) % size
+            if self.keys[slot] is None:
+                continue
+            if self.referenced[slot]:
+                self.referenced[slot] = 0
+            elif self.tat[slot] <= now:
+                self.release(slot)
+                released += 1
+        return released
+
+    def release(self, slot: int):
+        tenant_id, resource = self.keys[slot]
+        resources = self.index[tenant_id]
+        del resources[resource]
+        if not resources:
+            del self.index[tenant_id]
+        self.keys[slot] = None
+        self.referenced[slot] = 0
+        self.free.append(slot)
+
+
 class TenantRateLimiter:
-    """Per-tenant rate limiter using token bucket algorithm."""
+    """Per-tenant rate limiter using GCRA (token bucket semantics).
+
+    With a ``redis_client`` the limiter runs in distributed mode: the TAT of a
+    key lives in Redis and is updated by one Lua call, and the local table keeps
+    the last TAT seen. Since a TAT never moves backwards, a request the local TAT
+    already rejects is rejected without a round trip. If Redis is unavailable the
+    local table decides.
+    """
 
-    def __init__(self) -> None:
-        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
-        self.lock = asyncio.Lock()
+    def __init__(
+        self,
+        redis_client=None,
+        shards: int = 16,
+        max_keys: int = 200_000,
+        sweep_steps: int = 2,
+        key_prefix: str = "rate_limit:gcra",
+    ) -> None:
+        """Initialize tenant rate limiter.
+
+        Args:
+            redis_client: Async Redis client for distributed mode
+            shards: Number of shards (rounded up to a power of two)
+            max_keys: Maximum (tenant, resource) keys kept in memory
+            sweep_steps: Clock hand steps taken per check to release idle keys
+            key_prefix: Redis key prefix in distributed mode
+        """
+        shard_count = 1 << max(shards - 1, 0).bit_length()
+        self._mask = shard_count - 1
+        self.shards = [_Shard(max(max_keys // shard_count, 1)) for _ in range(shard_count)]
+        self.sweep_steps = sweep_steps
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = None
+        self.stats = {
+            "checks": 0,
+            "denied": 0,
+            "evictions": 0,
+            "released": 0,
+            "redis_calls": 0,
+            "local_denials": 0,
+            "errors": 0,
+        }
+
+    def _shard(self, tenant_id: str) -> _Shard:
+        return self.shards[hash(tenant_id) & self._mask]
 
     async def check_rate_limit(
         self, tenant_id: str, resource: str, tokens: int = 1, tier: str = "basic"
     ) -> Tuple[bool, Dict[str, Any]]:
         """Check if request is within rate limits."""
-        async with self.lock:
-            bucket = self._get_or_create_bucket(tenant_id, resource, tier)
-            allowed = bucket.consume(tokens)
+        self.stats["checks"] += 1
+        now = time.time()
+        shard = self._shard(tenant_id)
+        limit_id = get_limit_id(resource, tier)
+        limit = TIER_LIMITS[limit_id]
+
+        slot = shard.lookup(tenant_id, resource)
+        if slot is None:
+            slot, evicted = shard.insert(tenant_id, resource, limit_id, now)
+            self.stats["evictions"] += evicted
+        else:
+            shard.referenced[slot] = 1
+            shard.limit[slot] = limit_id  # follow tier changes
+        self.stats["released"] += shard.sweep(now, self.sweep_steps)
+
+        tat = max(shard.tat[slot], now)
+        new_tat = tat + tokens * limit.emission_interval
+        allowed = new_tat - now <= limit.tolerance
+
+        if allowed and self.redis_client is not None:
+            try:
+                allowed, tat = await self._check_distributed(tenant_id, resource, limit, tokens)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Distributed rate limit check failed for {tenant_id}: {e}")
+                # Fall back to the local decision, which must then hold the TAT
+                slot = shard.lookup(tenant_id, resource)
+                if slot is not None:
+                    shard.tat[slot] = new_tat
+            else:
+                # The shard may have reused the slot while awaiting
+                slot = shard.lookup(tenant_id, resource)
+                if slot is not None:
+                    shard.tat[slot] = tat
+                now = time.time()
+                new_tat = tat if allowed else max(tat, now) + tokens * limit.emission_interval
+        elif not allowed and self.redis_client is not None:
+            self.stats["local_denials"] += 1
+
+        if allowed:
+            if self.redis_client is None:
+                shard.tat[slot] = new_tat
+            tokens_remaining = limit.available(new_tat, now)
             wait_time = 0.0
-            if not allowed:
-                tokens_needed = tokens - bucket.tokens
-                wait_time = tokens_needed / bucket.refill_rate
-
-            metadata = {
-                "tokens_remaining": int(bucket.tokens),
-                "capacity": bucket.capacity,
-                "refill_rate": bucket.refill_rate,
-                "wait_time_seconds": wait_time,
-                "retry_after": (
-                    datetime.utcnow() + timedelta(seconds=wait_time) if wait_time > 0 else None
-                ),
-            }
-            return allowed, metadata
-
-    def _get_or_create_bucket(self, tenant_id: str, resource: str, tier: str) -> TokenBucket:
-        """Get or create token bucket for tenant/resource."""
-        if tenant_id not in self.buckets:
-            self.buckets[tenant_id] = {}
-
-        if resource not in self.buckets[tenant_id]:
-            limits = self._get_resource_limits(resource, tier)
-            capacity = int(limits["capacity"])
-            self.buckets[tenant_id][resource] = TokenBucket(
-                capacity=capacity,
-                refill_rate=limits["refill_rate"],
-                tokens=float(capacity),
-                last_refill=time.time(),
-            )
-        return self.buckets[tenant_id][resource]
-
-    def _get_resource_limits(self, resource: str, tier: str) -> Dict[str, float]:
-        """Get rate limits for resource and tier."""
-        limits = {
-            "api_requests": {
-                "basic": {"capacity": 100, "refill_rate": 1.67},
-                "professional": {"capacity": 300, "refill_rate": 5.0},
-                "enterprise": {"capacity": 1000, "refill_rate": 16.67},
-            },
-            "tokens": {
-                "basic": {"capacity": 10000, "refill_rate": 166.67},
-                "professional": {"capacity": 50000, "refill_rate": 833.33},
-                "enterprise": {"capacity": 200000, "refill_rate": 3333.33},
-            },
-            "websocket_messages": {
-                "basic": {"capacity": 60, "refill_rate": 1.0},
-                "professional": {"capacity": 180, "refill_rate": 3.0},
-                "enterprise": {"capacity": 600, "refill_rate": 10.0},
-            },
-            "file_uploads": {
-                "basic": {"capacity": 10, "refill_rate": 0.167},
-                "professional": {"capacity": 50, "refill_rate": 0.833},
-                "enterprise": {"capacity": 200, "refill_rate": 3.33},
-            },
+        else:
+            self.stats["denied"] += 1
+            tokens_remaining = limit.available(new_tat - tokens * limit.emission_interval, now)
+            wait_time = new_tat - now - limit.tolerance
+
+        metadata = {
+            "tokens_remaining": max(int(tokens_remaining), 0),
+            "capacity": limit.capacity,
+            "refill_rate": limit.refill_rate,
+            "wait_time_seconds": wait_time,
+            "retry_after": (
+                datetime.utcnow() + timedelta(seconds=wait_time) if wait_time > 0 else None
+            ),
         }
-        resource_limits = limits.get(resource, limits["api_requests"])
-        return resource_limits.get(tier, resource_limits["basic"])
+        return allowed, metadata
+
+    async def _check_distributed(
+        self, tenant_id: str, resource: str, limit: TierLimit, tokens: int
+    ) -> Tuple[bool, float]:
+        """Run GCRA in Redis; returns the decision and the key's TAT (epoch seconds)."""
+        if self._script is None:
+            self._script = self.redis_client.register_script(GCRA_SCRIPT)
+
+        self.stats["redis_calls"] += 1
+        allowed, tat_ms = await self._script(
+            keys=[f"{self.key_prefix}:{{{tenant_id}}}:{resource}"],
+            args=[
+                time.time() * 1000,
+                limit.emission_interval * 1000,
+                limit.tolerance * 1000,
+                tokens,
+            ],
+        )
+        return bool(int(allowed)), float(tat_ms) / 1000
 
     async def get_tenant_status(self, tenant_id: str) -> Dict[str, Dict[str, Any]]:
         """Get current rate limit status for tenant."""
-        async with self.lock:
-            if tenant_id not in self.buckets:
-                return {}
-            status = {}
-            for resource, bucket in self.buckets[tenant_id].items():
-                bucket.refill()
-                status[resource] = {
-                    "tokens_available": int(bucket.tokens),
-                    "capacity": bucket.capacity,
-                    "refill_rate": bucket.refill_rate,
-                }
-            return status
+        shard = self._shard(tenant_id)
+        now = time.time()
+        status = {}
+        for resource, slot in shard.index.get(tenant_id, {}).items():
+            limit = TIER_LIMITS[shard.limit[slot]]
+            status[resource] = {
+                "tokens_available": int(limit.available(shard.tat[slot], now)),
+                "capacity": limit.capacity,
+                "refill_rate": limit.refill_rate,
+            }
+        return status
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limiter statistics."""
+        return {
+            **self.stats,
+            "keys": sum(len(shard) for shard in self.shards),
+            "tenants": sum(len(shard.index) for shard in self.shards),
+            "shards": len(self.shards),
+        }
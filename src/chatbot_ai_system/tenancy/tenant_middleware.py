@@ -1,24 +1,87 @@
 """Multi-tenant middleware with JWT context injection and quota validation."""
 
 import logging
+import time
 from datetime import datetime
 from typing import Any
 
 from fastapi import HTTPException, Request, status
 from fastapi.responses import JSONResponse
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from .claim_cache import VerifiedClaimCache
+from .quota_engine import QuotaEngine
+
 logger = logging.getLogger(__name__)
 
 
 class TenantMiddleware(BaseHTTPMiddleware):
-    """Middleware for multi-tenant context extraction and validation."""
+    """Middleware for multi-tenant context extraction and validation.
+
+    Verified tokens are cached by digest until their ``exp`` (see
+    ``VerifiedClaimCache``), so a bearer that is sent repeatedly costs one hash
+    lookup instead of a signature verification. When an ``AuthService`` is
+    given, cached tokens are checked against its revocation list at most every
+    ``revocation_check_interval`` seconds, and tokens it revokes are dropped from
+    the cache immediately.
+    """
+
+    def __init__(
+        self,
+        app,
+        secret_key: str | None,
+        algorithm: str = "HS256",
+        redis_client=None,
+        quota_engine: QuotaEngine | None = None,
+        public_key: Any = None,
+        auth_service=None,
+        claim_cache: VerifiedClaimCache | None = None,
+        revocation_check_interval: float = 30.0,
+    ):
+        """Initialize tenant middleware.
 
-    def __init__(self, app, secret_key: str, algorithm: str = "HS256"):
+        Args:
+            app: ASGI application
+            secret_key: HMAC secret (unused when ``public_key`` is given)
+            algorithm: JWT algorithm, e.g. HS256, RS256 or ES256
+            redis_client: Async Redis client for quotas
+            quota_engine: Quota engine, created from ``redis_client`` when omitted
+            public_key: Verification key for asymmetric algorithms (PEM or JWK)
+            auth_service: ``AuthService`` whose revocation list is honoured
+            claim_cache: Verified claim cache, created when omitted
+            revocation_check_interval: Seconds between revocation checks of a cached token
+        """
         super().__init__(app)
         self.secret_key = secret_key
         self.algorithm = algorithm
+        self.quota = quota_engine or QuotaEngine(redis_client)
+        self.claim_cache = claim_cache or VerifiedClaimCache()
+        self.auth_service = auth_service
+        self.revocation_check_interval = revocation_check_interval
+
+        # Parsed on first use, once, instead of on every decode
+        self._key = public_key if public_key is not None else secret_key
+        self._verification_key = self._key if isinstance(self._key, Key) else None
+
+        if auth_service is not None and hasattr(auth_service, "add_revocation_listener"):
+            auth_service.add_revocation_listener(self.claim_cache.invalidate)
+
+    @property
+    def verification_key(self) -> Key:
+        """Key tokens are verified with, parsed on first use.
+
+        Raises:
+            RuntimeError: If neither ``secret_key`` nor ``public_key`` was given
+        """
+        if self._verification_key is None:
+            if self._key is None:
+                raise RuntimeError(
+                    "TenantMiddleware cannot verify tokens: set secret_key or public_key"
+                )
+            self._verification_key = jwk.construct(self._key, self.algorithm)
+        return self._verification_key
 
     async def dispatch(self, request: Request, call_next):
         """Process request with tenant context."""
@@ -32,6 +95,7 @@ class TenantMiddleware(BaseHTTPMiddleware):
 
             if tenant_context:
                 # Inject tenant context into request state
+                request.state.tenant_context = tenant_context
                 request.state.tenant_id = tenant_context.get("tenant_id")
                 request.state.tenant_tier = tenant_context.get("tier", "basic")
                 request.state.user_id = tenant_context.get("user_id")
@@ -103,27 +167,41 @@ class TenantMiddleware(BaseHTTPMiddleware):
         else:
             token = auth_header.replace("Bearer ", "")
 
-        try:
-            # Decode JWT and extract claims
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-
-            # Extract tenant-specific claims
-            tenant_context = {
-                "tenant_id": payload.get("tenant_id"),
-                "user_id": payload.get("sub"),
-                "tier": payload.get("tier", "basic"),
-                "permissions": payload.get("permissions", []),
-                "preferences": payload.get("preferences", {}),
-                "exp": payload.get("exp"),
-            }
-
-            # Validate tenant_id exists
-            if not tenant_context["tenant_id"]:
-                logger.warning("JWT missing tenant_id claim")
+        now = time.time()
+        digest = self.claim_cache.digest(token)
+        entry = self.claim_cache.get(digest, now)
+        if entry is None:
+            entry = self._verify(token, digest, now)
+            if entry is None:
                 return None
+            if entry.context is not None:
+                await self._check_revocation(token, entry, now)
+        elif (
+            entry.context is not None
+            and now - entry.revocation_checked_at >= self.revocation_check_interval
+        ):
+            await self._check_revocation(token, entry, now)
+
+        if entry.context is None:
+            return None
+        return dict(entry.context)
 
-            return tenant_context
+    def _verify(self, token: str, digest: bytes, now: float):
+        """Verify a token and cache its tenant context.
 
+        Args:
+            token: Encoded JWT
+            digest: Token digest
+            now: Current time (epoch seconds)
+
+        Returns:
+            Cached entry, or None if the token is invalid
+        """
+        # A missing key is a configuration error, not an invalid token
+        verification_key = self.verification_key
+        try:
+            # Decode JWT and extract claims
+            payload = jwt.decode(token, verification_key, algorithms=[self.algorithm])
         except JWTError as e:
             logger.error(f"JWT validation error: {e}")
             return None
@@ -131,6 +209,46 @@ class TenantMiddleware(BaseHTTPMiddleware):
             logger.error(f"Failed to extract tenant context: {e}")
             return None
 
+        # Extract tenant-specific claims
+        tenant_context = {
+            "tenant_id": payload.get("tenant_id"),
+            "user_id": payload.get("sub"),
+            "tier": payload.get("tier", "basic"),
+            "permissions": payload.get("permissions", []),
+            "preferences": payload.get("preferences", {}),
+            "exp": payload.get("exp"),
+        }
+
+        # Validate tenant_id exists
+        if not tenant_context["tenant_id"]:
+            logger.warning("JWT missing tenant_id claim")
+            tenant_context = None
+
+        return self.claim_cache.put(
+            digest, tenant_context, payload.get("exp"), jti=payload.get("jti"), now=now
+        )
+
+    async def _check_revocation(self, token: str, entry, now: float):
+        """Reject a cached token if the auth service has revoked it.
+
+        Args:
+            token: Encoded JWT
+            entry: Cached claims of the token
+            now: Current time (epoch seconds)
+        """
+        if self.auth_service is None:
+            return
+        entry.revocation_checked_at = now
+        try:
+            revoked = await self.auth_service.is_token_revoked(token, jti=entry.jti)
+        except Exception as e:
+            # Keep serving the verified claims; the next interval checks again
+            logger.warning(f"Token revocation check failed: {e}")
+            return
+        if revoked:
+            logger.warning("Rejected revoked token")
+            entry.context = None
+
     async def _validate_quota(self, tenant_id: str, endpoint: str, tier: str) -> dict[str, Any]:
         """Validate tenant quotas before processing request.
 
@@ -142,43 +260,8 @@ class TenantMiddleware(BaseHTTPMiddleware):
         Returns:
             Quota validation result
         """
-        # Get tier-specific limits
-        tier_limits = self._get_tier_limits(tier)
-
-        # Check rate limits from cache
-        from chatbot_ai_system.api.core.cache.cache_manager import CacheManager
-
-        cache = CacheManager()
-
-        # Create rate limit key
-        rate_key = f"rate_limit:{tenant_id}:{endpoint}"
-        minute_key = f"{rate_key}:minute"
-        hour_key = f"{rate_key}:hour"
-
-        # Get current usage
-        minute_count = await cache.get(minute_key) or 0
-        hour_count = await cache.get(hour_key) or 0
-
-        # Check against limits
-        if minute_count >= tier_limits["requests_per_minute"]:
-            return {
-                "allowed": False,
-                "reason": f"Exceeded {tier_limits['requests_per_minute']} requests per minute",
-                "remaining": 0,
-            }
-
-        if hour_count >= tier_limits["requests_per_hour"]:
-            return {
-                "allowed": False,
-                "reason": f"Exceeded {tier_limits['requests_per_hour']} requests per hour",
-                "remaining": 0,
-            }
-
-        # Increment counters
-        await cache.increment(minute_key, ttl=60)
-        await cache.increment(hour_key, ttl=3600)
-
-        return {"allowed": True, "remaining": tier_limits["requests_per_minute"] - minute_count - 1}
+        # One atomic check of both windows, usually served from the local lease
+        return await self.quota.check(tenant_id, endpoint, tier)
 
     async def _track_request(self, tenant_id: str, endpoint: str, method: str):
         """Track API request for usage and billing.
@@ -189,21 +272,8 @@ class TenantMiddleware(BaseHTTPMiddleware):
             method: HTTP method
         """
         try:
-            # Track in cache for real-time analytics
-            from chatbot_ai_system.api.core.cache.cache_manager import CacheManager
-
-            cache = CacheManager()
-
-            # Create usage key
-            usage_key = f"usage:{tenant_id}:{datetime.utcnow().strftime('%Y-%m-%d')}"
-
-            # Track endpoint usage
-            endpoint_key = f"{usage_key}:{endpoint}:{method}"
-            await cache.increment(endpoint_key, ttl=86400)  # 24 hour TTL
-
-            # Track total daily requests
-            total_key = f"{usage_key}:total"
-            await cache.increment(total_key, ttl=86400)
+            # Aggregated locally and written to Redis in batches
+            self.quota.track(tenant_id, endpoint, method)
 
             # Log for audit trail
             logger.info(
@@ -222,28 +292,32 @@ class TenantMiddleware(BaseHTTPMiddleware):
         Returns:
             Rate limit configuration
         """
-        limits = {
-            "basic": {
-                "requests_per_minute": 60,
-                "requests_per_hour": 1000,
-                "tokens_per_day": 100000,
-                "concurrent_connections": 5,
-            },
-            "professional": {
-                "requests_per_minute": 300,
-                "requests_per_hour": 10000,
-                "tokens_per_day": 1000000,
-                "concurrent_connections": 20,
-            },
-            "enterprise": {
-                "requests_per_minute": 1000,
-                "requests_per_hour": 50000,
-                "tokens_per_day": 10000000,
-                "concurrent_connections": 100,
-            },
-        }
+        return QuotaEngine.get_tier_limits(tier)
+
+
+def require_tenant_context(request: Request) -> dict[str, Any]:
+    """FastAPI dependency returning the verified tenant context of a request.
+
+    The context is set by ``TenantMiddleware`` from a verified JWT only, never
+    from headers the client can choose.
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        Tenant context dictionary
 
-        return limits.get(tier, limits["basic"])
+    Raises:
+        HTTPException: 401 if the request has no verified tenant context
+    """
+    tenant_context = getattr(request.state, "tenant_context", None)
+    if not tenant_context:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Tenant context required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tenant_context
 
 
 class TenantContextManager:
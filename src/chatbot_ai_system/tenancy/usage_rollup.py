@@ -0,0 +1,453 @@
+"""Pre-aggregated usage rollups stored in Redis hashes."""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.quantile_sketch import DDSketch
+
+logger = logging.getLogger(__name__)
+
+# Key TTLs
+HOUR_RETENTION_DAYS = 3  # hour hashes live until compacted into days
+HOUR_TTL = 86400 * HOUR_RETENTION_DAYS
+DAY_TTL = 86400 * 70  # one hash per month, refreshed on every write
+MONTH_TTL = 86400 * 800  # one hash per year
+LATENCY_TTL = 86400 * 35
+
+# Moves one day's hourly counters into the month's day hash and deletes them,
+# atomically with respect to concurrent HINCRBYFLOAT writes.
+COMPACT_DAY_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+if #fields == 0 then
+    return 0
+end
+local totals = {}
+for i = 1, #fields, 2 do
+    local metric = string.match(fields[i], '^%d+:(.*)$')
+    if metric then
+        totals[metric] = (totals[metric] or 0) + tonumber(fields[i + 1])
+    end
+end
+for metric, total in pairs(totals) do
+    redis.call('HINCRBYFLOAT', KEYS[2], ARGV[1] .. ':' .. metric, total)
+end
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('DEL', KEYS[1])
+return #fields / 2
+"""
+
+# Recomputes a closed month's totals from its day hash (idempotent)
+COMPACT_MONTH_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+if #fields == 0 then
+    return 0
+end
+local totals = {}
+for i = 1, #fields, 2 do
+    local metric = string.match(fields[i], '^[%d-]+:(.*)$')
+    if metric then
+        totals[metric] = (totals[metric] or 0) + tonumber(fields[i + 1])
+    end
+end
+for metric, total in pairs(totals) do
+    redis.call('HSET', KEYS[2], ARGV[1] .. ':' .. metric, tostring(total))
+end
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return #fields / 2
+"""
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class UsageRollupStore:
+    """Per-tenant usage counters bucketed by hour, day and month.
+
+    Writes only touch the hour hash of the current day (``{date}`` key, fields
+    ``{hour}:{metric}``). Compaction folds closed days into a per-month day hash
+    (fields ``{date}:{metric}``) and closed months into a per-year month hash
+    (fields ``{YYYY-MM}:{metric}``), so any date range is read with one pipeline
+    of a handful of ``HGETALL`` calls instead of one ``GET`` per day and metric.
+
+    Latency samples are kept as per-day DDSketch hashes (one field per bucket),
+    which are merged with ``HINCRBY`` and stay at fixed size however many
+    requests are recorded. Keys carry the tenant id as a hash tag so one
+    tenant's rollups live on the same cluster slot.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        key_prefix: str = "rollup",
+        compaction_grace: timedelta = timedelta(hours=1),
+        sketch_accuracy: float = 0.01,
+    ):
+        """Initialize rollup store.
+
+        Args:
+            redis_client: Async Redis client
+            key_prefix: Prefix of all rollup keys
+            compaction_grace: Time after a day or month closes before it is compacted
+            sketch_accuracy: Relative accuracy of latency sketches
+        """
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.compaction_grace = compaction_grace
+        self.sketch_accuracy = sketch_accuracy
+
+        self._compact_day = None
+        self._compact_month = None
+        self._compaction_task: Optional[asyncio.Task] = None
+
+        self.stats = {"compactions": 0, "compacted_days": 0, "compacted_months": 0, "errors": 0}
+
+    # Keys
+
+    @property
+    def tenants_key(self) -> str:
+        return f"{self.key_prefix}:tenants"
+
+    def hour_key(self, tenant_id: str, day: date) -> str:
+        return f"{self.key_prefix}:{{{tenant_id}}}:hour:{day.isoformat()}"
+
+    def day_key(self, tenant_id: str, month: date) -> str:
+        return f"{self.key_prefix}:{{{tenant_id}}}:day:{month.strftime('%Y-%m')}"
+
+    def month_key(self, tenant_id: str, year: int) -> str:
+        return f"{self.key_prefix}:{{{tenant_id}}}:month:{year}"
+
+    def latency_key(self, tenant_id: str, day: date, endpoint: str) -> str:
+        return f"{self.key_prefix}:{{{tenant_id}}}:latency:{day.isoformat()}:{endpoint}"
+
+    def counter_location(self, tenant_id: str, metric: str, timestamp: datetime) -> Tuple[str, str]:
+        """Hash key and field a usage increment is written to.
+
+        Args:
+            tenant_id: Tenant identifier
+            metric: Metric name
+            timestamp: Event time
+
+        Returns:
+            ``(key, field)`` pair
+        """
+        return self.hour_key(tenant_id, timestamp.date()), f"{timestamp.hour}:{metric}"
+
+    # Writes
+
+    def queue_counters(self, pipe, counters: Dict[Tuple[str, str], float], tenants: Iterable[str]):
+        """Queue counter increments on a pipeline.
+
+        Args:
+            pipe: Redis pipeline
+            counters: Amounts keyed by ``counter_location``
+            tenants: Tenants the counters belong to
+        """
+        keys = set()
+        for (key, field), amount in counters.items():
+            pipe.hincrbyfloat(key, field, amount)
+            keys.add(key)
+        for key in keys:
+            pipe.expire(key, HOUR_TTL)
+        tenants = list(tenants)
+        if tenants:
+            pipe.sadd(self.tenants_key, *tenants)
+
+    def queue_sketch(self, pipe, key: str, sketch: DDSketch):
+        """Queue merging a latency sketch into its stored hash.
+
+        Args:
+            pipe: Redis pipeline
+            key: Latency key from ``latency_key``
+            sketch: Sketch holding the new samples
+        """
+        for field, value in sketch.to_fields().items():
+            if field == "sum":
+                pipe.hincrbyfloat(key, field, value)
+            else:
+                pipe.hincrby(key, field, int(value))
+        pipe.expire(key, LATENCY_TTL)
+
+    # Reads
+
+    def _recent_days(self, start: date, end: date, today: date) -> List[date]:
+        """Days in range whose hour hash may still exist."""
+        # The TTL is refreshed by the day's last write, so allow one extra day
+        horizon = today - timedelta(days=HOUR_RETENTION_DAYS + 1)
+        day = max(start, horizon)
+        days = []
+        while day <= end:
+            days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    async def read_days(
+        self, tenant_id: str, start: date, end: date, today: Optional[date] = None
+    ) -> Dict[date, Dict[str, float]]:
+        """Read per-day totals for a date range in one round trip.
+
+        Args:
+            tenant_id: Tenant identifier
+            start: First day (inclusive)
+            end: Last day (inclusive)
+            today: Current day, defaults to today in UTC
+
+        Returns:
+            Metric totals per day (days without usage map to an empty dict)
+        """
+        today = today or datetime.utcnow().date()
+        months = []
+        month = _month_start(start)
+        while month <= end:
+            months.append(month)
+            month = _next_month(month)
+        recent = self._recent_days(start, end, today)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for month in months:
+            pipe.hgetall(self.day_key(tenant_id, month))
+        for day in recent:
+            pipe.hgetall(self.hour_key(tenant_id, day))
+        results = await pipe.execute()
+
+        totals: Dict[date, Dict[str, float]] = {}
+        day = start
+        while day <= end:
+            totals[day] = defaultdict(float)
+            day += timedelta(days=1)
+
+        for fields in results[: len(months)]:
+            for raw_field, raw_value in (fields or {}).items():
+                day_str, _, metric = _decode(raw_field).partition(":")
+                day = date.fromisoformat(day_str)
+                if day in totals:
+                    totals[day][metric] += float(raw_value)
+
+        for day, fields in zip(recent, results[len(months) :]):
+            for raw_field, raw_value in (fields or {}).items():
+                _hour, _, metric = _decode(raw_field).partition(":")
+                totals[day][metric] += float(raw_value)
+
+        return {day: dict(metrics) for day, metrics in totals.items()}
+
+    async def read_hours(self, tenant_id: str, day: date) -> Dict[int, Dict[str, float]]:
+        """Read per-hour totals of a day that has not been compacted yet.
+
+        Args:
+            tenant_id: Tenant identifier
+            day: Day to read
+
+        Returns:
+            Metric totals per hour
+        """
+        fields = await self.redis.hgetall(self.hour_key(tenant_id, day))
+        hours: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for raw_field, raw_value in (fields or {}).items():
+            hour, _, metric = _decode(raw_field).partition(":")
+            hours[int(hour)][metric] += float(raw_value)
+        return {hour: dict(metrics) for hour, metrics in hours.items()}
+
+    async def read_total(
+        self, tenant_id: str, start: date, end: date, today: Optional[date] = None
+    ) -> Dict[str, float]:
+        """Read metric totals over a date range in one round trip.
+
+        Whole months that have been compacted are read from the month hash;
+        everything else is summed from day and hour hashes.
+
+        Args:
+            tenant_id: Tenant identifier
+            start: First day (inclusive)
+            end: Last day (inclusive)
+            today: Current day, defaults to today in UTC
+
+        Returns:
+            Metric totals
+        """
+        today = today or datetime.utcnow().date()
+        months = []
+        month = _month_start(start)
+        while month <= end:
+            months.append(month)
+            month = _next_month(month)
+        years = sorted({month.year for month in months})
+        recent = self._recent_days(start, end, today)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for year in years:
+            pipe.hgetall(self.month_key(tenant_id, year))
+        for month in months:
+            pipe.hgetall(self.day_key(tenant_id, month))
+        for day in recent:
+            pipe.hgetall(self.hour_key(tenant_id, day))
+        results = await pipe.execute()
+
+        month_totals: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for fields in results[: len(years)]:
+            for raw_field, raw_value in (fields or {}).items():
+                month_str, _, metric = _decode(raw_field).partition(":")
+                month_totals[month_str][metric] = float(raw_value)
+
+        totals: Dict[str, float] = defaultdict(float)
+        from_month_hash = set()
+        day_results = results[len(years) : len(years) + len(months)]
+        for month, fields in zip(months, day_results):
+            compacted = month_totals.get(month.strftime("%Y-%m"))
+            whole_month = start <= month and _next_month(month) - timedelta(days=1) <= end
+            if compacted and whole_month:
+                from_month_hash.add(month)
+                for metric, value in compacted.items():
+                    totals[metric] += value
+                continue
+            for raw_field, raw_value in (fields or {}).items():
+                day_str, _, metric = _decode(raw_field).partition(":")
+                if start <= date.fromisoformat(day_str) <= end:
+                    totals[metric] += float(raw_value)
+
+        for day, fields in zip(recent, results[len(years) + len(months) :]):
+            if _month_start(day) in from_month_hash:
+                continue
+            for raw_field, raw_value in (fields or {}).items():
+                _hour, _, metric = _decode(raw_field).partition(":")
+                totals[metric] += float(raw_value)
+
+        return dict(totals)
+
+    async def read_latency(self, tenant_id: str, endpoint: str, start: date, end: date) -> DDSketch:
+        """Read the merged latency sketch of an endpoint over a date range.
+
+        Args:
+            tenant_id: Tenant identifier
+            endpoint: API endpoint
+            start: First day (inclusive)
+            end: Last day (inclusive)
+
+        Returns:
+            Merged sketch
+        """
+        days = []
+        day = start
+        while day <= end:
+            days.append(day)
+            day += timedelta(days=1)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for day in days:
+            pipe.hgetall(self.latency_key(tenant_id, day, endpoint))
+        results = await pipe.execute()
+
+        sketch = DDSketch(relative_accuracy=self.sketch_accuracy)
+        for fields in results:
+            if fields:
+                sketch.merge(DDSketch.from_fields(fields, self.sketch_accuracy))
+        return sketch
+
+    # Compaction
+
+    def _register_scripts(self):
+        if self._compact_day is None:
+            self._compact_day = self.redis.register_script(COMPACT_DAY_SCRIPT)
+            self._compact_month = self.redis.register_script(COMPACT_MONTH_SCRIPT)
+
+    async def compact_tenant(self, tenant_id: str, now: Optional[datetime] = None) -> int:
+        """Roll a tenant's closed days into day hashes and closed months into month hashes.
+
+        Args:
+            tenant_id: Tenant identifier
+            now: Current time, defaults to now in UTC
+
+        Returns:
+            Number of hourly fields compacted
+        """
+        self._register_scripts()
+        now = now or datetime.utcnow()
+        cutoff = (now - self.compaction_grace).date()
+
+        compacted = 0
+        day = now.date() - timedelta(days=HOUR_RETENTION_DAYS + 1)
+        while day < cutoff:
+            moved = await self._compact_day(
+                keys=[self.hour_key(tenant_id, day), self.day_key(tenant_id, day)],
+                args=[day.isoformat(), DAY_TTL],
+            )
+            if moved:
+                compacted += int(moved)
+                self.stats["compacted_days"] += 1
+            day += timedelta(days=1)
+
+        # The previous month is recomputed until its day hash expires, so late
+        # writes compacted after the month closed are still reflected.
+        previous_month = _month_start(_month_start(cutoff) - timedelta(days=1))
+        if _next_month(previous_month) <= cutoff:
+            rolled = await self._compact_month(
+                keys=[
+                    self.day_key(tenant_id, previous_month),
+                    self.month_key(tenant_id, previous_month.year),
+                ],
+                args=[previous_month.strftime("%Y-%m"), MONTH_TTL],
+            )
+            if rolled:
+                self.stats["compacted_months"] += 1
+
+        return compacted
+
+    async def compact(self, now: Optional[datetime] = None) -> int:
+        """Compact every tenant that has recorded usage.
+
+        Args:
+            now: Current time, defaults to now in UTC
+
+        Returns:
+            Number of hourly fields compacted
+        """
+        compacted = 0
+        async for raw_tenant in self.redis.sscan_iter(self.tenants_key):
+            tenant_id = _decode(raw_tenant)
+            try:
+                compacted += await self.compact_tenant(tenant_id, now)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Usage rollup compaction failed for tenant {tenant_id}: {e}")
+        self.stats["compactions"] += 1
+        return compacted
+
+    async def start_compaction(self, interval: float = 900):
+        """Start the background compaction loop.
+
+        Args:
+            interval: Seconds between compaction runs
+        """
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self._compaction_loop(interval))
+
+    async def stop_compaction(self):
+        """Stop the background compaction loop."""
+        if self._compaction_task and not self._compaction_task.done():
+            self._compaction_task.cancel()
+            try:
+                await self._compaction_task
+            except asyncio.CancelledError:
+                pass
+        self._compaction_task = None
+
+    async def _compaction_loop(self, interval: float):
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.compact()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Usage rollup compaction error: {e}")
@@ -1,18 +1,104 @@
 """Usage tracking and billing for multi-tenant system."""
 
+import asyncio
 import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..utils.quantile_sketch import DDSketch
+from .usage_rollup import UsageRollupStore
 
 logger = logging.getLogger(__name__)
 
+# Prometheus metrics
+usage_flush_lag_seconds = Histogram(
+    "usage_flush_lag_seconds",
+    "Time between the oldest buffered usage event and its flush",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+usage_flush_batch_size = Histogram(
+    "usage_flush_batch_size",
+    "Usage events written per flush",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+usage_events_dropped_total = Counter(
+    "usage_events_dropped_total", "Usage events dropped by the metering pipeline", ["reason"]
+)
+usage_events_pending = Gauge("usage_events_pending", "Usage events waiting to be flushed")
+
+
+@dataclass
+class UsageBatch:
+    """Usage events accumulated between two flushes.
+
+    Counter increments for the same rollup field are coalesced, so a batch costs
+    one ``HINCRBYFLOAT`` per distinct field regardless of how many events touched
+    it. Latency samples are folded into one sketch per endpoint and day.
+    """
+
+    counters: Dict[Tuple[str, str], float] = field(default_factory=lambda: defaultdict(float))
+    tenants: Set[str] = field(default_factory=set)
+    sketches: Dict[str, DDSketch] = field(default_factory=dict)
+    records: Dict[str, List[dict]] = field(default_factory=lambda: defaultdict(list))
+    events: int = 0
+    first_event_at: float = 0.0
+
 
 class UsageTracker:
-    """Track and manage tenant usage for billing."""
+    """Track and manage tenant usage for billing.
 
-    def __init__(self, redis_client, db_session=None):
+    Usage events are metered write-behind: ``track_*`` calls only append to an
+    in-process batch, which is flushed to Redis as one ``MULTI`` pipeline (and to
+    the database as one bulk insert per model) every ``flush_interval_ms`` or
+    once ``flush_max_events`` events are pending, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        db_session=None,
+        flush_interval_ms: int = 250,
+        flush_max_events: int = 500,
+        max_pending_events: int = 50_000,
+        compaction_interval: Optional[float] = 900,
+    ):
+        """Initialize usage tracker.
+
+        Args:
+            redis_client: Async Redis client
+            db_session: Optional async database session
+            flush_interval_ms: Maximum time an event waits before being flushed
+            flush_max_events: Pending events that trigger an early flush
+            max_pending_events: Events buffered before new ones are dropped
+            compaction_interval: Seconds between rollup compaction runs, started
+                with the first flush (None to leave compaction to another process)
+        """
         self.redis = redis_client
         self.db = db_session
+        self.rollups = UsageRollupStore(redis_client)
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_events = flush_max_events
+        self.max_pending_events = max_pending_events
+        self.compaction_interval = compaction_interval
+
+        self._batch = UsageBatch()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+
+        self.metering_stats = {
+            "events": 0,
+            "flushes": 0,
+            "flushed_events": 0,
+            "dropped_events": 0,
+            "flush_errors": 0,
+            "last_flush_lag": 0.0,
+        }
 
     async def track_api_call(
         self,
@@ -46,15 +132,20 @@ class UsageTracker:
             "metadata": metadata or {},
         }
 
+        batch = self._begin_event()
+        if batch is None:
+            return
+
         # Track in Redis for real-time analytics
-        await self._track_redis_metrics(tenant_id, "api_calls", timestamp)
+        self._track_redis_metrics(batch, tenant_id, "api_calls", timestamp)
 
         # Store detailed record
         if self.db:
-            await self._store_api_usage(usage_data)
+            batch.records["ApiUsage"].append(usage_data)
 
         # Update response time metrics
-        await self._update_latency_metrics(tenant_id, endpoint, response_time_ms)
+        self._update_latency_metrics(batch, tenant_id, endpoint, response_time_ms, timestamp)
+        self._end_event()
 
     async def track_token_usage(
         self,
@@ -91,16 +182,21 @@ class UsageTracker:
             "metadata": metadata or {},
         }
 
+        batch = self._begin_event()
+        if batch is None:
+            return
+
         # Track in Redis
-        await self._track_redis_metrics(tenant_id, "tokens", timestamp, total_tokens)
-        await self._track_redis_metrics(tenant_id, "cost", timestamp, cost)
+        self._track_redis_metrics(batch, tenant_id, "tokens", timestamp, total_tokens)
+        self._track_redis_metrics(batch, tenant_id, "cost", timestamp, cost)
 
         # Store in database
         if self.db:
-            await self._store_token_usage(usage_data)
+            batch.records["TokenUsage"].append(usage_data)
 
         # Update model-specific metrics
-        await self._update_model_metrics(tenant_id, model, total_tokens, cost)
+        self._update_model_metrics(batch, tenant_id, model, total_tokens, cost, timestamp)
+        self._end_event()
 
     async def track_websocket_usage(
         self,
@@ -134,16 +230,21 @@ class UsageTracker:
             "metadata": metadata or {},
         }
 
+        batch = self._begin_event()
+        if batch is None:
+            return
+
         # Track in Redis
         total_messages = messages_sent + messages_received
-        await self._track_redis_metrics(tenant_id, "websocket_messages", timestamp, total_messages)
-        await self._track_redis_metrics(
-            tenant_id, "websocket_duration", timestamp, duration_seconds
+        self._track_redis_metrics(batch, tenant_id, "websocket_messages", timestamp, total_messages)
+        self._track_redis_metrics(
+            batch, tenant_id, "websocket_duration", timestamp, duration_seconds
         )
 
         # Store in database
         if self.db:
-            await self._store_websocket_usage(usage_data)
+            batch.records["WebSocketUsage"].append(usage_data)
+        self._end_event()
 
     async def track_storage_usage(
         self,
@@ -167,17 +268,29 @@ class UsageTracker:
         # Convert to MB for tracking
         size_mb = size_bytes / (1024 * 1024)
 
+        batch = self._begin_event()
+        if batch is None:
+            return
+
         # Track in Redis
         if operation == "upload":
-            await self._track_redis_metrics(tenant_id, "storage_mb", timestamp, size_mb)
+            self._track_redis_metrics(batch, tenant_id, "storage_mb", timestamp, size_mb)
         elif operation == "delete":
-            await self._track_redis_metrics(tenant_id, "storage_mb", timestamp, -size_mb)
+            self._track_redis_metrics(batch, tenant_id, "storage_mb", timestamp, -size_mb)
 
         # Store event
         if self.db:
-            await self._store_storage_event(
-                tenant_id, storage_type, size_bytes, operation, timestamp, metadata
+            batch.records["StorageEvent"].append(
+                {
+                    "tenant_id": tenant_id,
+                    "storage_type": storage_type,
+                    "size_bytes": size_bytes,
+                    "operation": operation,
+                    "timestamp": timestamp,
+                    "metadata": metadata or {},
+                }
             )
+        self._end_event()
 
     async def get_usage_summary(
         self, tenant_id: str, start_date: datetime, end_date: datetime
@@ -200,11 +313,12 @@ class UsageTracker:
             "total_cost": 0.0,
         }
 
-        # Get usage metrics from Redis
+        # Get usage metrics from the rollups in one round trip
         metrics = ["api_calls", "tokens", "websocket_messages", "storage_mb"]
+        totals = await self.rollups.read_total(tenant_id, start_date.date(), end_date.date())
 
         for metric in metrics:
-            total = await self._get_period_total(tenant_id, metric, start_date, end_date)
+            total = totals.get(metric, 0.0)
             summary["usage"][metric] = total
 
             # Calculate cost
@@ -229,24 +343,19 @@ class UsageTracker:
         Returns:
             Current usage metrics
         """
-        today = datetime.utcnow().date()
+        now = datetime.utcnow()
+
+        # Today has not been compacted yet, so its hour hash holds the whole day
+        hours = await self.rollups.read_hours(tenant_id, now.date())
+        this_hour = hours.get(now.hour, {})
 
         metrics = {}
         metric_types = ["api_calls", "tokens", "websocket_messages", "storage_mb", "cost"]
 
         for metric_type in metric_types:
-            # Get today's usage
-            day_key = f"usage:{tenant_id}:{today}:{metric_type}"
-            day_value = await self.redis.get(day_key)
-
-            # Get this hour's usage
-            hour = datetime.utcnow().hour
-            hour_key = f"usage:{tenant_id}:{today}:{hour}:{metric_type}"
-            hour_value = await self.redis.get(hour_key)
-
             metrics[metric_type] = {
-                "today": float(day_value) if day_value else 0,
-                "this_hour": float(hour_value) if hour_value else 0,
+                "today": sum(hour.get(metric_type, 0.0) for hour in hours.values()),
+                "this_hour": this_hour.get(metric_type, 0.0),
             }
 
         return {
@@ -270,19 +379,14 @@ class UsageTracker:
 
         trends: Dict[str, Any] = {"tenant_id": tenant_id, "period_days": days, "daily_usage": []}
 
-        current_date = start_date
-        while current_date <= end_date:
-            day_metrics = {}
-
-            for metric in ["api_calls", "tokens", "cost"]:
-                key = f"usage:{tenant_id}:{current_date}:{metric}"
-                value = await self.redis.get(key)
-                day_metrics[metric] = float(value) if value else 0
+        daily = await self.rollups.read_days(tenant_id, start_date, end_date, today=end_date)
 
+        for current_date, totals in daily.items():
+            day_metrics = {
+                metric: totals.get(metric, 0.0) for metric in ["api_calls", "tokens", "cost"]
+            }
             trends["daily_usage"].append({"date": current_date.isoformat(), "metrics": day_metrics})
 
-            current_date += timedelta(days=1)
-
         # Calculate averages and trends
         if trends["daily_usage"]:
             total_api_calls = sum(d["metrics"]["api_calls"] for d in trends["daily_usage"])
@@ -312,6 +416,36 @@ class UsageTracker:
 
         return trends
 
+    async def get_latency_percentiles(
+        self,
+        tenant_id: str,
+        endpoint: str,
+        days: int = 1,
+        quantiles: tuple = (0.5, 0.9, 0.95, 0.99),
+    ) -> dict[str, Any]:
+        """Get latency percentiles for an endpoint.
+
+        Args:
+            tenant_id: Tenant identifier
+            endpoint: API endpoint
+            days: Number of days to include
+            quantiles: Quantiles to estimate
+
+        Returns:
+            Request count, mean and percentiles in milliseconds
+        """
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days - 1)
+        sketch = await self.rollups.read_latency(tenant_id, endpoint, start_date, end_date)
+
+        return {
+            "tenant_id": tenant_id,
+            "endpoint": endpoint,
+            "count": sketch.count,
+            "mean_ms": sketch.mean,
+            "percentiles": {f"p{round(q * 100, 1):g}": sketch.quantile(q) for q in quantiles},
+        }
+
     async def generate_invoice(self, tenant_id: str, billing_period: str) -> dict[str, Any]:
         """Generate invoice for billing period.
 
@@ -364,91 +498,223 @@ class UsageTracker:
 
         return invoice
 
-    async def _track_redis_metrics(
-        self, tenant_id: str, metric_type: str, timestamp: datetime, amount: float = 1
+    def _begin_event(self) -> Optional[UsageBatch]:
+        """Get the batch a new usage event is recorded into.
+
+        Returns:
+            Current batch, or None if the event has to be dropped
+        """
+        batch = self._batch
+        if batch.events >= self.max_pending_events:
+            self.metering_stats["dropped_events"] += 1
+            usage_events_dropped_total.labels("overflow").inc()
+            self._schedule_flush()
+            return None
+        if not batch.events:
+            batch.first_event_at = time.monotonic()
+        return batch
+
+    def _end_event(self):
+        """Count a recorded event and trigger a flush when due."""
+        self._batch.events += 1
+        self.metering_stats["events"] += 1
+        usage_events_pending.set(self._batch.events)
+
+        if self._batch.events >= self.flush_max_events:
+            self._schedule_flush()
+        else:
+            self._arm_timer()
+
+    def _arm_timer(self):
+        """Make sure the pending batch is flushed within the flush interval."""
+        if self._timer_task is not None and not self._timer_task.done():
+            return
+        try:
+            self._timer_task = asyncio.get_running_loop().create_task(self._flush_later())
+        except RuntimeError:
+            # No running loop; the batch is flushed by the next async caller
+            self._timer_task = None
+
+    def _schedule_flush(self):
+        """Start a flush in the background unless one is already running."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            self._flush_task = None
+
+    async def _flush_later(self):
+        """Flush the batch once the flush interval has elapsed."""
+        await asyncio.sleep(self.flush_interval)
+        # Shielded so stopping the timer never abandons a batch mid-write
+        await asyncio.shield(self.flush())
+
+    async def flush(self) -> int:
+        """Write all buffered usage events.
+
+        Counter increments go to Redis in one ``MULTI`` pipeline; database records
+        are inserted with one ``add_all`` and a single commit per flush. If Redis
+        fails, the coalesced counters are merged back into the pending batch so
+        billing totals are not lost.
+
+        Returns:
+            Number of events flushed
+        """
+        async with self._flush_lock:
+            batch = self._batch
+            if not batch.events and not batch.counters:
+                return 0
+            self._batch = UsageBatch()
+            usage_events_pending.set(0)
+
+            try:
+                await self._write_redis(batch)
+            except Exception as e:
+                self.metering_stats["flush_errors"] += 1
+                logger.error(f"Failed to flush {batch.events} usage events to Redis: {e}")
+                self._requeue_counters(batch)
+                if batch.sketches:
+                    usage_events_dropped_total.labels("redis_error").inc(
+                        sum(sketch.count for sketch in batch.sketches.values())
+                    )
+            else:
+                # Hour hashes expire, so whoever writes them also compacts them
+                if self.compaction_interval is not None:
+                    await self.rollups.start_compaction(self.compaction_interval)
+
+            if self.db and batch.records:
+                await self._store_records(batch.records)
+
+            lag = time.monotonic() - batch.first_event_at
+            usage_flush_lag_seconds.observe(lag)
+            usage_flush_batch_size.observe(batch.events)
+            self.metering_stats["flushes"] += 1
+            self.metering_stats["flushed_events"] += batch.events
+            self.metering_stats["last_flush_lag"] = lag
+            return batch.events
+
+    async def _write_redis(self, batch: UsageBatch):
+        """Apply a batch to Redis in one transactional pipeline.
+
+        Args:
+            batch: Batch to write
+        """
+        if not batch.counters and not batch.sketches:
+            return
+
+        pipe = self.redis.pipeline(transaction=True)
+        self.rollups.queue_counters(pipe, batch.counters, batch.tenants)
+        for key, sketch in batch.sketches.items():
+            self.rollups.queue_sketch(pipe, key, sketch)
+        await pipe.execute()
+
+    def _requeue_counters(self, batch: UsageBatch):
+        """Merge the counters of a failed batch into the pending batch.
+
+        Args:
+            batch: Batch whose Redis write failed
+        """
+        pending = self._batch
+        if not pending.counters and not pending.events:
+            pending.first_event_at = batch.first_event_at
+        for location, amount in batch.counters.items():
+            pending.counters[location] += amount
+        pending.tenants.update(batch.tenants)
+        self._arm_timer()
+
+    async def stop(self):
+        """Stop the flush timer and compaction, writing everything still buffered."""
+        if self._timer_task is not None and not self._timer_task.done():
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+        self._timer_task = None
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        self._flush_task = None
+        await self.flush()
+        await self.rollups.stop_compaction()
+
+    def get_metering_stats(self) -> Dict[str, Any]:
+        """Get metering pipeline statistics.
+
+        Returns:
+            Statistics dictionary
+        """
+        return {
+            "pending_events": self._batch.events,
+            "pending_counters": len(self._batch.counters),
+            **self.metering_stats,
+        }
+
+    def _track_redis_metrics(
+        self,
+        batch: UsageBatch,
+        tenant_id: str,
+        metric_type: str,
+        timestamp: datetime,
+        amount: float = 1,
     ):
-        """Track metrics in Redis.
+        """Accumulate a metric into the tenant's hourly rollup.
 
         Args:
+            batch: Batch to record into
             tenant_id: Tenant identifier
             metric_type: Type of metric
             timestamp: Timestamp
             amount: Amount to track
         """
-        # Daily tracking
-        day_key = f"usage:{tenant_id}:{timestamp.date()}:{metric_type}"
-        await self.redis.incrbyfloat(day_key, amount)
-        await self.redis.expire(day_key, 86400 * 35)  # 35 days
-
-        # Hourly tracking
-        hour_key = f"usage:{tenant_id}:{timestamp.date()}:{timestamp.hour}:{metric_type}"
-        await self.redis.incrbyfloat(hour_key, amount)
-        await self.redis.expire(hour_key, 86400 * 2)  # 2 days
-
-        # Monthly tracking
-        month_key = f"usage:{tenant_id}:{timestamp.strftime('%Y-%m')}:{metric_type}"
-        await self.redis.incrbyfloat(month_key, amount)
-        await self.redis.expire(month_key, 86400 * 400)  # ~13 months
+        batch.counters[self.rollups.counter_location(tenant_id, metric_type, timestamp)] += amount
+        batch.tenants.add(tenant_id)
 
-    async def _update_latency_metrics(self, tenant_id: str, endpoint: str, response_time_ms: float):
-        """Update latency metrics.
+    def _update_latency_metrics(
+        self,
+        batch: UsageBatch,
+        tenant_id: str,
+        endpoint: str,
+        response_time_ms: float,
+        timestamp: datetime,
+    ):
+        """Accumulate a latency sample.
 
         Args:
+            batch: Batch to record into
             tenant_id: Tenant identifier
             endpoint: API endpoint
             response_time_ms: Response time
+            timestamp: Timestamp
         """
-        # Store in sorted set for percentile calculations
-        key = f"latency:{tenant_id}:{datetime.utcnow().date()}:{endpoint}"
-        await self.redis.zadd(key, {str(datetime.utcnow().timestamp()): response_time_ms})
-        await self.redis.expire(key, 86400)  # 1 day
-
-    async def _update_model_metrics(self, tenant_id: str, model: str, tokens: int, cost: float):
-        """Update model-specific metrics.
+        # Percentiles come from a fixed-size sketch rather than raw samples
+        key = self.rollups.latency_key(tenant_id, timestamp.date(), endpoint)
+        sketch = batch.sketches.get(key)
+        if sketch is None:
+            sketch = batch.sketches[key] = DDSketch(self.rollups.sketch_accuracy)
+        sketch.add(response_time_ms)
+
+    def _update_model_metrics(
+        self,
+        batch: UsageBatch,
+        tenant_id: str,
+        model: str,
+        tokens: int,
+        cost: float,
+        timestamp: datetime,
+    ):
+        """Accumulate model-specific metrics.
 
         Args:
+            batch: Batch to record into
             tenant_id: Tenant identifier
             model: Model name
             tokens: Token count
             cost: Cost
+            timestamp: Timestamp
         """
-        date = datetime.utcnow().date()
-
-        # Track tokens per model
-        model_tokens_key = f"model_usage:{tenant_id}:{date}:{model}:tokens"
-        await self.redis.incrbyfloat(model_tokens_key, tokens)
-        await self.redis.expire(model_tokens_key, 86400 * 35)
-
-        # Track cost per model
-        model_cost_key = f"model_usage:{tenant_id}:{date}:{model}:cost"
-        await self.redis.incrbyfloat(model_cost_key, cost)
-        await self.redis.expire(model_cost_key, 86400 * 35)
-
-    async def _get_period_total(
-        self, tenant_id: str, metric: str, start_date: datetime, end_date: datetime
-    ) -> float:
-        """Get total usage for period.
-
-        Args:
-            tenant_id: Tenant identifier
-            metric: Metric type
-            start_date: Start date
-            end_date: End date
-
-        Returns:
-            Total usage
-        """
-        total = 0.0
-        current_date = start_date.date()
-
-        while current_date <= end_date.date():
-            key = f"usage:{tenant_id}:{current_date}:{metric}"
-            value = await self.redis.get(key)
-            if value:
-                total += float(value)
-            current_date += timedelta(days=1)
-
-        return total
+        self._track_redis_metrics(batch, tenant_id, f"model:{model}:tokens", timestamp, tokens)
+        self._track_redis_metrics(batch, tenant_id, f"model:{model}:cost", timestamp, cost)
 
     def _get_unit_cost(self, metric: str) -> float:
         """Get unit cost for metric.
@@ -505,74 +771,24 @@ class UsageTracker:
 
         return 0.0
 
-    async def _store_api_usage(self, usage_data: dict):
-        """Store API usage in database."""
-        if not self.db:
-            return
-
-        try:
-            from chatbot_ai_system.api.models import ApiUsage
+    async def _store_records(self, records: Dict[str, List[dict]]):
+        """Bulk insert buffered usage records.
 
-            usage = ApiUsage(**usage_data)
-            self.db.add(usage)
-            await self.db.commit()
-        except Exception as e:
-            logger.error(f"Failed to store API usage: {e}")
-
-    async def _store_token_usage(self, usage_data: dict):
-        """Store token usage in database."""
-        if not self.db:
-            return
-
-        try:
-            from chatbot_ai_system.api.models import TokenUsage
-
-            usage = TokenUsage(**usage_data)
-            self.db.add(usage)
-            await self.db.commit()
-        except Exception as e:
-            logger.error(f"Failed to store token usage: {e}")
-
-    async def _store_websocket_usage(self, usage_data: dict):
-        """Store WebSocket usage in database."""
-        if not self.db:
-            return
-
-        try:
-            from chatbot_ai_system.api.models import WebSocketUsage
-
-            usage = WebSocketUsage(**usage_data)
-            self.db.add(usage)
-            await self.db.commit()
-        except Exception as e:
-            logger.error(f"Failed to store WebSocket usage: {e}")
-
-    async def _store_storage_event(
-        self,
-        tenant_id: str,
-        storage_type: str,
-        size_bytes: int,
-        operation: str,
-        timestamp: datetime,
-        metadata: dict | None,
-    ):
-        """Store storage event in database."""
-        if not self.db:
-            return
+        Each model's rows are added in one ``add_all`` and the whole flush is
+        committed once, so the ORM issues a single executemany per table.
 
+        Args:
+            records: Rows keyed by model name in ``chatbot_ai_system.api.models``
+        """
+        count = sum(len(rows) for rows in records.values())
         try:
-            from chatbot_ai_system.api.models import StorageEvent
-
-            event = StorageEvent(
-                tenant_id=tenant_id,
-                storage_type=storage_type,
-                size_bytes=size_bytes,
-                operation=operation,
-                timestamp=timestamp,
-                metadata=metadata or {},
-            )
+            from chatbot_ai_system.api import models
 
-            self.db.add(event)
+            for model_name, rows in records.items():
+                model = getattr(models, model_name)
+                self.db.add_all([model(**row) for row in rows])
             await self.db.commit()
         except Exception as e:
-            logger.error(f"Failed to store storage event: {e}")
+            self.metering_stats["dropped_events"] += count
+            usage_events_dropped_total.labels("db_error").inc(count)
+            logger.error(f"Failed to store {count} usage records: {e}")
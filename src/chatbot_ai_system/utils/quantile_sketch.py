@@ -0,0 +1,182 @@
+"""Mergeable quantile sketch with bounded relative error."""
+
+import math
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+# Values at or below this are counted in the zero bucket
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """DDSketch-style quantile sketch.
+
+    Values are counted in logarithmic buckets whose width guarantees that every
+    quantile estimate is within ``relative_accuracy`` of the true value. Two
+    sketches with the same accuracy merge by adding bucket counts, which makes
+    them suitable for storing in Redis hashes (``HINCRBY`` per bucket) and for
+    combining per-hour or per-pod sketches into longer ranges. Memory is bounded
+    by ``max_bins``; when exceeded the lowest buckets are collapsed, which only
+    affects accuracy of the lowest quantiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """Initialize sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of quantile estimates
+            max_bins: Maximum number of buckets kept
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self) -> int:
+        return self.count
+
+    def key(self, value: float) -> int:
+        """Bucket index for a positive value."""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Representative value of a bucket."""
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Add a value.
+
+        Args:
+            value: Value to add (negative values are clamped to zero)
+            count: Number of occurrences
+        """
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            key = self.key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        """Merge another sketch with the same accuracy into this one.
+
+        Args:
+            other: Sketch to merge
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self):
+        """Fold the lowest buckets into one so at most ``max_bins`` remain."""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile.
+
+        Args:
+            q: Quantile in ``[0, 1]``
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        if self.count == 0:
+            return None
+
+        rank = min(max(q, 0.0), 1.0) * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                estimate = self.value(key)
+                # Exact bounds are known when they were tracked locally
+                if self.max != -math.inf:
+                    estimate = min(estimate, self.max)
+                if self.min != math.inf:
+                    estimate = max(estimate, self.min)
+                return estimate
+
+        return self.value(max(self.bins))
+
+    def quantiles(self, qs: Iterable[float]) -> dict[float, float | None]:
+        """Estimate several quantiles."""
+        return {q: self.quantile(q) for q in qs}
+
+    @property
+    def mean(self) -> float | None:
+        """Mean of the added values."""
+        return self.sum / self.count if self.count else None
+
+    def to_fields(self) -> dict[str, float]:
+        """Encode the sketch as flat hash fields.
+
+        Bucket counts are stored under their index, the zero bucket under ``z``
+        and the sum under ``sum``. Adding the fields of two encodings (e.g. with
+        ``HINCRBY``/``HINCRBYFLOAT``) yields the encoding of the merged sketch.
+
+        Returns:
+            Field to value mapping
+        """
+        fields: dict[str, float] = {str(key): count for key, count in self.bins.items()}
+        if self.zero_count:
+            fields["z"] = self.zero_count
+        fields["sum"] = self.sum
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Mapping[Any, Any], relative_accuracy: float = 0.01) -> "DDSketch":
+        """Decode a sketch produced by ``to_fields`` (bytes keys are accepted).
+
+        Args:
+            fields: Hash fields
+            relative_accuracy: Accuracy the sketch was built with
+
+        Returns:
+            Decoded sketch (without exact min/max)
+        """
+        sketch = cls(relative_accuracy=relative_accuracy)
+        for raw_field, raw_value in fields.items():
+            field = raw_field.decode() if isinstance(raw_field, bytes) else str(raw_field)
+            value = float(raw_value)
+            if field == "sum":
+                sketch.sum = value
+            elif field == "z":
+                sketch.zero_count += int(value)
+                sketch.count += int(value)
+            else:
+                count = int(value)
+                sketch.bins[int(field)] = sketch.bins.get(int(field), 0) + count
+                sketch.count += count
+        if len(sketch.bins) > sketch.max_bins:
+            sketch._collapse()
+        return sketch
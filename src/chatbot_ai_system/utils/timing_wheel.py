@@ -0,0 +1,354 @@
+"""Hierarchical timing wheel and shared timer scheduler for connection timers."""
+
+import asyncio
+import inspect
+import logging
+import math
+import time
+import zlib
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+timer_lag_seconds = Histogram(
+    "timer_lag_seconds",
+    "Delay between a timer's deadline and when it fired",
+    ["scheduler"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+timers_fired_total = Counter("timers_fired_total", "Timers fired", ["scheduler"])
+timers_scheduled = Gauge("timers_scheduled", "Timers currently scheduled", ["scheduler"])
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with O(1) schedule and cancel.
+
+    Level 0 has ``slots`` buckets of ``tick`` seconds; each higher level has
+    buckets ``slots`` times wider. A timer is placed on the lowest level whose
+    span covers it and cascades down as the wheel turns, so advancing only
+    touches the timers that are due (plus an occasional cascade), never every
+    scheduled timer.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, start: float = 0.0, levels: int = 3):
+        """Initialize timing wheel.
+
+        Args:
+            tick: Bucket width in seconds at the lowest level
+            slots: Number of buckets per level
+            start: Time the wheel starts at
+            levels: Number of levels
+        """
+        self.tick = tick
+        self.num_slots = slots
+        self.levels = levels
+        self.wheels: list[list[dict[Hashable, tuple[float, int]]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self.current_tick = int(start // tick)
+        self._index: dict[Hashable, tuple[int, int]] = {}  # key -> (level, bucket)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def _place(self, key: Hashable, deadline: float, target: int):
+        delta = target - self.current_tick
+        level = 0
+        while level < self.levels - 1 and delta >= self.num_slots ** (level + 1):
+            level += 1
+        bucket = (target // self.num_slots**level) % self.num_slots
+        self.wheels[level][bucket][key] = (deadline, target)
+        self._index[key] = (level, bucket)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Schedule (or reschedule) a key to fire at ``deadline``.
+
+        Args:
+            key: Timer key
+            deadline: Absolute time the timer fires at
+        """
+        self.cancel(key)
+        # Never place a timer in a tick that has already been processed
+        target = max(math.ceil(deadline / self.tick), self.current_tick + 1)
+        self._place(key, deadline, target)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel a scheduled key.
+
+        Args:
+            key: Timer key
+
+        Returns:
+            True if the key was scheduled
+        """
+        position = self._index.pop(key, None)
+        if position is None:
+            return False
+        level, bucket = position
+        del self.wheels[level][bucket][key]
+        return True
+
+    def deadline(self, key: Hashable) -> float | None:
+        """Get the deadline of a scheduled key."""
+        position = self._index.get(key)
+        if position is None:
+            return None
+        level, bucket = position
+        return self.wheels[level][bucket][key][0]
+
+    def advance(self, now: float) -> list[tuple[Hashable, float]]:
+        """Advance the wheel to ``now`` and collect expired timers.
+
+        Args:
+            now: Current time
+
+        Returns:
+            ``(key, deadline)`` pairs whose deadline has passed
+        """
+        target = int(now // self.tick)
+        expired: list[tuple[Hashable, float]] = []
+
+        if not self._index:
+            self.current_tick = max(self.current_tick, target)
+            return expired
+
+        while self.current_tick < target:
+            self.current_tick += 1
+            self._cascade()
+
+            bucket = self.wheels[0][self.current_tick % self.num_slots]
+            due = [
+                (key, deadline)
+                for key, (deadline, due_tick) in bucket.items()
+                if due_tick <= self.current_tick
+            ]
+            for key, _deadline in due:
+                del bucket[key]
+                del self._index[key]
+            expired.extend(due)
+
+            if not self._index:
+                self.current_tick = target
+                break
+
+        return expired
+
+    def _cascade(self):
+        """Move timers from higher-level buckets that just came due to lower levels."""
+        for level in range(self.levels - 1, 0, -1):
+            width = self.num_slots**level
+            if self.current_tick % width:
+                continue
+            bucket_index = (self.current_tick // width) % self.num_slots
+            bucket = self.wheels[level][bucket_index]
+            if not bucket:
+                continue
+            self.wheels[level][bucket_index] = {}
+            for key, (deadline, due_tick) in bucket.items():
+                self._place(key, deadline, max(due_tick, self.current_tick))
+
+
+def spread_delay(key: Hashable, interval: float) -> float:
+    """Deterministic offset in ``(0, interval]`` used to spread periodic timers.
+
+    Connections that arrive together (e.g. a reconnect storm after a deploy)
+    would otherwise all ping on the same tick.
+
+    Args:
+        key: Timer key
+        interval: Period of the timer
+
+    Returns:
+        Delay before the first firing
+    """
+    fraction = (zlib.crc32(repr(key).encode()) + 1) / 2**32
+    return interval * fraction
+
+
+class TimerScheduler:
+    """Asyncio driver for a shared timing wheel.
+
+    Callbacks run when their deadline passes; coroutine callbacks of one tick
+    are gathered in a separate task so a slow socket cannot delay the wheel.
+    Timer lag (fire time minus deadline) is exported per scheduler.
+    """
+
+    def __init__(self, name: str = "default", tick: float = 0.1, slots: int = 256, levels: int = 3):
+        """Initialize timer scheduler.
+
+        Args:
+            name: Scheduler name used as metrics label
+            tick: Timer resolution in seconds
+            slots: Buckets per wheel level
+            levels: Wheel levels
+        """
+        self.name = name
+        self.tick = tick
+        self.wheel = TimingWheel(tick=tick, slots=slots, start=time.monotonic(), levels=levels)
+        self.callbacks: dict[Hashable, Callable[[], Any]] = {}
+
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+        self.stats = {
+            "fired": 0,
+            "callback_errors": 0,
+            "max_lag": 0.0,
+            "total_lag": 0.0,
+        }
+
+    def call_at(self, key: Hashable, deadline: float, callback: Callable[[], Any]):
+        """Schedule ``callback`` at a monotonic deadline, replacing any timer for ``key``.
+
+        Args:
+            key: Timer key
+            deadline: Absolute ``time.monotonic()`` deadline
+            callback: Callable or coroutine function taking no arguments
+        """
+        self.wheel.schedule(key, deadline)
+        self.callbacks[key] = callback
+        timers_scheduled.labels(self.name).set(len(self.wheel))
+        self.start()
+
+    def call_later(self, key: Hashable, delay: float, callback: Callable[[], Any]):
+        """Schedule ``callback`` after ``delay`` seconds, replacing any timer for ``key``.
+
+        Args:
+            key: Timer key
+            delay: Delay in seconds
+            callback: Callable or coroutine function taking no arguments
+        """
+        self.call_at(key, time.monotonic() + delay, callback)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel a timer.
+
+        Args:
+            key: Timer key
+
+        Returns:
+            True if the timer was scheduled
+        """
+        self.callbacks.pop(key, None)
+        cancelled = self.wheel.cancel(key)
+        timers_scheduled.labels(self.name).set(len(self.wheel))
+        return cancelled
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.wheel
+
+    def start(self):
+        """Start the driver task if it is not running (requires a running loop)."""
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                # No running loop yet; the next call from async code starts it
+                self._task = None
+
+    async def stop(self):
+        """Stop the driver task."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        """Turn the wheel every tick while timers are scheduled."""
+        while len(self.wheel):
+            try:
+                await asyncio.sleep(self.tick)
+                self.fire_due(time.monotonic())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in timer scheduler {self.name}: {e}")
+
+    def fire_due(self, now: float) -> int:
+        """Fire every timer whose deadline is at or before ``now``.
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            Number of timers fired
+        """
+        due = self.wheel.advance(now)
+        coroutines = []
+
+        for key, deadline in due:
+            callback = self.callbacks.pop(key, None)
+            if callback is None:
+                continue
+
+            lag = max(now - deadline, 0.0)
+            timer_lag_seconds.labels(self.name).observe(lag)
+            self.stats["total_lag"] += lag
+            self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+            self.stats["fired"] += 1
+
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    coroutines.append(result)
+            except Exception as e:
+                self.stats["callback_errors"] += 1
+                logger.error(f"Timer callback failed for {key}: {e}")
+
+        if due:
+            timers_fired_total.labels(self.name).inc(len(due))
+            timers_scheduled.labels(self.name).set(len(self.wheel))
+
+        if coroutines:
+            task = asyncio.get_running_loop().create_task(self._gather(coroutines))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+        return len(due)
+
+    async def _gather(self, coroutines: list):
+        results = await asyncio.gather(*coroutines, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.stats["callback_errors"] += 1
+                logger.error(f"Timer callback failed in scheduler {self.name}: {result}")
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get scheduler statistics.
+
+        Returns:
+            Statistics dictionary
+        """
+        fired = self.stats["fired"]
+        return {
+            "name": self.name,
+            "tick": self.tick,
+            "scheduled": len(self.wheel),
+            "fired": fired,
+            "callback_errors": self.stats["callback_errors"],
+            "max_lag_seconds": self.stats["max_lag"],
+            "avg_lag_seconds": self.stats["total_lag"] / fired if fired else 0.0,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+# Process-wide scheduler shared by the WebSocket managers
+_scheduler: TimerScheduler | None = None
+
+
+def get_timer_scheduler() -> TimerScheduler:
+    """Get the shared timer scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TimerScheduler(name="websocket")
+    return _scheduler
@@ -1,44 +1,321 @@
-import tiktoken
-from chatbot_ai_system.api.models.chat import Message
+"""Token accounting shared by routing, cost checks and streaming.
+
+Encoders are preloaded at startup, or loaded on first use; on the event loop
+that load runs in a worker thread, since tiktoken may download its encoding
+files. Counts are memoized per (encoding, text digest), so the messages of a
+conversation are only encoded the first time they are seen, and the uncached
+messages of a conversation are encoded in one batch. Very long texts can be
+counted in a worker thread to keep the event loop free. While an encoder is
+loading or cannot be loaded (tiktoken missing, or its encoding files cannot be
+fetched) counts fall back to the ~4 characters per token estimate, and a failed
+load is retried after a backoff.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Texts longer than this are encoded with the batch API (which uses threads)
+BATCH_THRESHOLD_CHARS = 16_384
+
+
+def _estimate(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def encoding_for_model(model: str) -> str:
+    """Get the tiktoken encoding used to count tokens of a model.
+
+    Non-OpenAI models are counted with ``cl100k_base`` as an approximation.
+    """
+    if model.startswith(("gpt-4o", "o1", "o3", "o4")):
+        return "o200k_base"
+    return "cl100k_base"
+
+
+def _message_fields(message: Any) -> tuple[str, str, str | None]:
+    """Get role, content and name of a message object or dict."""
+    if isinstance(message, dict):
+        return message.get("role", ""), message.get("content") or "", message.get("name")
+    name = getattr(message, "name", None)
+    metadata = getattr(message, "metadata", None)
+    if name is None and metadata:
+        name = metadata.get("name")
+    return message.role, message.content or "", name
+
+
+class StreamTokenCounter:
+    """Incremental token count of streamed completion text.
+
+    Text up to the last space is committed and never encoded again; only the
+    trailing word is re-encoded on each delta. Tokens do not span a space
+    boundary in the supported encodings, so the count matches encoding the whole
+    text except for rare whitespace merges. Text without spaces (CJK, code,
+    base64) is committed whole once it passes ``commit_chars``, which may split a
+    token and count it twice, so that re-encoding stays bounded.
+    """
+
+    def __init__(self, counter: "TokenCounter", model: str, commit_chars: int = 64):
+        self.counter = counter
+        self.model = model
+        self.commit_chars = commit_chars
+        self.committed_tokens = 0
+        self._pending = ""
+        self._pending_tokens = 0
+
+    def add(self, delta: str) -> int:
+        """Add a streamed delta.
+
+        Args:
+            delta: Text of the delta
+
+        Returns:
+            Tokens in the stream so far
+        """
+        self._pending += delta
+        if len(self._pending) > self.commit_chars:
+            cut = self._pending.rfind(" ")
+            if cut <= 0:
+                cut = len(self._pending)
+            self.committed_tokens += self.counter.count_tokens(
+                self._pending[:cut], self.model, cache=False
+            )
+            self._pending = self._pending[cut:]
+        self._pending_tokens = self.counter.count_tokens(self._pending, self.model, cache=False)
+        return self.total
+
+    @property
+    def total(self) -> int:
+        return self.committed_tokens + self._pending_tokens
 
 
 class TokenCounter:
-    def __init__(self):
-        self.encoders = {
-            "gpt-4": tiktoken.encoding_for_model("gpt-4"),
-            "gpt-3.5-turbo": tiktoken.encoding_for_model("gpt-3.5-turbo"),
-            "default": tiktoken.get_encoding("cl100k_base"),
-        }
+    """Counts tokens with the model's tokenizer."""
+
+    def __init__(
+        self,
+        cache_size: int = 50_000,
+        offload_threshold: int = 32_000,
+        executor=None,
+        load_retry_seconds: float = 60.0,
+    ):
+        """Initialize token counter.
+
+        Args:
+            cache_size: Maximum number of memoized counts
+            offload_threshold: Characters above which async counts run in a thread
+            executor: Executor for offloaded counts and encoder loads (the loop's
+                default when None)
+            load_retry_seconds: Time before a failed encoder load is retried
+        """
+        self.cache_size = cache_size
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        self.load_retry_seconds = load_retry_seconds
+        self._encoders: dict[str, Any] = {}
+        self._loading: set[str] = set()
+        self._retry_at: dict[str, float] = {}
+        self._cache: "OrderedDict[tuple[str, bytes], int]" = OrderedDict()
+        self._lock = threading.Lock()  # offloaded counts share the cache
+        self.stats = {"hits": 0, "misses": 0, "estimated": 0, "offloaded": 0}
+
+    def get_encoder(self, model: str):
+        """Get the encoder of a model, loading it on first use.
+
+        Called on the event loop, a missing encoder is loaded in a worker thread
+        and None is returned until it is ready.
 
-    def count_tokens(self, text: str, model: str = "gpt-4") -> int:
+        Returns:
+            tiktoken encoding, or None if it is unavailable
+        """
+        name = encoding_for_model(model)
+        if name in self._encoders:
+            return self._encoders[name]
+        if name in self._loading or time.monotonic() < self._retry_at.get(name, 0.0):
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._load(name)
+        self._loading.add(name)
+        loop.run_in_executor(self.executor, self._load, name)
+        return None
+
+    def _load(self, name: str):
+        """Load an encoding, scheduling a retry if it fails."""
+        try:
+            import tiktoken
+
+            encoder = tiktoken.get_encoding(name)
+        except Exception as e:
+            logger.warning(
+                f"Tokenizer {name} unavailable, estimating token counts for "
+                f"{self.load_retry_seconds:.0f}s: {e}"
+            )
+            self._retry_at[name] = time.monotonic() + self.load_retry_seconds
+            encoder = None
+        else:
+            self._encoders[name] = encoder
+        finally:
+            self._loading.discard(name)
+        return encoder
+
+    async def preload(self, encodings: Iterable[str] = ("cl100k_base", "o200k_base")):
+        """Load encodings in worker threads, e.g. at startup.
+
+        Args:
+            encodings: Encoding names to load
+        """
+        loop = asyncio.get_running_loop()
+        pending = [name for name in encodings if name not in self._encoders]
+        self._loading.update(pending)
+        await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self._load, name) for name in pending)
+        )
+
+    def _cache_key(self, encoding: str, text: str) -> tuple[str, bytes]:
+        return encoding, hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def _lookup(self, key: tuple[str, bytes]) -> int | None:
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _remember(self, key: tuple[str, bytes], count: int):
+        with self._lock:
+            self._cache[key] = count
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count_tokens(self, text: str, model: str = "gpt-4", cache: bool = True) -> int:
         """Count tokens for a given text and model"""
-        encoder = self.encoders.get(model, self.encoders["default"])
-        return len(encoder.encode(text))
+        if not text:
+            return 0
+        encoder = self.get_encoder(model)
+        if encoder is None:
+            self.stats["estimated"] += 1
+            return _estimate(text)
+        if not cache:
+            return len(encoder.encode_ordinary(text))
+
+        key = self._cache_key(encoder.name, text)
+        count = self._lookup(key)
+        if count is not None:
+            self.stats["hits"] += 1
+            return count
+
+        self.stats["misses"] += 1
+        count = len(encoder.encode_ordinary(text))
+        self._remember(key, count)
+        return count
+
+    def count_many(self, texts: list[str], model: str = "gpt-4") -> list[int]:
+        """Count tokens of several texts, encoding the uncached ones in one batch.
 
-    def count_messages_tokens(self, messages: list[Message], model: str = "gpt-4") -> int:
-        """Count total tokens for a list of messages"""
-        encoder = self.encoders.get(model, self.encoders["default"])
+        Args:
+            texts: Texts to count
+            model: Model identifier
 
+        Returns:
+            Token count of each text
+        """
+        encoder = self.get_encoder(model)
+        if encoder is None:
+            self.stats["estimated"] += len(texts)
+            return [_estimate(text) for text in texts]
+
+        counts: list[int] = []
+        missing: dict[tuple[str, bytes], list[int]] = {}
+        missing_texts: list[str] = []
+        for i, text in enumerate(texts):
+            key = self._cache_key(encoder.name, text)
+            count = self._lookup(key)
+            if count is None:
+                if key not in missing:
+                    missing[key] = []
+                    missing_texts.append(text)
+                missing[key].append(i)
+                count = 0
+            counts.append(count)
+
+        self.stats["hits"] += len(texts) - sum(len(indexes) for indexes in missing.values())
+        if not missing:
+            return counts
+
+        self.stats["misses"] += len(missing_texts)
+        if sum(len(text) for text in missing_texts) > BATCH_THRESHOLD_CHARS:
+            encoded = [len(tokens) for tokens in encoder.encode_ordinary_batch(missing_texts)]
+        else:
+            encoded = [len(encoder.encode_ordinary(text)) for text in missing_texts]
+
+        for (key, indexes), count in zip(missing.items(), encoded):
+            self._remember(key, count)
+            for i in indexes:
+                counts[i] = count
+        return counts
+
+    def count_messages_tokens(self, messages: Iterable[Any], model: str = "gpt-4") -> int:
+        """Count total tokens for a list of messages (objects or dicts)"""
         # Token overhead per message (varies by model)
         tokens_per_message = 4 if "gpt-3.5-turbo" in model else 3
         tokens_per_name = 1
 
+        texts: list[str] = []
         num_tokens = 0
         for message in messages:
+            role, content, name = _message_fields(message)
             num_tokens += tokens_per_message
-            num_tokens += len(encoder.encode(message.content))
-            num_tokens += len(encoder.encode(message.role))
+            texts.append(content)
+            texts.append(role)
 
-            # Add tokens for name if present in metadata
-            if message.metadata and "name" in message.metadata:
+            # Add tokens for name if present
+            if name:
                 num_tokens += tokens_per_name
-                num_tokens += len(encoder.encode(message.metadata["name"]))
+                texts.append(name)
+
+        num_tokens += sum(self.count_many(texts, model))
 
         # Every reply is primed with assistant
         num_tokens += 3
 
         return num_tokens
 
+    async def count_tokens_async(self, text: str, model: str = "gpt-4") -> int:
+        """Count tokens, in a worker thread if the text is very long."""
+        if len(text) <= self.offload_threshold:
+            return self.count_tokens(text, model)
+        self.stats["offloaded"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.count_tokens, text, model)
+
+    async def count_messages_tokens_async(
+        self, messages: Iterable[Any], model: str = "gpt-4"
+    ) -> int:
+        """Count tokens of a conversation, in a worker thread if it is very long."""
+        messages = list(messages)
+        size = sum(len(_message_fields(message)[1]) for message in messages)
+        if size <= self.offload_threshold:
+            return self.count_messages_tokens(messages, model)
+        self.stats["offloaded"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.count_messages_tokens, messages, model
+        )
+
+    def stream_counter(self, model: str = "gpt-4") -> StreamTokenCounter:
+        """Create an incremental counter for a streamed completion."""
+        return StreamTokenCounter(self, model)
+
     def estimate_cost(self, input_tokens: int, output_tokens: int, model: str) -> dict[str, float]:
         """Estimate cost breakdown for token usage"""
         pricing = {
@@ -72,3 +349,7 @@ class TokenCounter:
         }
 
         return context_windows.get(model, 4096)
+
+
+# Shared token counter
+token_counter = TokenCounter()
@@ -1,6 +1,13 @@
 """WebSocket module for real-time streaming chat."""
 
+from .registry import ShardedConnectionRegistry
 from .ws_handlers import MessageHandler, WebSocketMessage
 from .ws_manager import ConnectionInfo, WebSocketManager
 
-__all__ = ["WebSocketManager", "ConnectionInfo", "MessageHandler", "WebSocketMessage"]
+__all__ = [
+    "WebSocketManager",
+    "ConnectionInfo",
+    "MessageHandler",
+    "WebSocketMessage",
+    "ShardedConnectionRegistry",
+]
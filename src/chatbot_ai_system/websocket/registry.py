@@ -0,0 +1,226 @@
+"""
+Sharded connection registry for WebSocket managers.
+"""
+
+import asyncio
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils.timing_wheel import TimingWheel
+
+# Timer kinds stored in each shard's wheel
+PING = "ping"
+IDLE = "idle"
+
+
+class ConnectionShard:
+    """One partition of the registry with its own lock and timers."""
+
+    def __init__(self, index: int, tick: float = 1.0, slots: int = 512):
+        self.index = index
+        self.lock = asyncio.Lock()
+        self.connections: Dict[str, Any] = {}
+        self.timers = TimingWheel(tick=tick, slots=slots, start=time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+
+class ShardedConnectionRegistry:
+    """
+    Connection registry partitioned by connection id hash.
+
+    Every shard has its own lock and its own timing wheel for heartbeat and idle
+    deadlines, so registering a connection never contends with unrelated ones and
+    timer work is proportional to the timers that are due, not to the number of
+    open sockets. Secondary indexes by user, tenant and conversation are updated
+    on add/remove instead of being rebuilt by scanning.
+    """
+
+    INDEXES = ("user_id", "tenant_id", "conversation_id")
+
+    def __init__(
+        self,
+        num_shards: int = 64,
+        max_connections: int = 100_000,
+        tick: float = 1.0,
+        wheel_slots: int = 512,
+    ):
+        """
+        Initialize registry.
+
+        Args:
+            num_shards: Number of shards
+            max_connections: Maximum connections across all shards
+            tick: Timer resolution in seconds
+            wheel_slots: Buckets per shard timing wheel
+        """
+        self.max_connections = max_connections
+        self.shards = [ConnectionShard(i, tick=tick, slots=wheel_slots) for i in range(num_shards)]
+        self.indexes: Dict[str, Dict[str, Set[str]]] = {
+            name: defaultdict(set) for name in self.INDEXES
+        }
+        self._count = 0
+        self._reserved = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, connection_id: str) -> bool:
+        return connection_id in self.shard_for(connection_id).connections
+
+    def shard_for(self, connection_id: str) -> ConnectionShard:
+        """Get the shard owning a connection id."""
+        return self.shards[zlib.crc32(connection_id.encode()) % len(self.shards)]
+
+    def try_reserve(self) -> bool:
+        """
+        Reserve a connection slot before the handshake.
+
+        Capacity is checked and claimed without awaiting, so concurrent accepts
+        cannot overshoot ``max_connections`` and no lock is held across I/O.
+
+        Returns:
+            True if a slot was reserved
+        """
+        if self._count + self._reserved >= self.max_connections:
+            return False
+        self._reserved += 1
+        return True
+
+    def release_reservation(self):
+        """Release a slot reserved with ``try_reserve`` that was not used."""
+        self._reserved = max(self._reserved - 1, 0)
+
+    async def add(
+        self,
+        connection_id: str,
+        connection: Any,
+        heartbeat_interval: float,
+        inactive_timeout: float,
+        reserved: bool = False,
+    ):
+        """
+        Register a connection and schedule its timers.
+
+        Args:
+            connection_id: Connection ID
+            connection: Connection object (indexed by its ``user_id``, ``tenant_id``
+                and ``conversation_id`` attributes when present)
+            heartbeat_interval: Seconds until the first ping
+            inactive_timeout: Seconds of inactivity before the idle timer fires
+            reserved: Whether a slot was already claimed with ``try_reserve``
+        """
+        shard = self.shard_for(connection_id)
+        async with shard.lock:
+            if reserved:
+                self.release_reservation()
+            if connection_id not in shard.connections:
+                self._count += 1
+            shard.connections[connection_id] = connection
+
+            now = time.monotonic()
+            shard.timers.schedule((PING, connection_id), now + heartbeat_interval)
+            shard.timers.schedule((IDLE, connection_id), now + inactive_timeout)
+
+        for name in self.INDEXES:
+            value = getattr(connection, name, None)
+            if value:
+                self.indexes[name][value].add(connection_id)
+
+    async def remove(self, connection_id: str) -> Optional[Any]:
+        """
+        Unregister a connection and cancel its timers.
+
+        Args:
+            connection_id: Connection ID
+
+        Returns:
+            Removed connection, or None if it was not registered
+        """
+        shard = self.shard_for(connection_id)
+        async with shard.lock:
+            connection = shard.connections.pop(connection_id, None)
+            if connection is None:
+                return None
+            self._count -= 1
+            shard.timers.cancel((PING, connection_id))
+            shard.timers.cancel((IDLE, connection_id))
+
+        for name in self.INDEXES:
+            value = getattr(connection, name, None)
+            if value:
+                members = self.indexes[name].get(value)
+                if members is not None:
+                    members.discard(connection_id)
+                    if not members:
+                        del self.indexes[name][value]
+
+        return connection
+
+    def get(self, connection_id: str) -> Optional[Any]:
+        """Get a connection by id."""
+        return self.shard_for(connection_id).connections.get(connection_id)
+
+    def lookup(self, index: str, value: str) -> Set[str]:
+        """
+        Get connection ids by a secondary index.
+
+        Args:
+            index: One of ``user_id``, ``tenant_id``, ``conversation_id``
+            value: Index value
+
+        Returns:
+            Connection ids (a copy, safe to iterate while disconnecting)
+        """
+        return set(self.indexes[index].get(value, ()))
+
+    def index_size(self, index: str) -> int:
+        """Number of distinct values in a secondary index."""
+        return len(self.indexes[index])
+
+    def reschedule(self, connection_id: str, kind: str, deadline: float):
+        """
+        Reschedule a connection timer.
+
+        Args:
+            connection_id: Connection ID
+            kind: ``PING`` or ``IDLE``
+            deadline: Absolute monotonic deadline
+        """
+        shard = self.shard_for(connection_id)
+        if connection_id in shard.connections:
+            shard.timers.schedule((kind, connection_id), deadline)
+
+    def due_timers(self, now: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """
+        Collect timers that are due across all shards.
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            ``(kind, connection_id, deadline)`` tuples
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        for shard in self.shards:
+            for (kind, connection_id), deadline in shard.timers.advance(now):
+                due.append((kind, connection_id, deadline))
+        return due
+
+    def connection_ids(self) -> Iterator[str]:
+        """Iterate over all connection ids."""
+        for shard in self.shards:
+            yield from list(shard.connections)
+
+    def values(self) -> Iterator[Any]:
+        """Iterate over all connections."""
+        for shard in self.shards:
+            yield from list(shard.connections.values())
+
+    def shard_sizes(self) -> List[int]:
+        """Number of connections per shard."""
+        return [len(shard) for shard in self.shards]
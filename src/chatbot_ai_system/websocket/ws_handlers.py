@@ -15,6 +15,7 @@ from pydantic import BaseModel, Field, field_validator
 
 from ..config import Settings
 from ..providers.base import ChatMessage, ProviderError
+from ..utils.token_counter import token_counter
 
 logger = logging.getLogger(__name__)
 
@@ -279,6 +280,7 @@ class MessageHandler:
             # Stream response
             if chat_request.stream and hasattr(provider, "stream_chat"):
                 # Streaming mode
+                stream_tokens = token_counter.stream_counter(chat_request.model)
                 async for chunk in provider.stream_chat(
                     messages=messages,
                     model=chat_request.model,
@@ -308,7 +310,7 @@ class MessageHandler:
 
                     full_response += chunk.content
                     chunk_index += 1
-                    total_tokens += 1
+                    total_tokens = stream_tokens.add(chunk.content)
             else:
                 # Non-streaming mode
                 response = await provider.chat(
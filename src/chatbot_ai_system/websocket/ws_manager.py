@@ -1,12 +1,12 @@
 """
-WebSocket connection manager with connection pooling and heartbeat.
+WebSocket connection manager with sharded connection registry and heartbeat.
 """
 
 import asyncio
 import json
 import logging
+import time
 import uuid
-from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set
@@ -14,6 +14,9 @@ from typing import Any, Dict, List, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 from prometheus_client import Counter, Gauge, Histogram
 
+from ..utils.timing_wheel import get_timer_scheduler, spread_delay, timer_lag_seconds
+from .registry import IDLE, PING, ShardedConnectionRegistry
+
 logger = logging.getLogger(__name__)
 
 # Prometheus metrics
@@ -36,6 +39,8 @@ class ConnectionInfo:
     connected_at: datetime = field(default_factory=datetime.utcnow)
     last_activity: datetime = field(default_factory=datetime.utcnow)
     user_id: Optional[str] = None
+    tenant_id: Optional[str] = None
+    conversation_id: Optional[str] = None
     client_info: Dict[str, Any] = field(default_factory=dict)
     message_count: int = 0
     bytes_sent: int = 0
@@ -53,8 +58,11 @@ class ConnectionInfo:
 
     def is_inactive(self, timeout_seconds: int = 300) -> bool:
         """Check if connection is inactive."""
-        inactive_duration = (datetime.utcnow() - self.last_activity).total_seconds()
-        return inactive_duration > timeout_seconds
+        return self.seconds_until_inactive(timeout_seconds) < 0
+
+    def seconds_until_inactive(self, timeout_seconds: int = 300) -> float:
+        """Seconds left before the connection counts as inactive."""
+        return timeout_seconds - (datetime.utcnow() - self.last_activity).total_seconds()
 
 
 class WebSocketManager:
@@ -63,23 +71,41 @@ class WebSocketManager:
     _instance = None
     _initialized = False
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        """Initialize WebSocket manager."""
+    def __init__(
+        self,
+        max_connections: int = 100_000,
+        heartbeat_interval: int = 30,
+        inactive_timeout: int = 300,
+        num_shards: int = 64,
+        timer_tick: float = 1.0,
+    ):
+        """
+        Initialize WebSocket manager.
+
+        Args:
+            max_connections: Maximum concurrent connections in this process
+            heartbeat_interval: Seconds between pings to each connection
+            inactive_timeout: Seconds without activity before disconnecting
+            num_shards: Number of registry shards
+            timer_tick: Resolution of heartbeat and idle timers in seconds
+        """
         if not self._initialized:
-            self.active_connections: Dict[str, ConnectionInfo] = {}
-            self.user_connections: Dict[str, Set[str]] = defaultdict(set)
-            self.max_connections = 100
-            self.heartbeat_interval = 30  # seconds
-            self.inactive_timeout = 300  # 5 minutes
+            self.connections = ShardedConnectionRegistry(
+                num_shards=num_shards, max_connections=max_connections, tick=timer_tick
+            )
+            self.max_connections = max_connections
+            self.heartbeat_interval = heartbeat_interval
+            self.inactive_timeout = inactive_timeout
+            self.timer_tick = timer_tick
             self.message_queue_size = 100
-            self._heartbeat_task = None
-            self._cleanup_task = None
-            self._lock = asyncio.Lock()
+            # Shard wheels are turned by a recurring tick on the shared scheduler
+            self.scheduler = get_timer_scheduler()
+            self._tick_key = (id(self), "registry_tick")
             self._initialized = True
 
             logger.info("WebSocket manager initialized")
@@ -89,14 +115,21 @@ class WebSocketManager:
         websocket: WebSocket,
         user_id: Optional[str] = None,
         client_info: Optional[Dict[str, Any]] = None,
+        tenant_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
     ) -> str:
         """
         Accept and register a new WebSocket connection.
 
+        The handshake and welcome message run outside any lock; capacity is
+        claimed up front so concurrent accepts cannot exceed the limit.
+
         Args:
             websocket: WebSocket connection
             user_id: Optional user identifier
             client_info: Optional client information
+            tenant_id: Optional tenant identifier
+            conversation_id: Optional conversation identifier
 
         Returns:
             Connection ID
@@ -104,66 +137,71 @@ class WebSocketManager:
         Raises:
             Exception: If max connections reached
         """
-        async with self._lock:
-            # Check connection limit
-            if len(self.active_connections) >= self.max_connections:
-                await websocket.close(code=1008, reason="Max connections reached")
-                raise Exception(f"Max connections ({self.max_connections}) reached")
+        # Check connection limit
+        if not self.connections.try_reserve():
+            await websocket.close(code=1008, reason="Max connections reached")
+            raise Exception(f"Max connections ({self.max_connections}) reached")
 
+        try:
             # Accept connection
             await websocket.accept()
-
-            # Generate connection ID
-            connection_id = str(uuid.uuid4())
-
-            # Create connection info
-            connection_info = ConnectionInfo(
-                connection_id=connection_id,
-                websocket=websocket,
-                user_id=user_id,
-                client_info=client_info or {},
-            )
-
-            # Register connection
-            self.active_connections[connection_id] = connection_info
-
-            if user_id:
-                self.user_connections[user_id].add(connection_id)
-
-            # Update metrics
-            ws_connections_active.set(len(self.active_connections))
-            ws_connections_total.inc()
-
-            # Start background tasks if not running
-            if not self._heartbeat_task or self._heartbeat_task.done():
-                self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
-
-            if not self._cleanup_task or self._cleanup_task.done():
-                self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-
-            logger.info(
-                "WebSocket connection established",
-                extra={
+        except Exception:
+            self.connections.release_reservation()
+            raise
+
+        # Generate connection ID
+        connection_id = str(uuid.uuid4())
+
+        # Create connection info
+        connection_info = ConnectionInfo(
+            connection_id=connection_id,
+            websocket=websocket,
+            user_id=user_id,
+            tenant_id=tenant_id,
+            conversation_id=conversation_id,
+            client_info=client_info or {},
+        )
+
+        # Register connection (only its shard is locked); first ping is spread
+        await self.connections.add(
+            connection_id,
+            connection_info,
+            heartbeat_interval=spread_delay(connection_id, self.heartbeat_interval),
+            inactive_timeout=self.inactive_timeout,
+            reserved=True,
+        )
+
+        # Update metrics
+        ws_connections_active.set(len(self.connections))
+        ws_connections_total.inc()
+
+        # Start turning the shard wheels if not already
+        if self._tick_key not in self.scheduler:
+            self.scheduler.call_later(self._tick_key, self.timer_tick, self._tick)
+
+        logger.info(
+            "WebSocket connection established",
+            extra={
+                "connection_id": connection_id,
+                "user_id": user_id,
+                "total_connections": len(self.connections),
+            },
+        )
+
+        # Send welcome message
+        await self.send_personal_message(
+            connection_id,
+            {
+                "type": "connection",
+                "data": {
                     "connection_id": connection_id,
-                    "user_id": user_id,
-                    "total_connections": len(self.active_connections),
+                    "status": "connected",
+                    "timestamp": datetime.utcnow().isoformat(),
                 },
-            )
-
-            # Send welcome message
-            await self.send_personal_message(
-                connection_id,
-                {
-                    "type": "connection",
-                    "data": {
-                        "connection_id": connection_id,
-                        "status": "connected",
-                        "timestamp": datetime.utcnow().isoformat(),
-                    },
-                },
-            )
+            },
+        )
 
-            return connection_id
+        return connection_id
 
     async def disconnect(
         self, connection_id: str, code: int = 1000, reason: str = "Normal closure"
@@ -176,44 +214,33 @@ class WebSocketManager:
             code: WebSocket close code
             reason: Disconnect reason
         """
-        async with self._lock:
-            if connection_id not in self.active_connections:
-                return
-
-            connection_info = self.active_connections[connection_id]
-
-            # Record connection duration
-            duration = connection_info.get_connection_duration()
-            ws_connection_duration.observe(duration)
+        connection_info = await self.connections.remove(connection_id)
+        if connection_info is None:
+            return
 
-            # Close WebSocket
-            try:
-                await connection_info.websocket.close(code=code, reason=reason)
-            except Exception as e:
-                logger.error(f"Error closing WebSocket: {e}")
+        # Record connection duration
+        duration = connection_info.get_connection_duration()
+        ws_connection_duration.observe(duration)
 
-            # Remove from active connections
-            del self.active_connections[connection_id]
-
-            # Remove from user connections
-            if connection_info.user_id:
-                self.user_connections[connection_info.user_id].discard(connection_id)
-                if not self.user_connections[connection_info.user_id]:
-                    del self.user_connections[connection_info.user_id]
-
-            # Update metrics
-            ws_connections_active.set(len(self.active_connections))
-
-            logger.info(
-                "WebSocket connection closed",
-                extra={
-                    "connection_id": connection_id,
-                    "user_id": connection_info.user_id,
-                    "duration": duration,
-                    "message_count": connection_info.message_count,
-                    "remaining_connections": len(self.active_connections),
-                },
-            )
+        # Close WebSocket
+        try:
+            await connection_info.websocket.close(code=code, reason=reason)
+        except Exception as e:
+            logger.error(f"Error closing WebSocket: {e}")
+
+        # Update metrics
+        ws_connections_active.set(len(self.connections))
+
+        logger.info(
+            "WebSocket connection closed",
+            extra={
+                "connection_id": connection_id,
+                "user_id": connection_info.user_id,
+                "duration": duration,
+                "message_count": connection_info.message_count,
+                "remaining_connections": len(self.connections),
+            },
+        )
 
     async def send_personal_message(self, connection_id: str, message: Dict[str, Any]) -> bool:
         """
@@ -226,12 +253,11 @@ class WebSocketManager:
         Returns:
             Success status
         """
-        if connection_id not in self.active_connections:
+        connection_info = self.connections.get(connection_id)
+        if connection_info is None:
             logger.warning(f"Connection {connection_id} not found")
             return False
 
-        connection_info = self.active_connections[connection_id]
-
         try:
             # Convert message to JSON
             message_json = json.dumps(message)
@@ -265,13 +291,14 @@ class WebSocketManager:
         Returns:
             Number of successful sends
         """
-        if user_id not in self.user_connections:
+        connection_ids = self.connections.lookup("user_id", user_id)
+        if not connection_ids:
             return 0
 
         success_count = 0
         failed_connections = []
 
-        for connection_id in list(self.user_connections[user_id]):
+        for connection_id in connection_ids:
             if await self.send_personal_message(connection_id, message):
                 success_count += 1
             else:
@@ -298,7 +325,7 @@ class WebSocketManager:
         success_count = 0
         failed_connections = []
 
-        for connection_id in list(self.active_connections.keys()):
+        for connection_id in self.connections.connection_ids():
             if connection_id in exclude:
                 continue
 
@@ -323,11 +350,10 @@ class WebSocketManager:
         Returns:
             Received message or None
         """
-        if connection_id not in self.active_connections:
+        connection_info = self.connections.get(connection_id)
+        if connection_info is None:
             return None
 
-        connection_info = self.active_connections[connection_id]
-
         try:
             # Receive message
             message_text = await connection_info.websocket.receive_text()
@@ -363,11 +389,10 @@ class WebSocketManager:
         Returns:
             Success status
         """
-        if connection_id not in self.active_connections:
+        connection_info = self.connections.get(connection_id)
+        if connection_info is None:
             return False
 
-        connection_info = self.active_connections[connection_id]
-
         # Limit queue size
         if len(connection_info.pending_messages) >= self.message_queue_size:
             connection_info.pending_messages.pop(0)  # Remove oldest
@@ -385,10 +410,10 @@ class WebSocketManager:
         Returns:
             Number of messages sent
         """
-        if connection_id not in self.active_connections:
+        connection_info = self.connections.get(connection_id)
+        if connection_info is None:
             return 0
 
-        connection_info = self.active_connections[connection_id]
         sent_count = 0
 
         while connection_info.pending_messages:
@@ -402,90 +427,108 @@ class WebSocketManager:
 
         return sent_count
 
-    async def _heartbeat_loop(self):
-        """Background task to send heartbeat pings."""
-        while self.active_connections:
-            try:
-                # Send ping to all connections
-                ping_message = {
-                    "type": "ping",
-                    "data": {"timestamp": datetime.utcnow().isoformat()},
-                }
-
-                failed_connections = []
-
-                for connection_id in list(self.active_connections.keys()):
-                    try:
-                        connection_info = self.active_connections[connection_id]
-                        await connection_info.websocket.send_json(ping_message)
-                    except Exception:
-                        failed_connections.append(connection_id)
-
-                # Disconnect failed connections
-                for connection_id in failed_connections:
-                    await self.disconnect(connection_id, code=1001, reason="Heartbeat failed")
-
-                await asyncio.sleep(self.heartbeat_interval)
+    async def _tick(self):
+        """Recurring scheduler callback that fires due heartbeat and idle timers."""
+        if len(self.connections):
+            self.scheduler.call_later(self._tick_key, self.timer_tick, self._tick)
+        try:
+            await self._process_timers(time.monotonic())
+        except Exception as e:
+            logger.error(f"Error processing connection timers: {e}")
 
-            except Exception as e:
-                logger.error(f"Error in heartbeat loop: {e}")
-                await asyncio.sleep(self.heartbeat_interval)
+    async def _process_timers(self, now: float):
+        """
+        Send pings and disconnect idle connections whose timers are due.
 
-    async def _cleanup_loop(self):
-        """Background task to clean up inactive connections."""
-        while self.active_connections:
-            try:
-                # Find inactive connections
-                inactive_connections = []
+        Args:
+            now: Current monotonic time
+        """
+        ping_ids = []
+        inactive_connections = []
 
-                for connection_id, connection_info in self.active_connections.items():
-                    if connection_info.is_inactive(self.inactive_timeout):
-                        inactive_connections.append(connection_id)
-                        logger.info(f"Cleaning up inactive connection: {connection_id}")
+        for kind, connection_id, deadline in self.connections.due_timers(now):
+            connection_info = self.connections.get(connection_id)
+            if connection_info is None:
+                continue
+            timer_lag_seconds.labels("websocket_registry").observe(max(now - deadline, 0.0))
+
+            if kind == PING:
+                ping_ids.append(connection_id)
+                self.connections.reschedule(connection_id, PING, now + self.heartbeat_interval)
+            elif kind == IDLE:
+                # Activity only updates a timestamp; the deadline is re-armed lazily here
+                remaining = connection_info.seconds_until_inactive(self.inactive_timeout)
+                if remaining < 0:
+                    inactive_connections.append(connection_id)
+                    logger.info(f"Cleaning up inactive connection: {connection_id}")
+                else:
+                    self.connections.reschedule(connection_id, IDLE, now + remaining)
+
+        if ping_ids:
+            ping_message = {
+                "type": "ping",
+                "data": {"timestamp": datetime.utcnow().isoformat()},
+            }
+            results = await asyncio.gather(
+                *(self._send_ping(connection_id, ping_message) for connection_id in ping_ids)
+            )
 
-                # Disconnect inactive connections
-                for connection_id in inactive_connections:
-                    await self.disconnect(connection_id, code=1001, reason="Inactive timeout")
+            # Disconnect failed connections
+            for connection_id, ok in zip(ping_ids, results):
+                if not ok:
+                    await self.disconnect(connection_id, code=1001, reason="Heartbeat failed")
 
-                await asyncio.sleep(60)  # Check every minute
+        # Disconnect inactive connections
+        for connection_id in inactive_connections:
+            await self.disconnect(connection_id, code=1001, reason="Inactive timeout")
 
-            except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
-                await asyncio.sleep(60)
+    async def _send_ping(self, connection_id: str, ping_message: Dict[str, Any]) -> bool:
+        """Send a heartbeat ping, returning False if the socket is gone."""
+        connection_info = self.connections.get(connection_id)
+        if connection_info is None:
+            return True
+        try:
+            await connection_info.websocket.send_json(ping_message)
+            return True
+        except Exception:
+            return False
 
     def get_connection_info(self, connection_id: str) -> Optional[ConnectionInfo]:
         """Get information about a connection."""
-        return self.active_connections.get(connection_id)
+        return self.connections.get(connection_id)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get WebSocket manager statistics."""
-        total_messages = sum(c.message_count for c in self.active_connections.values())
-        total_bytes_sent = sum(c.bytes_sent for c in self.active_connections.values())
-        total_bytes_received = sum(c.bytes_received for c in self.active_connections.values())
+        connections = list(self.connections.values())
+        total_messages = sum(c.message_count for c in connections)
+        total_bytes_sent = sum(c.bytes_sent for c in connections)
+        total_bytes_received = sum(c.bytes_received for c in connections)
+        shard_sizes = self.connections.shard_sizes()
 
         return {
-            "active_connections": len(self.active_connections),
+            "active_connections": len(self.connections),
             "max_connections": self.max_connections,
-            "total_users": len(self.user_connections),
+            "shards": len(shard_sizes),
+            "max_shard_size": max(shard_sizes),
+            "total_users": self.connections.index_size("user_id"),
+            "total_tenants": self.connections.index_size("tenant_id"),
             "total_messages": total_messages,
             "total_bytes_sent": total_bytes_sent,
             "total_bytes_received": total_bytes_received,
             "heartbeat_interval": self.heartbeat_interval,
             "inactive_timeout": self.inactive_timeout,
+            "timers": self.scheduler.get_stats(),
         }
 
     async def shutdown(self):
         """Gracefully shutdown all connections."""
         logger.info("Shutting down WebSocket manager")
 
-        # Cancel background tasks
-        if self._heartbeat_task:
-            self._heartbeat_task.cancel()
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
+        # Stop turning the shard wheels
+        self.scheduler.cancel(self._tick_key)
 
         # Close all connections
-        for connection_id in list(self.active_connections.keys()):
+        for connection_id in list(self.connections.connection_ids()):
             await self.disconnect(connection_id, code=1001, reason="Server shutdown")
 
         logger.info("WebSocket manager shutdown complete")
@@ -6,11 +6,13 @@ import logging
 import time
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Optional
 from uuid import UUID, uuid4
 
 from fastapi import WebSocket, WebSocketDisconnect
 
+from ..utils.timing_wheel import TimerScheduler, get_timer_scheduler, spread_delay
 from .events import ErrorEvent, EventType, HeartbeatEvent, WebSocketEvent, create_connection_event
 
 logger = logging.getLogger(__name__)
@@ -178,7 +180,13 @@ class WebSocketConnection:
 class ConnectionManager:
     """Manages WebSocket connections with multi-tenant support."""
 
-    def __init__(self, heartbeat_interval: int = 30, max_connections_per_tenant: int = 100):
+    def __init__(
+        self,
+        heartbeat_interval: int = 30,
+        max_connections_per_tenant: int = 100,
+        stale_threshold: float = 300,
+        scheduler: TimerScheduler | None = None,
+    ):
         self.connections: dict[str, WebSocketConnection] = {}
         self.tenant_connections: dict[UUID, set[str]] = {}
         self.user_connections: dict[str, set[str]] = {}
@@ -186,10 +194,10 @@ class ConnectionManager:
 
         self.heartbeat_interval = heartbeat_interval
         self.max_connections_per_tenant = max_connections_per_tenant
+        self.stale_threshold = stale_threshold
 
-        # Background tasks
-        self._heartbeat_task: asyncio.Task | None = None
-        self._cleanup_task: asyncio.Task | None = None
+        # Per-connection heartbeat and idle timers on the shared timing wheel
+        self.scheduler = scheduler or get_timer_scheduler()
 
         # Statistics
         self.total_connections = 0
@@ -199,32 +207,35 @@ class ConnectionManager:
         logger.info(f"Connection manager initialized with {heartbeat_interval}s heartbeat")
 
     async def start_background_tasks(self):
-        """Start background tasks for heartbeat and cleanup."""
-        if not self._heartbeat_task or self._heartbeat_task.done():
-            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
-            logger.info("Started heartbeat task")
-
-        if not self._cleanup_task or self._cleanup_task.done():
-            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-            logger.info("Started cleanup task")
+        """Start the timer scheduler that drives heartbeat and cleanup."""
+        self.scheduler.start()
 
     async def stop_background_tasks(self):
-        """Stop background tasks."""
-        if self._heartbeat_task and not self._heartbeat_task.done():
-            self._heartbeat_task.cancel()
-            try:
-                await self._heartbeat_task
-            except asyncio.CancelledError:
-                pass
-            logger.info("Stopped heartbeat task")
+        """Cancel heartbeat and cleanup timers of all connections."""
+        for connection_id in self.connections:
+            self._cancel_timers(connection_id)
+        logger.info("Stopped heartbeat and cleanup timers")
+
+    def _timer_key(self, connection_id: str, kind: str) -> tuple:
+        return (id(self), connection_id, kind)
+
+    def _schedule_timers(self, connection: WebSocketConnection):
+        """Arm the first heartbeat (spread across the interval) and the idle timer."""
+        ping_key = self._timer_key(connection.id, "ping")
+        self.scheduler.call_later(
+            ping_key,
+            spread_delay(ping_key, self.heartbeat_interval),
+            partial(self._heartbeat, connection.id),
+        )
+        self.scheduler.call_later(
+            self._timer_key(connection.id, "idle"),
+            self.stale_threshold,
+            partial(self._check_stale, connection.id),
+        )
 
-        if self._cleanup_task and not self._cleanup_task.done():
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            logger.info("Stopped cleanup task")
+    def _cancel_timers(self, connection_id: str):
+        self.scheduler.cancel(self._timer_key(connection_id, "ping"))
+        self.scheduler.cancel(self._timer_key(connection_id, "idle"))
 
     async def connect(
         self,
@@ -254,6 +265,7 @@ class ConnectionManager:
 
         # Store connection
         self.connections[connection.id] = connection
+        self._schedule_timers(connection)
 
         # Index by tenant
         if tenant_id:
@@ -318,6 +330,7 @@ class ConnectionManager:
 
         # Close WebSocket
         await connection.close(code=code, reason=reason)
+        self._cancel_timers(connection_id)
 
         # Remove from indexes
         if connection.tenant_id and connection.tenant_id in self.tenant_connections:
@@ -389,48 +402,50 @@ class ConnectionManager:
         for connection_id in failed_connections:
             await self.disconnect(connection_id, code=1006, reason="Send failed")
 
-    async def _heartbeat_loop(self):
-        """Background task to send heartbeat to all connections."""
-        while True:
-            try:
-                await asyncio.sleep(self.heartbeat_interval)
+    async def _heartbeat(self, connection_id: str):
+        """Heartbeat timer callback for one connection.
 
-                if not self.connections:
-                    continue
-
-                heartbeat_event = HeartbeatEvent()
-                await self.broadcast_to_all(heartbeat_event)
-
-                logger.debug(f"Sent heartbeat to {len(self.connections)} connections")
-
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in heartbeat loop: {e}")
+        A ping is only sent if nothing was sent in the last interval; otherwise the
+        timer is re-armed relative to the last activity.
+        """
+        connection = self.connections.get(connection_id)
+        if not connection:
+            return
 
-    async def _cleanup_loop(self):
-        """Background task to cleanup stale connections."""
-        while True:
-            try:
-                await asyncio.sleep(60)  # Run cleanup every minute
+        key = self._timer_key(connection_id, "ping")
+        callback = partial(self._heartbeat, connection_id)
+        idle_for = time.time() - connection.stats.last_activity
 
-                stale_connections = []
+        if idle_for < self.heartbeat_interval:
+            self.scheduler.call_later(key, self.heartbeat_interval - idle_for, callback)
+            return
 
-                for connection_id, connection in self.connections.items():
-                    if connection.stats.is_stale:
-                        stale_connections.append(connection_id)
+        self.scheduler.call_later(key, self.heartbeat_interval, callback)
+        try:
+            await connection.send_event(HeartbeatEvent())
+            connection.stats.last_heartbeat = time.time()
+            self.total_messages_sent += 1
+        except Exception as e:
+            logger.warning(f"Heartbeat failed for connection {connection_id}: {e}")
+            await self.disconnect(connection_id, code=1006, reason="Send failed")
 
-                # Disconnect stale connections
-                for connection_id in stale_connections:
-                    await self.disconnect(connection_id, code=1000, reason="Stale connection")
+    async def _check_stale(self, connection_id: str):
+        """Idle timer callback; disconnects the connection or re-arms the timer."""
+        connection = self.connections.get(connection_id)
+        if not connection:
+            return
 
-                if stale_connections:
-                    logger.info(f"Cleaned up {len(stale_connections)} stale connections")
+        remaining = self.stale_threshold - (time.time() - connection.stats.last_activity)
+        if remaining > 0:
+            self.scheduler.call_later(
+                self._timer_key(connection_id, "idle"),
+                remaining,
+                partial(self._check_stale, connection_id),
+            )
+            return
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
+        logger.info(f"Cleaning up stale connection {connection_id}")
+        await self.disconnect(connection_id, code=1000, reason="Stale connection")
 
     def get_connection(self, connection_id: str) -> WebSocketConnection | None:
         """Get connection by ID."""
@@ -455,6 +470,7 @@ class ConnectionManager:
             ),
             "average_uptime_seconds": avg_uptime,
             "heartbeat_interval": self.heartbeat_interval,
+            "timers": self.scheduler.get_stats(),
         }
 
     @asynccontextmanager
@@ -0,0 +1,201 @@
+"""Unit tests for admission control."""
+
+import asyncio
+import time
+
+import pytest
+
+
+async def hold(controller, order, name, **kwargs):
+    """Acquire a slot, note the admission order and release it."""
+    started_at = await controller.acquire(**kwargs)
+    order.append(name)
+    controller.release(started_at, record=False)
+
+
+class TestAdmissionController:
+    """Test suite for priority and fairness of admission."""
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_is_admitted_first(self):
+        """Test that waiting work is admitted by priority, not arrival."""
+        from chatbot_ai_system.reliability import AdmissionController, FixedLimit
+
+        controller = AdmissionController(limit=FixedLimit(1))
+        blocker = await controller.acquire()
+        order = []
+
+        tasks = [
+            asyncio.create_task(hold(controller, order, "low", priority=0)),
+            asyncio.create_task(hold(controller, order, "high", priority=10)),
+        ]
+        await asyncio.sleep(0)
+        controller.release(blocker, record=False)
+        await asyncio.gather(*tasks)
+
+        assert order == ["high", "low"]
+
+    @pytest.mark.asyncio
+    async def test_tenants_share_slots_by_weight(self):
+        """Test deficit round robin across tenants of the same priority."""
+        from chatbot_ai_system.reliability import AdmissionController, FixedLimit
+
+        controller = AdmissionController(limit=FixedLimit(1))
+        blocker = await controller.acquire()
+        order = []
+
+        tasks = [
+            asyncio.create_task(hold(controller, order, "a", tenant_id="a", weight=2))
+            for _ in range(4)
+        ] + [asyncio.create_task(hold(controller, order, "b", tenant_id="b")) for _ in range(2)]
+        await asyncio.sleep(0)
+        controller.release(blocker, record=False)
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "a", "b", "a", "a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_queued_work_past_its_deadline_is_shed(self):
+        """Test that work that can no longer meet its deadline is not sent."""
+        from chatbot_ai_system.reliability import (
+            AdmissionController,
+            DeadlineExceededException,
+            FixedLimit,
+        )
+
+        limit = FixedLimit(1)
+        limit.short_rtt = 500  # upstream currently takes 500ms
+        controller = AdmissionController(limit=limit)
+
+        with pytest.raises(DeadlineExceededException):
+            await controller.acquire(deadline=time.time() + 0.1)
+
+        blocker = await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire(deadline=time.time() + 0.05))
+        await asyncio.sleep(0.1)
+        with pytest.raises(DeadlineExceededException):
+            await waiting
+
+        controller.release(blocker, record=False)
+        assert controller.queued == 0
+        assert controller.inflight == 0
+        assert controller.stats["shed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """Test that work beyond the queue size is rejected."""
+        from chatbot_ai_system.reliability import (
+            AdmissionController,
+            BulkheadRejectedException,
+            FixedLimit,
+        )
+
+        controller = AdmissionController(limit=FixedLimit(1), max_queue=1)
+        blocker = await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(BulkheadRejectedException):
+            await controller.acquire()
+
+        controller.release(blocker, record=False)
+        controller.release(await waiting, record=False)
+
+
+class TestGradientLimit:
+    """Test suite for the adaptive concurrency limit."""
+
+    def test_limit_grows_while_latency_is_flat(self):
+        """Test that the limit grows when latency stays at its baseline."""
+        from chatbot_ai_system.reliability import GradientLimit
+
+        limit = GradientLimit(initial_limit=10)
+        for _ in range(50):
+            limit.on_sample(100, inflight=limit.current)
+
+        assert limit.current > 10
+
+    def test_limit_shrinks_when_latency_rises(self):
+        """Test that queueing at the upstream lowers the limit."""
+        from chatbot_ai_system.reliability import GradientLimit
+
+        limit = GradientLimit(initial_limit=50)
+        for _ in range(20):
+            limit.on_sample(100, inflight=limit.current)
+        grown = limit.current
+        for _ in range(20):
+            limit.on_sample(1000, inflight=limit.current)
+
+        assert limit.current < grown / 2
+
+    def test_drops_back_off(self):
+        """Test the multiplicative decrease on timeouts."""
+        from chatbot_ai_system.reliability import GradientLimit
+
+        limit = GradientLimit(initial_limit=100)
+        limit.on_sample(5000, inflight=100, dropped=True)
+
+        assert limit.current == 90
+
+
+class TestBulkheadRetryExecutor:
+    """Test suite for the bulkhead executor."""
+
+    @pytest.mark.asyncio
+    async def test_runs_callers_own_work(self):
+        """Test that each caller gets the result of its own function."""
+        from chatbot_ai_system.reliability import BulkheadRetryExecutor
+
+        executor = BulkheadRetryExecutor(max_concurrent=2)
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            *(executor.execute(work, i, priority=i % 3) for i in range(10))
+        )
+
+        assert results == list(range(10))
+        assert executor.get_status()["active_executions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_each_attempt_is_admitted_separately(self):
+        """Test that backoff between attempts holds no slot and is not sampled as latency."""
+        from chatbot_ai_system.reliability import BulkheadRetryExecutor, RetryConfig
+
+        executor = BulkheadRetryExecutor(
+            max_concurrent=2, config=RetryConfig(initial_delay_ms=200, jitter=False)
+        )
+        inflight = []
+
+        async def flaky():
+            inflight.append(executor.active_executions)
+            if len(inflight) == 1:
+                raise ConnectionError("reset")
+            return "ok"
+
+        async def observe_backoff():
+            await asyncio.sleep(0.1)
+            return executor.active_executions
+
+        result, during_backoff = await asyncio.gather(executor.execute(flaky), observe_backoff())
+
+        assert result == "ok"
+        assert inflight == [1, 1]
+        assert during_backoff == 0
+        assert executor.admission.limit.short_rtt < 50
+
+    @pytest.mark.asyncio
+    async def test_rejected_attempts_are_not_retried(self):
+        """Test that a full bulkhead rejects at once instead of retrying."""
+        from chatbot_ai_system.reliability import BulkheadRejectedException, BulkheadRetryExecutor
+
+        executor = BulkheadRetryExecutor(max_concurrent=1, queue_size=0, adaptive=False)
+        blocker = await executor.admission.acquire()
+
+        with pytest.raises(BulkheadRejectedException):
+            await executor.execute(asyncio.sleep, 0)
+
+        assert executor.admission.stats["rejected"] == 1
+        executor.admission.release(blocker, record=False)
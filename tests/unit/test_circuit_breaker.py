@@ -0,0 +1,171 @@
+"""Unit tests for the circuit breaker rolling window."""
+
+import pytest
+
+
+class TestRollingWindow:
+    """Test suite for bucketed request counters."""
+
+    def test_running_totals(self):
+        """Test that health reads running totals across buckets."""
+        from chatbot_ai_system.reliability.rolling_window import RollingWindow
+
+        window = RollingWindow(window_ms=10000, buckets=10)
+        for i in range(10):
+            window.record_success(10, now_ms=i * 1000)
+        window.record_failure(now_ms=9500)
+        window.record_timeout(5000, now_ms=9600)
+
+        health = window.health(now_ms=9999)
+        assert health.total == 12
+        assert health.errors == 2
+        assert health.error_percentage == pytest.approx(2 / 12 * 100)
+
+    def test_old_buckets_expire(self):
+        """Test that buckets leaving the window are subtracted."""
+        from chatbot_ai_system.reliability.rolling_window import RollingWindow
+
+        window = RollingWindow(window_ms=10000, buckets=10)
+        window.record_failure(now_ms=0)
+        window.record_success(10, now_ms=5000)
+
+        assert window.health(now_ms=10500).total == 1
+        assert window.health(now_ms=15500).total == 0
+        assert window.latency_count == 0
+        assert sum(window.histogram) == 0
+
+        # A long idle period clears everything
+        window.record_success(10, now_ms=16000)
+        assert window.health(now_ms=1_000_000).total == 0
+
+    def test_latency_percentile(self):
+        """Test percentile estimates from the bucket histograms."""
+        from chatbot_ai_system.reliability.rolling_window import RollingWindow
+
+        window = RollingWindow()
+        for _ in range(98):
+            window.record_success(8, now_ms=100)
+        for _ in range(2):
+            window.record_success(900, now_ms=100)
+
+        assert 5 <= window.latency_percentile(50, now_ms=100) <= 10
+        assert 750 <= window.latency_percentile(99, now_ms=100) <= 1000
+        assert window.mean_latency(now_ms=100) == pytest.approx((98 * 8 + 2 * 900) / 100)
+
+
+class TestHystrixCircuitBreaker:
+    """Test suite for circuit breaker trip conditions."""
+
+    @pytest.mark.asyncio
+    async def test_opens_on_error_percentage(self):
+        """Test that the error percentage over the window opens the circuit."""
+        from chatbot_ai_system.reliability import CircuitState, HystrixCircuitBreaker
+
+        breaker = HystrixCircuitBreaker("test", failure_threshold=100, min_requests_in_window=10)
+        for i in range(10):
+            if i % 2:
+                await breaker._record_failure()
+            else:
+                await breaker._record_success(5)
+
+        assert breaker._get_current_state() == CircuitState.OPEN
+        assert breaker.get_metrics()["current_error_percentage"] == 50.0
+
+    @pytest.mark.asyncio
+    async def test_opens_on_latency_percentile(self):
+        """Test the optional latency percentile trip condition."""
+        from chatbot_ai_system.reliability import CircuitState, HystrixCircuitBreaker
+
+        breaker = HystrixCircuitBreaker(
+            "slow", min_requests_in_window=10, latency_threshold_ms=1000, latency_percentile=90
+        )
+        for _ in range(10):
+            await breaker._record_success(50)
+        assert breaker._get_current_state() == CircuitState.CLOSED
+
+        for _ in range(5):
+            await breaker._record_success(4000)
+        assert breaker._get_current_state() == CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_reset_clears_window(self):
+        """Test that reset forgets the rolling window."""
+        from chatbot_ai_system.reliability import HystrixCircuitBreaker
+
+        breaker = HystrixCircuitBreaker("test")
+        await breaker._record_failure()
+        breaker.reset()
+
+        metrics = breaker.get_metrics()
+        assert metrics["requests_in_window"] == 0
+        assert metrics["state"] == "closed"
+
+
+class TestCircuitBreakerCluster:
+    """Test suite for circuit state shared across processes."""
+
+    def test_fleet_wide_counts_open_the_circuit(self):
+        """Test that cluster counts trip a circuit with few local requests."""
+        from chatbot_ai_system.reliability import CircuitState, HystrixCircuitBreaker
+        from chatbot_ai_system.reliability.rolling_window import HealthCounts
+
+        breaker = HystrixCircuitBreaker("test", min_requests_in_window=20)
+        breaker.update_cluster_health(HealthCounts(40, 30, 75.0), ttl=5)
+
+        assert breaker._get_current_state() == CircuitState.OPEN
+
+    def test_stale_fleet_counts_are_ignored(self):
+        """Test that counts from a cluster that stopped syncing are not used."""
+        from chatbot_ai_system.reliability import CircuitState, HystrixCircuitBreaker
+        from chatbot_ai_system.reliability.rolling_window import HealthCounts
+
+        breaker = HystrixCircuitBreaker("test", min_requests_in_window=20)
+        breaker.update_cluster_health(HealthCounts(40, 30, 75.0), ttl=-1)
+
+        assert breaker._get_current_state() == CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_remote_transitions_are_applied_not_rebroadcast(self):
+        """Test that announced transitions are applied without echoing them."""
+        import json
+        from unittest.mock import MagicMock
+
+        from chatbot_ai_system.reliability import (
+            CircuitBreakerCluster,
+            CircuitState,
+            HystrixCircuitBreaker,
+        )
+
+        cluster = CircuitBreakerCluster(MagicMock(), instance_id="pod-a")
+        cluster.announce = MagicMock()
+        breaker = HystrixCircuitBreaker("openai")
+        cluster.breakers[breaker.name] = breaker
+        breaker.cluster = cluster
+
+        cluster.handle_message(json.dumps({"name": "openai", "state": "open", "source": "pod-b"}))
+        assert breaker.state == CircuitState.OPEN
+
+        cluster.handle_message(json.dumps({"name": "openai", "state": "closed", "source": "pod-a"}))
+        assert breaker.state == CircuitState.OPEN
+
+        cluster.handle_message(json.dumps({"name": "openai", "state": "closed", "source": "pod-b"}))
+        assert breaker.state == CircuitState.CLOSED
+        cluster.announce.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_local_transitions_are_announced(self):
+        """Test that a circuit opened locally is broadcast to the cluster."""
+        from unittest.mock import MagicMock
+
+        from chatbot_ai_system.reliability import CircuitState, HystrixCircuitBreaker
+
+        breaker = HystrixCircuitBreaker("openai", failure_threshold=2)
+        breaker.cluster = MagicMock()
+
+        await breaker._record_failure()
+        await breaker._record_failure()
+        breaker._get_current_state()
+
+        breaker.cluster.announce.assert_called_once_with(breaker, CircuitState.OPEN)
+        assert breaker.take_unsynced() == (0, 2, 0)
+        assert breaker.take_unsynced() == (0, 0, 0)
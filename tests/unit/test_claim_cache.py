@@ -0,0 +1,147 @@
+"""Unit tests for verified JWT claim caching in the tenant middleware."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def make_request(token):
+    """Create a request mock carrying a bearer token."""
+    request = MagicMock()
+    request.headers = {"Authorization": f"Bearer {token}"}
+    request.cookies = {}
+    return request
+
+
+def make_middleware(**kwargs):
+    """Create a tenant middleware without an application."""
+    from chatbot_ai_system.tenancy.quota_engine import QuotaEngine
+    from chatbot_ai_system.tenancy.tenant_middleware import TenantMiddleware
+
+    return TenantMiddleware(MagicMock(), quota_engine=QuotaEngine(MagicMock()), **kwargs)
+
+
+class TestVerifiedClaimCache:
+    """Test suite for the verified claim cache."""
+
+    def test_entries_expire_with_token(self):
+        """Test that an entry is never served past the token's exp."""
+        from chatbot_ai_system.tenancy.claim_cache import VerifiedClaimCache
+
+        cache = VerifiedClaimCache(max_ttl=300)
+        digest = cache.digest("token")
+        cache.put(digest, {"tenant_id": "t1"}, exp=1010, now=1000)
+
+        assert cache.get(digest, now=1009).context == {"tenant_id": "t1"}
+        assert cache.get(digest, now=1010) is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache stays bounded."""
+        from chatbot_ai_system.tenancy.claim_cache import VerifiedClaimCache
+
+        cache = VerifiedClaimCache(max_entries=2)
+        first, second, third = (cache.digest(token) for token in ("a", "b", "c"))
+        cache.put(first, {}, exp=None, now=0)
+        cache.put(second, {}, exp=None, now=0)
+        cache.get(first, now=1)
+        cache.put(third, {}, exp=None, now=1)
+
+        assert cache.get(second, now=1) is None
+        assert cache.get(first, now=1) is not None
+        assert cache.get_stats()["evictions"] == 1
+
+
+class TestTenantMiddlewareClaimCache:
+    """Test suite for the cached authentication path."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_token_is_verified_once(self):
+        """Test that a repeated bearer skips signature verification."""
+        from jose import jwt
+
+        token = jwt.encode(
+            {"tenant_id": "t1", "sub": "u1", "exp": int(time.time()) + 600},
+            "secret",
+            algorithm="HS256",
+        )
+        middleware = make_middleware(secret_key="secret")
+
+        with patch(
+            "chatbot_ai_system.tenancy.tenant_middleware.jwt.decode", wraps=jwt.decode
+        ) as decode:
+            contexts = [
+                await middleware._extract_tenant_context(make_request(token)) for _ in range(5)
+            ]
+
+        assert decode.call_count == 1
+        assert all(context["tenant_id"] == "t1" for context in contexts)
+        assert middleware.claim_cache.get_stats()["hits"] == 4
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_not_cached(self):
+        """Test that a token with a bad signature is rejected every time."""
+        from jose import jwt
+
+        token = jwt.encode({"tenant_id": "t1"}, "other", algorithm="HS256")
+        middleware = make_middleware(secret_key="secret")
+
+        assert await middleware._extract_tenant_context(make_request(token)) is None
+        assert len(middleware.claim_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_asymmetric_key_is_parsed_once(self):
+        """Test RS256 verification with a pre-parsed public key."""
+        import rsa
+        from jose import jwt
+        from jose.backends.base import Key
+
+        public, private = rsa.newkeys(1024)
+        token = jwt.encode(
+            {"tenant_id": "t1", "tier": "enterprise"},
+            private.save_pkcs1().decode(),
+            algorithm="RS256",
+        )
+        middleware = make_middleware(
+            secret_key=None, algorithm="RS256", public_key=public.save_pkcs1().decode()
+        )
+
+        context = await middleware._extract_tenant_context(make_request(token))
+
+        assert isinstance(middleware.verification_key, Key)
+        assert context["tier"] == "enterprise"
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_is_dropped(self, mock_redis):
+        """Test that revocation through the auth service evicts the cached claims."""
+        from unittest.mock import AsyncMock
+
+        from jose import jwt
+
+        from chatbot_ai_system.core.auth.auth_service import AuthService
+
+        mock_redis.mget = AsyncMock(return_value=[None, None])
+        auth_service = AuthService(secret_key="secret", redis_client=mock_redis)
+        token = jwt.encode({"tenant_id": "t1", "jti": "abc"}, "secret", algorithm="HS256")
+        middleware = make_middleware(secret_key="secret", auth_service=auth_service)
+
+        assert await middleware._extract_tenant_context(make_request(token)) is not None
+        mock_redis.mget.assert_awaited_once_with("revoked_token:" + token, "revoked_token:abc")
+
+        await auth_service.revoke_token(token)
+
+        assert await middleware._extract_tenant_context(make_request(token)) is None
+        assert middleware.claim_cache.get_stats()["invalidations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_key_fails_only_when_verifying(self):
+        """Test that a middleware without a key can be built but refuses to verify."""
+        from jose import jwt
+
+        middleware = make_middleware(secret_key=None)
+        token = jwt.encode({"tenant_id": "t1"}, "secret", algorithm="HS256")
+
+        assert await middleware._extract_tenant_context(MagicMock(headers={}, cookies={})) is None
+        with pytest.raises(RuntimeError, match="secret_key or public_key"):
+            await middleware._extract_tenant_context(make_request(token))
@@ -0,0 +1,128 @@
+"""Unit tests for the columnar cost ledger."""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class TestCostLedger:
+    """Test suite for the cost ledger behind CostTracker."""
+
+    def test_summary_matches_entries(self):
+        """Test that vectorized summaries match a per-entry computation."""
+        from chatbot_ai_system.finops.cost_tracker import CostTracker
+
+        tracker = CostTracker()
+        tracker.track_usage("openai", "model-4", 1000, 500, tenant_id="t1")
+        tracker.track_usage("openai", "model-3.5-turbo", 2000, 100, tenant_id="t2")
+        tracker.track_usage("anthropic", "model-3-haiku", 400, 400, tenant_id="t1", cached=True)
+        tracker.track_usage("anthropic", "model-3-haiku", 400, 400)
+
+        summary = tracker.get_summary()
+        billed = [e for e in tracker.entries if not e.cached]
+
+        assert summary.total_requests == 4
+        assert summary.cached_requests == 1
+        assert summary.total_tokens == sum(e.total_tokens for e in billed)
+        assert abs(summary.total_cost - sum(e.total_cost for e in billed)) < 1e-9
+        assert abs(summary.cost_by_model["model-4"] - 0.06) < 1e-9
+        assert set(summary.cost_by_provider) == {"openai", "anthropic"}
+        assert set(summary.cost_by_tenant) == {"t1", "t2"}
+        assert summary.cache_savings > 0
+
+    def test_time_range_and_tenant_filters(self):
+        """Test that range and tenant filters select the right rows."""
+        from chatbot_ai_system.finops.cost_ledger import CostLedger
+
+        ledger = CostLedger()
+        now = time.time()
+        for i, tenant in enumerate(["t1", "t2", "t1"]):
+            ledger.append(now - i * 3600, tenant, "", "", "p", "m", 10, 10, 0.1, 0.1, False)
+        # Out-of-order append is re-sorted on read
+        ledger.append(now - 7200 + 1, "t1", "", "", "p", "m", 10, 10, 0.1, 0.1, False)
+
+        columns = ledger.select(now - 7200 - 1, now - 1800, tenant_id="t1")
+        assert len(columns["timestamp"]) == 2
+        assert list(columns["timestamp"]) == sorted(columns["timestamp"])
+        assert len(ledger.select(now - 10, now, tenant_id="unknown")["timestamp"]) == 0
+
+    def test_old_partitions_spill_to_disk(self, tmp_path):
+        """Test that spilled partitions are still queryable."""
+        from chatbot_ai_system.finops.cost_ledger import CostLedger
+
+        ledger = CostLedger(spill_dir=tmp_path, retain_days=1)
+        old = (datetime.now() - timedelta(days=3)).timestamp()
+        ledger.append(old, "t1", "u1", "c1", "p", "m", 10, 20, 0.5, 0.25, False)
+        ledger.append(time.time(), "t1", "u1", "c1", "p", "m", 1, 2, 0.1, 0.1, False)
+
+        assert ledger.spill() == 1
+        assert len(ledger.partitions) == 1
+
+        columns = ledger.select(old - 1, old + 1)
+        rows = list(ledger.decode(columns))
+        assert rows[0]["tenant_id"] == "t1"
+        assert rows[0]["completion_cost"] == 0.25
+
+
+class TestCostExports:
+    """Test suite for streaming cost exports."""
+
+    @pytest.mark.asyncio
+    async def test_ndjson_export_streams_in_chunks(self):
+        """Test that NDJSON exports are produced chunk by chunk with filters applied."""
+        import json
+
+        from chatbot_ai_system.finops.cost_tracker import CostTracker
+        from chatbot_ai_system.finops.exporters import stream_ndjson
+
+        tracker = CostTracker()
+        for i in range(25):
+            tracker.track_usage("openai", "model-4", 10, 10, tenant_id=f"t{i % 2}")
+
+        chunks = [
+            chunk
+            async for chunk in stream_ndjson(
+                tracker.ledger, 0, time.time() + 1, tenant_id="t0", chunk_rows=5
+            )
+        ]
+
+        rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+        assert len(chunks) == 3
+        assert len(rows) == 13
+        assert {row["tenant_id"] for row in rows} == {"t0"}
+        assert rows[0]["total_tokens"] == 20
+
+    @pytest.mark.asyncio
+    async def test_gzip_csv_export(self):
+        """Test that compressed CSV exports decompress to the expected rows."""
+        import gzip
+
+        from chatbot_ai_system.finops.cost_tracker import CostTracker
+
+        tracker = CostTracker()
+        tracker.track_usage("openai", "model-4", 1000, 0, tenant_id="t1", user_id="u1")
+
+        body = b"".join([c async for c in tracker.stream_export("csv", compress=True)])
+        lines = gzip.decompress(body).decode().splitlines()
+
+        assert lines[0] == "timestamp,tenant_id,user_id,provider,model,tokens,cost,cached"
+        assert lines[1].split(",")[1:] == ["t1", "u1", "openai", "model-4", "1000", "0.03", "False"]
+
+    @pytest.mark.asyncio
+    async def test_empty_arrow_export_is_a_valid_stream(self):
+        """Test that a range without rows still yields a schema-only Arrow stream."""
+        pa = pytest.importorskip("pyarrow")
+
+        from chatbot_ai_system.finops.cost_tracker import CostTracker
+        from chatbot_ai_system.finops.exporters import stream_arrow
+
+        tracker = CostTracker()
+        tracker.track_usage("openai", "model-4", 10, 10, tenant_id="t1")
+        body = b"".join([c async for c in stream_arrow(tracker.ledger, 0, time.time() + 1)])
+        empty = b"".join([c async for c in stream_arrow(tracker.ledger, 0, 1)])
+
+        full_table = pa.ipc.open_stream(body).read_all()
+        empty_table = pa.ipc.open_stream(empty).read_all()
+        assert empty_table.num_rows == 0
+        assert empty_table.schema == full_table.schema
@@ -0,0 +1,110 @@
+"""Unit tests for the FinOps export endpoints."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+SECRET = "test-secret-long-enough-for-hs256-keys"
+
+
+@pytest.fixture
+def client():
+    """Create a client for the application with a JWT secret configured."""
+    from pydantic import SecretStr
+
+    from chatbot_ai_system.config.settings import settings
+    from chatbot_ai_system.server.main import create_app
+
+    quota = MagicMock(check=AsyncMock(return_value={"allowed": True, "remaining": 100}))
+    with (
+        patch.object(settings, "jwt_secret_key", SecretStr(SECRET)),
+        patch("chatbot_ai_system.tenancy.tenant_middleware.QuotaEngine", return_value=quota),
+    ):
+        yield TestClient(create_app())
+
+
+def auth(tenant_id: str, *permissions: str) -> dict[str, str]:
+    """Build the Authorization header of a tenant user with the given permissions."""
+    from jose import jwt
+
+    claims = {
+        "sub": "user-1",
+        "tenant_id": tenant_id,
+        "permissions": list(permissions),
+        "exp": int(time.time()) + 300,
+    }
+    return {"Authorization": f"Bearer {jwt.encode(claims, SECRET, algorithm='HS256')}"}
+
+
+class TestCostExportAccess:
+    """Test suite for tenant scoping of the FinOps endpoints."""
+
+    def export(self, client, headers=None, **params):
+        from chatbot_ai_system.finops.cost_tracker import cost_tracker
+
+        with patch.object(cost_tracker, "stream_export", return_value=iter([b""])) as export:
+            response = client.get(
+                "/api/v1/finops/costs/export",
+                params={"gzip": False, **params},
+                headers=headers or {},
+            )
+        tenant = export.call_args.args[3] if export.called else None
+        return response, tenant
+
+    def test_export_requires_tenant_context(self, client):
+        """Test that callers without a verified token cannot export cost rows."""
+        response, _ = self.export(client)
+        assert response.status_code == 401
+
+        response, _ = self.export(
+            client, {"Authorization": "Bearer not-a-jwt", "X-Tenant-ID": "t1"}
+        )
+        assert response.status_code == 401
+
+    def test_export_is_scoped_to_own_tenant(self, client):
+        """Test that tenants only get their own rows."""
+        response, tenant = self.export(client, auth("t1"))
+        assert response.status_code == 200
+        assert tenant == "t1"
+
+        response, tenant = self.export(client, auth("t1"), tenant_id="t2")
+        assert response.status_code == 403
+        assert tenant is None
+
+    def test_admin_can_export_any_tenant(self, client):
+        """Test that system admins choose the tenant, or export all of them."""
+        response, tenant = self.export(client, auth("t1", "system:admin"))
+        assert response.status_code == 200
+        assert tenant is None
+
+        response, tenant = self.export(client, auth("t1", "system:admin"), tenant_id="t2")
+        assert tenant == "t2"
+
+    def test_report_requires_admin(self, client):
+        """Test that the cross-tenant report is refused to tenant users."""
+        from chatbot_ai_system.finops.cost_analyzer import CostAnalyzer
+
+        denied = client.get("/api/v1/finops/costs/report", headers=auth("t1", "cost:read"))
+        with patch.object(CostAnalyzer, "stream_cost_report", return_value=iter([b"report"])):
+            allowed = client.get("/api/v1/finops/costs/report", headers=auth("t1", "system:admin"))
+
+        assert denied.status_code == 403
+        assert allowed.status_code == 200
+        assert allowed.content == b"report"
+
+
+class TestFinOpsMounting:
+    """Test suite for mounting the FinOps endpoints in the application."""
+
+    def test_not_mounted_without_jwt_secret(self):
+        """Test that the endpoints are absent when tokens cannot be verified."""
+        from chatbot_ai_system.config.settings import settings
+        from chatbot_ai_system.server.main import create_app
+
+        with patch.object(settings, "jwt_secret_key", None):
+            client = TestClient(create_app())
+
+        response = client.get("/api/v1/finops/costs/export", headers=auth("t1"))
+        assert response.status_code == 404
@@ -0,0 +1,72 @@
+"""Unit tests for batched tenant access validation."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+def make_db(owned):
+    """Create a session mock whose queries return the ``owned`` ids."""
+    result = MagicMock()
+    result.scalars.return_value = list(owned)
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+class TestIsolationManager:
+    """Test suite for tenant access validation."""
+
+    @pytest.mark.asyncio
+    async def test_many_resources_cost_one_query(self):
+        """Test that a batch of ids is validated with a single query."""
+        from chatbot_ai_system.tenancy.isolation_manager import IsolationManager
+
+        db = make_db(["c1", "c3"])
+        manager = IsolationManager(db)
+
+        results = await manager.validate_tenant_access_many("t1", "chat", ["c1", "c2", "c3"])
+
+        assert results == {"c1": True, "c2": False, "c3": True}
+        assert db.execute.await_count == 1
+        query = str(db.execute.await_args.args[0])
+        assert "conversations.tenant_id" in query and "IN" in query
+
+    @pytest.mark.asyncio
+    async def test_granted_access_is_cached(self):
+        """Test that repeated checks of granted resources skip the database."""
+        from chatbot_ai_system.tenancy.isolation_manager import IsolationManager
+
+        db = make_db(["c1"])
+        manager = IsolationManager(db)
+
+        assert await manager.validate_tenant_access("t1", "c1", "chat") is True
+        assert await manager.validate_tenant_access("t1", "c1", "chat") is True
+        assert await manager.validate_tenant_access("t1", "c2", "chat") is False
+        assert await manager.validate_tenant_access("t1", "c2", "chat") is False
+
+        assert db.execute.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_messages_are_scoped_by_conversation(self):
+        """Test that messages are checked through the tenant of their conversation."""
+        from chatbot_ai_system.tenancy.isolation_manager import IsolationManager
+
+        db = make_db([])
+        manager = IsolationManager(db)
+
+        await manager.validate_tenant_access_many("t1", "message", ["m1"])
+
+        query = str(db.execute.await_args.args[0])
+        assert "JOIN conversations" in query
+
+    @pytest.mark.asyncio
+    async def test_unknown_resource_type_is_denied(self):
+        """Test that resource types without a model are denied without a query."""
+        from chatbot_ai_system.tenancy.isolation_manager import IsolationManager
+
+        db = make_db(["x"])
+        manager = IsolationManager(db)
+
+        assert await manager.validate_tenant_access("t1", "x", "dashboard") is False
+        db.execute.assert_not_awaited()
@@ -0,0 +1,110 @@
+"""Unit tests for the in-process profiler."""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def make_client() -> TestClient:
+    """Create a client for an app serving only the profiling endpoints."""
+    from chatbot_ai_system.api.profiling import profiling_router
+
+    app = FastAPI()
+    app.include_router(profiling_router, prefix="/profiling")
+    return TestClient(app)
+
+
+class TestProfilingEndpoints:
+    """Test suite for the profiling admin endpoints."""
+
+    def test_requests_are_refused_without_configured_token(self):
+        """Test that the endpoints fail closed when no token is configured."""
+        from chatbot_ai_system.config.settings import settings
+
+        with patch.object(settings, "profiling_token", None):
+            response = make_client().get("/profiling/status", headers={"X-Profiling-Token": "x"})
+
+        assert response.status_code == 403
+
+    def test_token_is_checked(self):
+        """Test that only the configured token is accepted."""
+        from pydantic import SecretStr
+
+        from chatbot_ai_system.config.settings import settings
+
+        client = make_client()
+        with patch.object(settings, "profiling_token", SecretStr("secret")):
+            missing = client.get("/profiling/status")
+            wrong = client.get("/profiling/status", headers={"X-Profiling-Token": "guess"})
+            right = client.get("/profiling/status", headers={"X-Profiling-Token": "secret"})
+
+        assert missing.status_code == 403
+        assert wrong.status_code == 403
+        assert right.status_code == 200
+        assert "loop_lag" in right.json()
+
+
+class TestProfiler:
+    """Test suite for the profiling instruments."""
+
+    def test_hot_section_accounts_time_per_coroutine(self):
+        """Test that sections are timed only while profiling and keyed by their owner."""
+        from chatbot_ai_system.telemetry import profiler as profiler_module
+
+        profiler = profiler_module.Profiler()
+        profiler.reset()
+
+        def lookup():
+            with profiler_module.hot_section("cache_lookup"):
+                time.sleep(0.01)
+
+        lookup()
+        assert profiler.get_sections() == []
+
+        with patch.object(profiler_module, "_sections_enabled", True):
+            lookup()
+            lookup()
+
+        sections = profiler.get_sections()
+        profiler.reset()
+
+        assert len(sections) == 1
+        section = sections[0]
+        assert section["section"] == "cache_lookup"
+        assert section["coroutine"].endswith("lookup")
+        assert section["count"] == 2
+        assert section["total_ms"] >= 20
+        assert section["max_ms"] >= section["mean_ms"]
+
+    def test_stack_sampler_collapses_stacks(self):
+        """Test that samples are aggregated as collapsed stacks, most frequent first."""
+        import sys
+
+        from chatbot_ai_system.telemetry.profiler import StackSampler
+
+        sampler = StackSampler(max_stacks=2)
+
+        def inner():
+            sampler.sample(sys._getframe())
+
+        def outer():
+            inner()
+
+        for _ in range(3):
+            outer()
+        sampler.sample(sys._getframe())
+        # A third distinct stack exceeds max_stacks
+        (lambda: sampler.sample(sys._getframe()))()
+
+        lines = sampler.collapsed().splitlines()
+
+        assert sampler.samples == 5
+        assert sampler.dropped == 1
+        assert len(lines) == 2
+        stack, count = lines[0].rsplit(" ", 1)
+        assert count == "3"
+        assert stack.split(";")[-2].endswith("<locals>.outer")
+        assert stack.split(";")[-1].endswith("<locals>.inner")
@@ -0,0 +1,96 @@
+"""Unit tests for the tenant quota engine."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+def make_redis(grant):
+    """Create a Redis mock whose quota script grants per ``grant(requested)``."""
+    from chatbot_ai_system.tenancy.quota_engine import QUOTA_SCRIPT
+
+    async def script(keys, args):
+        requested = args[2]
+        granted = grant(requested)
+        return [granted, 1, 1, 0 if granted else 1]
+
+    redis = AsyncMock()
+    script_mock = AsyncMock(side_effect=script)
+    redis.return_script = AsyncMock(side_effect=lambda keys, args: args[0])
+    redis.register_script = MagicMock(
+        side_effect=lambda source: script_mock if source == QUOTA_SCRIPT else redis.return_script
+    )
+    return redis, script_mock
+
+
+class TestQuotaEngine:
+    """Test suite for atomic quota checks with local leases."""
+
+    @pytest.mark.asyncio
+    async def test_hot_tenant_is_served_from_lease(self):
+        """Test that lease slices grow so most requests skip Redis."""
+        from chatbot_ai_system.tenancy.quota_engine import QuotaEngine
+
+        redis, script = make_redis(lambda requested: requested)
+        engine = QuotaEngine(redis)
+
+        results = [await engine.check("t1", "/chat", "enterprise", now=60.0) for _ in range(500)]
+
+        assert all(result["allowed"] for result in results)
+        # Slices of 1, 2, 4, ... capped at 10% of the 1000/minute limit
+        assert script.await_count < 15
+        requested = [call.kwargs["args"][2] for call in script.await_args_list]
+        assert max(requested) == 100
+
+    @pytest.mark.asyncio
+    async def test_denial_is_cached_for_the_window(self):
+        """Test that a rejected tenant is not re-checked in Redis within the minute."""
+        from chatbot_ai_system.tenancy.quota_engine import QuotaEngine
+
+        redis, script = make_redis(lambda requested: 0)
+        engine = QuotaEngine(redis)
+
+        first = await engine.check("t1", "/chat", "basic", now=60.0)
+        second = await engine.check("t1", "/chat", "basic", now=61.0)
+        next_window = await engine.check("t1", "/chat", "basic", now=120.0)
+
+        assert not first["allowed"] and not second["allowed"]
+        assert first["reason"] == "Exceeded 60 requests per minute"
+        assert not next_window["allowed"]
+        assert script.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unused_lease_is_returned(self):
+        """Test that leftover lease tokens are returned to the hour window."""
+        from chatbot_ai_system.tenancy.quota_engine import QuotaEngine
+
+        redis, _script = make_redis(lambda requested: requested)
+        engine = QuotaEngine(redis)
+
+        for _ in range(4):
+            await engine.check("t1", "/chat", "basic", now=60.0)
+        await engine.close()
+
+        # Slices 1 + 2 + 4 were granted for 4 requests
+        redis.return_script.assert_awaited_once_with(keys=["rate_limit:t1:/chat:hour:0"], args=[3])
+        assert engine.get_stats()["returned_tokens"] == 3
+
+    @pytest.mark.asyncio
+    async def test_return_to_expired_window_creates_no_key(self):
+        """Test that tokens returned late never leave a negative key without TTL."""
+        import fakeredis
+
+        from chatbot_ai_system.tenancy.quota_engine import QuotaEngine
+
+        redis = fakeredis.FakeAsyncRedis()
+        engine = QuotaEngine(redis)
+        await redis.set("hour:live", 5, ex=3600)
+
+        await engine._decrement("hour:expired", 3)
+        await engine._decrement("hour:live", 3)
+        await engine._decrement("hour:live", 3)
+
+        assert not await redis.exists("hour:expired")
+        assert int(await redis.get("hour:live")) == 0
+        assert await redis.ttl("hour:live") > 0
+        assert engine.get_stats()["returned_tokens"] == 5
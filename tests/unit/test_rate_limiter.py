@@ -215,3 +215,97 @@ class TestRateLimiter:
         await limiter.reset_quota("user123")
 
         mock_redis.delete.assert_called_with("rate_limit:user123")
+
+
+class TestShardedTenantRateLimiter:
+    """Test suite for the GCRA tenant rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_refill(self):
+        """Test that a tenant gets its tier capacity and then waits for refill."""
+        from chatbot_ai_system.tenancy.rate_limiter import TenantRateLimiter
+
+        limiter = TenantRateLimiter()
+
+        with patch("chatbot_ai_system.tenancy.rate_limiter.time.time", return_value=1000.0):
+            results = [await limiter.check_rate_limit("t1", "file_uploads") for _ in range(11)]
+        allowed, metadata = results[-1]
+
+        assert all(ok for ok, _ in results[:10])
+        assert allowed is False
+        assert metadata["capacity"] == 10
+        assert metadata["wait_time_seconds"] == pytest.approx(1 / 0.167)
+
+        with patch("chatbot_ai_system.tenancy.rate_limiter.time.time", return_value=1006.0):
+            allowed, metadata = await limiter.check_rate_limit("t1", "file_uploads")
+        assert allowed is True
+        assert metadata["tokens_remaining"] == 0
+
+    @pytest.mark.asyncio
+    async def test_key_count_is_bounded(self):
+        """Test that idle tenants are evicted once a shard is full."""
+        from chatbot_ai_system.tenancy.rate_limiter import TenantRateLimiter
+
+        limiter = TenantRateLimiter(shards=4, max_keys=64)
+
+        for i in range(1000):
+            await limiter.check_rate_limit(f"tenant-{i}", "api_requests")
+
+        stats = limiter.get_stats()
+        assert stats["keys"] <= 64
+        assert stats["evictions"] + stats["released"] >= 1000 - 64
+
+    @pytest.mark.asyncio
+    async def test_status_reports_tier_limits(self):
+        """Test per-tenant status from the table."""
+        from chatbot_ai_system.tenancy.rate_limiter import TenantRateLimiter
+
+        limiter = TenantRateLimiter()
+        await limiter.check_rate_limit("t1", "tokens", tokens=500, tier="enterprise")
+
+        status = await limiter.get_tenant_status("t1")
+
+        assert status["tokens"]["capacity"] == 200000
+        assert 199500 <= status["tokens"]["tokens_available"] <= 200000
+        assert await limiter.get_tenant_status("unknown") == {}
+
+    @pytest.mark.asyncio
+    async def test_distributed_denial_is_remembered_locally(self):
+        """Test that a TAT seen in Redis short-circuits later rejections."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from chatbot_ai_system.tenancy.rate_limiter import TenantRateLimiter
+
+        redis = MagicMock()
+        # Another pod has used the whole burst: TAT one tolerance ahead
+        script = AsyncMock(return_value=[0, str((1000.0 + 10 / 0.167) * 1000)])
+        redis.register_script = MagicMock(return_value=script)
+        limiter = TenantRateLimiter(redis_client=redis)
+
+        with patch("chatbot_ai_system.tenancy.rate_limiter.time.time", return_value=1000.0):
+            first, _ = await limiter.check_rate_limit("t1", "file_uploads")
+            second, metadata = await limiter.check_rate_limit("t1", "file_uploads")
+
+        assert first is False and second is False
+        assert script.await_count == 1
+        assert metadata["wait_time_seconds"] > 0
+        assert limiter.get_stats()["local_denials"] == 1
+
+    @pytest.mark.asyncio
+    async def test_local_table_limits_when_redis_fails(self):
+        """Test that the local fallback still limits while the Lua call raises."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from chatbot_ai_system.tenancy.rate_limiter import TenantRateLimiter
+
+        redis = MagicMock()
+        script = AsyncMock(side_effect=ConnectionError("redis down"))
+        redis.register_script = MagicMock(return_value=script)
+        limiter = TenantRateLimiter(redis_client=redis)
+
+        with patch("chatbot_ai_system.tenancy.rate_limiter.time.time", return_value=1000.0):
+            results = [await limiter.check_rate_limit("t1", "file_uploads") for _ in range(50)]
+
+        assert sum(ok for ok, _ in results) == 10
+        assert limiter.get_stats()["errors"] == 10
+        assert limiter.get_stats()["local_denials"] == 40
@@ -0,0 +1,163 @@
+"""Unit tests for resumable stream replay logs."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+class TestReplayLogManager:
+    """Test suite for the stream replay log."""
+
+    @pytest.mark.asyncio
+    async def test_offsets_are_monotonic(self):
+        """Test that appended messages receive consecutive offsets."""
+        from chatbot_ai_system.streaming.replay_log import ReplayLogManager
+
+        replay_log = ReplayLogManager()
+        offsets = [await replay_log.append("s1", {"type": "delta", "i": i}) for i in range(5)]
+
+        assert offsets == [1, 2, 3, 4, 5]
+        assert replay_log.last_offset("s1") == 5
+        assert replay_log.last_offset("unknown") == 0
+
+    @pytest.mark.asyncio
+    async def test_read_since_returns_missing_tail(self):
+        """Test that only messages after the acknowledged offset are returned."""
+        from chatbot_ai_system.streaming.replay_log import ReplayLogManager
+
+        replay_log = ReplayLogManager()
+        for i in range(10):
+            await replay_log.append("s1", {"type": "delta", "i": i})
+
+        messages = await replay_log.read_since("s1", 7)
+
+        assert [m["offset"] for m in messages] == [8, 9, 10]
+        assert await replay_log.read_since("s1", 10) == []
+
+    @pytest.mark.asyncio
+    async def test_ring_buffer_falls_back_to_redis(self):
+        """Test that evicted entries are read from Redis with one XRANGE."""
+        from chatbot_ai_system.streaming.replay_log import ReplayLogConfig, ReplayLogManager
+
+        redis = AsyncMock()
+        redis.pipeline = MagicMock(return_value=MagicMock(execute=AsyncMock()))
+        redis.xrange.return_value = [(b"2-0", {b"data": b'{"type": "delta", "offset": 2}'})]
+
+        replay_log = ReplayLogManager(ReplayLogConfig(buffer_size=3), redis_client=redis)
+        for i in range(6):
+            await replay_log.append("s1", {"type": "delta", "i": i})
+
+        messages = await replay_log.read_since("s1", 1)
+
+        redis.xrange.assert_awaited_once()
+        assert redis.xrange.call_args.kwargs["min"] == "2-0"
+        assert messages == [{"type": "delta", "offset": 2}]
+
+    @pytest.mark.asyncio
+    async def test_offsets_continue_from_redis_on_another_pod(self):
+        """Test that a stream new to this process continues after the offset in Redis."""
+        from chatbot_ai_system.streaming.replay_log import ReplayLogManager
+
+        redis = AsyncMock()
+        pipe = MagicMock(execute=AsyncMock())
+        redis.pipeline = MagicMock(return_value=pipe)
+        redis.xrevrange.return_value = [(b"41-0", {b"data": b"{}"})]
+
+        replay_log = ReplayLogManager(redis_client=redis)
+        offsets = [await replay_log.append("s1", {"type": "delta"}) for _ in range(2)]
+
+        assert offsets == [42, 43]
+        redis.xrevrange.assert_awaited_once()
+        assert pipe.xadd.call_args.kwargs["id"] == "43-0"
+        # The entries written elsewhere are read from Redis
+        assert not replay_log.get_log("s1").covers(40)
+
+
+class TestResumableWebSocketManager:
+    """Test suite for stream resumption in the WebSocket manager."""
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_tail_in_one_frame(self, mock_websocket):
+        """Test that a resumed client receives missed deltas as a single frame."""
+        from chatbot_ai_system.streaming.websocket_manager import WebSocketManager
+
+        manager = WebSocketManager()
+        conn = await manager.connect(mock_websocket, "session1")
+        for i in range(3):
+            await manager.send_message("session1", {"type": "delta", "content": str(i)})
+        await manager.handle_ack("session1", 1)
+
+        # Deltas produced while the client is away are still recorded
+        await manager.disconnect("session1")
+        await manager.send_message("session1", {"type": "delta", "content": "3"})
+
+        new_ws = AsyncMock()
+        await manager.connect(
+            new_ws, "ignored", reconnect_token=conn.reconnect_token, last_offset=1
+        )
+
+        frames = [call.args[0] for call in new_ws.send_json.call_args_list]
+        replay = [f for f in frames if f["type"] == "replay"]
+        assert len(replay) == 1
+        assert replay[0]["count"] == 3
+        assert [m["offset"] for m in replay[0]["messages"]] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_without_offset_resumes_after_ack(self, mock_websocket):
+        """Test that the acked offset survives the disconnect with the reconnect token."""
+        from chatbot_ai_system.streaming.websocket_manager import WebSocketManager
+
+        manager = WebSocketManager()
+        conn = await manager.connect(mock_websocket, "session1")
+        for i in range(4):
+            await manager.send_message("session1", {"type": "delta", "content": str(i)})
+        # The client acknowledges through the socket; the manager routes the frame
+        assert await manager.handle_message("session1", {"type": "ack", "offset": 3})
+        await manager.disconnect("session1")
+
+        new_ws = AsyncMock()
+        await manager.connect(new_ws, "ignored", reconnect_token=conn.reconnect_token)
+
+        frames = [call.args[0] for call in new_ws.send_json.call_args_list]
+        replay = [f for f in frames if f["type"] == "replay"]
+        assert [m["offset"] for m in replay[0]["messages"]] == [4]
+        assert manager.acked_offsets == {}
+
+    @pytest.mark.asyncio
+    async def test_broadcast_offsets_are_per_session(self):
+        """Test that each session logs its own copy of a broadcast message."""
+        from chatbot_ai_system.streaming.websocket_manager import WebSocketManager
+
+        manager = WebSocketManager()
+        ws1, ws2 = AsyncMock(), AsyncMock()
+        await manager.connect(ws1, "session1")
+        await manager.connect(ws2, "session2")
+        await manager.send_message("session1", {"type": "delta", "content": "only 1"})
+
+        message = {"type": "delta", "content": "all"}
+        await manager.broadcast(message)
+
+        sent1 = [c.args[0] for c in ws1.send_json.call_args_list if c.args[0]["type"] == "delta"]
+        sent2 = [c.args[0] for c in ws2.send_json.call_args_list if c.args[0]["type"] == "delta"]
+        assert [m["offset"] for m in sent1] == [1, 2]
+        assert [m["offset"] for m in sent2] == [1]
+        assert [m["offset"] for m in await manager.replay_log.read_since("session2", 0)] == [1]
+        assert "offset" not in message
+
+    @pytest.mark.asyncio
+    async def test_client_control_frames(self):
+        """Test that acks and heartbeats are handled and other messages passed back."""
+        from chatbot_ai_system.streaming.websocket_manager import WebSocketManager
+
+        manager = WebSocketManager()
+        ws = AsyncMock()
+        await manager.connect(ws, "session1")
+
+        assert await manager.handle_message("session1", {"type": "ack", "offset": 4})
+        assert await manager.handle_message("session1", {"type": "ack", "offset": 2})
+        assert await manager.handle_message("session1", {"type": "ping"})
+        assert not await manager.handle_message("session1", {"type": "chat", "content": "hi"})
+
+        assert manager.connections["session1"].last_acked_offset == 4
+        assert ws.send_json.call_args.args[0]["type"] == "pong"
+        assert manager.stats["total_messages_received"] == 4
@@ -0,0 +1,100 @@
+"""Unit tests for retry budgets."""
+
+import pytest
+
+
+def failing(counter):
+    """Create a coroutine function that always fails and counts its calls."""
+
+    async def call():
+        counter.append(1)
+        raise ConnectionError("upstream down")
+
+    return call
+
+
+class TestRetryBudget:
+    """Test suite for retry budgets."""
+
+    def test_successes_refill_the_budget(self):
+        """Test that retries are limited to a share of successful requests."""
+        from chatbot_ai_system.reliability import RetryBudget
+
+        budget = RetryBudget(ratio=0.1, min_retries_per_second=0, max_tokens=1)
+        assert budget.can_retry()
+        assert not budget.can_retry()
+
+        for _ in range(10):
+            budget.record_success()
+        assert budget.can_retry()
+        assert budget.get_stats()["suppressed"] == 1
+
+    def test_nested_layers_do_not_retry(self):
+        """Test that a retry in progress suppresses retries of nested layers."""
+        from chatbot_ai_system.reliability import RetryBudget, retry_attempt
+
+        budget = RetryBudget()
+        with retry_attempt():
+            assert not budget.can_retry()
+        assert budget.can_retry()
+        assert budget.stats["nested_suppressed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_executor_stops_retrying_when_budget_is_spent(self):
+        """Test that an outage costs one attempt per call once the budget is gone."""
+        from chatbot_ai_system.reliability import RetryBudget, RetryConfig, RetryExecutor
+
+        budget = RetryBudget(min_retries_per_second=0, max_tokens=2)
+        config = RetryConfig(max_attempts=3, initial_delay_ms=0, jitter=False)
+        executor = RetryExecutor(config=config, budget=budget)
+        calls = []
+
+        for _ in range(5):
+            with pytest.raises(ConnectionError):
+                await executor.execute(failing(calls))
+
+        # 5 first attempts plus the 2 retries the budget allowed
+        assert len(calls) == 7
+        assert budget.stats["suppressed"] == 4
+
+    @pytest.mark.asyncio
+    async def test_nested_executors_do_not_multiply_attempts(self):
+        """Test that an inner executor makes one attempt during an outer retry."""
+        from chatbot_ai_system.reliability import RetryConfig, RetryExecutor
+        from chatbot_ai_system.reliability.retry_strategy import MaxRetriesExceededException
+
+        config = RetryConfig(max_attempts=3, initial_delay_ms=0, jitter=False)
+        inner = RetryExecutor(config=config)
+        outer = RetryExecutor(config=config)
+        calls = []
+
+        async def layer():
+            return await inner.execute(failing(calls))
+
+        with pytest.raises((ConnectionError, MaxRetriesExceededException)):
+            await outer.execute(layer)
+
+        # 3 attempts on the first outer attempt, then 1 per outer retry
+        assert len(calls) == 5
+
+    @pytest.mark.asyncio
+    async def test_fallback_success_is_credited_once(self):
+        """Test that only the provider client deposits into its budget."""
+        from chatbot_ai_system.orchestration.fallback_manager import FallbackChain, FallbackManager
+        from chatbot_ai_system.reliability import retry_budget_manager
+
+        budget = retry_budget_manager.get_or_create("budget-test-provider")
+        manager = FallbackManager()
+        manager.register_fallback_chain(
+            "chat", FallbackChain(primary=("budget-test-provider", "model"), fallbacks=[])
+        )
+
+        async def provider_call(provider, model):
+            # Provider clients record their own successes
+            retry_budget_manager.get_or_create(provider).record_success()
+            return "ok"
+
+        response, event = await manager.execute_with_fallback(provider_call, "chat", {})
+
+        assert response == "ok" and event is None
+        assert budget.stats["successes"] == 1
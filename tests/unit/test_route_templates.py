@@ -0,0 +1,139 @@
+"""Unit tests for route template resolution in the metrics middleware."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def make_app() -> FastAPI:
+    """Create an app with parameter, path and mounted routes."""
+    app = FastAPI()
+
+    @app.get("/api/v1/chats/search")
+    async def search_chats():
+        return {}
+
+    @app.get("/api/v1/chats/{chat_id}")
+    async def get_chat(chat_id: str):
+        return {}
+
+    @app.get("/api/v1/chats/{chat_id}/messages")
+    async def get_messages(chat_id: str):
+        return {}
+
+    @app.get("/files/{name:path}")
+    async def get_file(name: str):
+        return {}
+
+    admin = FastAPI()
+
+    @admin.get("/users/{user_id}")
+    async def get_user(user_id: str):
+        return {}
+
+    app.mount("/admin", admin)
+    return app
+
+
+def requests_counted(endpoint: str, status: int = 200) -> float:
+    """Read the request counter of the monitoring middleware for one endpoint."""
+    from prometheus_client import REGISTRY
+
+    labels = {"method": "GET", "endpoint": endpoint, "status": str(status)}
+    return REGISTRY.get_sample_value("chatbot_requests_total", labels) or 0.0
+
+
+class TestRouteTemplateResolver:
+    """Test suite for the route template trie."""
+
+    def test_parameter_routes(self):
+        """Test that parameter segments resolve to their template."""
+        from chatbot_ai_system.monitoring.metrics import RouteTemplateResolver
+
+        resolver = RouteTemplateResolver(make_app().routes)
+
+        assert resolver.resolve("/api/v1/chats/abc") == "/api/v1/chats/{chat_id}"
+        assert resolver.resolve("/api/v1/chats/abc/messages") == "/api/v1/chats/{chat_id}/messages"
+        assert resolver.resolve("/api/v1/chats/search") == "/api/v1/chats/search"
+
+    def test_path_parameter_matches_remaining_segments(self):
+        """Test that a ``{name:path}`` parameter takes the rest of the path."""
+        from chatbot_ai_system.monitoring.metrics import RouteTemplateResolver
+
+        resolver = RouteTemplateResolver(make_app().routes)
+
+        assert resolver.resolve("/files/a.txt") == "/files/{name}"
+        assert resolver.resolve("/files/reports/2024/q1.pdf") == "/files/{name}"
+
+    def test_mounted_routes_include_mount_prefix(self):
+        """Test that routes of a mounted app resolve with the mount path."""
+        from chatbot_ai_system.monitoring.metrics import RouteTemplateResolver
+
+        resolver = RouteTemplateResolver(make_app().routes)
+
+        assert resolver.resolve("/admin/users/42") == "/admin/users/{user_id}"
+        assert resolver.resolve("/users/42") is None
+
+    def test_unknown_paths_do_not_resolve(self):
+        """Test that paths without a route resolve to None."""
+        from chatbot_ai_system.monitoring.metrics import RouteTemplateResolver
+
+        resolver = RouteTemplateResolver(make_app().routes)
+
+        assert resolver.resolve("/wp-login.php") is None
+        assert resolver.resolve("/api/v1/chats/abc/messages/extra") is None
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used path is evicted first."""
+        from chatbot_ai_system.monitoring.metrics import RouteTemplateResolver
+
+        resolver = RouteTemplateResolver(make_app().routes, cache_size=2)
+        resolver.resolve("/api/v1/chats/a")
+        resolver.resolve("/api/v1/chats/b")
+        resolver.resolve("/api/v1/chats/a")
+        resolver.resolve("/api/v1/chats/c")
+
+        assert list(resolver._cache) == ["/api/v1/chats/a", "/api/v1/chats/c"]
+
+
+class TestMetricsMiddlewareEndpoint:
+    """Test suite for the endpoint label of the metrics middleware."""
+
+    def make_client(self) -> TestClient:
+        from chatbot_ai_system.monitoring.metrics import MetricsMiddleware
+
+        app = make_app()
+        app.middleware("http")(MetricsMiddleware())
+        return TestClient(app)
+
+    def test_requests_are_labelled_with_route_template(self):
+        """Test that parameter and path routes are counted under their template."""
+        client = self.make_client()
+        chats = requests_counted("/api/v1/chats/{chat_id}")
+        files = requests_counted("/files/{name}")
+
+        client.get("/api/v1/chats/1")
+        client.get("/api/v1/chats/2")
+        client.get("/files/reports/q1.pdf")
+
+        assert requests_counted("/api/v1/chats/{chat_id}") == chats + 2
+        assert requests_counted("/files/{name}") == files + 1
+
+    def test_mounted_requests_include_mount_prefix(self):
+        """Test that requests served by a mounted app keep the mount path."""
+        client = self.make_client()
+        before = requests_counted("/admin/users/{user_id}")
+
+        client.get("/admin/users/7")
+
+        assert requests_counted("/admin/users/{user_id}") == before + 1
+
+    def test_unmatched_requests_share_one_label(self):
+        """Test that paths without a route are counted as ``unmatched``."""
+        client = self.make_client()
+        before = requests_counted("unmatched", 404)
+
+        client.get("/wp-login.php")
+        client.get("/.env")
+
+        assert requests_counted("unmatched", 404) == before + 2
+        assert requests_counted("/wp-login.php", 404) == 0
@@ -0,0 +1,110 @@
+"""Unit tests for tail-based trace sampling."""
+
+MS = 1_000_000  # nanoseconds
+
+
+def make_tracer(**config):
+    """Create a tracer whose spans go through a tail sampler to an in-memory exporter."""
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    from chatbot_ai_system.telemetry.sampling import TailSamplingSpanProcessor
+
+    exporter = InMemorySpanExporter()
+    processor = TailSamplingSpanProcessor(
+        SimpleSpanProcessor(exporter), latency_threshold_ms=2000, sample_rate=0.0, **config
+    )
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__), processor, exporter
+
+
+def run_trace(tracer, duration_ms=10, child=None, root_attributes=None, start=10**18):
+    """Record a root span with one child span; ``child`` may modify the child."""
+    from opentelemetry import trace
+
+    root = tracer.start_span("request", start_time=start, attributes=root_attributes)
+    with trace.use_span(root):
+        span = tracer.start_span("provider_call", start_time=start + MS)
+        if child:
+            child(span)
+        span.end(end_time=start + 2 * MS)
+    root.end(end_time=start + duration_ms * MS)
+    return root
+
+
+def exported(exporter):
+    return [span.name for span in exporter.get_finished_spans()]
+
+
+class TestTailSampling:
+    """Test suite for the tail sampling span processor."""
+
+    def test_fast_unremarkable_trace_is_dropped(self):
+        """Test that a fast, successful, unsampled trace never reaches the exporter."""
+        tracer, processor, exporter = make_tracer()
+
+        run_trace(tracer)
+
+        assert exported(exporter) == []
+        assert processor.get_stats()["dropped"] == 1
+
+    def test_slow_trace_is_kept(self):
+        """Test that a root slower than the threshold keeps the whole trace."""
+        tracer, processor, exporter = make_tracer()
+
+        run_trace(tracer, duration_ms=3000)
+
+        assert exported(exporter) == ["provider_call", "request"]
+
+    def test_failed_trace_is_kept(self):
+        """Test that an error on any span keeps the trace."""
+        from opentelemetry.trace import Status, StatusCode
+
+        tracer, processor, exporter = make_tracer()
+
+        run_trace(tracer, child=lambda span: span.set_status(Status(StatusCode.ERROR)))
+
+        assert exported(exporter) == ["provider_call", "request"]
+
+    def test_keep_attribute_keeps_trace(self):
+        """Test that a span marked with the keep attribute keeps the trace."""
+        from chatbot_ai_system.telemetry.sampling import KEEP_ATTRIBUTE
+
+        tracer, processor, exporter = make_tracer()
+
+        run_trace(tracer, child=lambda span: span.set_attribute(KEEP_ATTRIBUTE, "fallback"))
+
+        assert exported(exporter) == ["provider_call", "request"]
+
+    def test_head_decision_is_followed(self):
+        """Test that the head sampling attribute of the root overrides the ratio."""
+        from chatbot_ai_system.telemetry.sampling import HEAD_SAMPLED_ATTRIBUTE
+
+        tracer, processor, exporter = make_tracer()
+        processor.sample_rate = 1.0
+
+        run_trace(tracer, root_attributes={HEAD_SAMPLED_ATTRIBUTE: False})
+        assert exported(exporter) == []
+
+        processor.sample_rate = 0.0
+        run_trace(tracer, root_attributes={HEAD_SAMPLED_ATTRIBUTE: True})
+        assert exported(exporter) == ["provider_call", "request"]
+
+    def test_evicted_slow_trace_is_kept_whole(self):
+        """Test that a long-running trace pushed out of the buffer is still exported."""
+        from opentelemetry import trace
+
+        tracer, processor, exporter = make_tracer(max_traces=1)
+        start = 10**18
+
+        slow_root = tracer.start_span("slow_request", start_time=start)
+        with trace.use_span(slow_root):
+            tracer.start_span("slow_child", start_time=start).end(end_time=start + MS)
+        # A newer trace ending spans well past the threshold evicts the slow one
+        run_trace(tracer, start=start + 5000 * MS)
+        slow_root.end(end_time=start + 6000 * MS)
+
+        assert exported(exporter) == ["slow_child", "slow_request"]
+        assert processor.get_stats()["evicted"] == 1
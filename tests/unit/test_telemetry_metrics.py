@@ -0,0 +1,132 @@
+"""Unit tests for request and SLI metrics."""
+
+import itertools
+
+import pytest
+
+_namespaces = itertools.count()
+
+
+@pytest.fixture
+def metrics(request):
+    """Create a metrics collector under its own namespace, unregistered afterwards.
+
+    Indirect parameters are passed to its ``TenantLabeler``.
+    """
+    from prometheus_client import REGISTRY
+
+    from chatbot_ai_system.telemetry.metrics import MetricsCollector, TenantLabeler
+
+    labeler = TenantLabeler(**getattr(request, "param", {}))
+    collector = MetricsCollector(namespace=f"test_{next(_namespaces)}", tenant_labeler=labeler)
+    yield collector
+    REGISTRY.unregister(collector._request_collector)
+    for registered in (
+        collector._counters,
+        collector._gauges,
+        collector._histograms,
+        collector._info,
+    ):
+        for metric in registered.values():
+            REGISTRY.unregister(metric)
+
+
+def scrape(collector, name, **labels):
+    """Read one sample of a collector from the Prometheus exposition output."""
+    from prometheus_client import generate_latest
+    from prometheus_client.parser import text_string_to_metric_families
+
+    name = f"{collector.namespace}_{name}"
+    for family in text_string_to_metric_families(generate_latest().decode()):
+        for sample in family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return None
+
+
+class TestRequestMetrics:
+    """Test suite for the scrape-time request collector."""
+
+    def test_sli_and_slo_values(self, metrics):
+        """Test that availability, error rate and compliance follow the recorded statuses."""
+        for status in (200, 201, 404, 503):
+            metrics.record_request("GET", "/api/v1/chats", status, 0.01, tenant_id="t1")
+
+        assert scrape(metrics, "sli_availability") == 0.75
+        assert scrape(metrics, "sli_error_rate") == 0.25
+        assert scrape(metrics, "slo_compliance", slo_name="availability") == 0.0
+        assert scrape(metrics, "slo_compliance", slo_name="error_rate") == 0.0
+        assert scrape(metrics, "sli_latency_seconds_count", endpoint="/api/v1/chats") == 4
+        assert scrape(metrics, "sli_latency_seconds_sum", endpoint="/api/v1/chats") == 0.04
+        assert metrics.get_snapshot().gauges["sli_availability"] == 0.75
+
+    def test_no_requests_meets_slo(self, metrics):
+        """Test that an idle process reports full availability."""
+        assert scrape(metrics, "sli_availability") == 1.0
+        assert scrape(metrics, "slo_compliance", slo_name="availability") == 1.0
+
+    def test_requests_counted_by_status_class(self, metrics):
+        """Test that statuses are collapsed into their class label."""
+        metrics.record_request("POST", "/api/v1/chat", 200, 0.1, tenant_id="t1")
+        metrics.record_request("POST", "/api/v1/chat", 204, 0.1, tenant_id="t1")
+        metrics.record_request("POST", "/api/v1/chat", 502, 0.1, tenant_id="t1")
+
+        labels = {"method": "POST", "endpoint": "/api/v1/chat", "tenant_id": "t1"}
+        assert scrape(metrics, "requests_total", status="2xx", **labels) == 2
+        assert scrape(metrics, "requests_total", status="5xx", **labels) == 1
+
+    def test_duration_histogram_buckets(self, metrics):
+        """Test that durations land in cumulative buckets, bounds inclusive."""
+        for duration in (0.003, 0.005, 0.1, 0.3, 20.0):
+            metrics.record_request("GET", "/health", 200, duration)
+
+        def bucket(le):
+            return scrape(
+                metrics, "request_duration_seconds_bucket", method="GET", endpoint="/health", le=le
+            )
+
+        assert bucket("0.005") == 2
+        assert bucket("0.05") == 2
+        assert bucket("0.1") == 3
+        assert bucket("0.5") == 4
+        assert bucket("10.0") == 4
+        assert bucket("+Inf") == 5
+        labels = {"method": "GET", "endpoint": "/health"}
+        assert scrape(metrics, "request_duration_seconds_count", **labels) == 5
+        assert scrape(metrics, "request_duration_seconds_sum", **labels) == pytest.approx(20.408)
+
+
+class TestTenantLabeler:
+    """Test suite for bounded tenant labels."""
+
+    @pytest.mark.parametrize(
+        "metrics", [{"max_tenant_series": 2, "buckets": 4, "pinned": ["vip"]}], indirect=True
+    )
+    def test_tenants_past_limit_share_bucket_labels(self, metrics):
+        """Test that tenants beyond the own-label limit are exported as ``other_NN``."""
+        import zlib
+
+        for tenant in ("t1", "t2", "t3", "vip"):
+            metrics.record_request("GET", "/api/v1/chats", 200, 0.01, tenant_id=tenant)
+
+        labels = {"method": "GET", "endpoint": "/api/v1/chats", "status": "2xx"}
+        bucket = f"other_{zlib.crc32(b't3') % 4:02d}"
+        assert scrape(metrics, "requests_total", tenant_id="t1", **labels) == 1
+        assert scrape(metrics, "requests_total", tenant_id="t2", **labels) == 1
+        assert scrape(metrics, "requests_total", tenant_id="t3", **labels) is None
+        assert scrape(metrics, "requests_total", tenant_id=bucket, **labels) == 1
+        # Pinned tenants keep their label and do not use up the limit
+        assert scrape(metrics, "requests_total", tenant_id="vip", **labels) == 1
+
+    def test_labels_are_stable(self):
+        """Test that a tenant keeps its label and missing tenants are ``unknown``."""
+        from chatbot_ai_system.telemetry.metrics import TenantLabeler
+
+        labeler = TenantLabeler(max_tenant_series=1, buckets=16)
+
+        assert labeler.label("t1") == "t1"
+        overflow = labeler.label("t2")
+        assert overflow.startswith("other_") and len(overflow) == len("other_00")
+        assert labeler.label("t2") == overflow
+        assert labeler.label("t1") == "t1"
+        assert labeler.label(None) == "unknown"
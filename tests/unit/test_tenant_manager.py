@@ -192,3 +192,123 @@ class TestTenantManager:
 
         assert result["success"] is True
         mock_database.commit.assert_called()
+
+
+class TestTenantConfigCache:
+    """Test suite for cached tenant lookups."""
+
+    @pytest.mark.asyncio
+    async def test_lookups_are_served_from_cache(self, mock_database, tenant_config):
+        """Test that repeated lookups hit the database once."""
+        from chatbot_ai_system.core.tenancy.tenant_manager import TenantManager
+
+        mock_database.execute.return_value.scalar_one_or_none.return_value = tenant_config
+        manager = TenantManager(db=mock_database)
+
+        for _ in range(5):
+            assert await manager.get_tenant(tenant_config["tenant_id"]) == tenant_config
+
+        assert mock_database.execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_tenant_is_negatively_cached(self):
+        """Test that unknown tenants are remembered until created."""
+        from chatbot_ai_system.core.tenancy.tenant_manager import TenantManager
+
+        manager = TenantManager()
+        loads = 0
+        load_tenant = manager._load_tenant
+
+        async def counting_loader(tenant_id):
+            nonlocal loads
+            loads += 1
+            return await load_tenant(tenant_id)
+
+        manager._load_tenant = counting_loader
+
+        assert await manager.get_tenant("missing") is None
+        assert await manager.get_tenant("missing") is None
+        assert loads == 1
+
+        await manager.create_tenant({"tenant_id": "missing", "tier": "basic"})
+        assert (await manager.get_tenant("missing"))["tier"] == "basic"
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_survives_load_failure(self):
+        """Test that an expired tenant is served when the database is down."""
+        from chatbot_ai_system.core.tenancy.tenant_cache import TenantConfigCache
+
+        cache = TenantConfigCache(ttl=0.0, stale_ttl=60.0)
+        cache.put("t1", {"tenant_id": "t1"}, {"streaming": True})
+
+        async def failing_loader(tenant_id):
+            raise ConnectionError("database unavailable")
+
+        entry = await cache.load("t1", failing_loader)
+
+        assert entry.record == {"tenant_id": "t1"}
+        assert entry.has_feature("streaming")
+        assert cache.get_stats()["stale_served"] == 1
+        with pytest.raises(ConnectionError):
+            await cache.load("t2", failing_loader)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_load_does_not_block_waiters(self):
+        """Test that a coalesced caller loads again when the loading call is cancelled."""
+        import asyncio
+
+        from chatbot_ai_system.core.tenancy.tenant_cache import TenantConfigCache
+
+        cache = TenantConfigCache()
+        started = asyncio.Event()
+        calls = 0
+
+        async def loader(tenant_id):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                started.set()
+                await asyncio.sleep(10)
+            return {"tenant_id": tenant_id}, {}
+
+        first = asyncio.create_task(cache.load("t1", loader))
+        await started.wait()
+        second = asyncio.create_task(cache.load("t1", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        entry = await asyncio.wait_for(second, timeout=1)
+
+        assert entry.record == {"tenant_id": "t1"}
+        assert calls == 2
+        assert first.cancelled()
+        assert cache.get_stats()["coalesced"] == 1
+
+    @pytest.mark.asyncio
+    async def test_feature_checks_follow_updates(self):
+        """Test that feature bitsets are rebuilt after a tenant update."""
+        from chatbot_ai_system.core.tenancy.tenant_manager import TenantManager
+
+        manager = TenantManager()
+        await manager.create_tenant({"tenant_id": "t1", "tier": "basic"})
+
+        assert await manager.has_feature("t1", "analytics") is False
+
+        await manager.update_tenant("t1", {"features": {"analytics": True}})
+
+        assert await manager.has_feature("t1", "analytics") is True
+        assert await manager.get_feature_flags("t1") == {"analytics": True}
+
+    @pytest.mark.asyncio
+    async def test_changes_are_published(self, mock_redis):
+        """Test that updates are announced to other processes."""
+        from unittest.mock import AsyncMock
+
+        from chatbot_ai_system.core.tenancy.tenant_manager import TenantManager
+
+        mock_redis.publish = AsyncMock()
+        manager = TenantManager(redis_client=mock_redis)
+        await manager.create_tenant({"tenant_id": "t1"})
+        await manager.update_tenant("t1", {"tier": "professional"})
+
+        mock_redis.publish.assert_awaited_with("tenant_changes", "t1")
@@ -0,0 +1,102 @@
+"""Unit tests for learned timeouts."""
+
+import asyncio
+import random
+
+import pytest
+
+
+class TestTimeoutManager:
+    """Test suite for timeouts derived from latency quantiles."""
+
+    def test_timeout_follows_tail_latency(self):
+        """Test that the learned timeout covers the observed tail, not the mean."""
+        from chatbot_ai_system.reliability import TimeoutManager
+
+        manager = TimeoutManager()
+        rng = random.Random(7)
+        for _ in range(1000):
+            # Mostly fast, with a heavy tail of long generations
+            manager.record_latency("chat", rng.choice([500] * 9 + [8000]))
+
+        p99 = manager.latency_quantile("chat", 0.99)
+        assert p99 == pytest.approx(8000, rel=0.05)
+        assert manager._calculate_effective_timeout(None, "chat", False) == pytest.approx(
+            12000, rel=0.05
+        )
+
+    def test_latency_is_tracked_per_model_and_output_size(self):
+        """Test that specific histories are used once they have enough samples."""
+        from chatbot_ai_system.reliability import TimeoutManager
+
+        manager = TimeoutManager()
+        for _ in range(50):
+            manager.record_latency("chat", 400, model="small", max_tokens=100)
+            manager.record_latency("chat", 20000, model="large", max_tokens=4000)
+
+        small = manager.suggest_timeout("chat", model="small", max_tokens=100)
+        large = manager.suggest_timeout("chat", model="large", max_tokens=4000)
+        unknown = manager.suggest_timeout("chat", model="other")
+
+        assert small == pytest.approx(600, rel=0.05)
+        assert large == pytest.approx(30000, rel=0.05)
+        # Falls back to the operation-wide history
+        assert unknown == pytest.approx(30000, rel=0.05)
+
+    def test_requested_timeout_and_deadline_cap_learned_timeout(self):
+        """Test that explicit timeouts and the propagated deadline still bound it."""
+        import time
+
+        from chatbot_ai_system.reliability import TimeoutManager, deadline_context
+
+        manager = TimeoutManager()
+        for _ in range(50):
+            manager.record_latency("chat", 10000)
+
+        assert manager._calculate_effective_timeout(2000, "chat", False) == 2000
+
+        token = deadline_context.set(time.time() + 1)
+        try:
+            assert manager._calculate_effective_timeout(None, "chat", True) < 1000
+        finally:
+            deadline_context.reset(token)
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_fast_when_stalled(self):
+        """Test that a stream stalling between chunks times out on the gap."""
+        from chatbot_ai_system.reliability import TimeoutConfig, TimeoutException, TimeoutManager
+
+        manager = TimeoutManager(TimeoutConfig(inter_token_timeout_ms=100, min_timeout_ms=10))
+
+        async def stalled():
+            yield "a"
+            yield "b"
+            await asyncio.sleep(10)
+            yield "c"
+
+        received = []
+        with pytest.raises(TimeoutException):
+            async for chunk in manager.stream_with_timeout(stalled(), model="gpt-4"):
+                received.append(chunk)
+
+        assert received == ["a", "b"]
+        assert manager.latency[("stream:ttft", None, None)].count == 1
+
+    @pytest.mark.asyncio
+    async def test_long_stream_is_not_killed(self):
+        """Test that a stream keeps going as long as chunks keep arriving."""
+        from chatbot_ai_system.reliability import TimeoutConfig, TimeoutManager
+
+        manager = TimeoutManager(
+            TimeoutConfig(first_token_timeout_ms=200, inter_token_timeout_ms=100, min_timeout_ms=10)
+        )
+
+        async def steady():
+            for i in range(20):
+                await asyncio.sleep(0.02)
+                yield i
+
+        chunks = [chunk async for chunk in manager.stream_with_timeout(steady())]
+
+        # 0.4s in total, longer than either per-chunk timeout
+        assert chunks == list(range(20))
@@ -0,0 +1,160 @@
+"""Unit tests for the shared token counter."""
+
+import pytest
+
+
+class WordEncoder:
+    """Tokenizer stand-in producing one token per word."""
+
+    name = "cl100k_base"
+
+    def __init__(self):
+        self.calls = 0
+        self.batch_calls = 0
+
+    def encode_ordinary(self, text):
+        self.calls += 1
+        return text.split()
+
+    def encode_ordinary_batch(self, texts):
+        self.batch_calls += 1
+        return [text.split() for text in texts]
+
+
+def make_counter(**kwargs):
+    """Create a token counter using the word encoder."""
+    from chatbot_ai_system.utils.token_counter import TokenCounter
+
+    counter = TokenCounter(**kwargs)
+    encoder = WordEncoder()
+    counter._encoders["cl100k_base"] = encoder
+    return counter, encoder
+
+
+class TestTokenCounter:
+    """Test suite for token accounting."""
+
+    def test_counts_are_memoized(self):
+        """Test that a text is encoded once."""
+        counter, encoder = make_counter()
+
+        assert counter.count_tokens("one two three") == 3
+        assert counter.count_tokens("one two three") == 3
+
+        assert encoder.calls == 1
+        assert counter.stats["hits"] == 1
+
+    def test_conversation_encodes_only_new_messages(self):
+        """Test that a growing conversation only encodes the new turn."""
+        counter, encoder = make_counter()
+        history = [{"role": "user", "content": "hello there"}]
+
+        first = counter.count_messages_tokens(history)
+        calls = encoder.calls
+        history.append({"role": "assistant", "content": "hi how are you"})
+        second = counter.count_messages_tokens(history)
+
+        # 3 per message, role and content words, 3 for the reply primer
+        assert first == 3 + 1 + 2 + 3
+        assert second == first + 3 + 1 + 4
+        assert encoder.calls - calls == 2  # new role and new content
+
+    def test_long_conversation_is_batched(self):
+        """Test that uncached texts above the threshold use the batch API."""
+        from chatbot_ai_system.providers.base import Message
+
+        counter, encoder = make_counter()
+        messages = [Message(role="user", content="word " * 5000)] * 3
+
+        assert counter.count_messages_tokens(messages) == 3 * (3 + 5000 + 1) + 3
+        assert encoder.batch_calls == 1
+
+    def test_stream_counter_matches_full_count(self):
+        """Test that incremental counting matches counting the whole completion."""
+        counter, _ = make_counter()
+        text = "The quick brown fox jumps over the lazy dog. " * 20
+        stream = counter.stream_counter("gpt-4")
+
+        for i in range(0, len(text), 7):
+            total = stream.add(text[i : i + 7])
+
+        assert total == counter.count_tokens(text)
+
+    def test_stream_without_spaces_is_committed(self):
+        """Test that text without word boundaries is not re-encoded from its start."""
+        counter, encoder = make_counter()
+        encoded = []
+        encode = encoder.encode_ordinary
+        encoder.encode_ordinary = lambda text: encoded.append(len(text)) or encode(text)
+        stream = counter.stream_counter("gpt-4")
+
+        for _ in range(500):
+            stream.add("数据流")
+
+        assert max(encoded) <= stream.commit_chars + 3
+
+    def test_unavailable_tokenizer_falls_back_to_estimate(self):
+        """Test the estimate used when an encoding cannot be loaded."""
+        from chatbot_ai_system.utils.token_counter import TokenCounter
+
+        counter = TokenCounter()
+        counter._encoders["cl100k_base"] = None
+
+        assert counter.count_tokens("x" * 40) == 10
+        assert counter.count_many(["abcd", "abcde"]) == [1, 2]
+
+    def test_failed_encoder_load_is_retried_after_backoff(self):
+        """Test that one failed fetch does not downgrade counts for good."""
+        import sys
+        from unittest.mock import MagicMock, patch
+
+        from chatbot_ai_system.utils.token_counter import TokenCounter
+
+        tiktoken = MagicMock()
+        tiktoken.get_encoding.side_effect = [OSError("download failed"), WordEncoder()]
+        counter = TokenCounter(load_retry_seconds=60)
+        clock = "chatbot_ai_system.utils.token_counter.time.monotonic"
+
+        with patch.dict(sys.modules, {"tiktoken": tiktoken}):
+            with patch(clock, return_value=1000.0):
+                assert counter.count_tokens("x" * 40) == 10
+                assert counter.count_tokens("x" * 40) == 10
+            assert tiktoken.get_encoding.call_count == 1
+
+            with patch(clock, return_value=1061.0):
+                assert counter.count_tokens("one two three") == 3
+        assert tiktoken.get_encoding.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_encoder_is_not_loaded_on_the_event_loop(self):
+        """Test that a first count on the loop estimates while the encoder loads."""
+        import sys
+        import threading
+        from unittest.mock import MagicMock, patch
+
+        from chatbot_ai_system.utils.token_counter import TokenCounter
+
+        loaded_on = []
+
+        def get_encoding(name):
+            loaded_on.append(threading.get_ident())
+            return WordEncoder()
+
+        tiktoken = MagicMock(get_encoding=get_encoding)
+        counter = TokenCounter()
+
+        with patch.dict(sys.modules, {"tiktoken": tiktoken}):
+            assert await counter.count_tokens_async("one two three") == 4
+            await counter.preload(["cl100k_base"])
+
+        assert await counter.count_tokens_async("one two three") == 3
+        assert loaded_on and threading.get_ident() not in loaded_on
+
+    @pytest.mark.asyncio
+    async def test_long_text_is_counted_off_loop(self):
+        """Test that very long texts are counted in a worker thread."""
+        counter, _ = make_counter(offload_threshold=100)
+
+        assert await counter.count_tokens_async("short text") == 2
+        assert await counter.count_tokens_async("word " * 100) == 100
+        assert counter.stats["offloaded"] == 1
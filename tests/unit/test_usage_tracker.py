@@ -0,0 +1,207 @@
+"""Unit tests for write-behind usage metering."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+def make_redis():
+    """Create a Redis mock whose pipeline records queued commands."""
+    redis = AsyncMock()
+    pipe = MagicMock(execute=AsyncMock())
+    redis.pipeline = MagicMock(return_value=pipe)
+    return redis, pipe
+
+
+class TestUsageTracker:
+    """Test suite for the usage metering pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_tracking_does_not_touch_redis(self):
+        """Test that tracking only buffers events on the request path."""
+        from chatbot_ai_system.tenancy.usage_tracker import UsageTracker
+
+        redis, pipe = make_redis()
+        tracker = UsageTracker(redis, flush_interval_ms=60_000)
+
+        await tracker.track_token_usage("t1", "gpt-4", 10, 20, 30, 0.5)
+        await tracker.track_api_call("t1", "/chat", "POST", 12.0, 200)
+
+        redis.pipeline.assert_not_called()
+        redis.incrbyfloat.assert_not_awaited()
+        assert tracker.get_metering_stats()["pending_events"] == 2
+        await tracker.stop()
+
+    @pytest.mark.asyncio
+    async def test_flush_coalesces_counters_into_one_pipeline(self):
+        """Test that repeated events on the same keys become one increment per key."""
+        from chatbot_ai_system.tenancy.usage_tracker import UsageTracker
+
+        redis, pipe = make_redis()
+        tracker = UsageTracker(redis, flush_interval_ms=60_000)
+
+        for _ in range(5):
+            await tracker.track_token_usage("t1", "gpt-4", 10, 20, 30, 0.5)
+
+        assert await tracker.flush() == 5
+
+        redis.pipeline.assert_called_once_with(transaction=True)
+        pipe.execute.assert_awaited_once()
+        increments = {call.args[1]: call.args[2] for call in pipe.hincrbyfloat.call_args_list}
+        # tokens and cost, plus the two per-model counters, in the hour rollup
+        assert len(increments) == 4
+        tokens = [v for field, v in increments.items() if field.endswith(":tokens")]
+        assert tokens == [150, 150]
+        await tracker.stop()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self):
+        """Test that reaching flush_max_events flushes without waiting for the timer."""
+        import asyncio
+
+        from chatbot_ai_system.tenancy.usage_tracker import UsageTracker
+
+        redis, pipe = make_redis()
+        tracker = UsageTracker(redis, flush_interval_ms=60_000, flush_max_events=3)
+
+        for _ in range(3):
+            await tracker.track_api_call("t1", "/chat", "POST", 12.0, 200)
+        await asyncio.sleep(0)
+
+        pipe.execute.assert_awaited_once()
+        assert tracker.get_metering_stats()["flushed_events"] == 3
+        await tracker.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_counters(self):
+        """Test that counters survive a Redis failure and overflow is counted."""
+        from chatbot_ai_system.tenancy.usage_tracker import UsageTracker
+
+        redis, pipe = make_redis()
+        pipe.execute.side_effect = [ConnectionError("down"), None]
+        tracker = UsageTracker(redis, flush_interval_ms=60_000, max_pending_events=1)
+
+        await tracker.track_api_call("t1", "/chat", "POST", 12.0, 200)
+        await tracker.track_api_call("t1", "/chat", "POST", 12.0, 200)
+        assert tracker.get_metering_stats()["dropped_events"] == 1
+
+        await tracker.flush()
+        assert tracker.get_metering_stats()["pending_counters"] == 1
+
+        await tracker.stop()
+        assert pipe.execute.await_count == 2
+        assert tracker.get_metering_stats()["pending_counters"] == 0
+
+
+class TestUsageRollups:
+    """Test suite for pre-aggregated usage rollups."""
+
+    def test_sketch_quantiles_within_accuracy(self):
+        """Test that sketch quantiles stay within the relative accuracy."""
+        from chatbot_ai_system.utils.quantile_sketch import DDSketch
+
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in range(1, 10_001):
+            sketch.add(float(value))
+
+        assert abs(sketch.quantile(0.5) - 5000) / 5000 <= 0.01
+        assert abs(sketch.quantile(0.99) - 9900) / 9900 <= 0.01
+        assert len(sketch.bins) < 1000
+
+    def test_sketch_fields_merge_additively(self):
+        """Test that adding encoded fields gives the merged sketch."""
+        from chatbot_ai_system.utils.quantile_sketch import DDSketch
+
+        first, second = DDSketch(), DDSketch()
+        for value in range(1, 101):
+            first.add(float(value))
+            second.add(float(value + 100))
+
+        fields = first.to_fields()
+        for field, value in second.to_fields().items():
+            fields[field] = fields.get(field, 0) + value
+        merged = DDSketch.from_fields({k.encode(): str(v) for k, v in fields.items()})
+
+        assert merged.count == 200
+        assert abs(merged.quantile(0.5) - 100) / 100 <= 0.02
+
+    @pytest.mark.asyncio
+    async def test_read_total_is_one_round_trip(self):
+        """Test that a month-long range is read with a single pipeline."""
+        from datetime import date
+
+        from chatbot_ai_system.tenancy.usage_rollup import UsageRollupStore
+
+        redis, pipe = make_redis()
+        pipe.execute.return_value = [
+            {b"2026-09:tokens": b"1000"},  # month hash for 2026
+            {b"2026-09-30:tokens": b"5"},  # day hash for September
+        ]
+        store = UsageRollupStore(redis)
+
+        totals = await store.read_total(
+            "t1", date(2026, 9, 1), date(2026, 9, 30), today=date(2026, 10, 18)
+        )
+
+        pipe.execute.assert_awaited_once()
+        assert pipe.hgetall.call_count == 2
+        # The compacted month total wins over the day hash for a whole month
+        assert totals == {"tokens": 1000.0}
+
+    @pytest.mark.asyncio
+    async def test_compaction_keeps_usage_past_hour_retention(self):
+        """Test that closed days are rolled into day and month hashes before expiring."""
+        from datetime import date, datetime
+
+        import fakeredis
+
+        from chatbot_ai_system.tenancy.usage_rollup import HOUR_TTL, UsageRollupStore
+
+        redis = fakeredis.FakeAsyncRedis()
+        store = UsageRollupStore(redis)
+        written_at = datetime(2026, 9, 29, 13, 0)
+        pipe = redis.pipeline(transaction=True)
+        store.queue_counters(
+            pipe, {store.counter_location("t1", "tokens", written_at): 150.0}, ["t1"]
+        )
+        await pipe.execute()
+
+        await store.compact(now=datetime(2026, 10, 1, 2, 0))
+
+        assert not await redis.exists(store.hour_key("t1", written_at.date()))
+        assert await redis.ttl(store.day_key("t1", written_at.date())) > HOUR_TTL
+        month_totals = await redis.hgetall(store.month_key("t1", 2026))
+        assert float(month_totals[b"2026-09:tokens"]) == 150.0
+        totals = await store.read_total(
+            "t1", date(2026, 9, 1), date(2026, 9, 30), today=date(2026, 10, 18)
+        )
+        assert totals == {"tokens": 150.0}
+
+    @pytest.mark.asyncio
+    async def test_tracker_runs_compaction_until_stopped(self):
+        """Test that a tracker writing rollups also compacts them."""
+        import asyncio
+        from datetime import datetime, timedelta
+
+        import fakeredis
+
+        from chatbot_ai_system.tenancy.usage_tracker import UsageTracker
+
+        redis = fakeredis.FakeAsyncRedis()
+        tracker = UsageTracker(redis, flush_interval_ms=60_000, compaction_interval=0.01)
+        closed_day = datetime.utcnow() - timedelta(days=2)
+        pipe = redis.pipeline(transaction=True)
+        tracker.rollups.queue_counters(
+            pipe, {tracker.rollups.counter_location("t1", "tokens", closed_day): 5.0}, ["t1"]
+        )
+        await pipe.execute()
+
+        await tracker.track_api_call("t1", "/chat", "POST", 12.0, 200)
+        await tracker.flush()
+        await asyncio.sleep(0.1)
+
+        assert not await redis.exists(tracker.rollups.hour_key("t1", closed_day.date()))
+        assert tracker.rollups.stats["compacted_days"] >= 1
+
+        await tracker.stop()
+        assert tracker.rollups._compaction_task is None
@@ -0,0 +1,240 @@
+"""Unit tests for the scalable WebSocket manager."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+SECRET = "test-secret-long-enough-for-hs256-keys"
+
+
+def make_manager(**config):
+    """Create a manager on fakeredis with Socket.IO calls mocked out."""
+    import fakeredis
+
+    from chatbot_ai_system.infrastructure.websocket_scalable import ScalableWebSocketManager
+
+    manager = ScalableWebSocketManager(
+        {"redis_url": "redis://localhost:6379", "jwt_secret": SECRET, **config}
+    )
+    manager.redis = fakeredis.FakeAsyncRedis()
+    manager.rate_limit_script = AsyncMock(return_value=[1, 9, 0, 0])
+    for name in ("emit", "enter_room", "leave_room", "disconnect"):
+        setattr(manager.sio, name, AsyncMock())
+    return manager
+
+
+def handler(manager, event):
+    """Get a registered Socket.IO event handler."""
+    return manager.sio.handlers["/"][event]
+
+
+async def connect(manager, sid, user_id, room):
+    """Connect a user with a valid token."""
+    import jwt
+
+    token = jwt.encode({"user_id": user_id}, SECRET, algorithm="HS256")
+    assert await handler(manager, "connect")(sid, {}, {"token": token, "room": room})
+
+
+def queued(manager, sid):
+    """Get the contents of queued messages emitted to a socket."""
+    return [
+        message["content"]
+        for call in manager.sio.emit.call_args_list
+        if call.args[0] == "queued_messages" and call.kwargs.get("room") == sid
+        for message in call.args[1]["messages"]
+    ]
+
+
+class TestOfflineQueue:
+    """Test suite for the per-room offline message streams."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_queued_and_delivered_once(self):
+        """Test that a reconnecting user gets what was sent while offline, once."""
+        manager = make_manager()
+        await connect(manager, "s1", "u1", "r1")
+        await handler(manager, "disconnect")("s1")
+
+        await connect(manager, "s2", "u2", "r1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "missed"})
+
+        await connect(manager, "s3", "u1", "r1")
+        await handler(manager, "disconnect")("s3")
+        await connect(manager, "s4", "u1", "r1")
+
+        assert queued(manager, "s3") == ["missed"]
+        # Acknowledged on delivery, so not delivered again
+        assert queued(manager, "s4") == []
+        stream = manager._offline_stream_key("r1")
+        group = manager._offline_group("u1")
+        consumers = await manager.redis.xinfo_consumers(stream, group)
+        assert [consumer["name"] for consumer in consumers] == [b"u1"]
+        assert consumers[0]["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_leaving_a_room_starts_queueing_it(self):
+        """Test that a room left for another one only queues messages sent after leaving."""
+        manager = make_manager()
+        await connect(manager, "s1", "u1", "r1")
+        await connect(manager, "s2", "u2", "r1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "live"})
+
+        await handler(manager, "join_room")("s1", {"room_id": "r2"})
+        await handler(manager, "disconnect")("s1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "missed"})
+
+        await connect(manager, "s3", "u1", "r1")
+
+        assert queued(manager, "s3") == ["missed"]
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_is_retried(self):
+        """Test that entries read but not acknowledged are delivered on the next drain."""
+        manager = make_manager()
+        await connect(manager, "s1", "u1", "r1")
+        await handler(manager, "disconnect")("s1")
+        await connect(manager, "s2", "u2", "r1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "missed"})
+
+        async def emit(event, *args, **kwargs):
+            if event == "queued_messages" and kwargs.get("room") == "s3":
+                raise ConnectionError("socket closed")
+
+        manager.sio.emit.side_effect = emit
+        await connect(manager, "s3", "u1", "r1")
+        await handler(manager, "disconnect")("s3")
+        await connect(manager, "s4", "u1", "r1")
+
+        assert queued(manager, "s4") == ["missed"]
+        consumers = await manager.redis.xinfo_consumers(
+            manager._offline_stream_key("r1"), manager._offline_group("u1")
+        )
+        assert consumers[0]["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_is_drained_with_other_sessions_open(self):
+        """Test that a second session or a room join delivers the room's backlog."""
+        manager = make_manager()
+        await connect(manager, "s1", "u1", "r1")
+        await handler(manager, "join_room")("s1", {"room_id": "r2"})
+        await connect(manager, "s2", "u2", "r1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "first"})
+
+        # s1 is still open in r2
+        await connect(manager, "s3", "u1", "r1")
+        await handler(manager, "disconnect")("s3")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "second"})
+        await handler(manager, "join_room")("s1", {"room_id": "r1"})
+
+        assert queued(manager, "s3") == ["first"]
+        assert queued(manager, "s1") == ["second"]
+
+    @pytest.mark.asyncio
+    async def test_live_messages_are_not_queued_for_new_sessions(self):
+        """Test that a session joining a room another session is in gets no duplicates."""
+        manager = make_manager()
+        await connect(manager, "s1", "u1", "r1")
+        await connect(manager, "s2", "u2", "r1")
+        await handler(manager, "message")("s2", {"type": "chat", "content": "live"})
+
+        await connect(manager, "s3", "u1", "r1")
+        await handler(manager, "disconnect")("s1")
+        await handler(manager, "disconnect")("s3")
+        await connect(manager, "s4", "u1", "r1")
+
+        assert queued(manager, "s3") == []
+        assert queued(manager, "s4") == []
+
+
+class TestConnectionRateLimit:
+    """Test suite for the GCRA connection rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_allowed_connection_checks_every_scope_at_once(self):
+        """Test that user, tenant and IP limits go to the script in one call."""
+        manager = make_manager()
+        manager.rate_limit_script.return_value = [1, 4, 0, 0]
+
+        decision = await manager._check_rate_limit("u1", tenant_id="t1", client_ip="10.0.0.1")
+
+        assert decision.allowed and decision.remaining == 4 and decision.retry_after == 0
+        manager.rate_limit_script.assert_awaited_once()
+        call = manager.rate_limit_script.await_args.kwargs
+        assert call["keys"] == [
+            "rate_limit:user:u1",
+            "rate_limit:tenant:t1",
+            "rate_limit:ip:10.0.0.1",
+        ]
+        # Emission interval and period per key, after the current time
+        assert call["args"][1:] == [6000.0, 60000, 60.0, 60000, 1200.0, 60000]
+
+    @pytest.mark.asyncio
+    async def test_denied_connection_reports_scope_and_retry_after(self):
+        """Test that the rejecting key is mapped back to its scope."""
+        manager = make_manager()
+        manager.rate_limit_script.return_value = [0, 0, 1500, 2]
+
+        decision = await manager._check_rate_limit("u1", tenant_id="t1", client_ip="10.0.0.1")
+
+        assert not decision.allowed
+        assert decision.limited_by == "tenant"
+        assert decision.retry_after == 1.5
+
+    @pytest.mark.asyncio
+    async def test_script_spaces_connections_by_emission_interval(self):
+        """Test allow, deny and retry-after against the Lua script itself."""
+        import fakeredis
+
+        from chatbot_ai_system.infrastructure.websocket_scalable import (
+            CONNECTION_RATE_LIMIT_SCRIPT,
+        )
+
+        manager = make_manager()
+        manager.config["max_connections_per_user"] = 2
+        manager.rate_limit_script = fakeredis.FakeAsyncRedis().register_script(
+            CONNECTION_RATE_LIMIT_SCRIPT
+        )
+
+        first = await manager._check_rate_limit("u1")
+        second = await manager._check_rate_limit("u1")
+        third = await manager._check_rate_limit("u1")
+
+        assert first.allowed and first.remaining == 1
+        assert second.allowed and second.remaining == 0
+        assert not third.allowed and third.limited_by == "user"
+        # One connection per 30s is earned back
+        assert third.retry_after == pytest.approx(30, abs=0.5)
+        assert (await manager._check_rate_limit("u2")).allowed
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_allows_connection(self):
+        """Test that the limiter fails open."""
+        manager = make_manager()
+        manager.rate_limit_script.side_effect = ConnectionError("redis down")
+
+        decision = await manager._check_rate_limit("u1")
+
+        assert decision.allowed
+
+    def test_forwarded_for_is_ignored_from_untrusted_peers(self):
+        """Test that clients cannot pick the IP their connections are counted under."""
+        manager = make_manager()
+
+        ip = manager._client_ip({"REMOTE_ADDR": "203.0.113.7", "HTTP_X_FORWARDED_FOR": "1.2.3.4"})
+
+        assert ip == "203.0.113.7"
+
+    def test_forwarded_for_is_read_behind_trusted_proxies(self):
+        """Test that the client is the last address not added by a trusted proxy."""
+        manager = make_manager(trusted_proxies=["10.0.0.0/8"])
+
+        def client_ip(forwarded):
+            return manager._client_ip(
+                {"REMOTE_ADDR": "10.0.0.2", "HTTP_X_FORWARDED_FOR": forwarded}
+            )
+
+        # The left-most entries come from the client and are not trusted
+        assert client_ip("1.2.3.4, 198.51.100.9, 10.0.0.1") == "198.51.100.9"
+        assert client_ip("198.51.100.9") == "198.51.100.9"
+        assert client_ip("") == "10.0.0.2"
@@ -0,0 +1,144 @@
+"""Unit tests for the sharded WebSocket connection registry."""
+
+from types import SimpleNamespace
+
+import pytest
+
+
+class TestTimingWheel:
+    """Test suite for the timing wheel."""
+
+    def test_advance_returns_only_due_timers(self):
+        """Test that advancing the wheel fires due timers and keeps later ones."""
+        from chatbot_ai_system.utils.timing_wheel import TimingWheel
+
+        wheel = TimingWheel(tick=1.0, slots=8)
+        wheel.schedule("a", 2.5)
+        wheel.schedule("b", 5.0)
+        wheel.schedule("c", 20.0)  # beyond one revolution
+
+        assert [key for key, _ in wheel.advance(3.0)] == ["a"]
+        assert [key for key, _ in wheel.advance(6.0)] == ["b"]
+        assert wheel.advance(19.0) == []
+        assert [key for key, _ in wheel.advance(20.0)] == ["c"]
+        assert len(wheel) == 0
+
+    def test_reschedule_and_cancel(self):
+        """Test that rescheduling moves a timer and cancel removes it."""
+        from chatbot_ai_system.utils.timing_wheel import TimingWheel
+
+        wheel = TimingWheel(tick=1.0, slots=8)
+        wheel.schedule("a", 2.0)
+        wheel.schedule("a", 4.0)
+        wheel.schedule("b", 3.0)
+        assert wheel.cancel("b") is True
+
+        assert wheel.advance(3.0) == []
+        assert [key for key, _ in wheel.advance(4.0)] == ["a"]
+
+
+class TestShardedConnectionRegistry:
+    """Test suite for the sharded registry."""
+
+    @pytest.mark.asyncio
+    async def test_indexes_maintained_incrementally(self):
+        """Test that secondary indexes follow add and remove."""
+        from chatbot_ai_system.websocket.registry import ShardedConnectionRegistry
+
+        registry = ShardedConnectionRegistry(num_shards=4)
+        conn = SimpleNamespace(user_id="u1", tenant_id="t1", conversation_id=None)
+
+        await registry.add("c1", conn, heartbeat_interval=30, inactive_timeout=300)
+        await registry.add("c2", SimpleNamespace(user_id="u1"), 30, 300)
+
+        assert len(registry) == 2
+        assert registry.lookup("user_id", "u1") == {"c1", "c2"}
+        assert registry.lookup("tenant_id", "t1") == {"c1"}
+
+        assert await registry.remove("c1") is conn
+        assert registry.lookup("user_id", "u1") == {"c2"}
+        assert registry.index_size("tenant_id") == 0
+        assert await registry.remove("c1") is None
+
+    def test_reservation_enforces_capacity(self):
+        """Test that slots are claimed before the handshake."""
+        from chatbot_ai_system.websocket.registry import ShardedConnectionRegistry
+
+        registry = ShardedConnectionRegistry(max_connections=2)
+
+        assert registry.try_reserve() is True
+        assert registry.try_reserve() is True
+        assert registry.try_reserve() is False
+
+        registry.release_reservation()
+        assert registry.try_reserve() is True
+
+    @pytest.mark.asyncio
+    async def test_due_timers_across_shards(self):
+        """Test that ping and idle timers are collected from every shard."""
+        from chatbot_ai_system.websocket.registry import IDLE, PING, ShardedConnectionRegistry
+
+        registry = ShardedConnectionRegistry(num_shards=4)
+        for i in range(10):
+            await registry.add(
+                f"c{i}", SimpleNamespace(), heartbeat_interval=5, inactive_timeout=50
+            )
+
+        now = registry.shards[0].timers.current_tick * registry.shards[0].timers.tick
+        due = registry.due_timers(now + 10)
+
+        assert sorted(kind for kind, _, _ in due) == [PING] * 10
+        assert IDLE not in {kind for kind, _, _ in due}
+
+
+class TestHierarchicalTimingWheel:
+    """Test suite for cascading between wheel levels."""
+
+    def test_far_deadlines_cascade_to_lower_levels(self):
+        """Test that timers beyond the first level fire at the right tick."""
+        from chatbot_ai_system.utils.timing_wheel import TimingWheel
+
+        wheel = TimingWheel(tick=1.0, slots=4, levels=3)
+        deadlines = {f"t{d}": float(d) for d in (3, 7, 18, 40, 100)}
+        for key, deadline in deadlines.items():
+            wheel.schedule(key, deadline)
+
+        fired = {}
+        for now in range(1, 101):
+            for key, _ in wheel.advance(float(now)):
+                fired[key] = now
+
+        assert fired == {key: int(deadline) for key, deadline in deadlines.items()}
+
+
+class TestTimerScheduler:
+    """Test suite for the shared timer scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_fire_due_runs_callbacks_and_records_lag(self):
+        """Test that due callbacks run once and lag is tracked."""
+        from chatbot_ai_system.utils.timing_wheel import TimerScheduler
+
+        scheduler = TimerScheduler(name="test", tick=0.1)
+        calls = []
+        scheduler.call_at("a", scheduler.wheel.current_tick * 0.1 + 0.5, lambda: calls.append("a"))
+        scheduler.call_at("b", scheduler.wheel.current_tick * 0.1 + 5.0, lambda: calls.append("b"))
+
+        now = scheduler.wheel.current_tick * 0.1 + 1.0
+        assert scheduler.fire_due(now) == 1
+        assert calls == ["a"]
+        assert "b" in scheduler
+
+        stats = scheduler.get_stats()
+        assert stats["fired"] == 1
+        assert stats["max_lag_seconds"] == pytest.approx(0.5)
+        await scheduler.stop()
+
+    def test_spread_delay_is_within_interval(self):
+        """Test that first-fire offsets are spread across the interval."""
+        from chatbot_ai_system.utils.timing_wheel import spread_delay
+
+        delays = [spread_delay(f"conn-{i}", 30) for i in range(1000)]
+
+        assert all(0 < d <= 30 for d in delays)
+        assert min(delays) < 3 and max(delays) > 27